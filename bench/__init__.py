@@ -0,0 +1,3 @@
+"""
+UI-TARS性能基准测试脚本
+"""
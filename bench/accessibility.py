@@ -0,0 +1,222 @@
+"""
+无障碍树基准测试：对比每步完整遍历控件树和按AT-SPI事件增量更新的读取耗时，以及控件树文本和截图的token数
+
+模拟一个聊天应用的控件树（工具栏、会话列表、消息列表、输入框，GTK/Qt式的多层无名容器），
+每读取一个控件模拟一次D-Bus往返的耗时（--latency-ms）。每一步界面发生少量变化
+（新增消息、输入框内容变化、会话列表中最后一条消息更新），产生对应的事件：
+
+- full:        不监听事件，每步完整遍历
+- incremental: 按事件只重新读取变化的控件（同时与完整遍历的结果比较，检查序列化文本一致）
+
+    python -m bench.accessibility --steps 20 --latency-ms 0.5
+"""
+
+import time
+import random
+import argparse
+
+from ui_tars_accessibility import AccessibilityTree
+
+
+class FakeAccessible:
+    """
+    模拟的控件，box为窗口内坐标（顶层窗口为屏幕坐标）
+    """
+
+    def __init__(self, role, name="", box=(0, 0, 0, 0), text=None, showing=True):
+        self.role = role
+        self.name = name
+        self.box = box
+        self.text = text
+        self.showing = showing
+        self.children = []
+
+    def add(self, child):
+        self.children.append(child)
+        return child
+
+
+class FakeEvent:
+    def __init__(self, event_type, source, any_data=None, detail1=-1):
+        self.type = event_type
+        self.source = source
+        self.any_data = any_data
+        self.detail1 = detail1
+
+
+def wrap(parent, depth, box):
+    # GTK/Qt的控件外面通常套着几层没有名称的容器
+    for _ in range(depth):
+        parent = parent.add(FakeAccessible("filler", box=box))
+    return parent
+
+
+class SimulatedApp:
+    """
+    模拟的聊天应用：窗口在屏幕上的 (100, 50)，大小1280x800
+    """
+
+    def __init__(self, contacts=40, messages=60, seed=0):
+        self.rng = random.Random(seed)
+        self.root = FakeAccessible("frame", "聊天", (100, 50, 1280, 800))
+        body = wrap(self.root, 2, (0, 0, 1280, 800))
+
+        toolbar = wrap(body, 1, (0, 0, 60, 800))
+        for i, name in enumerate(("聊天", "通讯录", "收藏", "文件", "朋友圈", "设置")):
+            wrap(toolbar, 1, (10, 70 + i * 56, 40, 40)).add(FakeAccessible("push button", name,
+                                                                          (10, 70 + i * 56, 40, 40)))
+
+        self.contact_list = wrap(body, 2, (60, 60, 250, 740)).add(FakeAccessible("list", "", (60, 60, 250, 740)))
+        self.contacts = []
+        for i in range(contacts):
+            # 只有前十几个会话在可见范围内，其余不可见
+            item = self.contact_list.add(FakeAccessible("list item", f"联系人{i}", (60, 60 + i * 64, 250, 64),
+                                                        showing=i < 12))
+            item.add(FakeAccessible("label", f"最后一条消息{i}", (120, 90 + i * 64, 180, 20)))
+            self.contacts.append(item)
+
+        chat = wrap(body, 2, (310, 0, 970, 800))
+        chat.add(FakeAccessible("label", "联系人0", (330, 15, 200, 30)))
+        self.messages = wrap(chat, 1, (310, 60, 970, 560)).add(FakeAccessible("list", "", (310, 60, 970, 560)))
+        self.count = 0
+        for _ in range(messages):
+            self._message()
+
+        self.entry = chat.add(FakeAccessible("text", "", (330, 640, 800, 100), text=""))
+        chat.add(FakeAccessible("push button", "发送", (1150, 750, 100, 36)))
+
+    def _message(self):
+        """
+        新消息加在列表末尾，只有最后8条在可见范围内
+
+        Returns:
+            list: 产生的事件
+        """
+        self.count += 1
+        events = []
+        children = self.messages.children
+        if len(children) >= 8:
+            hidden = children[-8]
+            hidden.showing = False
+            events.append(FakeEvent("object:state-changed:showing", hidden))
+        item = self.messages.add(FakeAccessible("list item", "", (330, 560, 930, 60)))
+        wrap(item, 1, (330, 560, 930, 60)).add(FakeAccessible("label", f"第{self.count}条消息", (340, 570, 600, 40)))
+        events.append(FakeEvent("object:children-changed:add", self.messages, item, len(children) - 1))
+        return events
+
+    def step(self):
+        """
+        界面的一步变化
+
+        Returns:
+            list: 产生的事件
+        """
+        events = []
+        action = self.rng.random()
+        if action < 0.4:
+            self.entry.text = f"输入中的文字{self.rng.randint(0, 99)}"
+            events.append(FakeEvent("object:text-changed:insert", self.entry))
+        else:
+            self.entry.text = ""
+            events.append(FakeEvent("object:text-changed:delete", self.entry))
+            events.extend(self._message())
+            label = self.contacts[0].children[0]
+            label.name = f"第{self.count}条消息"
+            events.append(FakeEvent("object:property-change:accessible-name", label))
+        return events
+
+
+class SimulatedTree(AccessibilityTree):
+    """
+    读取模拟应用的无障碍树，每次读取控件按latency模拟D-Bus往返
+    """
+
+    def __init__(self, app, latency=0.0005, **kwargs):
+        super().__init__(**kwargs)
+        self.app = app
+        self.latency = latency
+
+    def available(self):
+        return True
+
+    def start(self):
+        self._listening = self.listen
+        return self
+
+    def stop(self):
+        self._listening = False
+
+    def _wait(self):
+        end = time.perf_counter() + self.latency
+        while time.perf_counter() < end:
+            pass
+
+    def _find_roots(self):
+        self._wait()
+        return [self.app.root]
+
+    def _children(self, accessible):
+        self._wait()
+        return list(accessible.children)
+
+    def _read(self, accessible, top_level):
+        self._wait()
+        return accessible.role, accessible.name, accessible.text, accessible.showing, accessible.box
+
+
+def run(steps=20, latency_ms=0.5, contacts=40, messages=60, seed=0):
+    """
+    依次运行full和incremental
+
+    Returns:
+        dict: 模式 -> avg_ms、first_ms（第一次读取）、avg_reads、cached、nodes、text_tokens，
+            incremental另有mismatches（与完整遍历结果不一致的步数）；另有image_tokens（1920x1080截图）
+    """
+    from ui_tars_budget import estimate_text_tokens, image_tokens
+
+    results = {"image_tokens": image_tokens(1920, 1080)}
+    for mode in ("full", "incremental"):
+        app = SimulatedApp(contacts, messages, seed)
+        tree = SimulatedTree(app, latency_ms / 1000, listen=mode == "incremental", refresh_seconds=0).start()
+        check = SimulatedTree(app, 0.0, listen=False)
+        region = app.root.box
+        first = tree.snapshot(region)
+        seconds, reads, mismatches, tokens = [], [], 0, []
+        for _ in range(steps):
+            for event in app.step():
+                tree.handle_event(event)
+            snapshot = tree.snapshot(region)
+            seconds.append(snapshot["seconds"])
+            reads.append(snapshot["reads"])
+            tokens.append(estimate_text_tokens(snapshot["text"]))
+            if mode == "incremental" and snapshot["text"] != check.snapshot(region)["text"]:
+                mismatches += 1
+        results[mode] = {
+            "first_ms": first["seconds"] * 1000,
+            "avg_ms": sum(seconds) * 1000 / steps,
+            "avg_reads": sum(reads) / steps,
+            "cached": snapshot["cached"],
+            "nodes": snapshot["nodes"],
+            "text_tokens": sum(tokens) / steps,
+            "mismatches": mismatches,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='无障碍树基准测试')
+    parser.add_argument('--steps', type=int, default=20, help='界面变化的步数')
+    parser.add_argument('--latency-ms', type=float, default=0.5, help='每次读取控件模拟的D-Bus往返耗时（毫秒）')
+    parser.add_argument('--contacts', type=int, default=40, help='会话列表中的联系人数')
+    parser.add_argument('--messages', type=int, default=60, help='消息列表中的初始消息数')
+    args = parser.parse_args()
+
+    results = run(args.steps, args.latency_ms, args.contacts, args.messages)
+    print(f"{'模式':<14}{'首次读取':>10}{'平均每步':>10}{'每步读取控件':>14}{'缓存控件':>10}{'列出控件':>10}"
+          f"{'文本token':>10}{'结果不一致':>12}")
+    for mode in ("full", "incremental"):
+        r = results[mode]
+        print(f"{mode:<14}{r['first_ms']:>8.1f}ms{r['avg_ms']:>8.1f}ms{r['avg_reads']:>14.1f}{r['cached']:>10}"
+              f"{r['nodes']:>10}{r['text_tokens']:>10.0f}{r['mismatches']:>12}")
+    print(f"\n1920x1080截图约 {results['image_tokens']} tokens，控件树文本约 "
+          f"{results['incremental']['text_tokens']:.0f} tokens")
@@ -0,0 +1,123 @@
+"""
+跨会话请求合并基准测试：多个会话同时运行时，对比逐个发送和合并为批量请求的总吞吐量
+
+桩模型服务只有slots个执行槽位（模拟一块GPU上的推理引擎）：逐个发送时请求排队，每个请求都要付一次基础延迟；
+合并后一个批量请求只占用一个槽位、只付一次基础延迟。每个会话是缸中脑模式的多步任务（不执行动作）。
+
+- serial:   不合并，每个会话各自发送请求
+- batched:  共用一个MicroBatcher
+- fallback: 共用MicroBatcher，但服务不提供批量接口（检查退回逐个发送后没有额外开销）
+
+    python -m bench.batching --sessions 8 --steps 5 --window-ms 5
+"""
+
+import os
+import time
+import argparse
+import threading
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+
+from bench.stub_server import StubServer
+from bench.target_cache import StepModel
+
+
+def make_script(steps):
+    script = [f"Thought: 第{i + 1}步。\nAction: click(start_box='({100 + i * 150},500)')" for i in range(steps)]
+    script.append("Thought: 任务完成。\nAction: finished(content='完成')")
+    return script
+
+
+def run_sessions(server, sessions, steps, batcher=None):
+    """
+    同时运行多个会话，每个会话执行steps步后输出finished
+
+    Returns:
+        dict: seconds（总耗时）、requests、throughput（每秒请求数）、avg_step_seconds、max_step_seconds
+    """
+    from ui_tars_agent import UITarsAgent
+
+    agents = []
+    for _ in range(sessions):
+        agent = UITarsAgent(base_url=server.base_url, batcher=batcher)
+        agent.agent.debug_mode = False
+        agent._execute_ui_action = lambda action: {"status": "success"}
+        agents.append(agent)
+
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def session(agent):
+        message = "完成模拟任务"
+        try:
+            for _ in range(steps + 1):
+                start = time.perf_counter()
+                result = agent.process_task(message, None)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+                if result["action"]["type"] == "finished":
+                    break
+                message = "点击操作已完成，检查一下目标是否已完成"
+        except Exception as e:
+            errors.append(e)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(agent,)) for agent in agents]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+
+    return {
+        "seconds": seconds,
+        "requests": len(latencies),
+        "throughput": len(latencies) / seconds,
+        "avg_step_seconds": sum(latencies) / max(len(latencies), 1),
+        "max_step_seconds": max(latencies, default=0.0),
+    }
+
+
+def run(sessions=8, steps=5, window_ms=5, max_batch=8, slots=1, base_latency=0.1):
+    """
+    依次运行serial、batched和fallback
+
+    Returns:
+        dict: 模式 -> run_sessions的结果，合并模式另有batcher（合并统计）
+    """
+    from ui_tars_batching import MicroBatcher
+
+    results = {}
+    for name in ("serial", "batched", "fallback"):
+        model = StepModel(script=make_script(steps), base_latency=base_latency, prefill_per_token=0.00001,
+                          slots=slots)
+        with StubServer(model, batching=name != "fallback") as server:
+            if name == "serial":
+                results[name] = run_sessions(server, sessions, steps)
+                continue
+            with MicroBatcher(window_ms=window_ms, max_batch=max_batch) as batcher:
+                results[name] = run_sessions(server, sessions, steps, batcher)
+                results[name]["batcher"] = batcher.report()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='跨会话请求合并基准测试')
+    parser.add_argument('--sessions', type=int, default=8, help='同时运行的会话数')
+    parser.add_argument('--steps', type=int, default=5, help='每个会话的步骤数')
+    parser.add_argument('--window-ms', type=float, default=5, help='合并窗口（毫秒）')
+    parser.add_argument('--max-batch', type=int, default=8, help='一个批量请求最多包含的请求数')
+    parser.add_argument('--slots', type=int, default=1, help='桩模型服务的执行槽位数')
+    parser.add_argument('--base-latency', type=float, default=0.1, help='每次执行的基础延迟（秒）')
+    args = parser.parse_args()
+
+    results = run(args.sessions, args.steps, args.window_ms, args.max_batch, args.slots, args.base_latency)
+    print(f"{'模式':<10}{'请求':>6}{'总耗时':>10}{'吞吐(请求/秒)':>16}{'平均每步':>10}{'最慢一步':>10}{'平均批大小':>12}")
+    for name, r in results.items():
+        batcher = r.get("batcher")
+        batch = f"{batcher['avg_batch']:.1f}" if batcher and batcher["batches"] else "-"
+        print(f"{name:<10}{r['requests']:>6}{r['seconds']:>9.2f}s{r['throughput']:>16.1f}"
+              f"{r['avg_step_seconds']:>9.2f}s{r['max_step_seconds']:>9.2f}s{batch:>12}")
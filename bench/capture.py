@@ -0,0 +1,115 @@
+"""
+截图后端帧率基准测试
+
+在没有显示器的Linux上可以用 --xvfb 启动一个临时的Xvfb虚拟显示:
+
+    python -m bench.capture --xvfb --seconds 3
+"""
+
+import os
+import time
+import shutil
+import argparse
+import subprocess
+
+from ui_tars_capture import CAPTURE_BACKENDS
+
+
+def start_xvfb(width=1920, height=1080, display=":99"):
+    """
+    启动一个Xvfb虚拟显示并设置DISPLAY环境变量
+
+    Returns:
+        subprocess.Popen: Xvfb进程
+    """
+    if not shutil.which("Xvfb"):
+        raise RuntimeError("找不到Xvfb，请先安装xvfb")
+
+    process = subprocess.Popen(
+        ["Xvfb", display, "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    os.environ["DISPLAY"] = display
+
+    # 等待X服务器就绪
+    socket_path = f"/tmp/.X11-unix/X{display.lstrip(':')}"
+    deadline = time.time() + 5
+    while not os.path.exists(socket_path):
+        if time.time() > deadline or process.poll() is not None:
+            process.kill()
+            raise RuntimeError("Xvfb启动失败")
+        time.sleep(0.05)
+    return process
+
+
+def bench_backend(name, seconds=3.0, region=None):
+    """
+    测量单个截图后端的帧率
+
+    Args:
+        name (str): 后端名称
+        seconds (float): 测量时长
+        region (tuple, optional): 截图区域
+
+    Returns:
+        dict: 测量结果
+    """
+    backend = CAPTURE_BACKENDS[name]()
+    try:
+        # 预热一帧，排除首帧的初始化开销
+        frame = backend.grab(region)
+        frames = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            frame = backend.grab(region)
+            frames += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        backend.close()
+
+    return {
+        "backend": name,
+        "size": f"{frame.width}x{frame.height}",
+        "frames": frames,
+        "fps": frames / elapsed,
+        "ms_per_frame": elapsed * 1000 / frames,
+    }
+
+
+def run(seconds=3.0, region=None, backends=None):
+    """
+    依次测量所有（或指定的）截图后端
+
+    Returns:
+        list: 每个后端的测量结果，失败的后端包含error字段
+    """
+    results = []
+    for name in backends or CAPTURE_BACKENDS:
+        try:
+            results.append(bench_backend(name, seconds, region))
+        except Exception as e:
+            results.append({"backend": name, "error": str(e)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='截图后端帧率基准测试')
+    parser.add_argument('--seconds', type=float, default=3.0, help='每个后端的测量时长（秒）')
+    parser.add_argument('--region', type=int, nargs=4, metavar=('LEFT', 'TOP', 'WIDTH', 'HEIGHT'),
+                        help='只截取指定区域')
+    parser.add_argument('--backend', action='append', choices=list(CAPTURE_BACKENDS),
+                        help='只测量指定后端，可重复')
+    parser.add_argument('--xvfb', action='store_true', help='启动临时Xvfb虚拟显示（1920x1080）')
+    args = parser.parse_args()
+
+    xvfb = start_xvfb() if args.xvfb else None
+    try:
+        for result in run(args.seconds, tuple(args.region) if args.region else None, args.backend):
+            if "error" in result:
+                print(f"{result['backend']:>10}: 不可用 ({result['error']})")
+            else:
+                print(f"{result['backend']:>10}: {result['size']} {result['fps']:7.1f} fps "
+                      f"({result['ms_per_frame']:.2f} ms/帧, {result['frames']} 帧)")
+    finally:
+        if xvfb:
+            xvfb.terminate()
@@ -0,0 +1,284 @@
+"""
+动作效果检查基准测试：统计每个任务的模型调用次数，对比不检查效果和检查效果（本地重试）两种方式
+
+模拟一个800x600的界面，上面是一排排按钮（按钮之间有10像素的空隙），点击按钮后按钮变色；
+每个任务依次点击若干个按钮，最后按一次ctrl+s（界面角落的保存标记变色）。模拟的模型：
+
+- 以 --edge 的概率把点击落在按钮边缘外1~4像素的空隙里（点击没有效果）
+- 以 --slow 的概率目标按钮响应较慢（--delay 秒后才变色，超过每步之间的等待时间）
+- 以 --drop 的概率热键的第一次按下被应用丢掉
+
+每步之后等待 --pause 秒再截图交给模型；目标没有变化时模型要再调用一次，重新给出位置：
+
+- off:    不检查效果，没有效果的动作在下一次模型调用时才被发现
+- verify: 执行器检查目标附近的变化，没有变化时等待更久、偏移几个像素再点或再按一次热键
+
+    python -m bench.effects --tasks 10 --buttons 5
+"""
+
+import time
+import random
+import argparse
+import threading
+
+MODES = ("off", "verify")
+
+BACKGROUND = (200, 200, 200)
+BUTTON = (60, 120, 200)
+ACTIVE = (60, 180, 90)
+
+
+class SimulatedScreen:
+    """
+    模拟的界面：按钮网格和右上角的保存标记，可以延迟生效
+    """
+
+    def __init__(self, width=800, height=600, button=(80, 30), gap=10, seed=0):
+        import numpy as np
+
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        self.pixels = np.full((height, width, 3), BACKGROUND, dtype=np.uint8)
+        self.buttons = []
+        bw, bh = button
+        for top in range(60, height - bh, bh + gap):
+            for left in range(20, width - bw, bw + gap):
+                self.buttons.append((left, top, bw, bh))
+                self.pixels[top:top + bh, left:left + bw] = BUTTON
+        self.saved_box = (width - 40, 10, 30, 30)
+        self.active = set()
+        self.saved = False
+        self.slow = set()
+        self.delay = 0.0
+        self.drop_next_key = False
+        self.lock = threading.Lock()
+        self.pending = []  # [(生效时间, 回调), ...]
+
+    def _fill(self, box, color):
+        left, top, width, height = box
+        self.pixels[top:top + height, left:left + width] = color
+
+    def _apply_pending(self):
+        now = time.perf_counter()
+        due = [p for p in self.pending if p[0] <= now]
+        self.pending = [p for p in self.pending if p[0] > now]
+        for _, callback in due:
+            callback()
+
+    def click(self, x, y):
+        with self.lock:
+            for index, (left, top, width, height) in enumerate(self.buttons):
+                if left <= x < left + width and top <= y < top + height:
+                    def activate(index=index):
+                        self.active.add(index)
+                        self._fill(self.buttons[index], ACTIVE)
+                    if index in self.slow:
+                        self.pending.append((time.perf_counter() + self.delay, activate))
+                    else:
+                        activate()
+                    return
+
+    def hotkey(self):
+        with self.lock:
+            if self.drop_next_key:
+                self.drop_next_key = False
+                return
+            self.saved = True
+            self._fill(self.saved_box, ACTIVE)
+
+    def grab(self, region):
+        with self.lock:
+            self._apply_pending()
+            left, top, width, height = region
+            return self.pixels[top:top + height, left:left + width].copy()
+
+    def reset(self):
+        with self.lock:
+            for box in self.buttons:
+                self._fill(box, BUTTON)
+            self._fill(self.saved_box, BACKGROUND)
+            self.active = set()
+            self.saved = False
+            self.slow = set()
+            self.pending = []
+            self.drop_next_key = False
+
+    def is_active(self, index):
+        with self.lock:
+            self._apply_pending()
+            return index in self.active
+
+
+class SimulatedCapture:
+    """
+    从模拟界面截图的截图后端
+    """
+
+    name = "simulated"
+
+    def __init__(self, screen):
+        self.screen = screen
+
+    def grab(self, region=None):
+        from ui_tars_capture import Frame
+
+        region = region or (0, 0, self.screen.width, self.screen.height)
+        pixels = self.screen.grab(region)
+        height, width = pixels.shape[:2]
+        return Frame(memoryview(pixels.tobytes()), width, height, width * 3, "RGB")
+
+    def close(self):
+        pass
+
+
+class SimulatedInput:
+    """
+    把输入事件作用到模拟界面的输入后端：鼠标松开时点击，组合键的最后一个键松开时触发热键
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.position = (0, 0)
+        self.keys = []
+
+    def check(self):
+        pass
+
+    def move(self, x, y):
+        self.position = (x, y)
+
+    def down(self, button):
+        pass
+
+    def up(self, button):
+        self.screen.click(*self.position)
+
+    def key_down(self, key):
+        self.keys.append(key)
+
+    def key_up(self, key):
+        if key in self.keys:
+            self.keys.remove(key)
+        if not self.keys:
+            self.screen.hotkey()
+
+    def scroll(self, clicks):
+        pass
+
+    hscroll = scroll
+
+    def text(self, content):
+        pass
+
+
+def pick_point(screen, box, rng, edge):
+    """
+    模拟模型给出的点击位置：通常在按钮中间，以edge的概率落在按钮边缘外1~4像素
+    """
+    left, top, width, height = box
+    if rng.random() >= edge:
+        return left + width // 2 + rng.randint(-10, 10), top + height // 2 + rng.randint(-4, 4)
+    side = rng.choice(("left", "right", "top", "bottom"))
+    miss = rng.randint(1, 4)
+    if side == "left":
+        return left - miss, top + rng.randint(5, height - 5)
+    if side == "right":
+        return left + width - 1 + miss, top + rng.randint(5, height - 5)
+    if side == "top":
+        return left + rng.randint(5, width - 5), top - miss
+    return left + rng.randint(5, width - 5), top + height - 1 + miss
+
+
+def run_mode(mode, tasks=10, buttons=5, edge=0.2, slow=0.1, drop=0.2, delay=0.25, pause=0.1, settle=0.1,
+             seed=0):
+    """
+    运行一种方式
+
+    Returns:
+        dict: calls_per_task（每个任务的模型调用次数）、extra_per_task（比必需的调用多出的次数）、
+            seconds_per_task、resolved、no_effect、retries、avg_check_ms（verify方式）
+    """
+    from ui_tars_executor import UITarsExecutor
+    from ui_tars_input import InputEngine
+    from ui_tars_effects import EffectVerifier
+
+    screen = SimulatedScreen(seed=seed)
+    rng = random.Random(seed)
+    verifier = EffectVerifier(SimulatedCapture(screen), settle=settle, poll=0.02) if mode == "verify" else None
+    executor = UITarsExecutor(screen_width=screen.width, screen_height=screen.height,
+                              input_engine=InputEngine(SimulatedInput(screen)), verifier=verifier)
+
+    def relative(x, y):
+        return f"({round(x * 1000 / screen.width)},{round(y * 1000 / screen.height)})"
+
+    calls = 0
+    start = time.perf_counter()
+    for _ in range(tasks):
+        screen.reset()
+        targets = rng.sample(range(len(screen.buttons)), buttons)
+        screen.slow = {t for t in targets if rng.random() < slow}
+        screen.delay = delay
+        for target in targets:
+            while not screen.is_active(target):
+                calls += 1
+                x, y = pick_point(screen, screen.buttons[target], rng, edge)
+                executor.execute({"type": "click", "params": {"start_box": relative(x, y)}})
+                # 每步之后的等待，然后截图交给模型
+                time.sleep(pause)
+        screen.drop_next_key = rng.random() < drop
+        while True:
+            calls += 1
+            executor.execute({"type": "hotkey", "params": {"key": "ctrl s"}})
+            time.sleep(pause)
+            if screen.saved:
+                break
+    seconds = time.perf_counter() - start
+    executor.close()
+
+    stats = verifier.report() if verifier else {}
+    return {
+        "calls_per_task": calls / tasks,
+        "extra_per_task": calls / tasks - (buttons + 1),
+        "seconds_per_task": seconds / tasks,
+        "resolved": stats.get("resolved", 0),
+        "no_effect": stats.get("no_effect", 0),
+        "retries": stats.get("retries", 0),
+        "avg_check_ms": stats.get("avg_ms", 0.0),
+    }
+
+
+def run(modes=MODES, **kwargs):
+    """
+    依次运行各方式（参数见run_mode）
+
+    Returns:
+        dict: 方式 -> run_mode的结果
+    """
+    return {mode: run_mode(mode, **kwargs) for mode in modes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='动作效果检查基准测试')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES), help='要测试的方式')
+    parser.add_argument('--tasks', type=int, default=10, help='任务数')
+    parser.add_argument('--buttons', type=int, default=5, help='每个任务点击的按钮数')
+    parser.add_argument('--edge', type=float, default=0.2, help='点击落在按钮边缘之外的概率')
+    parser.add_argument('--slow', type=float, default=0.1, help='按钮响应较慢的概率')
+    parser.add_argument('--drop', type=float, default=0.2, help='热键第一次按下被丢掉的概率')
+    parser.add_argument('--delay', type=float, default=0.25, help='响应较慢的按钮的生效延迟（秒）')
+    parser.add_argument('--pause', type=float, default=0.1, help='每步之后截图前的等待（秒）')
+    parser.add_argument('--settle', type=float, default=0.1, help='效果检查等待变化的时间（秒）')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(args.modes, tasks=args.tasks, buttons=args.buttons, edge=args.edge, slow=args.slow,
+                  drop=args.drop, delay=args.delay, pause=args.pause, settle=args.settle, seed=args.seed)
+    print(f"{'方式':<8}{'每任务模型调用':>16}{'多出的调用':>12}{'每任务耗时':>12}{'本地生效':>10}{'仍无变化':>10}"
+          f"{'重试':>8}{'平均检查':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['calls_per_task']:>16.2f}{r['extra_per_task']:>12.2f}{r['seconds_per_task']:>11.2f}s"
+              f"{r['resolved']:>10}{r['no_effect']:>10}{r['retries']:>8}{r['avg_check_ms']:>8.0f}ms")
+    if set(MODES) <= set(results):
+        saved = results["off"]["calls_per_task"] - results["verify"]["calls_per_task"]
+        print(f"\n每个任务省下 {saved:.2f} 次模型调用")
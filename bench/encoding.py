@@ -0,0 +1,126 @@
+"""
+截图编码基准测试：对比在会话线程中编码和在进程池中编码（共享内存传递像素）的吞吐量和每步延迟
+
+每个会话在自己的线程中循环：截图（复制一帧合成的BGRX截图）→ PNG编码和base64 → 构造请求JSON →
+等待模型（sleep模拟）。会话线程中编码时编码和base64转换持有GIL，多个会话相互排队；
+进程池中编码时会话线程只把像素复制到共享内存，等待结果期间不持有GIL。
+
+- throughput: 不等待模型，所有会话连续编码，统计每秒编码的帧数
+- step:       每步等待模型 --model-latency 秒，统计每步的平均和p95延迟
+
+    python -m bench.encoding --sessions 1 2 4 8 16 32 --steps 4 --processes 4
+"""
+
+import json
+import time
+import argparse
+import threading
+
+
+def make_capture_frame(seed, width=1920, height=1080):
+    """
+    生成一帧合成的BGRX截图（与XShm后端的格式相同）
+
+    Returns:
+        Frame: 截图帧
+    """
+    import numpy as np
+    from bench.grounding import make_frame
+    from ui_tars_capture import Frame
+
+    rgb = make_frame(seed, width, height)[0]
+    bgrx = np.empty((height, width, 4), dtype=np.uint8)
+    bgrx[..., 0], bgrx[..., 1], bgrx[..., 2], bgrx[..., 3] = rgb[..., 2], rgb[..., 1], rgb[..., 0], 0
+    return Frame(memoryview(bgrx.tobytes()), width, height, width * 4, "BGRX")
+
+
+def run_sessions(source, sessions, steps, encoder=None, model_latency=0.0):
+    """
+    同时运行多个会话
+
+    Returns:
+        dict: frames、seconds、fps（每秒编码帧数）、avg_step_ms、p95_step_ms、avg_encode_ms
+    """
+    from ui_tars_capture import Frame
+    from ui_tars_encoding import encode_frame
+
+    lock = threading.Lock()
+    steps_ms = []
+    encode_ms = []
+
+    def session(index):
+        for step in range(steps):
+            start = time.perf_counter()
+            # 截图：复制一帧（XShm后端的缓冲区会被下一次截图覆盖）
+            frame = Frame(memoryview(bytes(source.buffer)), source.width, source.height, source.stride, source.mode)
+            encoded = encoder.encode(frame) if encoder else encode_frame(frame)
+            encoded_at = time.perf_counter()
+            json.dumps({"messages": [{"role": "user", "content": [
+                {"type": "text", "text": f"会话{index}第{step}步"},
+                {"type": "image_url", "image_url": {"url": encoded["data_url"]}}]}]})
+            if model_latency:
+                time.sleep(model_latency)
+            with lock:
+                encode_ms.append((encoded_at - start) * 1000)
+                steps_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    ordered = sorted(steps_ms)
+    return {
+        "frames": len(steps_ms),
+        "seconds": seconds,
+        "fps": len(steps_ms) / seconds,
+        "avg_step_ms": sum(steps_ms) / len(steps_ms),
+        "p95_step_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "avg_encode_ms": sum(encode_ms) / len(encode_ms),
+    }
+
+
+def run(sessions=(1, 2, 4, 8, 16, 32), steps=4, processes=None, model_latency=0.3, width=1920, height=1080):
+    """
+    对每个会话数分别测量两种编码方式的吞吐量和每步延迟
+
+    Returns:
+        list: 每项为 (会话数, 方式, throughput结果, step结果)
+    """
+    from ui_tars_encoding import FrameEncoder
+
+    source = make_capture_frame(7, width, height)
+    results = []
+    with FrameEncoder(processes=processes) as encoder:
+        # 预热：启动工作进程并创建共享内存
+        for _ in range(encoder.processes):
+            encoder.encode(source)
+        for count in sessions:
+            for name, selected in (("thread", None), ("pool", encoder)):
+                throughput = run_sessions(source, count, steps, selected)
+                step = run_sessions(source, count, steps, selected, model_latency)
+                results.append((count, name, throughput, step))
+    return results
+
+
+if __name__ == "__main__":
+    import os
+
+    parser = argparse.ArgumentParser(description='截图编码基准测试')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32], help='同时运行的会话数')
+    parser.add_argument('--steps', type=int, default=4, help='每个会话的步骤数')
+    parser.add_argument('--processes', type=int, default=None, help='编码进程池的工作进程数，默认为CPU核数')
+    parser.add_argument('--model-latency', type=float, default=0.3, help='每步模拟的模型延迟（秒）')
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    args = parser.parse_args()
+
+    results = run(args.sessions, args.steps, args.processes, args.model_latency, args.width, args.height)
+    print(f"CPU核数 {os.cpu_count()}, 截图 {args.width}x{args.height}, 模型延迟 {args.model_latency}s")
+    print(f"{'会话':>4}  {'方式':<8}{'编码帧/秒':>10}{'编码耗时':>10}{'平均每步':>10}{'p95每步':>10}")
+    for count, name, throughput, step in results:
+        print(f"{count:>4}  {name:<8}{throughput['fps']:>10.1f}{throughput['avg_encode_ms']:>8.0f}ms"
+              f"{step['avg_step_ms']:>8.0f}ms{step['p95_step_ms']:>8.0f}ms")
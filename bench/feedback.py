@@ -0,0 +1,168 @@
+"""
+反馈格式基准测试：在回放集上对比中文模板反馈和紧凑结构化反馈的提示token数和失败信号
+
+回放集中的每条轨迹按录制的模型输出驱动代理（桩模型按步骤序号返回轨迹中的原始输出，不执行动作），
+每一步的反馈分别按两种格式生成：
+- template: 原有的中文模板，每一轮都重复同样的说明，执行失败时（除被拦截的点击外）也报告“已完成”
+- compact:  一行结构化结果（执行状态、实际位置、界面变化区域、稳定用时），格式说明在保留的历史中只出现一次
+
+统计桩模型收到的提示token（不含截图，两种格式的截图相同）、最后一轮请求的大小，
+以及执行失败的步骤中反馈如实报告失败的比例。两种格式下模型的输出相同，
+真实模型上的任务成功率需要在线评测，这里用失败信号的保留程度作为代理指标。
+
+合成回放集使用bench.loops的轨迹（每次点击有一定概率执行失败或被拦截），--corpus 指定录制的轨迹目录
+
+    python -m bench.feedback --per-kind 10
+    python -m bench.feedback --corpus ./trajectories
+"""
+
+import os
+import random
+import argparse
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+
+from bench.stub_server import StubServer
+from bench.target_cache import StepModel
+
+STYLES = ("template", "compact")
+
+
+def synthetic_corpus(per_kind, seed=0, failure_rate=0.15):
+    """
+    合成回放集：bench.loops的各类轨迹，补上原始输出和执行结果
+
+    Returns:
+        list: Trajectory列表（每步额外带execution和settle）
+    """
+    from bench.loops import KINDS, FrameBank, make_trajectory
+
+    rng = random.Random(seed)
+    bank = FrameBank()
+    corpus = []
+    for kind in KINDS:
+        for _ in range(per_kind):
+            trajectory = make_trajectory(kind, rng, bank)
+            for step in trajectory.steps:
+                action = step["action"]
+                params = action["params"]
+                args = ", ".join(f"{k}='{v}'" for k, v in params.items())
+                step["raw_response"] = f"Thought: 继续完成{kind}任务。\nAction: {action['type']}({args})"
+                step["execution"] = {"status": "success"}
+                if "start_box" in params:
+                    x, y = (int(v) for v in params["start_box"].strip("()").split(","))
+                    # 1000x1000的屏幕，绝对坐标与相对坐标相同
+                    step["execution"]["coords"] = {"x": x, "y": y}
+                    if action["type"] == "click" and rng.random() < failure_rate:
+                        step["execution"] = dict(step["execution"], status="error", blocked=rng.random() < 0.5,
+                                                 message="点击位置落在空白背景上" if rng.random() < 0.5
+                                                 else "执行异常: 目标窗口失去焦点")
+                step["settle"] = round(rng.uniform(0.2, 1.5), 1)
+            corpus.append(trajectory)
+    return corpus
+
+
+def make_feedback(style, step, next_frame, guidance=False):
+    """
+    按指定格式生成某一步之后的反馈，guidance为True时紧凑反馈附上格式说明
+
+    Returns:
+        str: 反馈
+    """
+    from ui_tars_feedback import GUIDANCE, template_feedback, compact_feedback, execution_status
+    from ui_tars_replay import frame_change
+
+    execution = step.get("execution") or {"status": step.get("status")}
+    action = dict(step["action"], blocked=bool(execution.get("blocked")))
+    if style == "template":
+        return template_feedback(action)
+
+    coords = execution.get("coords")
+    change = None
+    if step.get("frame") and next_frame:
+        change = frame_change(step["frame"], next_frame)
+    feedback = compact_feedback(action, execution_status(execution), (coords["x"], coords["y"]) if coords else None,
+                                change, step.get("settle"),
+                                execution.get("message") if execution.get("status") != "success" else None)
+    if guidance:
+        feedback = f"{GUIDANCE}\n{feedback}"
+    return feedback
+
+
+def replay(server, trajectory, style, num_history_responses):
+    """
+    按一种反馈格式回放一条轨迹
+
+    Returns:
+        dict: steps、feedback_chars、failures（执行失败的步骤数）、signaled（反馈如实报告失败的步骤数）
+    """
+    from ui_tars_agent import UITarsAgent
+    from ui_tars_feedback import needs_guidance
+
+    server.model.script = [step["raw_response"] for step in trajectory.steps]
+    agent = UITarsAgent(base_url=server.base_url, num_history_responses=num_history_responses)
+    agent.agent.debug_mode = False
+    agent._execute_ui_action = lambda action: {"status": "success"}
+
+    stats = {"steps": 0, "feedback_chars": 0, "failures": 0, "signaled": 0}
+    guidance_turn = None
+    message = trajectory.task or "完成模拟任务"
+    for index, step in enumerate(trajectory.steps):
+        agent.process_task(message, None)
+        stats["steps"] += 1
+        execution = step.get("execution") or {"status": step.get("status")}
+        next_frame = trajectory.steps[index + 1]["frame"] if index + 1 < len(trajectory.steps) else None
+        guidance = style == "compact" and needs_guidance(guidance_turn, agent.turns, agent.retained_turns())
+        if guidance:
+            guidance_turn = agent.turns
+        message = make_feedback(style, step, next_frame, guidance)
+        stats["feedback_chars"] += len(message)
+        if execution.get("status") not in (None, "success"):
+            stats["failures"] += 1
+            first_line = message.splitlines()[-1]
+            stats["signaled"] += any(mark in first_line for mark in ("blocked", "error", "未执行"))
+    return stats
+
+
+def run(per_kind=10, corpus=None, num_history_responses=20, seed=0):
+    """
+    在回放集上对比两种反馈格式
+
+    Returns:
+        dict: 格式 -> trajectories、steps、prompt_tokens、avg_prompt_tokens、max_prompt_tokens、
+            avg_feedback_chars、failures、signaled
+    """
+    from bench.loops import load_corpus
+
+    trajectories = load_corpus(corpus) if corpus else synthetic_corpus(per_kind, seed)
+    results = {}
+    for style in STYLES:
+        totals = {"trajectories": len(trajectories), "steps": 0, "feedback_chars": 0, "failures": 0, "signaled": 0}
+        with StubServer(StepModel(base_latency=0.0, prefill_per_token=0.0)) as server:
+            for trajectory in trajectories:
+                for key, value in replay(server, trajectory, style, num_history_responses).items():
+                    totals[key] += value
+            snapshot = server.model.snapshot()
+        totals["prompt_tokens"] = snapshot["prompt_tokens"]
+        totals["avg_prompt_tokens"] = snapshot["avg_prompt_tokens"]
+        totals["max_prompt_tokens"] = snapshot["max_prompt_tokens"]
+        totals["avg_feedback_chars"] = totals["feedback_chars"] / max(totals["steps"], 1)
+        results[style] = totals
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='反馈格式基准测试')
+    parser.add_argument('--per-kind', type=int, default=10, help='合成回放集中每类轨迹的条数')
+    parser.add_argument('--corpus', default=None, help='录制轨迹所在目录')
+    parser.add_argument('--history', type=int, default=20, help='发送给模型的最多历史轮数')
+    args = parser.parse_args()
+
+    results = run(args.per_kind, args.corpus, args.history)
+    print(f"{'格式':<10}{'轨迹':>6}{'步骤':>6}{'提示token':>12}{'平均每次':>10}{'最大一次':>10}{'平均反馈字数':>14}"
+          f"{'失败步骤':>10}{'如实反馈':>10}")
+    for style, r in results.items():
+        print(f"{style:<10}{r['trajectories']:>6}{r['steps']:>6}{r['prompt_tokens']:>12}{r['avg_prompt_tokens']:>10.0f}"
+              f"{r['max_prompt_tokens']:>10}{r['avg_feedback_chars']:>14.1f}{r['failures']:>10}{r['signaled']:>10}")
+    base, compact = results["template"], results["compact"]
+    print(f"\n提示token减少 {1 - compact['prompt_tokens'] / max(base['prompt_tokens'], 1):.1%}")
@@ -0,0 +1,190 @@
+"""
+多机任务分发基准测试：在本机启动一个调度服务和若干个worker进程，运行一批模拟任务，中途杀掉一个worker
+
+每个worker进程有 --slots 个槽位，执行函数为模拟的任务（不操作桌面）：每步等待 --step-seconds 秒并上报
+一个检查点；槽位第一次运行某个应用的任务时先等待 --cold-seconds 秒（启动应用、点击目标缓存未命中），
+之后同一槽位再运行该应用的任务时没有这段等待。运行 --kill-after 秒后用SIGKILL杀掉第一个worker，
+它正在运行的任务在失联后带着检查点重新分配，由其他worker从检查点继续。
+
+- fifo:     任务不带亲和键，按提交顺序分配
+- affinity: 任务以应用为亲和键，优先分配给运行过该应用的槽位
+
+    python -m bench.fleet --workers 3 --slots 2 --tasks 24 --apps 4
+"""
+
+import os
+import sys
+import time
+import signal
+import random
+import argparse
+import subprocess
+
+from bench.load_playground import _free_port
+
+MODES = ("fifo", "affinity")
+
+# 本worker进程中已经运行过的 (槽位, 应用)
+_WARM = set()
+
+
+def simulated_runner(job, slot, report, cancel_event):
+    """
+    模拟的任务执行函数（worker的 --runner bench.fleet:simulated_runner）：从检查点的步骤继续，每步上报检查点
+
+    Returns:
+        dict: steps、resumed_from（从第几步继续）、executed（本次执行的步数）、cold（是否冷启动）、pid
+    """
+    from ui_tars_jobs import JobCancelled
+
+    options = job["options"]
+    steps = options.get("steps", 8)
+    app = options.get("app")
+    start = (job.get("checkpoint") or {}).get("step", 0)
+    cold = (slot, app) not in _WARM
+    if cold:
+        if cancel_event.wait(options.get("cold_seconds", 0.5)):
+            raise JobCancelled()
+        _WARM.add((slot, app))
+    for step in range(start, steps):
+        if cancel_event.wait(options.get("step_seconds", 0.05)):
+            raise JobCancelled()
+        report("step", step=step)
+        report("checkpoint", checkpoint={"step": step + 1})
+    return {"steps": steps, "resumed_from": start, "executed": steps - start, "cold": cold, "pid": os.getpid()}
+
+
+def _wait_for(check, timeout, message):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(message)
+
+
+def _stop(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def run_mode(mode, workers=3, slots=2, tasks=24, apps=4, steps=20, step_seconds=0.05, cold_seconds=0.5,
+             kill_after=2.0, lease_seconds=1.5, affinity_wait=1.0, timeout=120.0, seed=0):
+    """
+    运行一种调度方式
+
+    Returns:
+        dict: succeeded、failed、seconds、throughput（每秒完成的任务数）、cold_starts、session_hits、
+            affinity_hits、affinity_misses、reassigned、lost_workers、resumed（从检查点继续的任务数）、
+            saved_steps（检查点省下的步数）
+    """
+    import httpx
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    quiet = {"cwd": root, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    dispatcher = subprocess.Popen(
+        [sys.executable, "-m", "ui_tars_fleet", "dispatcher", "--port", str(port),
+         "--lease-seconds", str(lease_seconds), "--affinity-wait", str(affinity_wait)], **quiet)
+    processes = []
+    client = httpx.Client(base_url=url, timeout=10)
+    try:
+        _wait_for(lambda: client.get("/fleet/stats").status_code == 200, 30, "等待调度服务就绪超时")
+        for index in range(workers):
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "ui_tars_fleet", "worker", "--dispatcher", url, "--name", f"w{index}",
+                 "--slots", *[f":{100 + index * slots + slot}" for slot in range(slots)],
+                 "--runner", "bench.fleet:simulated_runner", "--heartbeat", str(lease_seconds / 4)], **quiet))
+        _wait_for(lambda: client.get("/fleet/stats").json()["workers"] == workers, 30, "等待worker注册超时")
+
+        rng = random.Random(seed)
+        names = [f"app{rng.randrange(apps)}" for _ in range(tasks)]
+        start = time.perf_counter()
+        for index, app in enumerate(names):
+            client.post("/fleet/jobs", json={
+                "task": f"回归用例 {index}（{app}）",
+                "options": {"app": app, "steps": steps, "step_seconds": step_seconds, "cold_seconds": cold_seconds},
+                "affinity": app if mode == "affinity" else None,
+            }).raise_for_status()
+
+        killed = kill_after <= 0
+        while True:
+            stats = client.get("/fleet/stats").json()
+            if stats["succeeded"] + stats["failed"] + stats["cancelled"] >= tasks:
+                break
+            elapsed = time.perf_counter() - start
+            if not killed and elapsed >= kill_after:
+                processes[0].send_signal(signal.SIGKILL)
+                killed = True
+            if elapsed > timeout:
+                raise RuntimeError("等待任务完成超时")
+            time.sleep(0.05)
+        seconds = time.perf_counter() - start
+        results = [job["result"] for job in client.get("/fleet/jobs").json() if job["status"] == "succeeded"]
+    finally:
+        client.close()
+        for process in processes:
+            _stop(process)
+        _stop(dispatcher)
+
+    return {
+        "succeeded": stats["succeeded"],
+        "failed": stats["failed"],
+        "seconds": seconds,
+        "throughput": tasks / seconds,
+        "cold_starts": sum(1 for r in results if r["cold"]),
+        "session_hits": stats["session_hits"],
+        "affinity_hits": stats["affinity_hits"],
+        "affinity_misses": stats["affinity_misses"],
+        "reassigned": stats["reassigned"],
+        "lost_workers": stats["lost_workers"],
+        "resumed": sum(1 for r in results if r["resumed_from"]),
+        "saved_steps": sum(r["resumed_from"] for r in results),
+    }
+
+
+def run(modes=MODES, **kwargs):
+    """
+    依次运行各调度方式（参数见run_mode）
+
+    Returns:
+        dict: 方式 -> run_mode的结果
+    """
+    return {mode: run_mode(mode, **kwargs) for mode in modes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='多机任务分发基准测试')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES), help='要测试的调度方式')
+    parser.add_argument('--workers', type=int, default=3, help='worker进程数')
+    parser.add_argument('--slots', type=int, default=2, help='每个worker的槽位数')
+    parser.add_argument('--tasks', type=int, default=24, help='任务数')
+    parser.add_argument('--apps', type=int, default=4, help='任务涉及的应用数')
+    parser.add_argument('--steps', type=int, default=20, help='每个任务的步数')
+    parser.add_argument('--step-seconds', type=float, default=0.05, help='每步耗时（秒）')
+    parser.add_argument('--cold-seconds', type=float, default=0.5, help='槽位第一次运行某个应用时的冷启动耗时（秒）')
+    parser.add_argument('--kill-after', type=float, default=2.0, help='开始后多少秒杀掉第一个worker，0表示不杀')
+    parser.add_argument('--lease-seconds', type=float, default=1.5, help='worker失联判定时间（秒）')
+    parser.add_argument('--affinity-wait', type=float, default=1.0, help='任务为等待热槽位最多保留的时间（秒）')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(args.modes, workers=args.workers, slots=args.slots, tasks=args.tasks, apps=args.apps,
+                  steps=args.steps, step_seconds=args.step_seconds, cold_seconds=args.cold_seconds,
+                  kill_after=args.kill_after, lease_seconds=args.lease_seconds, affinity_wait=args.affinity_wait,
+                  seed=args.seed)
+    print(f"{'方式':<10}{'完成':>6}{'失败':>6}{'耗时':>9}{'吞吐':>10}{'冷启动':>8}{'热槽位/热worker/总数':>18}"
+          f"{'重新分配':>10}{'从检查点继续':>14}{'省下步数':>10}")
+    for mode, r in results.items():
+        hits = f"{r['session_hits']}/{r['affinity_hits']}/{r['affinity_hits'] + r['affinity_misses']}"
+        print(f"{mode:<10}{r['succeeded']:>6}{r['failed']:>6}{r['seconds']:>8.2f}s{r['throughput']:>7.2f}/s"
+              f"{r['cold_starts']:>8}{hits:>18}{r['reassigned']:>10}{r['resumed']:>14}{r['saved_steps']:>10}")
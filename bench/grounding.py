@@ -0,0 +1,220 @@
+"""
+本地定位检查基准测试：统计元素检测器对点击位置的吸附、拦截效果和耗时
+
+1. 合成帧：生成类似聊天软件的界面（侧边栏图标、会话列表、消息气泡、输入框和发送按钮），
+   已知每个控件的位置。模拟模型给出的点击位置（在控件中心附近按高斯分布偏移，另有一部分落在空白处），
+   对比直接点击和经过检测器检查后的命中率、误拦截和空白拦截率
+2. 录制帧：--recorded 指定截图目录时，另外统计每帧检测到的元素数和检测耗时（没有标注，只测耗时）
+
+    python -m bench.grounding --frames 20 --clicks 50
+    python -m bench.grounding --recorded ./screens
+"""
+
+import os
+import time
+import random
+import argparse
+
+from bench.load_playground import percentile
+
+
+def make_frame(seed, width=1280, height=720):
+    """
+    生成一帧合成界面
+
+    Returns:
+        tuple: (RGB数组, 控件列表[(x1, y1, x2, y2), ...], 空白区域列表[(x1, y1, x2, y2), ...])，右下角不含
+    """
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (245, 245, 245))
+    draw = ImageDraw.Draw(image)
+    widgets = []
+
+    # 左侧工具栏和图标
+    draw.rectangle([0, 0, 59, height - 1], fill=(46, 46, 46))
+    for i in range(6):
+        y = 70 + i * 56
+        box = (14, y, 46, y + 32)
+        draw.rounded_rectangle([box[0], box[1], box[2] - 1, box[3] - 1], radius=6, fill=(160, 160, 160))
+        widgets.append(box)
+
+    # 会话列表：头像 + 名字 + 最后一条消息，整行可点击
+    draw.rectangle([60, 0, 309, height - 1], fill=(233, 233, 233))
+    draw.line([309, 0, 309, height - 1], fill=(214, 214, 214))
+    selected = rng.randrange(8)
+    for i in range(8):
+        y = 64 + i * 68
+        if i == selected:
+            draw.rectangle([60, y, 308, y + 67], fill=(200, 200, 200))
+        color = tuple(rng.randrange(60, 200) for _ in range(3))
+        draw.rectangle([72, y + 12, 115, y + 55], fill=color)
+        draw.text((126, y + 16), f"contact {seed}-{i}", fill=(20, 20, 20))
+        draw.text((126, y + 38), "last message " * rng.randint(1, 2), fill=(140, 140, 140))
+        draw.text((262, y + 16), f"{rng.randint(10, 23)}:{rng.randint(10, 59)}", fill=(160, 160, 160))
+        widgets.append((60, y, 309, y + 68))
+
+    # 聊天区：标题栏和消息气泡
+    draw.line([310, 56, width - 1, 56], fill=(214, 214, 214))
+    draw.text((330, 22), f"chat {seed}", fill=(20, 20, 20))
+    y = 80
+    for i in range(rng.randint(2, 4)):
+        w = rng.randint(120, 360)
+        mine = rng.random() < 0.5
+        x1 = width - 80 - w if mine else 380
+        draw.rectangle([x1, y, x1 + w - 1, y + 39], fill=(149, 236, 105) if mine else (255, 255, 255))
+        draw.text((x1 + 12, y + 12), "hello " * (w // 60), fill=(20, 20, 20))
+        widgets.append((x1, y, x1 + w, y + 40))
+        y += 64
+
+    # 输入区：工具图标、输入框和发送按钮
+    top = height - 180
+    draw.line([310, top, width - 1, top], fill=(214, 214, 214))
+    for i in range(4):
+        box = (330 + i * 40, top + 12, 354 + i * 40, top + 36)
+        draw.rectangle([box[0], box[1], box[2] - 1, box[3] - 1], outline=(90, 90, 90), width=2)
+        widgets.append(box)
+    send = (width - 130, height - 52, width - 30, height - 18)
+    draw.rectangle([send[0], send[1], send[2] - 1, send[3] - 1], fill=(233, 233, 233), outline=(200, 200, 200))
+    draw.text((send[0] + 34, send[1] + 11), "Send", fill=(7, 193, 96))
+    widgets.append(send)
+
+    # 空白区域：消息气泡下方到输入区之间，以及输入区中央（离控件足够远）
+    blanks = [(400, y + 40, width - 120, top - 40), (560, top + 60, width - 200, height - 70)]
+    return np.asarray(image), widgets, blanks
+
+
+def make_clicks(widgets, blanks, count, blank_ratio, rng):
+    """
+    模拟模型给出的点击位置
+
+    Returns:
+        list: [(x, y, 目标控件或None), ...]，目标为None表示点击落在空白处
+    """
+    clicks = []
+    for _ in range(count):
+        if rng.random() < blank_ratio:
+            x1, y1, x2, y2 = rng.choice(blanks)
+            if x2 > x1 and y2 > y1:
+                clicks.append((rng.randrange(x1, x2), rng.randrange(y1, y2), None))
+                continue
+        box = rng.choice(widgets)
+        cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        # 偏移量与控件大小相关，小控件更容易点偏
+        sx = 4 + 0.4 * (box[2] - box[0]) / 2
+        sy = 4 + 0.4 * (box[3] - box[1]) / 2
+        clicks.append((int(rng.gauss(cx, sx)), int(rng.gauss(cy, sy)), box))
+    return clicks
+
+
+def inside(box, x, y):
+    return box[0] <= x < box[2] and box[1] <= y < box[3]
+
+
+def bench_synthetic(detector, frames=20, clicks=50, blank_ratio=0.2, seed=0):
+    """
+    在合成帧上比较直接点击和经过检查后的结果
+
+    Returns:
+        dict: 命中率、误拦截、空白拦截率、吸附次数和耗时
+    """
+    rng = random.Random(seed)
+    counts = {"targeted": 0, "raw_hits": 0, "grounded_hits": 0, "snapped": 0, "snap_fixed": 0,
+              "snap_broken": 0, "false_blocks": 0, "blank": 0, "blank_blocked": 0}
+    detect_seconds, locate_seconds = [], []
+
+    for index in range(frames):
+        array, widgets, blanks = make_frame(seed * 1000 + index)
+        start = time.perf_counter()
+        detection = detector.detect(array)
+        detect_seconds.append(time.perf_counter() - start)
+
+        height, width = array.shape[:2]
+        for x, y, target in make_clicks(widgets, blanks, clicks, blank_ratio, rng):
+            x, y = min(max(x, 0), width - 1), min(max(y, 0), height - 1)
+            start = time.perf_counter()
+            located = detector.locate(detection, x, y)
+            locate_seconds.append(time.perf_counter() - start)
+
+            if target is None:
+                counts["blank"] += 1
+                counts["blank_blocked"] += located["status"] == "empty"
+                continue
+
+            counts["targeted"] += 1
+            raw_hit = inside(target, x, y)
+            counts["raw_hits"] += raw_hit
+            if located["status"] == "empty":
+                counts["false_blocks"] += 1
+                continue
+            grounded_hit = inside(target, located["x"], located["y"])
+            counts["grounded_hits"] += grounded_hit
+            if located["status"] == "snapped":
+                counts["snapped"] += 1
+                counts["snap_fixed"] += grounded_hit and not raw_hit
+                counts["snap_broken"] += raw_hit and not grounded_hit
+
+    return dict(counts, frames=frames,
+                detect_ms=sum(detect_seconds) * 1000 / len(detect_seconds),
+                detect_p99_ms=percentile(detect_seconds, 0.99) * 1000,
+                locate_us=sum(locate_seconds) * 1e6 / max(len(locate_seconds), 1))
+
+
+def bench_recorded(detector, directory):
+    """
+    在录制的截图上统计检测耗时和元素数
+
+    Returns:
+        dict: 帧数、平均元素数和检测耗时
+    """
+    from ui_tars_grounding import to_gray
+
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")))
+    elements, seconds = [], []
+    for path in paths:
+        # 解码不计入检测耗时
+        gray = to_gray(path)
+        start = time.perf_counter()
+        detection = detector.detect(gray)
+        seconds.append(time.perf_counter() - start)
+        elements.append(len(detection["elements"]))
+    if not paths:
+        return {"frames": 0}
+    return {"frames": len(paths), "elements": sum(elements) / len(elements),
+            "detect_ms": sum(seconds) * 1000 / len(seconds), "detect_p99_ms": percentile(seconds, 0.99) * 1000}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='本地定位检查基准测试')
+    parser.add_argument('--frames', type=int, default=20, help='合成帧数')
+    parser.add_argument('--clicks', type=int, default=50, help='每帧模拟的点击数')
+    parser.add_argument('--blank-ratio', type=float, default=0.2, help='落在空白处的点击比例')
+    parser.add_argument('--snap-distance', type=int, default=24, help='吸附距离（像素）')
+    parser.add_argument('--cell', type=int, default=4, help='检测分块大小（像素）')
+    parser.add_argument('--recorded', default=None, help='录制截图所在目录')
+    args = parser.parse_args()
+
+    from ui_tars_grounding import ElementDetector
+
+    detector = ElementDetector(cell=args.cell, snap_distance=args.snap_distance)
+    r = bench_synthetic(detector, args.frames, args.clicks, args.blank_ratio)
+    targeted = max(r["targeted"], 1)
+    print(f"合成帧 {r['frames']} 帧, 指向控件的点击 {r['targeted']} 次, 空白处点击 {r['blank']} 次")
+    print(f"直接点击命中率: {r['raw_hits'] / targeted:.1%}")
+    print(f"检查后命中率:   {r['grounded_hits'] / targeted:.1%} "
+          f"(吸附 {r['snapped']} 次, 修正 {r['snap_fixed']} 次, 吸附出错 {r['snap_broken']} 次, "
+          f"误拦截 {r['false_blocks']} 次)")
+    print(f"空白点击拦截率: {r['blank_blocked'] / max(r['blank'], 1):.1%}")
+    print(f"检测耗时: 平均 {r['detect_ms']:.1f}ms, p99 {r['detect_p99_ms']:.1f}ms; "
+          f"单次检查 {r['locate_us']:.0f}us")
+
+    if args.recorded:
+        rec = bench_recorded(detector, args.recorded)
+        if rec["frames"]:
+            print(f"\n录制帧 {rec['frames']} 帧: 平均 {rec['elements']:.0f} 个元素, "
+                  f"检测耗时平均 {rec['detect_ms']:.1f}ms, p99 {rec['detect_p99_ms']:.1f}ms")
+        else:
+            print(f"\n{args.recorded} 中没有截图")
@@ -0,0 +1,130 @@
+"""
+导入耗时基准测试：在没有图形界面（去掉DISPLAY）的子进程里逐个导入模块，统计冷启动耗时，
+并检查导入后没有提前加载重型依赖（agno、openai、pyautogui、pyperclip、numpy）
+
+耗时取自 python -X importtime 输出中该模块的累计耗时，另外记录子进程的总耗时（含解释器启动）。
+任一模块超过 --budget-ms 或提前加载了重型依赖时以非零状态退出，便于在CI里作为门槛
+
+    python -m bench.importtime --repeat 5 --budget-ms 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+MODULES = [
+    "ui_tars_parser",
+    "ui_tars_replay",
+    "ui_tars_targets",
+    "ui_tars_grounding",
+    "ui_tars_executor",
+    "ui_tars_agent",
+    "ui_tars_session",
+    "ui_tars_cli",
+]
+
+HEAVY = ["agno", "openai", "httpx", "pyautogui", "pyperclip", "numpy", "PIL"]
+
+PROBE = """
+import sys
+import {module}
+heavy = {heavy!r}
+print("LOADED " + ",".join(name for name in heavy if name in sys.modules))
+"""
+
+
+def measure(module, cwd=None):
+    """
+    在新的子进程中导入一次模块
+
+    Returns:
+        dict: import_ms（-X importtime中的累计耗时）、wall_ms（子进程总耗时）、
+            loaded（已加载的重型依赖）和error（导入失败时的错误输出）
+    """
+    env = dict(os.environ)
+    env.pop("DISPLAY", None)
+    env.pop("WAYLAND_DISPLAY", None)
+    code = PROBE.format(module=module, heavy=HEAVY)
+
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env,
+                          capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    import_us = None
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            import_us = int(fields[1])
+
+    loaded = []
+    for line in proc.stdout.splitlines():
+        if line.startswith("LOADED "):
+            loaded = [name for name in line[len("LOADED "):].split(",") if name]
+
+    error = None
+    if proc.returncode != 0:
+        error = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")][-1:]
+    return {
+        "import_ms": import_us / 1000 if import_us is not None else None,
+        "wall_ms": wall_ms,
+        "loaded": loaded,
+        "error": error[0] if error else None,
+    }
+
+
+def run(modules=None, repeat=3, cwd=None):
+    """
+    每个模块导入repeat次，取最小值（排除磁盘缓存等偶然因素）
+
+    Returns:
+        dict: 模块名 -> import_ms、wall_ms、loaded、error
+    """
+    results = {}
+    for module in modules or MODULES:
+        samples = [measure(module, cwd) for _ in range(repeat)]
+        ok = [s for s in samples if s["error"] is None and s["import_ms"] is not None]
+        if not ok:
+            results[module] = samples[-1]
+            continue
+        results[module] = {
+            "import_ms": min(s["import_ms"] for s in ok),
+            "wall_ms": min(s["wall_ms"] for s in ok),
+            "loaded": ok[-1]["loaded"],
+            "error": None,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='导入耗时基准测试')
+    parser.add_argument('--modules', nargs='+', default=None, help='要测试的模块，默认全部')
+    parser.add_argument('--repeat', type=int, default=3, help='每个模块导入的次数（取最小值）')
+    parser.add_argument('--budget-ms', type=float, default=200, help='单个模块的导入耗时上限（毫秒）')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = run(args.modules, args.repeat, cwd=root)
+
+    failed = []
+    print(f"{'模块':<30}{'导入':>10}{'进程总耗时':>12}  提前加载的依赖")
+    for module, r in results.items():
+        if r["error"]:
+            print(f"{module:<30}{'失败':>10}{'':>12}  {r['error']}")
+            failed.append(module)
+            continue
+        over = r["import_ms"] > args.budget_ms
+        if over or r["loaded"]:
+            failed.append(module)
+        print(f"{module:<30}{r['import_ms']:>8.1f}ms{r['wall_ms']:>10.1f}ms  "
+              f"{','.join(r['loaded']) or '-'}{'  超出预算' if over else ''}")
+
+    if failed:
+        print(f"\n未通过: {', '.join(failed)} (预算 {args.budget_ms:.0f}ms，且不应加载 {', '.join(HEAVY)})")
+        sys.exit(1)
+    print(f"\n全部通过 (预算 {args.budget_ms:.0f}ms)")
@@ -0,0 +1,167 @@
+"""
+输入事件基准测试：对比在调用线程中内联执行动作和交给输入线程执行时的事件时间精度和每步耗时
+
+每一步执行一个动作（拖拽、输入或点击，按执行器的节奏），同时做一次“截图编码”（zlib压缩一帧
+合成画面，压缩时释放GIL，与真实的PNG/JPEG编码相同）。记录后端记下每个事件实际发生的时间：
+
+- inline: 旧的执行方式，调用线程中逐个调用并用time.sleep等待，动作完成后才开始编码
+- engine: 动作编译为事件序列交给InputEngine，编码与输入同时进行，编码完成后再等待输入完成
+
+--python-load 在编码的同时加入一个纯Python的计算线程（持有GIL），观察GIL争用下的时间偏差
+
+    python -m bench.input --steps 20
+"""
+
+import time
+import zlib
+import argparse
+import threading
+
+from ui_tars_input import InputEngine, InputEvent, click_events, drag_events, chord_events
+
+MODES = ("inline", "engine")
+
+
+class RecordingBackend:
+    """
+    记录每个事件实际发生时间的输入后端，每次调用按call_ms模拟一次X11/uinput调用的耗时
+    """
+
+    def __init__(self, call_ms=0.05):
+        self.call = call_ms / 1000
+        self.times = []
+
+    def _record(self, *args):
+        self.times.append(time.perf_counter())
+        end = time.perf_counter() + self.call
+        while time.perf_counter() < end:
+            pass
+
+    def check(self):
+        pass
+
+    move = down = up = key_down = key_up = scroll = hscroll = text = _record
+
+
+def actions(drag_duration=0.3):
+    """
+    每步依次使用的动作：拖拽、剪贴板输入（粘贴+回车，省去开始前的等待）、点击
+
+    Returns:
+        list: 事件序列列表
+    """
+    typing = (chord_events(["ctrl", "v"], at=0.0) + chord_events(["enter"], at=0.5)
+              + [InputEvent("idle", at=0.8)])
+    return [drag_events((100, 100), (700, 500), duration=drag_duration), typing, click_events(400, 300)]
+
+
+def play_inline(backend, events):
+    """
+    旧的执行方式：在调用线程中逐个调用，事件之间用time.sleep等待
+
+    Returns:
+        list: 每个事件的计划时间（perf_counter）
+    """
+    start = time.perf_counter()
+    planned = []
+    for event in sorted(events, key=lambda event: event.at):
+        delay = start + event.at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if event.kind != "idle":
+            planned.append(start + event.at)
+            backend._record()
+    return planned
+
+
+def encode(frame, level):
+    return len(zlib.compress(frame, level))
+
+
+def python_load(stop):
+    # 纯Python计算，持有GIL
+    value = 0
+    while not stop.is_set():
+        for i in range(10000):
+            value += i * i
+    return value
+
+
+def run_mode(mode, steps=20, frame_mb=8, level=6, call_ms=0.05, load=False, drag_duration=0.3):
+    """
+    运行一种模式
+
+    Returns:
+        dict: avg_lag_ms、p99_lag_ms、max_lag_ms（事件实际时间相对计划时间的偏差）、events、
+            step_ms（每步平均耗时）、encode_ms（每步平均编码耗时）
+    """
+    frame = bytes(range(256)) * (frame_mb * 4096)
+    backend = RecordingBackend(call_ms)
+    engine = InputEngine(backend) if mode == "engine" else None
+    sequences = actions(drag_duration)
+    stop = threading.Event()
+    loader = threading.Thread(target=python_load, args=(stop,), daemon=True) if load else None
+    if loader:
+        loader.start()
+
+    lags, step_seconds, encode_seconds = [], [], []
+    try:
+        for step in range(steps):
+            events = sequences[step % len(sequences)]
+            step_start = time.perf_counter()
+            recorded = len(backend.times)
+            if engine:
+                future = engine.submit(events)
+                start = time.perf_counter()
+                encode(frame, level)
+                encode_seconds.append(time.perf_counter() - start)
+                result = future.result()
+                planned = [result["started"] + event.at
+                           for event in sorted(events, key=lambda event: event.at) if event.kind != "idle"]
+            else:
+                planned = play_inline(backend, events)
+                start = time.perf_counter()
+                encode(frame, level)
+                encode_seconds.append(time.perf_counter() - start)
+            step_seconds.append(time.perf_counter() - step_start)
+            lags.extend(t - p for t, p in zip(backend.times[recorded:], planned))
+    finally:
+        stop.set()
+        if loader:
+            loader.join()
+
+    if engine:
+        engine.close()
+    lags.sort()
+    return {"avg_lag_ms": sum(lags) * 1000 / len(lags), "p99_lag_ms": lags[int(len(lags) * 0.99)] * 1000,
+            "max_lag_ms": lags[-1] * 1000, "events": len(lags), "step_ms": sum(step_seconds) * 1000 / steps,
+            "encode_ms": sum(encode_seconds) * 1000 / steps}
+
+
+def run(modes=MODES, steps=20, frame_mb=8, level=6, call_ms=0.05, load=False, drag_duration=0.3):
+    """
+    依次运行各模式
+
+    Returns:
+        dict: 模式 -> run_mode的结果
+    """
+    return {mode: run_mode(mode, steps, frame_mb, level, call_ms, load, drag_duration) for mode in modes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='输入事件基准测试')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES), help='要测试的执行方式')
+    parser.add_argument('--steps', type=int, default=20, help='步骤数')
+    parser.add_argument('--frame-mb', type=int, default=8, help='每步编码的合成画面大小（MB）')
+    parser.add_argument('--level', type=int, default=6, help='zlib压缩级别')
+    parser.add_argument('--call-ms', type=float, default=0.05, help='每次输入调用模拟的耗时（毫秒）')
+    parser.add_argument('--drag-duration', type=float, default=0.3, help='拖拽的持续时间（秒）')
+    parser.add_argument('--python-load', action='store_true', help='同时运行一个持有GIL的纯Python计算线程')
+    args = parser.parse_args()
+
+    results = run(args.modes, args.steps, args.frame_mb, args.level, args.call_ms, args.python_load,
+                  args.drag_duration)
+    print(f"{'方式':<10}{'事件数':>8}{'平均偏差':>12}{'P99偏差':>12}{'最大偏差':>12}{'每步编码':>12}{'每步耗时':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['events']:>8}{r['avg_lag_ms']:>10.3f}ms{r['p99_lag_ms']:>10.3f}ms"
+              f"{r['max_lag_ms']:>10.3f}ms{r['encode_ms']:>10.1f}ms{r['step_ms']:>10.1f}ms")
@@ -0,0 +1,153 @@
+"""
+Playground服务压测：用桩模型启动starter.py，并发调用运行接口，统计吞吐和延迟分位数
+
+每个配置启动一次独立的服务进程（生产模式，不自动重启），多个虚拟用户各自维护一个会话，
+每个会话连续发送若干轮消息，会话历史经由共享的SQLite存储在不同Agent实例间传递。
+
+    python -m bench.load_playground --workers 1 4 --users 32 --turns 4
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from bench.stub_server import StubModel, StubServer
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_playground(workers, pool_size, base_url, db_url, port, timeout=60.0):
+    """
+    以子进程启动starter.py并等待服务就绪
+
+    Returns:
+        subprocess.Popen: 服务进程
+    """
+    import httpx
+
+    env = dict(os.environ)
+    env.setdefault("HUOSHAN_API_KEY", "stub")
+    env.setdefault("DEEPSEEK_API_KEY", "stub")
+    env["UI_TARS_DEBUG"] = "0"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "starter.py", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--pool-size", str(pool_size),
+         "--base-url", base_url, "--db-url", db_url],
+        cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Playground服务启动失败，退出码 {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/v1/playground/status", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("等待Playground服务就绪超时")
+
+
+def percentile(values, ratio):
+    """
+    计算分位数（最近秩法）
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(ratio * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def _user(client, url, user_index, turns, latencies, errors):
+    session_id = f"load-{user_index}"
+    for turn in range(turns):
+        message = "打开微信，给文件传输助手发送一条消息：你好啊" if turn == 0 else "点击操作已完成，检查一下目标是否已完成"
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, data={"message": message, "stream": "false", "session_id": session_id})
+            if response.status_code != 200:
+                errors.append(f"HTTP {response.status_code}: {response.text[:80]}")
+                continue
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(str(e))
+
+
+async def _load(port, users, turns):
+    import httpx
+
+    url = f"http://127.0.0.1:{port}/v1/playground/agents/ui-tars/runs"
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(_user(client, url, i, turns, latencies, errors) for i in range(users)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def run(workers=1, pool_size=4, users=32, turns=4, model_latency=0.2):
+    """
+    启动一个服务配置并压测
+
+    Returns:
+        dict: 请求数、错误数、每秒请求数和延迟分位数（毫秒）
+    """
+    model = StubModel(base_latency=model_latency, prefill_per_token=0.0)
+    with tempfile.TemporaryDirectory() as directory, StubServer(model) as stub:
+        port = _free_port()
+        db_url = f"sqlite:///{os.path.join(directory, 'sessions.db')}"
+        process = start_playground(workers, pool_size, stub.base_url, db_url, port)
+        try:
+            latencies, errors, elapsed = asyncio.run(_load(port, users, turns))
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    return {
+        "workers": workers,
+        "pool_size": pool_size,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies, default=0) * 1000,
+        "model_requests": model.snapshot()["requests"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Playground服务压测')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='要对比的worker数')
+    parser.add_argument('--pool-size', type=int, default=4, help='每个worker的Agent池大小')
+    parser.add_argument('--users', type=int, default=32, help='并发用户（会话）数')
+    parser.add_argument('--turns', type=int, default=4, help='每个会话的轮数')
+    parser.add_argument('--model-latency', type=float, default=0.2, help='桩模型每次调用的延迟（秒）')
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'pool':>6}{'请求':>8}{'错误':>6}{'rps':>10}{'p50':>12}{'p99':>12}{'max':>12}")
+    for workers in args.workers:
+        result = run(workers, args.pool_size, args.users, args.turns, args.model_latency)
+        print(f"{result['workers']:>8}{result['pool_size']:>6}{result['requests']:>8}{result['errors']:>6}"
+              f"{result['rps']:>10.1f}{result['p50_ms']:>10.0f}ms{result['p99_ms']:>10.0f}ms{result['max_ms']:>10.0f}ms")
+        if result["first_error"]:
+            print(f"  首个错误: {result['first_error']}")
@@ -0,0 +1,194 @@
+"""
+循环检测基准测试：在轨迹语料上离线运行进度监控，统计提前结束省下的步骤和误判
+
+语料中每条轨迹按录制时的顺序给出每一步的动作和动作前截图签名。没有进度监控时，
+陷入循环的任务要一直跑到步骤预算用完；进度监控先发纠正提示，纠正后仍在循环才提前结束。
+
+合成语料（默认）包含：
+- normal:      正常完成的任务，含连续滚动浏览和等待加载（界面短暂不变）
+- recovered:   重复点击几次后自己摆脱并完成，不应被提前结束
+- repeat:      反复点击同一位置，界面没有反应
+- stall:       每步点击不同位置，界面始终没有变化
+- oscillation: 在打开和关闭同一个菜单之间来回切换
+
+--corpus 指定目录时改用录制的轨迹（ui-tars run --record 保存的JSON文件）
+
+    python -m bench.loops --per-kind 20
+    python -m bench.loops --corpus ./trajectories
+"""
+
+import os
+import random
+import argparse
+
+KINDS = ["normal", "recovered", "repeat", "stall", "oscillation"]
+
+
+class FrameBank:
+    """
+    合成界面的截图签名，按状态编号缓存
+    """
+
+    def __init__(self):
+        self.frames = {}
+
+    def get(self, state):
+        from bench.grounding import make_frame
+        from ui_tars_replay import frame_signature
+
+        if state not in self.frames:
+            self.frames[state] = frame_signature(make_frame(1000 + state)[0])
+        return self.frames[state]
+
+
+def _click(x, y):
+    return {"type": "click", "params": {"start_box": f"({x},{y})"}}
+
+
+def make_trajectory(kind, rng, bank, max_steps=10):
+    """
+    生成一条合成轨迹
+
+    Returns:
+        Trajectory: 轨迹（每步的action、frame，最后一步为finished时任务完成）
+    """
+    from ui_tars_replay import Trajectory
+
+    base = rng.randrange(10 ** 6)
+    steps = []
+
+    def add(action, state):
+        steps.append({"message": "", "frame": bank.get(state), "thought": "", "action": action,
+                      "raw_response": "", "status": "success"})
+
+    state = base
+    if kind == "normal":
+        for _ in range(rng.randint(2, 4)):
+            add(_click(rng.randrange(1000), rng.randrange(1000)), state)
+            state += 1
+        # 连续向下滚动浏览列表，每次界面都有变化
+        for _ in range(rng.randint(2, 4)):
+            add({"type": "scroll", "params": {"start_box": "(500,500)", "direction": "down"}}, state)
+            state += 1
+        # 等待加载：界面暂时不变
+        add({"type": "wait", "params": {}}, state)
+        add({"type": "wait", "params": {}}, state)
+        state += 1
+        add({"type": "finished", "params": {"content": "完成"}}, state)
+    elif kind == "recovered":
+        add(_click(rng.randrange(1000), rng.randrange(1000)), state)
+        state += 1
+        x, y = rng.randrange(1000), rng.randrange(1000)
+        for _ in range(3):
+            add(_click(x + rng.randint(-3, 3), y + rng.randint(-3, 3)), state)
+        # 纠正提示之后换了方法
+        add({"type": "hotkey", "params": {"key": "enter"}}, state)
+        state += 1
+        add(_click(rng.randrange(1000), rng.randrange(1000)), state)
+        state += 1
+        add({"type": "finished", "params": {"content": "完成"}}, state)
+    else:
+        for _ in range(rng.randint(1, 3)):
+            add(_click(rng.randrange(1000), rng.randrange(1000)), state)
+            state += 1
+        x, y = rng.randrange(1000), rng.randrange(1000)
+        menu = state + 1
+        while len(steps) < max_steps + 1:
+            if kind == "repeat":
+                add(_click(x + rng.randint(-3, 3), y + rng.randint(-3, 3)), state)
+            elif kind == "stall":
+                add(_click(rng.randrange(1000), rng.randrange(1000)), state)
+            else:
+                # 打开菜单 -> 关闭菜单 -> 打开菜单 ...
+                opened = len(steps) % 2
+                add(_click(x, y) if not opened else _click(1000 - x, 1000 - y), menu if opened else state)
+    return Trajectory(task=kind, steps=steps)
+
+
+def evaluate(trajectory, monitor):
+    """
+    在一条轨迹上离线运行进度监控
+
+    Returns:
+        dict: steps（没有监控时执行的步骤数）、guarded_steps（有监控时执行的步骤数）、
+            finished、corrected_at（第一次纠正提示的步骤）和stopped（提前结束的原因）
+    """
+    monitor.start()
+    corrected_at = None
+    guarded = len(trajectory.steps)
+    for index, step in enumerate(trajectory.steps):
+        verdict = monitor.observe(step["action"], step.get("frame"))
+        if verdict["status"] == "correct" and corrected_at is None:
+            corrected_at = index + 1
+        if verdict["status"] == "abort":
+            guarded = index + 1
+            break
+    finished = bool(trajectory.steps) and trajectory.steps[-1]["action"]["type"] == "finished"
+    return {"steps": len(trajectory.steps), "guarded_steps": guarded, "finished": finished,
+            "corrected_at": corrected_at, "stopped": monitor.stopped}
+
+
+def load_corpus(directory):
+    from ui_tars_replay import Trajectory
+
+    return [Trajectory.load(os.path.join(directory, name)) for name in sorted(os.listdir(directory))
+            if name.endswith(".json")]
+
+
+def summarize(results):
+    finished = [r for r in results if r["finished"]]
+    return {
+        "trajectories": len(results),
+        "steps": sum(r["steps"] for r in results),
+        "guarded_steps": sum(r["guarded_steps"] for r in results),
+        "saved": sum(r["steps"] - r["guarded_steps"] for r in results),
+        "corrected": sum(r["corrected_at"] is not None for r in results),
+        "aborted": sum(r["stopped"] is not None for r in results),
+        # 录制时最终完成了的任务被提前结束
+        "false_aborts": sum(r["stopped"] is not None and r["guarded_steps"] < r["steps"] for r in finished),
+    }
+
+
+def run(per_kind=20, max_steps=10, corpus=None, seed=0, **monitor_options):
+    """
+    在合成语料（或录制的语料）上统计
+
+    Returns:
+        dict: 类别 -> trajectories、steps、guarded_steps、saved、corrected、aborted、false_aborts
+    """
+    from ui_tars_progress import ProgressMonitor
+
+    monitor = ProgressMonitor(max_steps=max_steps, **monitor_options)
+    if corpus:
+        return {"corpus": summarize([evaluate(t, monitor) for t in load_corpus(corpus)])}
+
+    rng = random.Random(seed)
+    bank = FrameBank()
+    results = {}
+    for kind in KINDS:
+        trajectories = [make_trajectory(kind, rng, bank, max_steps) for _ in range(per_kind)]
+        results[kind] = summarize([evaluate(t, monitor) for t in trajectories])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='循环检测基准测试')
+    parser.add_argument('--per-kind', type=int, default=20, help='每类合成轨迹的条数')
+    parser.add_argument('--max-steps', type=int, default=10, help='步骤预算（初始任务之后）')
+    parser.add_argument('--repeat-limit', type=int, default=3, help='连续相同动作的次数阈值')
+    parser.add_argument('--stall-steps', type=int, default=3, help='界面不变的步数阈值')
+    parser.add_argument('--oscillation-cycles', type=int, default=2, help='来回切换的次数阈值')
+    parser.add_argument('--corrections', type=int, default=1, help='纠正提示的最多次数')
+    parser.add_argument('--corpus', default=None, help='录制轨迹所在目录')
+    args = parser.parse_args()
+
+    results = run(args.per_kind, args.max_steps, args.corpus, repeat_limit=args.repeat_limit,
+                  stall_steps=args.stall_steps, oscillation_cycles=args.oscillation_cycles,
+                  max_corrections=args.corrections)
+    print(f"{'类别':<12}{'轨迹':>6}{'原步骤':>8}{'监控后':>8}{'省下':>6}{'纠正':>6}{'提前结束':>10}{'误判':>6}")
+    for name, r in results.items():
+        print(f"{name:<12}{r['trajectories']:>6}{r['steps']:>8}{r['guarded_steps']:>8}{r['saved']:>6}"
+              f"{r['corrected']:>6}{r['aborted']:>10}{r['false_aborts']:>6}")
+    total = sum(r["steps"] for r in results.values())
+    saved = sum(r["saved"] for r in results.values())
+    print(f"\n合计省下 {saved}/{total} 步 ({saved / max(total, 1):.1%})")
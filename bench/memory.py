@@ -0,0 +1,217 @@
+"""
+长时间运行的内存基准测试：模拟数千步的会话，检查进程常驻内存(RSS)在预热之后保持平稳
+
+桩模型服务在子进程中运行（其前缀缓存和统计不计入本进程），本进程中的代理按自动模式循环：
+合成截图（每步内容不同）→ 编码 → 调用模型 → 记录动作（不执行）→ 生成反馈，
+输出finished后开始下一个任务（同一个代理连续处理多个任务，与常驻的工作进程相同）。
+启用了token预算、进度监控和紧凑反馈，覆盖会话中所有随步数增长的结构。
+
+- stable_prefix: 稳定前缀模式（默认），对话历史由代理维护
+- agno_history:  Agno历史模式，对话历史保存在Agno的memory中
+
+每隔 --sample-every 步记录一次RSS，预热 --warmup 步之后RSS比预热结束时增长超过 --ceiling-mb
+时以非零状态退出，便于在CI里作为门槛
+
+    python -m bench.memory --steps 3000 --sessions 2 --ceiling-mb 20
+"""
+
+import os
+import gc
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+# Agno的遥测会在每轮之后序列化整个运行记录并发出请求，不计入测量
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+MODES = ("stable_prefix", "agno_history")
+
+
+def rss_mb():
+    """
+    当前进程的常驻内存(MB)
+
+    没有/proc时退回getrusage的峰值RSS
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux为KB，macOS为字节
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class SyntheticCapture:
+    """
+    合成截图后端：每次截图返回一帧内容不同的合成界面（RGB）
+    """
+
+    name = "synthetic"
+
+    def __init__(self, width=640, height=360, variants=50):
+        self.width = width
+        self.height = height
+        self.variants = variants
+        self.grabs = 0
+
+    def grab(self, region=None):
+        from bench.grounding import make_frame
+        from ui_tars_capture import Frame
+
+        rgb = make_frame(self.grabs % self.variants, self.width, self.height)[0]
+        self.grabs += 1
+        return Frame(memoryview(rgb.tobytes()), self.width, self.height, self.width * 3, "RGB")
+
+    def close(self):
+        pass
+
+
+class StubProcess:
+    """
+    在子进程中运行桩模型服务
+    """
+
+    def __init__(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}/v1/"
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "bench.stub_server", "--port", str(self.port), "--base-latency", "0",
+             "--prefill-per-token", "0"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.5).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.process.kill()
+        raise RuntimeError("桩模型服务未能启动")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+
+
+def make_agent(base_url, mode, directory, index, width, height, history, token_budget):
+    """
+    创建使用桩模型和合成截图的多轮代理
+    """
+    from ui_tars_agent import UITarsAgent
+    from ui_tars_progress import ProgressMonitor
+    from ui_tars_session import MultiTurnAgent
+
+    agent = MultiTurnAgent(use_screenshot=False, verbose=0, monitor=ProgressMonitor(max_steps=10 ** 9),
+                           feedback_style="compact", num_history_responses=history)
+    agent.agent = UITarsAgent(base_url=base_url, num_history_responses=history,
+                              prefix_cache=mode == "stable_prefix", token_budget=token_budget)
+    agent.agent.agent.debug_mode = False
+    agent.agent._execute_ui_action = lambda action: {"status": "success"}
+    agent.use_screenshot = True
+    agent.capture = SyntheticCapture(width, height)
+    agent.screenshot_path = os.path.join(directory, f"screen_{index}.png")
+    return agent
+
+
+def run_mode(base_url, mode, steps=3000, sessions=2, warmup=300, sample_every=100, width=640, height=360,
+             history=20, token_budget=8000):
+    """
+    运行一种模式：sessions个代理在同一进程中轮流执行，共steps步
+
+    Returns:
+        dict: samples（[(步数, RSS MB), ...]）、baseline_mb（预热结束时）、peak_mb、growth_mb、
+            slope_mb（预热后每千步的增长）、steps、tasks、seconds
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        agents = [make_agent(base_url, mode, directory, i, width, height, history, token_budget)
+                  for i in range(sessions)]
+        results = [None] * sessions
+        tasks = 0
+        samples = []
+        start = time.time()
+        for step in range(1, steps + 1):
+            index = step % sessions
+            agent, result = agents[index], results[index]
+            if result is None or result["action"]["type"] == "finished":
+                tasks += 1
+                results[index] = agent.process_initial_task(f"模拟任务{tasks}")
+            else:
+                results[index] = agent.process_feedback(agent.next_feedback())
+            if step % sample_every == 0:
+                gc.collect()
+                samples.append((step, rss_mb()))
+        seconds = time.time() - start
+        for agent in agents:
+            agent.close()
+
+    after = [(s, m) for s, m in samples if s >= warmup] or samples[-1:]
+    baseline = after[0][1]
+    peak = max(m for _, m in after)
+    slope = 0.0
+    if len(after) > 1:
+        mean_s = sum(s for s, _ in after) / len(after)
+        mean_m = sum(m for _, m in after) / len(after)
+        var = sum((s - mean_s) ** 2 for s, _ in after)
+        slope = sum((s - mean_s) * (m - mean_m) for s, m in after) / var * 1000
+    return {"samples": samples, "baseline_mb": baseline, "peak_mb": peak, "growth_mb": peak - baseline,
+            "slope_mb": slope, "steps": steps, "tasks": tasks, "seconds": seconds}
+
+
+def run(modes=MODES, steps=3000, sessions=2, warmup=300, sample_every=100, width=640, height=360, history=20,
+        token_budget=8000):
+    """
+    依次运行各模式
+
+    Returns:
+        dict: 模式 -> run_mode的结果
+    """
+    results = {}
+    with StubProcess() as stub:
+        for mode in modes:
+            results[mode] = run_mode(stub.base_url, mode, steps, sessions, warmup, sample_every, width, height,
+                                     history, token_budget)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='长时间运行的内存基准测试')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES), help='要测试的历史模式')
+    parser.add_argument('--steps', type=int, default=3000, help='总步骤数（所有会话合计）')
+    parser.add_argument('--sessions', type=int, default=2, help='同一进程中轮流执行的会话数')
+    parser.add_argument('--warmup', type=int, default=300, help='预热步数，之后的RSS增长计入门槛')
+    parser.add_argument('--sample-every', type=int, default=100, help='每隔多少步记录一次RSS')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=360)
+    parser.add_argument('--history', type=int, default=20, help='发送给模型的最多历史轮数')
+    parser.add_argument('--token-budget', type=int, default=8000, help='单次请求的token预算（稳定前缀模式）')
+    parser.add_argument('--ceiling-mb', type=float, default=20, help='预热后允许的RSS增长上限（MB）')
+    args = parser.parse_args()
+
+    results = run(args.modes, args.steps, args.sessions, args.warmup, args.sample_every, args.width, args.height,
+                  args.history, args.token_budget)
+    print(f"{'模式':<16}{'步骤':>6}{'任务':>6}{'耗时':>9}{'预热后RSS':>12}{'峰值':>10}{'增长':>10}{'每千步':>10}")
+    failed = []
+    for mode, r in results.items():
+        print(f"{mode:<16}{r['steps']:>6}{r['tasks']:>6}{r['seconds']:>8.1f}s{r['baseline_mb']:>10.1f}MB"
+              f"{r['peak_mb']:>8.1f}MB{r['growth_mb']:>8.1f}MB{r['slope_mb']:>8.2f}MB")
+        if r["growth_mb"] > args.ceiling_mb:
+            failed.append(mode)
+    if failed:
+        print(f"\n未通过: {', '.join(failed)} (预热后RSS增长上限 {args.ceiling_mb:.0f}MB)")
+        sys.exit(1)
+    print(f"\n全部通过 (预热后RSS增长上限 {args.ceiling_mb:.0f}MB)")
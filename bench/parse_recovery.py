@@ -0,0 +1,157 @@
+"""
+输出修复基准测试：统计本地修复和纯文本纠正请求能恢复的步骤数及耗时
+
+1. 本地修复：对一组格式不规范的模型输出，统计能在本地修复的比例和解析耗时
+2. 纠正请求：桩模型按脚本穿插无法解析的输出，对比
+   - correction: 针对同一张截图发送纯文本纠正请求（截图已在历史中，命中前缀缓存）
+   - baseline:   不纠正，下一轮重新截图并调用模型（原来的行为，另需等待界面稳定）
+
+    python -m bench.parse_recovery --turns 30
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+
+from bench.stub_server import StubModel, StubServer
+from bench.prefix_cache import make_screens
+
+
+MALFORMED_OUTPUTS = [
+    "Thought: 点击发送按钮\nclick(start_box='(100,200)')",
+    "Thought: 点击发送按钮\nAction: click(start_box='(100,200)'",
+    "Thought: 点击发送按钮\nAction: click(start_box=(100,200))",
+    "Thought: 点击发送按钮\nAction: click(100, 200)",
+    "Thought: 点击发送按钮\nAction: click(point='<point>100 200</point>')",
+    "Thought: 点击发送按钮\nAction: left_single(start_box='[10,20,30,40]')",
+    "Thought: 点击发送按钮\naction： click(start_box='(100,200)') 这样就能发送了",
+    "Thought: 点击发送按钮\nAction：click（start_box='(100,200)'）",
+    "Thought: 点击发送按钮\n**Action:** click(start_box='(100,200)')",
+    "```\nThought: 双击打开\nAction: double_click(start_box='(117,129)')\n```",
+    "Thought: 输入消息\nAction: type(content='你好啊\\n",
+    "Thought: 输入消息\nAction: type('你好啊')",
+    "Thought: 复制\nAction: hotkey('ctrl c')",
+    "Thought: 复制\nAction: press(key='ctrl c')",
+    "Thought: 等待加载\nAction: wait",
+    "Thought: 向下滚动\nAction: scroll(start_box='(500,500)', direction=down)",
+    "Thought: 拖动\nAction: drag(start_box='(1,2)', end_box='(3,4)'",
+    "Thought: 完成\nAction: finish(content='已发送')",
+    # 以下无法在本地修复，需要纠正请求
+    "Thought: 我觉得应该点击发送按钮。",
+    "Thought: 点击\nAction: click()",
+    "Thought: 滚动\nAction: scroll(start_box='(1,2)', direction='sideways')",
+    "Thought: 飞走\nAction: fly(to='moon')",
+]
+
+GOOD = "Thought: 点击发送按钮。\nAction: click(start_box='(500,80)')"
+BAD = "Thought: 我需要点击发送按钮，它在输入框的右边。"
+
+
+def bench_local(repeat=200):
+    """
+    统计本地修复的结果和耗时
+
+    Returns:
+        dict: 样本数、修复成功数、各修复类型的次数以及平均解析耗时（微秒）
+    """
+    from ui_tars_parser import UITarsParser
+
+    parser = UITarsParser()
+    recovered, kinds = 0, {}
+    for output in MALFORMED_OUTPUTS:
+        result = parser.parse_output(output)
+        if not result["error"]:
+            recovered += 1
+        for kind in result["repairs"]:
+            kinds[kind] = kinds.get(kind, 0) + 1
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for output in MALFORMED_OUTPUTS:
+            parser.parse_output(output)
+    repair_us = (time.perf_counter() - start) * 1e6 / (repeat * len(MALFORMED_OUTPUTS))
+
+    start = time.perf_counter()
+    for _ in range(repeat * len(MALFORMED_OUTPUTS)):
+        parser.parse_output(GOOD)
+    strict_us = (time.perf_counter() - start) * 1e6 / (repeat * len(MALFORMED_OUTPUTS))
+
+    return {"samples": len(MALFORMED_OUTPUTS), "recovered": recovered, "repairs": kinds,
+            "repair_us": repair_us, "strict_us": strict_us}
+
+
+def run_session(server, screens, turns, max_corrections):
+    """
+    用桩模型跑一段会话，返回无效步骤数、恢复次数和模型调用耗时
+    """
+    from ui_tars_agent import UITarsAgent
+
+    agent = UITarsAgent(base_url=server.base_url, max_corrections=max_corrections)
+    agent.agent.debug_mode = False
+    agent._execute_ui_action = lambda action: {"status": "skipped"}
+
+    server.model.reset()
+    invalid, corrections, correction_seconds = 0, 0, 0.0
+    step_seconds = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        result = agent.process_task("检查一下目标是否已完成", screens[turn % len(screens)])
+        step_seconds.append(time.perf_counter() - start - result["recovery"]["correction_seconds"])
+        corrections += result["recovery"]["corrections"]
+        correction_seconds += result["recovery"]["correction_seconds"]
+        if result["action"]["type"] == "invalid":
+            invalid += 1
+
+    return {
+        "turns": turns,
+        "invalid_steps": invalid,
+        "corrections": corrections,
+        "avg_correction_ms": correction_seconds * 1000 / max(corrections, 1),
+        "avg_step_ms": sum(step_seconds) * 1000 / len(step_seconds),
+        "model_requests": server.model.snapshot()["requests"],
+    }
+
+
+def run(turns=30, bad_every=3):
+    """
+    对比纠正请求和重新截图两种方式
+
+    Returns:
+        dict: local、correction、baseline三组统计
+    """
+    # 每bad_every个输出中有一个无法解析；纠正请求会消耗下一条脚本（正常输出）
+    script = [BAD if i % bad_every == 0 else GOOD for i in range(bad_every * 2)]
+    results = {"local": bench_local()}
+    with tempfile.TemporaryDirectory() as directory:
+        screens = make_screens(directory, turns)
+        for name, max_corrections in (("correction", 1), ("baseline", 0)):
+            with StubServer(StubModel(script=script)) as server:
+                results[name] = run_session(server, screens, turns, max_corrections)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='输出修复基准测试')
+    parser.add_argument('--turns', type=int, default=30, help='会话轮数')
+    parser.add_argument('--bad-every', type=int, default=3, help='每多少条输出中有一条无法解析')
+    args = parser.parse_args()
+
+    results = run(args.turns, args.bad_every)
+    local = results["local"]
+    print(f"本地修复: {local['recovered']}/{local['samples']} 条, "
+          f"修复路径平均 {local['repair_us']:.0f}us, 正常解析平均 {local['strict_us']:.0f}us")
+    print(f"修复类型: {local['repairs']}")
+
+    correction, baseline = results["correction"], results["baseline"]
+    print(f"\n{'模式':<12}{'轮数':>6}{'无效步骤':>10}{'纠正请求':>10}{'模型请求':>10}{'单次纠正':>12}{'单步(含截图)':>14}")
+    for name in ("correction", "baseline"):
+        r = results[name]
+        print(f"{name:<12}{r['turns']:>6}{r['invalid_steps']:>10}{r['corrections']:>10}{r['model_requests']:>10}"
+              f"{r['avg_correction_ms']:>10.0f}ms{r['avg_step_ms']:>12.0f}ms")
+    print(f"\n纠正请求恢复 {correction['corrections'] - correction['invalid_steps']} 步，"
+          f"每次耗时约为完整一步模型调用的 {correction['avg_correction_ms'] / max(baseline['avg_step_ms'], 1e-9):.0%}，"
+          f"且不需要重新截图和等待界面稳定")
@@ -0,0 +1,95 @@
+"""
+前缀缓存基准测试：对比稳定前缀模式与Agno默认历史模式的提示token和首token延迟
+
+桩模型服务按64个token为一块模拟服务端前缀缓存，统计每轮的提示token、命中缓存的token
+以及按未命中token数模拟的首token延迟。
+
+    python -m bench.prefix_cache --turns 30
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+
+from bench.stub_server import StubServer
+
+
+def make_screens(directory, count, width=1280, height=720):
+    """
+    生成一组内容各不相同的合成截图
+
+    Returns:
+        list: 截图路径列表
+    """
+    from PIL import Image, ImageDraw
+
+    paths = []
+    for i in range(count):
+        image = Image.new("RGB", (width, height), (236, 236, 236))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle([0, 0, width, 48], fill=(40, 40, 48))
+        draw.rectangle([60 + i * 20 % 400, 120, 460 + i * 20 % 400, 180], fill=(7, 193, 96))
+        draw.text((80, 140), f"step {i}", fill=(255, 255, 255))
+        path = os.path.join(directory, f"screen_{i}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def run_agent(server, screens, turns, prefix_cache, history, slide_step):
+    """
+    用指定模式跑若干轮，返回桩模型统计和客户端耗时
+    """
+    from ui_tars_agent import UITarsAgent
+
+    agent = UITarsAgent(base_url=server.base_url, num_history_responses=history,
+                        history_slide_step=slide_step, prefix_cache=prefix_cache)
+    agent.agent.debug_mode = False
+    # 只测量请求构造和模型调用，不执行动作
+    agent._execute_ui_action = lambda action: {"status": "skipped"}
+
+    server.model.reset()
+    latencies = []
+    agent.process_task("打开微信，给文件传输助手发送一条消息：你好啊", screens[0])
+    for turn in range(1, turns):
+        start = time.perf_counter()
+        agent.process_task("点击操作已完成，检查一下目标是否已完成", screens[turn % len(screens)])
+        latencies.append(time.perf_counter() - start)
+
+    stats = server.model.snapshot()
+    stats["avg_call_ms"] = sum(latencies) * 1000 / max(len(latencies), 1)
+    return stats
+
+
+def run(turns=30, history=20, slide_step=5):
+    """
+    分别以默认模式和稳定前缀模式运行，返回两组统计
+    """
+    with tempfile.TemporaryDirectory() as directory, StubServer() as server:
+        screens = make_screens(directory, turns)
+        return {
+            "agno_history": run_agent(server, screens, turns, False, history, slide_step),
+            "stable_prefix": run_agent(server, screens, turns, True, history, slide_step),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='前缀缓存基准测试')
+    parser.add_argument('--turns', type=int, default=30, help='对话轮数')
+    parser.add_argument('--history', type=int, default=20, help='最多历史轮数')
+    parser.add_argument('--slide-step', type=int, default=5, help='历史按块丢弃的轮数')
+    args = parser.parse_args()
+
+    results = run(args.turns, args.history, args.slide_step)
+    print(f"{'模式':<16}{'提示token':>12}{'命中缓存':>12}{'未命中':>12}{'命中率':>8}{'平均TTFT':>12}{'平均调用':>12}")
+    for name, stats in results.items():
+        print(f"{name:<16}{stats['prompt_tokens']:>12}{stats['cached_tokens']:>12}{stats['uncached_tokens']:>12}"
+              f"{stats['cache_hit_rate']:>8.1%}{stats['avg_ttft_ms']:>10.1f}ms{stats['avg_call_ms']:>10.1f}ms")
+
+    base, stable = results["agno_history"], results["stable_prefix"]
+    print(f"\n未命中提示token减少 {1 - stable['uncached_tokens'] / max(base['uncached_tokens'], 1):.1%}，"
+          f"平均首token延迟减少 {1 - stable['avg_ttft_ms'] / max(base['avg_ttft_ms'], 1e-9):.1%}")
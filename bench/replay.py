@@ -0,0 +1,131 @@
+"""
+轨迹回放基准测试：录制一次任务，再回放，对比调用模型的步骤数和总耗时
+
+模拟的界面每执行一个动作切换到下一个画面（切换有延迟，模拟动画和加载）：
+- record:  正常的自动模式，每步调用模型，步骤之间固定等待界面稳定，同时录制轨迹
+- replay:  界面与录制时一致，每步截图核对后直接执行录制的动作，不调用模型
+- diverged: 其中一步出现了录制时没有的弹出提示，这一步回退到模型，其余步骤照常回放
+
+    python -m bench.replay --model-latency 0.5 --transition 0.3
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+
+from bench.stub_server import StubServer
+from bench.grounding import make_frame
+from bench.target_cache import StepModel
+
+
+class SimulatedUI:
+    """
+    模拟的界面：画面序号随执行的动作递增，动作后transition秒内仍显示上一个画面
+    """
+
+    def __init__(self, directory, steps, transition=0.3, popup_state=None):
+        from PIL import Image, ImageDraw
+
+        self.paths = []
+        for state in range(steps + 1):
+            image = Image.fromarray(make_frame(100 + state)[0])
+            if state == popup_state:
+                draw = ImageDraw.Draw(image)
+                draw.rectangle([440, 260, 840, 420], fill=(60, 60, 60))
+                draw.text((480, 330), "network unstable, retrying...", fill=(255, 255, 255))
+            path = os.path.join(directory, f"state_{state}_{popup_state}.png")
+            image.save(path)
+            self.paths.append(path)
+        self.transition = transition
+        self.state = 0
+        self.changed_at = 0.0
+        self.screenshots = 0
+
+    def screenshot(self, max_size=None):
+        self.screenshots += 1
+        state = self.state
+        if state and time.time() - self.changed_at < self.transition:
+            state -= 1
+        return self.paths[state]
+
+    def execute(self, action):
+        if action["type"] != "finished":
+            self.state = min(self.state + 1, len(self.paths) - 1)
+            self.changed_at = time.time()
+        return {"status": "success", "message": "模拟执行"}
+
+
+def make_agent(server, ui, record=False):
+    """
+    创建使用桩模型和模拟界面的多轮代理
+    """
+    from ui_tars_agent import UITarsAgent
+    from ui_tars_session import MultiTurnAgent
+
+    agent = MultiTurnAgent(use_screenshot=False, verbose=0, record=record)
+    agent.agent = UITarsAgent(base_url=server.base_url)
+    agent.agent.agent.debug_mode = False
+    agent.agent._execute_ui_action = ui.execute
+    agent.take_screenshot = ui.screenshot
+    return agent
+
+
+def make_script(steps):
+    script = [f"Thought: 第{i + 1}步。\nAction: click(start_box='({100 + i * 150},{500})')" for i in range(steps)]
+    script.append("Thought: 任务完成。\nAction: finished(content='完成')")
+    return script
+
+
+def run(steps=6, model_latency=0.5, transition=0.3, settle=None):
+    """
+    依次运行record、replay、diverged
+
+    Returns:
+        dict: 每种情况的步骤数、模型请求数、回放步骤数和耗时
+    """
+    settle = transition * 2 if settle is None else settle
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, \
+            StubServer(StepModel(script=make_script(steps), base_latency=model_latency,
+                                 prefill_per_token=0.0)) as server:
+        # 录制：正常的自动模式
+        ui = SimulatedUI(directory, steps, transition)
+        agent = make_agent(server, ui, record=True)
+        server.model.reset()
+        start = time.time()
+        result = agent.process_initial_task("完成模拟任务")
+        while result["action"]["type"] != "finished":
+            time.sleep(settle)
+            result = agent.process_feedback(agent.generate_feedback(agent.action_history[-1]))
+        results["record"] = {"steps": agent.steps_taken, "model_requests": server.model.snapshot()["requests"],
+                             "replayed": 0, "screenshots": ui.screenshots, "seconds": time.time() - start}
+        trajectory = agent.trajectory
+
+        for name, popup in (("replay", None), ("diverged", steps // 2)):
+            ui = SimulatedUI(directory, steps, transition, popup_state=popup)
+            agent = make_agent(server, ui)
+            server.model.reset()
+            stats = agent.replay(trajectory, verify_timeout=transition * 4, poll_interval=0.05, settle_seconds=settle)
+            results[name] = {"steps": stats["steps"], "model_requests": server.model.snapshot()["requests"],
+                             "replayed": stats["replayed"], "screenshots": ui.screenshots,
+                             "seconds": stats["seconds"], "finished": stats["finished"]}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='轨迹回放基准测试')
+    parser.add_argument('--steps', type=int, default=6, help='任务的点击步骤数')
+    parser.add_argument('--model-latency', type=float, default=0.5, help='桩模型每次调用的延迟（秒）')
+    parser.add_argument('--transition', type=float, default=0.3, help='模拟界面每次切换的延迟（秒）')
+    parser.add_argument('--settle', type=float, default=None, help='录制时步骤之间的等待（秒），默认切换延迟的2倍')
+    args = parser.parse_args()
+
+    results = run(args.steps, args.model_latency, args.transition, args.settle)
+    print(f"{'情况':<10}{'步骤':>6}{'模型请求':>10}{'回放':>6}{'截图':>6}{'总耗时':>10}")
+    for name, r in results.items():
+        print(f"{name:<10}{r['steps']:>6}{r['model_requests']:>10}{r['replayed']:>6}{r['screenshots']:>6}"
+              f"{r['seconds']:>9.2f}s")
@@ -0,0 +1,110 @@
+"""
+模型调用韧性基准测试：在注入故障的桩模型上对比不同调用策略的尾延迟和失败率
+
+桩模型按比例注入503错误、卡住的请求和长尾延迟，分别以以下策略连续调用若干轮：
+- baseline: 只有较长的客户端超时，不重试、不对冲（相当于原来的行为）
+- retry:    较短的单次超时 + 带抖动的指数退避重试
+- hedge:    在retry的基础上，超过近期p95延迟仍未返回时发出对冲请求
+
+    python -m bench.resilience --calls 200
+"""
+
+import os
+import time
+import argparse
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+
+from bench.stub_server import StubModel, StubServer
+from bench.load_playground import percentile
+
+
+def make_policies(stall_seconds):
+    """
+    返回要对比的调用策略
+    """
+    from ui_tars_resilience import CallPolicy
+
+    return {
+        "baseline": CallPolicy(timeout=stall_seconds * 3, max_retries=0),
+        "retry": CallPolicy(timeout=1.0, max_retries=3, backoff_base=0.05, backoff_max=0.5),
+        "hedge": CallPolicy(timeout=1.0, max_retries=3, backoff_base=0.05, backoff_max=0.5,
+                            hedge=True, hedge_quantile=0.95, hedge_min_delay=0.05),
+    }
+
+
+def run_policy(server, policy, calls):
+    """
+    用指定策略连续调用calls轮，返回延迟分布和失败数
+    """
+    from ui_tars_agent import UITarsAgent
+
+    agent = UITarsAgent(base_url=server.base_url, num_history_responses=4, history_slide_step=2,
+                        call_policy=policy)
+    agent.agent.debug_mode = False
+    # 只测量模型调用，不执行动作
+    agent._execute_ui_action = lambda action: {"status": "skipped"}
+
+    server.model.reset()
+    latencies, failures = [], 0
+    for turn in range(calls):
+        start = time.perf_counter()
+        try:
+            agent.process_task("打开微信，给文件传输助手发送一条消息：你好啊" if turn == 0 else "检查一下目标是否已完成")
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+
+    stats = policy.stats()
+    return {
+        "calls": calls,
+        "failures": failures,
+        "attempts": stats["attempts"],
+        "retries": stats["retries"],
+        "timeouts": stats["timeouts"],
+        "hedges": stats["hedges"],
+        "hedge_wins": stats["hedge_wins"],
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "total_s": sum(latencies),
+        "server": server.model.snapshot(),
+    }
+
+
+def run(calls=200, error_rate=0.03, stall_rate=0.02, stall_seconds=5.0, tail_rate=0.03, tail_seconds=0.5,
+        base_latency=0.05, seed=7):
+    """
+    依次用各个策略运行，返回每个策略的统计
+    """
+    results = {}
+    for name, policy in make_policies(stall_seconds).items():
+        model = StubModel(base_latency=base_latency, prefill_per_token=0.0,
+                          error_rate=error_rate, stall_rate=stall_rate, stall_seconds=stall_seconds,
+                          tail_rate=tail_rate, tail_seconds=tail_seconds, seed=seed)
+        with StubServer(model) as server:
+            results[name] = run_policy(server, policy, calls)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='模型调用韧性基准测试')
+    parser.add_argument('--calls', type=int, default=200, help='每个策略的调用轮数')
+    parser.add_argument('--error-rate', type=float, default=0.03, help='503错误比例')
+    parser.add_argument('--stall-rate', type=float, default=0.02, help='卡住的请求比例')
+    parser.add_argument('--stall-seconds', type=float, default=5.0, help='卡住的时长（秒）')
+    parser.add_argument('--tail-rate', type=float, default=0.03, help='长尾请求比例')
+    parser.add_argument('--tail-seconds', type=float, default=0.5, help='长尾额外延迟（秒）')
+    parser.add_argument('--base-latency', type=float, default=0.05, help='正常请求延迟（秒）')
+    args = parser.parse_args()
+
+    results = run(args.calls, args.error_rate, args.stall_rate, args.stall_seconds,
+                  args.tail_rate, args.tail_seconds, args.base_latency)
+    print(f"{'策略':<10}{'失败':>6}{'请求数':>8}{'重试':>6}{'超时':>6}{'对冲':>6}{'对冲胜':>8}"
+          f"{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'总耗时':>10}")
+    for name, r in results.items():
+        print(f"{name:<10}{r['failures']:>6}{r['attempts']:>8}{r['retries']:>6}{r['timeouts']:>6}{r['hedges']:>6}"
+              f"{r['hedge_wins']:>8}{r['p50_ms']:>8.0f}ms{r['p95_ms']:>8.0f}ms{r['p99_ms']:>8.0f}ms"
+              f"{r['max_ms']:>8.0f}ms{r['total_s']:>9.1f}s")
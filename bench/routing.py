@@ -0,0 +1,109 @@
+"""
+模型路由基准测试：对比所有轮次都发给UI-TARS和按轮次能力路由时每个模型的调用次数、延迟、token和费用
+
+两个桩模型服务分别模拟UI-TARS（视觉模型，基础延迟高、图片token多）和DeepSeek V3（纯文本，延迟低）：
+- vat:     缸中脑模式，没有截图，所有轮次都是纯文本
+- desktop: 有截图的任务，其中一轮输出无法解析（纠正请求要看历史截图），
+           输出finished后再发一轮确认（只需确认自己的结论）
+
+    python -m bench.routing --steps 5 --vision-latency 0.8 --text-latency 0.2
+"""
+
+import os
+import argparse
+import tempfile
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+
+from bench.stub_server import StubServer
+from bench.grounding import make_frame
+from bench.target_cache import StepModel
+
+
+def make_script(steps, broken_step=None):
+    script = []
+    for i in range(steps):
+        if i == broken_step:
+            script.append("Thought: 我再看看界面。")
+        script.append(f"Thought: 第{i + 1}步。\nAction: click(start_box='({100 + i * 150},500)')")
+    script.append("Thought: 任务完成。\nAction: finished(content='完成')")
+    script.append("Thought: 确认任务已经完成。\nAction: finished(content='任务已结束')")
+    return script
+
+
+def run_case(vision, text, screenshots, routed, steps):
+    """
+    跑一次任务
+
+    Returns:
+        dict: 路由名 -> 路由统计（见ModelRouter.report）
+    """
+    from ui_tars_agent import UITarsAgent
+    from ui_tars_router import ModelRouter, ModelRoute, TARS, V3
+
+    routes = [ModelRoute("tars", TARS, ("grounding", "vision", "text"), 3.0, 9.0, base_url=vision.base_url)]
+    if routed:
+        routes.append(ModelRoute("v3", V3, ("text",), 2.0, 8.0, base_url=text.base_url))
+    agent = UITarsAgent(base_url=vision.base_url, router=ModelRouter(routes))
+    agent.agent.debug_mode = False
+    agent._execute_ui_action = lambda action: {"status": "success"}
+
+    message = "完成模拟任务"
+    for step in range(steps + 2):
+        screenshot = screenshots[min(step, len(screenshots) - 1)] if screenshots else None
+        result = agent.process_task(message, screenshot)
+        if step == steps + 1:
+            break
+        message = ("任务被认为已结束，检查是否确实结束" if result["action"]["type"] == "finished"
+                   else "点击操作已完成，检查一下目标是否已完成")
+    return agent.router.report()
+
+
+def run(steps=5, vision_latency=0.8, text_latency=0.2):
+    """
+    依次运行vat和desktop，各自对比不路由和路由
+
+    Returns:
+        dict: (情况, 是否路由) -> 路由统计
+    """
+    from PIL import Image
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        screenshots = []
+        for state in range(steps + 2):
+            path = os.path.join(directory, f"state_{state}.png")
+            Image.fromarray(make_frame(200 + state)[0]).save(path)
+            screenshots.append(path)
+
+        for case, frames, broken in (("vat", None, None), ("desktop", screenshots, steps // 2)):
+            script = make_script(steps, broken)
+            with StubServer(StepModel(script=script, base_latency=vision_latency,
+                                      prefill_per_token=0.00005)) as vision, \
+                    StubServer(StepModel(script=script, base_latency=text_latency,
+                                         prefill_per_token=0.00001)) as text:
+                for routed in (False, True):
+                    results[(case, routed)] = run_case(vision, text, frames, routed, steps + (broken is not None))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='模型路由基准测试')
+    parser.add_argument('--steps', type=int, default=5, help='任务的点击步骤数')
+    parser.add_argument('--vision-latency', type=float, default=0.8, help='视觉模型每次调用的基础延迟（秒）')
+    parser.add_argument('--text-latency', type=float, default=0.2, help='纯文本模型每次调用的基础延迟（秒）')
+    args = parser.parse_args()
+
+    results = run(args.steps, args.vision_latency, args.text_latency)
+    print(f"{'情况':<10}{'路由':<6}{'模型':<6}{'调用':>6}{'平均延迟':>10}{'输入token':>12}{'输出token':>10}"
+          f"{'费用(元)':>12}  轮次类别")
+    for (case, routed), report in results.items():
+        total_seconds = sum(r["seconds"] for r in report.values())
+        total_cost = sum(r["cost"] for r in report.values())
+        for name, r in report.items():
+            classes = ", ".join(f"{k}={v}" for k, v in r["classes"].items())
+            print(f"{case:<10}{'是' if routed else '否':<6}{name:<6}{r['calls']:>6}{r['avg_seconds']:>9.2f}s"
+                  f"{r['input_tokens']:>12}{r['output_tokens']:>10}{r['cost']:>12.5f}  {classes}")
+        print(f"{case:<10}{'是' if routed else '否':<6}{'合计':<6}{'':>6}{total_seconds:>9.2f}s"
+              f"{'':>12}{'':>10}{total_cost:>12.5f}")
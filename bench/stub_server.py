@@ -0,0 +1,374 @@
+"""
+OpenAI兼容的桩模型服务，用于在没有真实模型的情况下测量请求构造和会话循环的性能
+
+- POST /v1/chat/completions  返回脚本化的UI-TARS输出，并在usage中给出token统计
+- POST /v1/batch/chat/completions  批量请求：{"requests": [...]} -> {"responses": [{"status", "body"}, ...]}
+- GET  /stats                返回累计的token统计（提示token、命中前缀缓存的token、模拟首token延迟）
+- POST /reset                清空统计和前缀缓存
+
+前缀缓存按块（默认64个token）模拟：请求与最近请求的最长公共前缀按块向下取整后视为命中，
+首token延迟 = 基础延迟 + 未命中token数 × 每token预填充耗时。
+
+slots限制同时执行的请求数（模拟一块GPU上的推理引擎），超出的请求排队等待。
+一个批量请求只占用一个执行槽位，整批只付一次基础延迟，预填充耗时按整批的未命中token累加。
+
+故障注入（按请求随机抽取，seed固定时可复现）：
+- error_rate: 返回503错误
+- stall_rate: 卡住stall_seconds秒后才响应（模拟挂起的连接）
+- tail_rate:  额外增加tail_seconds秒延迟（模拟长尾）
+
+    python -m bench.stub_server --port 8765
+"""
+
+import re
+import json
+import time
+import random
+import base64
+import hashlib
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from ui_tars_budget import image_size, image_tokens
+
+
+DEFAULT_SCRIPT = [
+    "Thought: 我需要先找到目标窗口，桌面上有它的图标，双击打开。\nAction: left_double(start_box='(117,129)')",
+    "Thought: 窗口已经打开，点击搜索框准备输入。\nAction: click(start_box='(500,80)')",
+    "Thought: 搜索框已激活，输入要查找的联系人。\nAction: type(content='文件传输助手')",
+    "Thought: 搜索结果出现了，点击第一条结果。\nAction: click(start_box='(300,200)')",
+    "Thought: 对话框已打开，输入消息并发送。\nAction: type(content='你好啊\\n')",
+    "Thought: 消息已经发送成功。\nAction: finished(content='消息已发送')",
+]
+
+_TOKEN_PATTERN = re.compile(r"[一-鿿]|\w+|[^\w\s]")
+
+
+def tokenize_messages(messages):
+    """
+    把请求消息转换为可比较的token序列（近似分词，仅用于统计和前缀匹配）
+
+    Returns:
+        list: token序列
+    """
+    tokens = []
+    for message in messages:
+        tokens.append(f"<|{message.get('role')}|>")
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+        for part in parts:
+            if part.get("type") == "text":
+                tokens.extend(_TOKEN_PATTERN.findall(part.get("text") or ""))
+            elif part.get("type") == "image_url":
+                url = part["image_url"]["url"]
+                digest = hashlib.sha1(url.encode()).hexdigest()[:12]
+                count = 1024
+                if url.startswith("data:"):
+                    size = image_size(base64.b64decode(url.split(",", 1)[1]))
+                    if size:
+                        count = image_tokens(*size)
+                tokens.extend(f"<img:{digest}:{i}>" for i in range(count))
+        tokens.append("<|end|>")
+    return tokens
+
+
+class StubFault(Exception):
+    """注入的服务端错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class StubModel:
+    """
+    桩模型：脚本化输出、token统计、前缀缓存模拟和故障注入
+    """
+
+    def __init__(self, script=None, block_size=64, cache_entries=64,
+                 base_latency=0.02, prefill_per_token=0.00005, decode_per_token=0.0,
+                 error_rate=0.0, stall_rate=0.0, stall_seconds=30.0, tail_rate=0.0, tail_seconds=1.0,
+                 seed=None, slots=None):
+        self.script = script or DEFAULT_SCRIPT
+        self.block_size = block_size
+        self.cache = deque(maxlen=cache_entries)
+        self.base_latency = base_latency
+        self.prefill_per_token = prefill_per_token
+        self.decode_per_token = decode_per_token
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.tail_rate = tail_rate
+        self.tail_seconds = tail_seconds
+        self.random = random.Random(seed)
+        self.slots = threading.Semaphore(slots) if slots else None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.cache.clear()
+            self.turn = 0
+            self.stats = {
+                "requests": 0,
+                "prompt_tokens": 0,
+                "cached_tokens": 0,
+                "completion_tokens": 0,
+                "max_prompt_tokens": 0,
+                "ttft_seconds": 0.0,
+                "batches": 0,
+                "batched_requests": 0,
+                "faults_error": 0,
+                "faults_stall": 0,
+                "faults_tail": 0,
+            }
+
+    def _cached_prefix(self, tokens):
+        best = 0
+        for cached in self.cache:
+            limit = min(len(cached), len(tokens))
+            length = 0
+            while length < limit and cached[length] == tokens[length]:
+                length += 1
+            best = max(best, length)
+        return best // self.block_size * self.block_size
+
+    def next_output(self, request):
+        """
+        返回本次请求的模型输出，默认按脚本循环
+        """
+        with self.lock:
+            output = self.script[self.turn % len(self.script)]
+            self.turn += 1
+        return output
+
+    def _draw_fault(self):
+        with self.lock:
+            draw = self.random.random()
+        if draw < self.error_rate:
+            return "error"
+        draw -= self.error_rate
+        if draw < self.stall_rate:
+            return "stall"
+        draw -= self.stall_rate
+        if draw < self.tail_rate:
+            return "tail"
+        return None
+
+    def _occupy(self, seconds):
+        # 占用一个执行槽位seconds秒（没有限制槽位时直接等待）
+        if self.slots is None:
+            time.sleep(seconds)
+            return
+        with self.slots:
+            time.sleep(seconds)
+
+    def _prefill(self, request):
+        tokens = tokenize_messages(request.get("messages", []))
+        with self.lock:
+            cached = self._cached_prefix(tokens)
+            self.cache.append(tokens)
+        output = self.next_output(request)
+        return tokens, cached, output, len(_TOKEN_PATTERN.findall(output))
+
+    def _response(self, request, tokens, cached, output, completion_tokens, ttft):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += len(tokens)
+            self.stats["cached_tokens"] += cached
+            self.stats["completion_tokens"] += completion_tokens
+            self.stats["max_prompt_tokens"] = max(self.stats["max_prompt_tokens"], len(tokens))
+            self.stats["ttft_seconds"] += ttft
+            number = self.stats["requests"]
+
+        return {
+            "id": f"chatcmpl-stub-{number}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": output},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(tokens),
+                "completion_tokens": completion_tokens,
+                "total_tokens": len(tokens) + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached},
+            },
+        }
+
+    def complete(self, request):
+        """
+        处理一次chat completions请求
+
+        Returns:
+            dict: OpenAI格式的响应
+
+        Raises:
+            StubFault: 注入的服务端错误
+        """
+        fault = self._draw_fault()
+        if fault:
+            with self.lock:
+                self.stats[f"faults_{fault}"] += 1
+        if fault == "error":
+            time.sleep(self.base_latency)
+            raise StubFault(503, "injected fault: service unavailable")
+
+        tokens, cached, output, completion_tokens = self._prefill(request)
+        ttft = self.base_latency + (len(tokens) - cached) * self.prefill_per_token
+        delay = ttft + completion_tokens * self.decode_per_token
+        if fault == "stall":
+            delay += self.stall_seconds
+        elif fault == "tail":
+            delay += self.tail_seconds
+        self._occupy(delay)
+        return self._response(request, tokens, cached, output, completion_tokens, ttft)
+
+    def complete_batch(self, requests):
+        """
+        处理一个批量请求：整批占用一个执行槽位，只付一次基础延迟，解码按最长的输出计算
+
+        Returns:
+            list: 每个请求的 {"status": 状态码, "body": 响应}，顺序与请求一致
+        """
+        prepared = [self._prefill(request) for request in requests]
+        prefill = sum(len(tokens) - cached for tokens, cached, _, _ in prepared) * self.prefill_per_token
+        ttft = self.base_latency + prefill
+        decode = max(completion for _, _, _, completion in prepared) * self.decode_per_token
+        self._occupy(ttft + decode)
+        with self.lock:
+            self.stats["batches"] += 1
+            self.stats["batched_requests"] += len(requests)
+        return [{"status": 200, "body": self._response(request, *item, ttft)}
+                for request, item in zip(requests, prepared)]
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        requests = max(stats["requests"], 1)
+        stats["uncached_tokens"] = stats["prompt_tokens"] - stats["cached_tokens"]
+        stats["cache_hit_rate"] = stats["cached_tokens"] / max(stats["prompt_tokens"], 1)
+        stats["avg_prompt_tokens"] = stats["prompt_tokens"] / requests
+        stats["avg_ttft_ms"] = stats["ttft_seconds"] * 1000 / requests
+        stats["avg_batch"] = stats["batched_requests"] / max(stats["batches"], 1)
+        return stats
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(self.server.model.snapshot())
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        request = self._read_json()
+        if self.path.rstrip("/").endswith("/batch/chat/completions"):
+            if not self.server.batching:
+                self._send_json({"error": "not found"}, 404)
+                return
+            self._send_json({"responses": self.server.model.complete_batch(request.get("requests", []))})
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            try:
+                response = self.server.model.complete(request)
+            except StubFault as e:
+                self._send_json({"error": {"message": str(e), "type": "server_error"}}, e.status)
+                return
+            try:
+                self._send_json(response)
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端已超时断开
+                pass
+        elif self.path.rstrip("/").endswith("/reset"):
+            self.server.model.reset()
+            self._send_json({"status": "ok"})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+
+class StubServer:
+    """
+    在后台线程中运行的桩模型HTTP服务
+
+        with StubServer() as server:
+            agent = UITarsAgent(base_url=server.base_url)
+    """
+
+    def __init__(self, model=None, host="127.0.0.1", port=0, batching=True):
+        self.model = model or StubModel()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.model = self.model
+        # False时批量接口返回404（模拟不支持批处理的服务）
+        self.httpd.batching = batching
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="StubServer", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='UI-TARS桩模型服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--base-latency', type=float, default=0.02, help='基础首token延迟（秒）')
+    parser.add_argument('--prefill-per-token', type=float, default=0.00005, help='每个未缓存token的预填充耗时（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回503错误的请求比例')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='卡住不响应的请求比例')
+    parser.add_argument('--stall-seconds', type=float, default=30.0, help='卡住的时长（秒）')
+    parser.add_argument('--tail-rate', type=float, default=0.0, help='长尾延迟的请求比例')
+    parser.add_argument('--tail-seconds', type=float, default=1.0, help='长尾请求额外增加的延迟（秒）')
+    parser.add_argument('--seed', type=int, default=None, help='故障注入的随机种子')
+    parser.add_argument('--slots', type=int, default=None, help='同时执行的请求数上限（默认不限制）')
+    parser.add_argument('--no-batching', dest='batching', action='store_false', help='不提供批量接口')
+    args = parser.parse_args()
+
+    model = StubModel(base_latency=args.base_latency, prefill_per_token=args.prefill_per_token,
+                      error_rate=args.error_rate, stall_rate=args.stall_rate, stall_seconds=args.stall_seconds,
+                      tail_rate=args.tail_rate, tail_seconds=args.tail_seconds, seed=args.seed,
+                      slots=args.slots)
+    server = StubServer(model, args.host, args.port, batching=args.batching)
+    print(f"桩模型服务已启动: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
@@ -0,0 +1,436 @@
+"""
+性能回归基准测试：覆盖各个子系统和端到端的会话循环，结果写入JSON并与保存的基线比较
+
+- parser.*:     UITarsParser解析正常输出和需要修复的输出
+- executor.*:   坐标解析和映射、动作编译并经输入线程执行（空输入后端，不等待计划时间）
+- capture.*:    环形缓冲区写入一帧、两帧之间的差异、XShm截图（有DISPLAY时）
+- encoding.*:   一帧截图编码为PNG/JPEG的data URL
+- agent.*:      稳定前缀模式下构造一次请求（历史、token预算检查，不发出请求）
+- session.*:    端到端的一步：合成桌面截图 → 编码 → 桩模型服务（子进程）→ 解析 → 执行 → 反馈
+
+每项取 --repeat 轮中每次操作的最短耗时。结果与 --baselines 中的基线比较，
+比基线慢超过阈值（基线文件中每项的threshold，默认见BENCHMARKS）时列出并以非零状态退出。
+基线与机器有关，换机器或有意的改动之后用 --update-baselines 重新生成：
+
+    python -m bench.suite --output bench_results.json
+    python -m bench.suite --only parser executor
+    python -m bench.suite --update-baselines
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import itertools
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+# Agno的遥测会在每轮之后发出请求，不计入测量
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# 名称 -> (准备函数, 单位, 默认阈值)；准备函数返回 (每次操作调用的函数, 每轮次数, 清理函数或None)，
+# 当前环境无法运行时返回None
+BENCHMARKS = {}
+
+UNITS = {"us": 1e6, "ms": 1e3}
+
+PARSER_OUTPUTS = [
+    "Thought: 点击搜索框准备输入。\nAction: click(start_box='(500,80)')",
+    "Thought: 输入要查找的联系人。\nAction: type(content='文件传输助手')",
+    "Thought: 把文件拖到对话框里。\nAction: drag(start_box='(120,300,180,340)', end_box='(600,500)')",
+    "Thought: 向下滚动查看更多消息。\nAction: scroll(start_box='(640,400)', direction='down')",
+    "Thought: 消息已经发送成功。\nAction: finished(content='消息已发送')",
+]
+
+# 需要本地修复的输出：缺少右括号、坐标写成列表、参数名拼错
+REPAIR_OUTPUTS = [
+    "Thought: 点击发送按钮\nAction: click(start_box='(900,700)'",
+    "Thought: 点击搜索框\nAction: click(start_box=[500, 80])",
+    "Thought: 输入消息\nAction: type(text='你好啊')",
+]
+
+
+def benchmark(name, unit="us", threshold=0.75):
+    def register(setup):
+        BENCHMARKS[name] = (setup, unit, threshold)
+        return setup
+    return register
+
+
+class NullBackend:
+    """
+    不产生任何输入的输入后端
+    """
+
+    def check(self):
+        pass
+
+    def _ignore(self, *args):
+        pass
+
+    move = down = up = key_down = key_up = scroll = hscroll = text = _ignore
+
+
+def instant_engine():
+    """
+    不等待计划时间的输入引擎：只测量编译、线程交接和分发的开销，不测量动作本身的节奏
+    """
+    from ui_tars_input import InputEngine
+
+    class InstantEngine(InputEngine):
+        def _wait_until(self, deadline, sequence):
+            pass
+
+    return InstantEngine(NullBackend())
+
+
+class FakeDesktop:
+    """
+    合成桌面的截图后端：预先生成若干帧合成界面（BGRX，与XShm相同），每次截图轮流返回一帧
+    """
+
+    name = "fake"
+
+    def __init__(self, width=1280, height=720, variants=4):
+        import numpy as np
+        from bench.grounding import make_frame
+
+        self.width = width
+        self.height = height
+        self.frames = []
+        for seed in range(variants):
+            rgb = make_frame(seed, width, height)[0]
+            bgrx = np.zeros((height, width, 4), dtype=np.uint8)
+            bgrx[..., :3] = rgb[..., ::-1]
+            self.frames.append(bgrx.tobytes())
+        self.grabs = 0
+
+    def grab(self, region=None):
+        from ui_tars_capture import Frame
+
+        data = self.frames[self.grabs % len(self.frames)]
+        self.grabs += 1
+        return Frame(memoryview(data), self.width, self.height, self.width * 4, "BGRX")
+
+    def save(self, path, region=None):
+        return self.grab(region).save(path)
+
+    def close(self):
+        pass
+
+
+@benchmark("parser.parse_output")
+def bench_parse_output():
+    from ui_tars_parser import UITarsParser
+
+    parser = UITarsParser()
+    outputs = itertools.cycle(PARSER_OUTPUTS)
+    return lambda: parser.parse_output(next(outputs)), 2000, None
+
+
+@benchmark("parser.repair")
+def bench_repair():
+    from ui_tars_parser import UITarsParser
+
+    parser = UITarsParser()
+    outputs = itertools.cycle(REPAIR_OUTPUTS)
+    return lambda: parser.parse_output(next(outputs)), 1000, None
+
+
+@benchmark("executor.coordinates")
+def bench_coordinates():
+    from ui_tars_executor import UITarsExecutor
+
+    executor = UITarsExecutor(screen_width=1920, screen_height=1080)
+    boxes = itertools.cycle(["(512,300)", "[120, 300, 180, 340]", "(999,0)"])
+
+    def op():
+        executor._convert_to_absolute_coordinates(executor._parse_coordinates(next(boxes)))
+
+    return op, 5000, None
+
+
+@benchmark("executor.dispatch")
+def bench_dispatch():
+    from ui_tars_executor import UITarsExecutor
+
+    executor = UITarsExecutor(screen_width=1920, screen_height=1080, input_engine=instant_engine())
+    actions = itertools.cycle([
+        {"type": "click", "params": {"start_box": "(500,80)"}},
+        {"type": "hotkey", "params": {"key": "ctrl a"}},
+        {"type": "drag", "params": {"start_box": "(120,300)", "end_box": "(600,500)"}},
+        {"type": "scroll", "params": {"start_box": "(640,400)", "direction": "down"}},
+    ])
+    return lambda: executor.execute(next(actions)), 500, executor.close
+
+
+@benchmark("capture.ring_write", unit="ms")
+def bench_ring_write():
+    from ui_tars_frames import FrameRingBuffer
+
+    desktop = FakeDesktop(1920, 1080, variants=2)
+    buffer = FrameRingBuffer(4, 1920 * 1080 * 4)
+    return lambda: buffer.write(desktop.grab()), 50, None
+
+
+@benchmark("capture.frame_difference", unit="ms")
+def bench_frame_difference():
+    from ui_tars_frames import frame_difference
+
+    desktop = FakeDesktop(1920, 1080, variants=2)
+    a, b = desktop.grab(), desktop.grab()
+    return lambda: frame_difference(a, b), 200, None
+
+
+@benchmark("capture.xshm_grab", unit="ms")
+def bench_xshm_grab():
+    if not sys.platform.startswith("linux") or not os.environ.get("DISPLAY"):
+        return None
+    from ui_tars_capture import XShmCapture
+
+    try:
+        capture = XShmCapture()
+    except Exception:
+        return None
+    return lambda: capture.grab(), 50, capture.close
+
+
+@benchmark("encoding.png", unit="ms")
+def bench_png():
+    from ui_tars_encoding import encode_frame
+
+    frame = FakeDesktop(1280, 720, variants=1).grab()
+    return lambda: encode_frame(frame, "png"), 10, None
+
+
+@benchmark("encoding.jpeg", unit="ms")
+def bench_jpeg():
+    from ui_tars_encoding import encode_frame
+
+    frame = FakeDesktop(1280, 720, variants=1).grab()
+    return lambda: encode_frame(frame, "jpeg"), 20, None
+
+
+@benchmark("agent.request_building")
+def bench_request_building():
+    from types import SimpleNamespace
+    from agno.media import Image
+    from agno.memory.agent import AgentMemory
+    from ui_tars_agent import UITarsAgent
+    from ui_tars_encoding import encode_frame
+
+    # 不发出请求：只测量历史整理、token预算检查和消息构造
+    agent = UITarsAgent(base_url="http://127.0.0.1:9/v1/", token_budget=8000)
+    agent.agent.debug_mode = False
+    # 没有经过Agno运行时memory还没有创建
+    agent.agent.memory = AgentMemory()
+    response = SimpleNamespace(content=PARSER_OUTPUTS[0])
+    agent._run_agent = lambda message, images=None, route=None: response
+    image = Image(url=encode_frame(FakeDesktop(640, 360, variants=1).grab(), "jpeg")["data_url"])
+    for _ in range(agent.num_history_responses):
+        agent._run_with_stable_prefix("点击操作已完成", [image])
+    return lambda: agent._run_with_stable_prefix("点击操作已完成", [image]), 200, None
+
+
+@benchmark("session.step", unit="ms", threshold=0.3)
+def bench_session_step():
+    import tempfile
+    from bench.memory import StubProcess
+    from ui_tars_agent import UITarsAgent
+    from ui_tars_executor import UITarsExecutor
+    from ui_tars_progress import ProgressMonitor
+    from ui_tars_session import MultiTurnAgent
+
+    stub = StubProcess().__enter__()
+    directory = tempfile.TemporaryDirectory()
+    agent = MultiTurnAgent(use_screenshot=False, verbose=0, monitor=ProgressMonitor(max_steps=10 ** 9),
+                           feedback_style="compact", token_budget=8000)
+    agent.agent = UITarsAgent(base_url=stub.base_url, token_budget=8000)
+    agent.agent.agent.debug_mode = False
+    agent.agent.executor = UITarsExecutor(screen_width=1280, screen_height=720, input_engine=instant_engine(),
+                                          type_delay=0)
+    agent.use_screenshot = True
+    agent.capture = FakeDesktop(1280, 720)
+    agent.screenshot_path = os.path.join(directory.name, "screen.png")
+    state = {"result": None, "tasks": 0}
+
+    def op():
+        result = state["result"]
+        if result is None or result["action"]["type"] == "finished":
+            state["tasks"] += 1
+            state["result"] = agent.process_initial_task(f"模拟任务{state['tasks']}")
+        else:
+            state["result"] = agent.process_feedback(agent.next_feedback())
+
+    def cleanup():
+        agent.close()
+        stub.__exit__(None, None, None)
+        directory.cleanup()
+
+    return op, 20, cleanup
+
+
+def measure(op, number, repeat):
+    """
+    运行repeat轮，每轮调用number次
+
+    Returns:
+        tuple: (每次操作的最短耗时, 中位数耗时)，单位为秒
+    """
+    op()
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        rounds.append((time.perf_counter() - start) / number)
+    rounds.sort()
+    return rounds[0], rounds[len(rounds) // 2]
+
+
+def run(only=None, repeat=7, scale=1.0):
+    """
+    运行基准测试
+
+    Args:
+        only (list, optional): 只运行名称以这些前缀开头的项
+        repeat (int): 每项运行的轮数
+        scale (float): 每轮次数的倍数（小于1时更快但更不稳定）
+
+    Returns:
+        dict: 名称 -> {value（最短耗时）, median, unit, number, repeat}，无法运行的项为 {skipped: True}
+    """
+    results = {}
+    previous = logging.root.manager.disable
+    # 各模块的日志不计入测量
+    logging.disable(logging.CRITICAL)
+    try:
+        for name, (setup, unit, _) in BENCHMARKS.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            prepared = setup()
+            if prepared is None:
+                results[name] = {"skipped": True, "unit": unit}
+                continue
+            op, number, cleanup = prepared
+            number = max(1, int(number * scale))
+            try:
+                best, median = measure(op, number, repeat)
+            finally:
+                if cleanup:
+                    cleanup()
+            results[name] = {"value": best * UNITS[unit], "median": median * UNITS[unit], "unit": unit,
+                             "number": number, "repeat": repeat}
+    finally:
+        logging.disable(previous)
+    return results
+
+
+def machine():
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+            "cpus": os.cpu_count()}
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("benchmarks", {})
+
+
+def compare(results, baselines, threshold=None):
+    """
+    与基线比较
+
+    Args:
+        results (dict): run的结果
+        baselines (dict): 名称 -> {value, unit, threshold}
+        threshold (float, optional): 覆盖所有项的阈值
+
+    Returns:
+        dict: 名称 -> {baseline, ratio（当前/基线）, threshold, status}，
+            status为 ok、regression、improved 或 new（没有基线）
+    """
+    comparison = {}
+    for name, result in results.items():
+        if result.get("skipped"):
+            continue
+        baseline = baselines.get(name)
+        if not baseline:
+            comparison[name] = {"baseline": None, "ratio": None, "threshold": None, "status": "new"}
+            continue
+        limit = threshold if threshold is not None else baseline.get("threshold", BENCHMARKS[name][2])
+        ratio = result["value"] / baseline["value"]
+        status = "regression" if ratio > 1 + limit else "improved" if ratio < 1 / (1 + limit) else "ok"
+        comparison[name] = {"baseline": baseline["value"], "ratio": ratio, "threshold": limit, "status": status}
+    return comparison
+
+
+def save_baselines(path, results, previous):
+    """
+    把本次结果保存为基线，保留已有的阈值设置
+    """
+    benchmarks = {}
+    for name, result in results.items():
+        if result.get("skipped"):
+            if name in previous:
+                benchmarks[name] = previous[name]
+            continue
+        threshold = previous.get(name, {}).get("threshold", BENCHMARKS[name][2])
+        benchmarks[name] = {"value": round(result["value"], 3), "unit": result["unit"], "threshold": threshold}
+    for name, baseline in previous.items():
+        benchmarks.setdefault(name, baseline)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"machine": machine(), "benchmarks": benchmarks}, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='性能回归基准测试')
+    parser.add_argument('--only', nargs='+', default=None, help='只运行名称以这些前缀开头的项（如parser executor）')
+    parser.add_argument('--repeat', type=int, default=7, help='每项运行的轮数')
+    parser.add_argument('--scale', type=float, default=1.0, help='每轮次数的倍数')
+    parser.add_argument('--output', default=None, help='结果写入该JSON文件')
+    parser.add_argument('--baselines', default=BASELINES, help='基线文件')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='比基线慢超过该比例视为回归，覆盖基线文件中每项的阈值')
+    parser.add_argument('--update-baselines', action='store_true', help='把本次结果保存为基线')
+    args = parser.parse_args()
+
+    results = run(args.only, args.repeat, args.scale)
+    baselines = load_baselines(args.baselines)
+    comparison = compare(results, baselines, args.threshold)
+
+    print(f"{'基准测试':<28}{'当前':>12}{'基线':>12}{'比值':>8}{'阈值':>8}  结果")
+    for name, result in results.items():
+        if result.get("skipped"):
+            print(f"{name:<28}{'-':>12}{'-':>12}{'-':>8}{'-':>8}  跳过（当前环境不可用）")
+            continue
+        c = comparison[name]
+        unit = result["unit"]
+        baseline = f"{c['baseline']:.2f}{unit}" if c["baseline"] is not None else "-"
+        ratio = f"{c['ratio']:.2f}" if c["ratio"] is not None else "-"
+        limit = f"+{c['threshold']:.0%}" if c["threshold"] is not None else "-"
+        print(f"{name:<28}{result['value']:>10.2f}{unit}{baseline:>12}{ratio:>8}{limit:>8}  {c['status']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results,
+                       "comparison": comparison}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.output}")
+
+    if args.update_baselines:
+        save_baselines(args.baselines, results, baselines)
+        print(f"基线已更新: {args.baselines}")
+        sys.exit(0)
+
+    regressions = [name for name, c in comparison.items() if c["status"] == "regression"]
+    if regressions:
+        print(f"\n性能回归: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n没有性能回归")
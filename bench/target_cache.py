@@ -0,0 +1,159 @@
+"""
+点击目标缓存基准测试：同一个回归任务跑多次，统计命中缓存跳过的模型调用和每步耗时
+
+任务在合成界面上依次点击会话列表项、输入区图标和发送按钮，最后输出finished。
+- cold:    缓存为空，每一步都调用模型，点击成功后保存目标图块
+- warm:    界面不变，点击步骤直接命中缓存
+- moved:   窗口整体平移（第一级在原位置附近找不到，靠金字塔全图匹配）；
+           输入区的几个图标外观相同，离开原位后无法区分，应回退到模型
+- changed: 换了一组会话（列表项内容不同），列表项应回退到模型，图标和发送按钮仍可命中
+
+    python -m bench.target_cache --model-latency 0.5
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+
+from bench.stub_server import StubModel, StubServer
+from bench.grounding import make_frame, inside
+
+
+class StepModel(StubModel):
+    """
+    按请求中已有的助手消息数（即步骤序号）返回脚本输出，命中缓存跳过的步骤不会打乱脚本
+    """
+
+    def next_output(self, request):
+        step = sum(1 for message in request.get("messages", []) if message.get("role") == "assistant")
+        with self.lock:
+            self.turn += 1
+        return self.script[min(step, len(self.script) - 1)]
+
+
+def make_task(seed, width=1280, height=720):
+    """
+    生成任务的目标控件和对应的模型输出脚本
+
+    Returns:
+        tuple: (目标控件列表, 脚本)
+    """
+    _, widgets, _ = make_frame(seed, width, height)
+    # 第3个会话、第2个输入区图标、发送按钮
+    targets = [widgets[6 + 2], widgets[-4], widgets[-1]]
+    names = ["打开第3个会话", "点击表情按钮", "点击发送按钮"]
+    script = []
+    for name, (x1, y1, x2, y2) in zip(names, targets):
+        x, y = (x1 + x2) // 2 * 1000 // width, (y1 + y2) // 2 * 1000 // height
+        script.append(f"Thought: {name}。\nAction: click(start_box='({x},{y})')")
+    script.append("Thought: 消息已发送。\nAction: finished(content='已发送')")
+    return targets, script
+
+
+def shifted(array, dx, dy):
+    # 整个界面平移(dx, dy)，空出的部分填背景色
+    import numpy as np
+
+    out = np.full_like(array, 245)
+    h, w = array.shape[:2]
+    out[max(0, dy):h + min(0, dy), max(0, dx):w + min(0, dx)] = \
+        array[max(0, -dy):h - max(0, dy), max(0, -dx):w - max(0, dx)]
+    return out
+
+
+def run_task(server, cache, directory, seed, dx=0, dy=0, task_seed=0):
+    """
+    跑一次任务，返回模型请求数、命中数、点击准确率和耗时
+    """
+    from PIL import Image
+    from ui_tars_agent import UITarsAgent
+
+    array, _, _ = make_frame(seed)
+    frame = shifted(array, dx, dy)
+    screenshot = os.path.join(directory, f"frame_{seed}_{dx}_{dy}.png")
+    Image.fromarray(frame).save(screenshot)
+    height, width = frame.shape[:2]
+
+    targets, _ = make_task(seed)
+    targets = [(x1 + dx, y1 + dy, x2 + dx, y2 + dy) for x1, y1, x2, y2 in targets]
+
+    agent = UITarsAgent(base_url=server.base_url, target_cache=cache)
+    agent.agent.debug_mode = False
+    agent.executor.set_region((0, 0, width, height))
+
+    def execute(action):
+        # 只换算坐标，不真正点击
+        coords = agent.executor._parse_coordinates(action["params"].get("start_box", ""))
+        point = agent.executor._convert_to_absolute_coordinates(coords)
+        if not point:
+            return {"status": "success"}
+        return {"status": "success", "coords": {"x": point[0], "y": point[1]}}
+    agent._execute_ui_action = execute
+
+    server.model.reset()
+    task = f"打开会话并发送消息 #{task_seed}"
+    hits, correct, step_seconds, lookup_seconds = 0, 0, [], []
+    for step in range(len(targets) + 1):
+        start = time.perf_counter()
+        result = agent.process_task(task if step == 0 else "点击操作已完成，检查一下目标是否已完成",
+                                    screenshot, cache_key=f"{task}\n#{step}")
+        step_seconds.append(time.perf_counter() - start)
+        if result["target"]:
+            hits += 1
+            lookup_seconds.append(result["target"]["seconds"])
+            coords = result["execution"]["coords"]
+            correct += inside(targets[step], coords["x"], coords["y"])
+        if result["action"]["type"] == "finished":
+            break
+
+    return {
+        "steps": len(step_seconds),
+        "model_requests": server.model.snapshot()["requests"],
+        "hits": hits,
+        "correct": correct,
+        "total_s": sum(step_seconds),
+        "lookup_ms": sum(lookup_seconds) * 1000 / max(len(lookup_seconds), 1),
+    }
+
+
+def run(model_latency=0.5):
+    """
+    依次运行cold、warm、moved、changed四种情况
+
+    Returns:
+        dict: 每种情况的统计
+    """
+    from ui_tars_targets import TargetCache
+
+    seed = 3
+    _, script = make_task(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TargetCache(path=os.path.join(directory, "targets"))
+        with StubServer(StepModel(script=script, base_latency=model_latency, prefill_per_token=0.0)) as server:
+            results["cold"] = run_task(server, cache, directory, seed)
+            # 重新从磁盘加载，模拟下一次运行
+            cache = TargetCache(path=os.path.join(directory, "targets"))
+            results["warm"] = run_task(server, cache, directory, seed)
+            results["moved"] = run_task(server, cache, directory, seed, dx=20, dy=-150)
+            results["changed"] = run_task(server, cache, directory, seed + 1)
+        results["cache"] = cache.stats()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='点击目标缓存基准测试')
+    parser.add_argument('--model-latency', type=float, default=0.5, help='桩模型每次调用的延迟（秒）')
+    args = parser.parse_args()
+
+    results = run(args.model_latency)
+    print(f"{'情况':<10}{'步骤':>6}{'模型请求':>10}{'缓存命中':>10}{'点对':>6}{'总耗时':>10}{'单次匹配':>10}")
+    for name in ("cold", "warm", "moved", "changed"):
+        r = results[name]
+        print(f"{name:<10}{r['steps']:>6}{r['model_requests']:>10}{r['hits']:>10}{r['correct']:>6}"
+              f"{r['total_s']:>9.2f}s{r['lookup_ms']:>8.1f}ms")
+    print(f"\n缓存统计: {results['cache']}")
@@ -0,0 +1,64 @@
+"""
+token预算基准测试：长会话下对比有无预算管理时的请求大小和压缩事件
+
+    python -m bench.token_budget --turns 60 --budget 20000
+"""
+
+import os
+import argparse
+import tempfile
+
+os.environ.setdefault("HUOSHAN_API_KEY", "stub")
+os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+
+from bench.stub_server import StubServer
+from bench.prefix_cache import make_screens
+
+
+def run_agent(server, screens, turns, budget):
+    """
+    跑一个长会话，返回桩模型统计和预算报告
+    """
+    from ui_tars_agent import UITarsAgent
+
+    # 历史轮数上限放开，只由token预算约束请求大小
+    agent = UITarsAgent(base_url=server.base_url, num_history_responses=turns, token_budget=budget)
+    agent.agent.debug_mode = False
+    agent._execute_ui_action = lambda action: {"status": "skipped"}
+
+    server.model.reset()
+    agent.process_task("打开微信，给文件传输助手发送一条消息：你好啊", screens[0])
+    for turn in range(1, turns):
+        agent.process_task("点击操作已完成，检查一下目标是否已完成", screens[turn % len(screens)])
+
+    stats = server.model.snapshot()
+    stats["budget"] = agent.token_budget.report() if agent.token_budget else None
+    return stats
+
+
+def run(turns=60, budget=20000):
+    with tempfile.TemporaryDirectory() as directory, StubServer() as server:
+        screens = make_screens(directory, min(turns, 20))
+        return {
+            "unbounded": run_agent(server, screens, turns, None),
+            "budgeted": run_agent(server, screens, turns, budget),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='token预算基准测试')
+    parser.add_argument('--turns', type=int, default=60, help='对话轮数')
+    parser.add_argument('--budget', type=int, default=20000, help='单次请求token预算')
+    args = parser.parse_args()
+
+    results = run(args.turns, args.budget)
+    for name, stats in results.items():
+        print(f"{name:<10} 平均提示token {stats['avg_prompt_tokens']:>9.0f}  最大提示token {stats['max_prompt_tokens']:>7}  "
+              f"平均TTFT {stats['avg_ttft_ms']:>7.1f}ms")
+
+    report = results["budgeted"]["budget"]
+    print(f"\n压缩 {report['compactions']} 次，丢弃截图 {report['frames_dropped']} 张，"
+          f"压缩Thought {report['thoughts_summarized']} 条，合并轮次 {report['turns_merged']} 轮")
+    for event in report["events"]:
+        print(f"  第{event['turn']}轮: {event['before_tokens']} -> {event['after_tokens']} tokens, "
+              f"载荷 {event['before_payload_bytes'] / 1024:.0f}KB -> {event['after_payload_bytes'] / 1024:.0f}KB")
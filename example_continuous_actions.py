@@ -6,281 +6,15 @@ UI-TARS Agent 多轮对话操作示例
 该脚本展示了如何使用UI-TARS Agent进行多轮对话式自动化操作
 """
 
-from ui_tars_agent import UITarsAgent
-import pyautogui
-import json
-import os
-import time
-
-class MultiTurnAgent:
-    """多轮对话代理类，处理连续对话操作"""
-    
-    def __init__(self, use_screenshot=True, verbose=1):
-        """
-        初始化多轮对话代理
-        
-        Args:
-            use_screenshot (bool): 是否使用实际截图，False表示缸中脑模式
-            verbose (int): 日志详细程度，0=静默，1=普通，2=详细
-        """
-        if verbose > 0:
-            print("初始化UI-TARS代理...")
-        self.agent = UITarsAgent()
-        self.screenshot_path = "current_screen.png"
-        self.action_history = []  # 仅记录操作历史，不维护对话历史
-        self.use_screenshot = use_screenshot
-        self.verbose = verbose
-    
-    def take_screenshot(self):
-        """
-        获取当前屏幕截图，或在缸中脑模式下返回None
-        
-        Returns:
-            str|None: 截图路径或缸中脑模式下的None
-        """
-        if not self.use_screenshot:
-            if self.verbose > 1:
-                print("缸中脑模式：不使用屏幕截图")
-            return None
-        
-        try:
-            if self.verbose > 1:
-                print("正在截取当前屏幕...")
-            pyautogui.screenshot(self.screenshot_path)
-            if self.verbose > 1:
-                print(f"屏幕截图已保存至: {self.screenshot_path}")
-            return self.screenshot_path
-        except Exception as e:
-            print(f"截图失败: {e}")
-            return None
-    
-    def process_initial_task(self, task):
-        """处理初始任务"""
-        if self.verbose > 0:
-            print(f"\n处理整体任务: {task}")
-        
-        # 获取初始截图
-        screenshot_path = self.take_screenshot()
-        
-        # 初始任务处理
-        result = self.agent.process_task(task, screenshot_path)
-        
-        # 记录动作到历史
-        self.action_history.append({
-            "type": result["action"]["type"],
-            "params": result["action"]["params"],
-            "thought": result["thought"]
-        })
-        
-        # 打印结果
-        self._print_step_result(result)
-        
-        return result
-    
-    def process_feedback(self, feedback):
-        """处理反馈并执行下一步操作"""
-        if not self.action_history:
-            print("没有活跃的任务，请先处理初始任务")
-            return None
-        
-        # 更新截图
-        screenshot_path = self.take_screenshot()
-        
-        # 处理任务
-        result = self.agent.process_task(feedback, screenshot_path)
-        
-        # 记录动作到历史
-        self.action_history.append({
-            "type": result["action"]["type"],
-            "params": result["action"]["params"],
-            "thought": result["thought"]
-        })
-        
-        # 打印结果
-        self._print_step_result(result)
-        
-        return result
-    
-    def _print_step_result(self, result):
-        """打印步骤结果"""
-        if self.verbose == 0:
-            return
-            
-        print("\n==================== 步骤结果 ====================")
-        
-        # 详细模式才打印思考过程
-        if self.verbose > 1:
-            print(f"模型思考: {result['thought']}")
-            
-        # 简化动作输出
-        action_type = result['action']['type']
-        action_params = result['action']['params']
-        params_str = ""
-        
-        if action_params:
-            for k, v in action_params.items():
-                if isinstance(v, str) and len(v) > 30:
-                    v = v[:27] + "..."
-                params_str += f"{k}={v}, "
-            params_str = params_str.rstrip(", ")
-        
-        print(f"执行动作: {action_type}({params_str})")
-        
-        # 简化执行结果输出
-        if self.verbose > 1:
-            print(f"执行结果: {json.dumps(result['execution'], ensure_ascii=False)}")
-        else:
-            # 简洁模式只显示执行是否成功
-            success = result['execution'].get('success', False)
-            print(f"执行状态: {'成功' if success else '失败'}")
-            
-        print("=================================================\n")
-    
-    def print_action_summary(self):
-        """打印操作历史摘要"""
-        if self.verbose == 0:
-            return
-            
-        print("\n============= 操作历史摘要 =============")
-        for i, action in enumerate(self.action_history):
-            params_str = ""
-            if "params" in action and action["params"]:
-                for k, v in action["params"].items():
-                    if isinstance(v, str) and len(v) > 20:
-                        v = v[:17] + "..."
-                    params_str += f"{k}={v}, "
-                params_str = params_str.rstrip(", ")
-            
-            print(f"[{i+1}] {action['type']}({params_str})")
-        print("========================================")
-    
-    def generate_feedback(self, action):
-        """根据action类型生成自动反馈"""
-        action_type = action["type"]
-        params = action["params"] if "params" in action else {}
-        
-        feedback_templates = {
-            "click": "点击操作已完成，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
-            "left_double": "双击操作已完成，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
-            "right_single": "右键点击已完成，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
-            "drag": "拖拽操作已完成，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
-            "hotkey": "热键{key}已按下，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
-            "type": "文本已输入：{content}，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
-            "scroll": "已在{start_box}位置向{direction}方向滚动，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
-            "wait": "等待操作完成，已暂停5秒，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
-            "finished": "任务已完成：{content}"
-        }
-        
-        if action_type in feedback_templates:
-            template = feedback_templates[action_type]
-            try:
-                # 尝试格式化模板
-                feedback = template.format(**params)
-            except KeyError:
-                # 如果格式化失败，返回通用反馈
-                feedback = f"{action_type}操作已完成"
-        else:
-            feedback = f"{action_type}操作已完成"
-        
-        return feedback
-
-def run_session(mode="auto", use_screenshot=True, verbose=1):
-    """
-    运行会话，根据指定的模式和截图选项执行任务
-    
-    Args:
-        mode (str): 会话模式，"auto"表示自动反馈，"interactive"表示交互式
-        use_screenshot (bool): 是否使用截图，True使用实际截图，False为缸中脑模式
-        verbose (int): 日志详细程度，0=静默，1=普通，2=详细
-    """
-    agent = MultiTurnAgent(use_screenshot=use_screenshot, verbose=verbose)
-    
-    if verbose > 0:
-        # 使用模式文字描述
-        mode_text = "交互式" if mode == "interactive" else "自动反馈"
-        screenshot_text = "使用实际截图" if use_screenshot else "缸中脑模式(无截图)"
-        
-        print("="*50)
-        print(f"UI-TARS {mode_text}会话 ({screenshot_text})")
-        print("="*50)
-    
-    # 获取初始任务
-    if mode == "interactive":
-        # 交互式模式下通过输入获取任务
-        initial_task = input("\n请输入整体任务: ")
-        if initial_task.lower() in ['quit', 'exit']:
-            return
-    else:
-        # 自动模式下使用预设任务
-        initial_task = "打开微信，给文件传输助手发送一条消息：你好啊"
-        if verbose > 0:
-            print(f"\n使用预设任务: {initial_task}")
-    
-    # 处理初始任务
-    result = agent.process_initial_task(initial_task)
-    if not result:
-        print("初始任务处理失败")
-        return
-    
-    # 最大步骤数，防止无限循环
-    max_steps = 10
-    steps = 0
-    
-    if mode == "auto" and verbose > 0:
-        print("\n开始执行自动反馈序列...")
-    
-    # 循环执行直到任务完成或达到最大步骤数
-    while steps < max_steps:
-        steps += 1
-        
-        if mode == "interactive":
-            # 交互式模式下通过用户输入获取反馈
-            feedback = input("\n请输入执行结果或下一步指令 ('quit'退出, 'summary'查看历史, 'auto'使用自动反馈): ")
-            
-            if feedback.lower() in ['quit', 'exit']:
-                break
-            elif feedback.lower() == 'summary':
-                agent.print_action_summary()
-                continue
-            elif feedback.lower() == 'auto':
-                # 使用自动生成的反馈
-                last_action = agent.action_history[-1]
-                feedback = agent.generate_feedback(last_action)
-                if verbose > 0:
-                    print(f"使用自动反馈: {feedback}")
-        else:
-            # 自动模式下生成反馈
-            last_action = agent.action_history[-1]
-            feedback = agent.generate_feedback(last_action)
-            
-            if verbose > 0:
-                print(f"\n--- 步骤 {steps}/{max_steps} ---")
-                print(f"自动反馈: {feedback}")
-            
-            # 暂停一下，方便查看流程
-            time.sleep(10)
-        
-        # 处理当前反馈
-        result = agent.process_feedback(feedback)
-        
-        # 检查是否完成任务
-        if result and result['action']['type'] == 'finished':
-            if verbose > 0:
-                print(f"\n任务已完成: {result['action']['params'].get('content', '任务完成')}")
-            if mode == "interactive":
-                cont = input("\n任务已标记为完成，是否继续? (y/n): ")
-                if cont.lower() != 'y':
-                    break
-            else:
-                break
-    
-    # 打印操作历史摘要
-    agent.print_action_summary()
+from ui_tars_session import run_session
 
 if __name__ == "__main__":
     import sys
+    import logging
     import argparse
     
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
     # 使用argparse解析命令行参数
     parser = argparse.ArgumentParser(description='UI-TARS多轮对话示例')
     parser.add_argument('--mode', choices=['auto', 'interactive'], default='auto',
@@ -289,6 +23,34 @@ if __name__ == "__main__":
                       help='是否使用截图：true使用实际截图，false缸中脑模式')
     parser.add_argument('--verbose', type=int, choices=[0, 1, 2], default=1,
                       help='日志详细程度：0=静默，1=普通，2=详细')
+    parser.add_argument('--window-title', default=None,
+                      help='目标窗口标题：只截取并操作该窗口，如 微信')
+    parser.add_argument('--window-pid', type=int, default=None,
+                      help='目标窗口所属进程PID')
+    parser.add_argument('--capture', choices=['auto', 'xshm', 'pyautogui'], default='auto',
+                      help='截图后端：auto自动选择，xshm使用X11共享内存，pyautogui使用pyautogui.screenshot')
+    parser.add_argument('--background-fps', type=float, default=0,
+                      help='后台截图帧率：大于0时启用后台截图线程，截图直接读取最新帧')
+    parser.add_argument('--ring-slots', type=int, default=8,
+                      help='后台截图环形缓冲区槽位数，每个槽位占用一帧全屏内存')
+    parser.add_argument('--token-budget', type=int, default=None,
+                      help='单次请求的token预算：接近预算时丢弃旧截图、压缩旧Thought并合并早期轮次')
+    parser.add_argument('--model-timeout', type=float, default=60,
+                      help='单次模型调用的超时时间（秒）')
+    parser.add_argument('--max-retries', type=int, default=2,
+                      help='模型调用遇到超时、限流或5xx错误时的最多重试次数（带抖动的指数退避）')
+    parser.add_argument('--hedge', action='store_true',
+                      help='启用对冲请求：调用超过近期p95延迟仍未返回时再发一个相同请求，取先返回的结果')
+    parser.add_argument('--grounding', action='store_true',
+                      help='点击前用本地元素检测器检查位置：吸附到附近的控件，拦截落在空白背景上的点击')
+    parser.add_argument('--record', default=None,
+                      help='录制操作轨迹并在会话结束后保存到该JSON文件')
+    parser.add_argument('--replay', default=None,
+                      help='回放录制的轨迹：界面与录制时一致的步骤直接执行，不一致时才调用模型')
+    parser.add_argument('--replay-tolerance', type=float, default=0.01,
+                      help='回放时允许的截图变化比例（缩略图中变化的像素比例）')
+    parser.add_argument('--target-cache', default=None,
+                      help='点击目标缓存目录：模型的点击成功后保存目标图块，之后相同任务的相同步骤匹配成功时直接点击')
     
     args = parser.parse_args()
     
@@ -297,4 +59,9 @@ if __name__ == "__main__":
     verbose = args.verbose
     
     # 运行会话
-    run_session(mode=mode, use_screenshot=use_screenshot, verbose=verbose) 
\ No newline at end of file
+    run_session(mode=mode, use_screenshot=use_screenshot, verbose=verbose,
+                window_title=args.window_title, window_pid=args.window_pid, capture=args.capture,
+                background_fps=args.background_fps, ring_slots=args.ring_slots, token_budget=args.token_budget,
+                model_timeout=args.model_timeout, max_retries=args.max_retries, hedge=args.hedge,
+                grounding=args.grounding, target_cache=args.target_cache,
+                record=args.record, replay=args.replay, replay_tolerance=args.replay_tolerance) 
\ No newline at end of file
@@ -1,7 +1,7 @@
-from agno.agent import Agent, RunResponse
-from agno.models.deepseek import DeepSeek
-from agno.playground import Playground, serve_playground_app
-from agno.storage.agent.sqlite import SqliteAgentStorage
+import os
+import argparse
+
+from agno.playground import serve_playground_app
 
 #litellm初始化火山引擎的方法
 #V3的模型
@@ -28,49 +28,32 @@ from agno.storage.agent.sqlite import SqliteAgentStorage
 # Set up SILICONFLOW API key
 # 记得使用以上方法后，需要关闭vscode后重启vscode，之后点击F5运行python脚本的时候才能生效
 
-V3 = "ep-20250204220334-l2q5g"
-R1 = "ep-20250204215316-p8rqb"
-TARS = "ep-20250417103958-d888s"
-
-#参考官方文档：https://www.volcengine.com/docs/82379/1536429
-#使用无随机性的推理参数，以提高模型输出准确性
-# temperature=0
-# top_p=0.7
-
-ui_tars = DeepSeek(id=TARS,base_url="https://ark.cn-beijing.volces.com/api/v3/",temperature=0,top_p=0.7)
-
-agent = Agent(model=ui_tars,
-              name="我的UI助手",
-              description="",
-              instructions="""
-You are a GUI agent. You are given a task and your action history, with screenshots. You need to perform the next action to complete the task.
-## Output Format
-```
-Thought: ...
-Action: ...
-```
-## Action Space
-click(start_box='[x1, y1, x2, y2]')
-left_double(start_box='[x1, y1, x2, y2]')
-right_single(start_box='[x1, y1, x2, y2]')
-drag(start_box='[x1, y1, x2, y2]', end_box='[x3, y3, x4, y4]')
-hotkey(key='')
-type(content='') #If you want to submit your input, use "\n" at the end of `content`.
-scroll(start_box='[x1, y1, x2, y2]', direction='down or up or right or left')
-wait() #Sleep for 5s and take a screenshot to check for any changes.
-finished(content='xxx') # Use escape characters \\', \\", and \\n in content part to ensure we can parse the content in normal python string format.
-## Note
-- Use Chinese in `Thought` part.
-- Write a small plan and finally summarize your next action (with its target element) in one sentence in `Thought` part.
-## User Instruction
-            """,
-            debug_mode=True,
-            add_datetime_to_instructions=True,
-            add_history_to_messages=True,
-            num_history_responses=5,
-              )
-
-app = Playground(agents=[agent]).get_app()
-
+# 服务本身（模型、存储和Agent池）在ui_tars_playground中，由uvicorn在worker进程中导入；
+# 本脚本不能先导入它，否则单worker时uvicorn直接使用已导入的模块，命令行参数不起作用
 if __name__ == "__main__":
-    serve_playground_app("starter:app", reload=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='UI-TARS Playground服务')
+    parser.add_argument('--host', default='localhost', help='监听地址')
+    parser.add_argument('--port', type=int, default=7777, help='监听端口')
+    parser.add_argument('--workers', type=int, default=int(os.getenv("UI_TARS_WORKERS", "1")),
+                        help='uvicorn worker进程数')
+    parser.add_argument('--pool-size', type=int, default=None, help='每个worker的Agent池大小（默认4）')
+    parser.add_argument('--db-url', default=None,
+                        help='会话存储数据库URL（sqlite:///... 或 postgresql://...，默认sqlite:////tmp/ui_tars_sessions.db）')
+    parser.add_argument('--base-url', default=None, help='模型服务地址（默认火山引擎）')
+    parser.add_argument('--reload', action='store_true', help='开发模式：代码修改后自动重启（只能单worker）')
+    args = parser.parse_args()
+
+    # worker进程导入ui_tars_playground模块，通过环境变量传递配置，没有指定的参数沿用已有的环境变量
+    if args.pool_size is not None:
+        os.environ["UI_TARS_POOL_SIZE"] = str(args.pool_size)
+    if args.db_url:
+        os.environ["UI_TARS_DB_URL"] = args.db_url
+    if args.base_url:
+        os.environ["UI_TARS_BASE_URL"] = args.base_url
+
+    if args.reload:
+        serve_playground_app("ui_tars_playground:app", host=args.host, port=args.port, reload=True)
+    else:
+        import uvicorn
+        uvicorn.run("ui_tars_playground:app", host=args.host, port=args.port, workers=args.workers,
+                    log_level="warning")
\ No newline at end of file
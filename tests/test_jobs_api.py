@@ -0,0 +1,68 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from ui_tars_jobs import JobManager, create_app
+
+# run_ui_task文档中列出的全部任务选项及示例值
+OPTIONS = {
+    "max_steps": 5,
+    "max_seconds": 30.0,
+    "use_screenshot": False,
+    "window_title": "微信",
+    "window_pid": 1234,
+    "capture": "xshm",
+    "background_fps": 10.0,
+    "token_budget": 8000,
+    "grounding": True,
+    "target_cache": "/tmp/ui_tars_targets",
+    "settle_seconds": 1.0,
+    "num_history_responses": 6,
+    "scroll_clicks": 3,
+    "drag_duration": 0.2,
+    "type_delay": 0.1,
+    "wait_seconds": 2.0,
+    "repeat_limit": 4,
+    "stall_steps": 5,
+    "oscillation_cycles": 3,
+    "loop_corrections": 2,
+    "route": True,
+    "text_model": "ep-text",
+    "feedback_style": "compact",
+    "observation": "tree+image",
+    "verify_effects": True,
+}
+
+
+def submit(payload):
+    """用记录选项的执行函数启动任务队列服务，提交一个任务，返回 (状态码, 执行函数收到的选项)"""
+    received = []
+    manager = JobManager(runner=lambda job: received.append(job.options) or {})
+    with TestClient(create_app(manager)) as client:
+        response = client.post("/jobs", json=payload)
+        deadline = time.time() + 5
+        while response.status_code == 202 and not received and time.time() < deadline:
+            time.sleep(0.01)
+    return response.status_code, received[0] if received else None
+
+
+def test_every_option_reaches_runner():
+    """POST /jobs的每个选项都原样交给执行函数"""
+    status, options = submit(dict(OPTIONS, task="打开微信"))
+    assert status == 202, status
+    missing = {key: value for key, value in OPTIONS.items() if options.get(key) != value}
+    assert not missing, f"没有交给执行函数的选项: {missing}"
+    print(f"{len(OPTIONS)} 个选项全部交给了执行函数")
+
+
+def test_unknown_option_rejected():
+    """未知的选项返回422，而不是被静默忽略"""
+    status, options = submit({"task": "打开微信", "groundng": True})
+    assert status == 422 and options is None, status
+    print("未知选项返回422")
+
+
+if __name__ == "__main__":
+    test_every_option_reaches_runner()
+    test_unknown_option_rejected()
+    print("测试完成!")
@@ -0,0 +1,383 @@
+import time
+import logging
+import threading
+
+
+# 可以操作的控件角色，没有名称时也列出
+INTERACTIVE_ROLES = {
+    "push button", "toggle button", "check box", "radio button", "menu item", "check menu item",
+    "radio menu item", "menu", "combo box", "entry", "password text", "text", "spin button", "slider",
+    "link", "list item", "page tab", "tree item", "table cell", "icon", "scroll bar",
+}
+
+# 可以包含文本值的角色，读取其中的文字（输入框中已有的内容）
+TEXT_ROLES = {"entry", "text", "password text", "spin button", "combo box"}
+
+HEADER = "界面元素（角色 \"名称\" [x1,y1,x2,y2]，0-1000坐标）:"
+
+
+class _Node:
+    # 缓存的一个无障碍对象；children为None表示还没有遍历子节点
+    __slots__ = ("accessible", "depth", "role", "name", "text", "showing", "box", "children")
+
+    def __init__(self, accessible, depth):
+        self.accessible = accessible
+        self.depth = depth
+        self.role = None
+        self.name = None
+        self.text = None
+        self.showing = False
+        self.box = None
+        self.children = None
+
+
+class AccessibilityTree:
+    """
+    无障碍树观察通道：通过AT-SPI读取目标应用的控件（角色、名称、位置），序列化为紧凑的文本
+
+    每个控件的读取都是一次D-Bus调用，控件树在第一次读取时完整遍历并缓存，之后由AT-SPI事件
+    （子节点增减、名称、状态和位置变化，窗口创建和关闭）标记变化的节点，下一次读取时只重新遍历这些节点；
+    控件位置按所在窗口缓存，窗口移动时只需重新读取窗口的位置。没有事件循环时每次读取都完整遍历。
+
+    序列化时去掉不可见、在映射区域之外的控件，没有名称的容器不单独列出（其子控件上移一层），
+    坐标换算为映射区域内的0-1000相对坐标（与模型输出的坐标相同）：
+
+        界面元素（角色 "名称" [x1,y1,x2,y2]，0-1000坐标）:
+        frame "微信" [0,0,1000,1000]
+          entry "搜索" [80,40,300,70]
+          push button "发送" [850,900,950,960]
+
+    需要系统安装pyatspi（如 python3-pyatspi）并启用辅助功能；不可用时available()返回False
+    """
+
+    EVENTS = (
+        "object:children-changed",
+        "object:state-changed:showing",
+        "object:property-change:accessible-name",
+        "object:bounds-changed",
+        "object:text-changed",
+        "window:create",
+        "window:destroy",
+    )
+
+    def __init__(self, title=None, pid=None, max_nodes=200, max_depth=40, refresh_seconds=30.0, listen=True):
+        """
+        初始化无障碍树
+
+        Args:
+            title (str, optional): 目标窗口标题（包含匹配），与pid都未指定时使用当前激活的窗口
+            pid (int, optional): 目标应用的进程PID
+            max_nodes (int): 序列化时最多列出的控件数
+            max_depth (int): 遍历的最大深度
+            refresh_seconds (float): 每隔该时间完整遍历一次，防止漏掉的事件让缓存一直过期，0表示不定期遍历
+            listen (bool): 是否监听AT-SPI事件增量更新缓存，False时每次读取都完整遍历
+        """
+        self.title = title
+        self.pid = int(pid) if pid else None
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.refresh_seconds = refresh_seconds
+        self.listen = listen
+        self.logger = logging.getLogger("AccessibilityTree")
+
+        self._lock = threading.Lock()
+        self._roots = None
+        self._index = {}  # 无障碍对象 -> 缓存节点
+        self._dirty = {}  # 无障碍对象 -> "structure"（子节点需要重新遍历）或 "attributes"
+        self._changes = []  # 子节点增减事件：("add"或"remove", 父对象, 子对象, 位置)
+        self._roots_dirty = False
+        self._walked_at = 0.0
+        self._thread = None
+        self._listening = False
+        self._available = None
+        self.stats = {"snapshots": 0, "full_walks": 0, "reads": 0, "events": 0, "seconds": 0.0}
+
+    def available(self):
+        """
+        AT-SPI是否可用（pyatspi可以导入，并且能连接到辅助功能总线）
+
+        Returns:
+            bool: 是否可用
+        """
+        if self._available is None:
+            try:
+                import pyatspi
+                pyatspi.Registry.getDesktop(0)
+                self._available = True
+            except Exception as e:
+                self.logger.info(f"AT-SPI不可用: {e}")
+                self._available = False
+        return self._available
+
+    def start(self):
+        """
+        开始监听AT-SPI事件（在后台线程中运行事件循环）
+
+        Returns:
+            AccessibilityTree: self
+        """
+        if not self.listen or self._thread or not self.available():
+            return self
+        import pyatspi
+
+        pyatspi.Registry.registerEventListener(self.handle_event, *self.EVENTS)
+        self._thread = threading.Thread(target=pyatspi.Registry.start, name="AtspiEvents", daemon=True)
+        self._thread.start()
+        self._listening = True
+        return self
+
+    def stop(self):
+        """
+        停止监听事件并清空缓存
+        """
+        if self._thread:
+            import pyatspi
+
+            pyatspi.Registry.deregisterEventListener(self.handle_event, *self.EVENTS)
+            pyatspi.Registry.stop()
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._listening = False
+        with self._lock:
+            self._roots = None
+            self._index = {}
+            self._dirty = {}
+            self._changes = []
+
+    def handle_event(self, event):
+        """
+        处理一个AT-SPI事件：标记变化的节点，下一次读取时重新遍历
+
+        Args:
+            event: AT-SPI事件（type和source）
+        """
+        event_type = str(event.type)
+        with self._lock:
+            self.stats["events"] += 1
+            if event_type.startswith("window:"):
+                self._roots_dirty = True
+            elif event_type.startswith("object:children-changed"):
+                # 事件带有增减的子对象和位置时只更新这一个子节点，否则重新遍历所有子节点
+                child = getattr(event, "any_data", None)
+                kind = event_type.rsplit(":", 1)[-1]
+                if child is not None and kind in ("add", "remove"):
+                    self._changes.append((kind, event.source, child, getattr(event, "detail1", -1)))
+                else:
+                    self._dirty[event.source] = "structure"
+            else:
+                self._dirty.setdefault(event.source, "attributes")
+
+    # 以下三个方法是对AT-SPI的全部调用，基准测试中替换为模拟的控件树
+
+    def _find_roots(self):
+        """
+        目标应用的顶层窗口：按PID或标题匹配，都未指定时为当前激活的窗口
+
+        Returns:
+            list: 顶层窗口的无障碍对象
+        """
+        import pyatspi
+
+        roots = []
+        desktop = pyatspi.Registry.getDesktop(0)
+        for app in desktop:
+            if app is None:
+                continue
+            if self.pid and app.get_process_id() != self.pid:
+                continue
+            for window in app:
+                if window is None:
+                    continue
+                states = window.getState()
+                if not states.contains(pyatspi.STATE_SHOWING):
+                    continue
+                if self.title and self.title not in (window.name or ""):
+                    continue
+                if not self.title and not self.pid and not states.contains(pyatspi.STATE_ACTIVE):
+                    continue
+                roots.append(window)
+        return roots
+
+    def _children(self, accessible):
+        return [child for child in accessible if child is not None]
+
+    def _read(self, accessible, top_level):
+        """
+        读取一个控件的属性
+
+        Returns:
+            tuple: (角色, 名称, 文本值, 是否可见, (x, y, 宽, 高))，顶层窗口为屏幕坐标，其余为窗口内坐标
+        """
+        import pyatspi
+
+        role = accessible.getRoleName()
+        showing = accessible.getState().contains(pyatspi.STATE_SHOWING)
+        box = None
+        text = None
+        if showing:
+            coords = pyatspi.DESKTOP_COORDS if top_level else pyatspi.WINDOW_COORDS
+            extents = accessible.queryComponent().getExtents(coords)
+            box = (extents.x, extents.y, extents.width, extents.height)
+            if role in TEXT_ROLES:
+                try:
+                    text_interface = accessible.queryText()
+                    text = text_interface.getText(0, min(text_interface.characterCount, 80))
+                except NotImplementedError:
+                    text = None
+        return role, accessible.name or "", text, showing, box
+
+    def _load(self, node, top_level):
+        node.role, node.name, node.text, node.showing, node.box = self._read(node.accessible, top_level)
+        self.stats["reads"] += 1
+
+    def _walk(self, accessible, depth=0):
+        node = _Node(accessible, depth)
+        self._index[accessible] = node
+        self._load(node, depth == 0)
+        self._walk_children(node)
+        return node
+
+    def _walk_children(self, node):
+        # 不可见的控件不遍历子节点，变为可见时（state-changed:showing事件）再遍历
+        node.children = []
+        if node.showing and node.depth < self.max_depth:
+            node.children = [self._walk(child, node.depth + 1) for child in self._children(node.accessible)]
+
+    def _forget(self, node):
+        for child in node.children or ():
+            self._index.pop(child.accessible, None)
+            self._forget(child)
+        node.children = []
+
+    def _update(self, dirty, changes):
+        # 只重新读取有变化的节点：子节点增减时只遍历增加的子节点，需要重新遍历时遍历其子树，属性变化时只读取该节点
+        for kind, parent, child, position in changes:
+            node = self._index.get(parent)
+            if node is None or node.children is None or dirty.get(parent) == "structure" \
+                    or not node.showing or node.depth >= self.max_depth:
+                continue
+            old = self._index.pop(child, None)
+            if old is not None and old in node.children:
+                self._forget(old)
+                node.children.remove(old)
+            if kind == "add":
+                position = position if 0 <= position <= len(node.children) else len(node.children)
+                node.children.insert(position, self._walk(child, node.depth + 1))
+
+        for accessible, kind in dirty.items():
+            node = self._index.get(accessible)
+            if node is None:
+                continue
+            was_showing = node.showing
+            self._load(node, node.depth == 0)
+            if kind == "structure" or node.showing != was_showing:
+                self._forget(node)
+                self._walk_children(node)
+
+    def snapshot(self, region=None):
+        """
+        读取当前的控件树并序列化
+
+        Args:
+            region (tuple, optional): 映射区域 (left, top, width, height)，坐标换算为该区域内的0-1000相对坐标，
+                区域之外的控件不列出；默认为第一个顶层窗口
+
+        Returns:
+            dict: text（序列化文本，没有找到目标窗口时为空字符串）、nodes（列出的控件数）、
+                cached（缓存的控件总数）、reads（本次读取的控件数）、full（是否完整遍历）和seconds
+        """
+        start = time.perf_counter()
+        reads = self.stats["reads"]
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            changes, self._changes = self._changes, []
+            roots_dirty, self._roots_dirty = self._roots_dirty, False
+
+        expired = self.refresh_seconds and time.time() - self._walked_at >= self.refresh_seconds
+        full = self._roots is None or roots_dirty or expired or not self._listening
+        if full:
+            self._index = {}
+            self._roots = [self._walk(root) for root in self._find_roots()]
+            self._walked_at = time.time()
+            self.stats["full_walks"] += 1
+        else:
+            self._update(dirty, changes)
+            # 窗口可能移动过（移动窗口不一定触发子控件的事件），每次都重新读取顶层窗口的位置
+            for root in self._roots:
+                self._load(root, True)
+
+        text, nodes = self.serialize(region)
+        seconds = time.perf_counter() - start
+        self.stats["snapshots"] += 1
+        self.stats["seconds"] += seconds
+        return {"text": text, "nodes": nodes, "cached": len(self._index), "reads": self.stats["reads"] - reads,
+                "full": full, "seconds": seconds}
+
+    def serialize(self, region=None):
+        """
+        把缓存的控件树序列化为文本（见类说明中的格式）
+
+        Returns:
+            tuple: (文本, 列出的控件数)
+        """
+        if not self._roots:
+            return "", 0
+        if region is None:
+            region = self._roots[0].box
+        left, top, width, height = region
+        lines = []
+        skipped = 0
+
+        def relative(x, y):
+            return (min(1000, max(0, round((x - left) * 1000 / max(width, 1)))),
+                    min(1000, max(0, round((y - top) * 1000 / max(height, 1)))))
+
+        def emit(node, origin, depth):
+            # origin为所在窗口的屏幕位置，顶层窗口自身为(0, 0)
+            nonlocal skipped
+            if not node.showing or not node.box or node.box[2] <= 0 or node.box[3] <= 0:
+                return
+            x, y = origin[0] + node.box[0], origin[1] + node.box[1]
+            x2, y2 = x + node.box[2], y + node.box[3]
+            if x2 <= left or y2 <= top or x >= left + width or y >= top + height:
+                return
+            listed = node.role in INTERACTIVE_ROLES or node.name or node.text
+            if listed:
+                if len(lines) >= self.max_nodes:
+                    skipped += 1
+                else:
+                    x1r, y1r = relative(x, y)
+                    x2r, y2r = relative(x2, y2)
+                    line = f"{'  ' * depth}{node.role} \"{node.name}\""
+                    if node.text:
+                        line += f" = \"{node.text[:40]}\""
+                    lines.append(f"{line} [{x1r},{y1r},{x2r},{y2r}]")
+            if origin == (0, 0) and node in self._roots:
+                origin = (x, y)
+            for child in node.children or ():
+                emit(child, origin, depth + 1 if listed else depth)
+
+        for root in self._roots:
+            emit(root, (0, 0), 0)
+        if skipped:
+            lines.append(f"……还有{skipped}个控件未列出")
+        if not lines:
+            return "", 0
+        return "\n".join([HEADER] + lines), len(lines) - (1 if skipped else 0)
+
+    def report(self):
+        """
+        返回读取统计
+
+        Returns:
+            dict: snapshots、full_walks、reads、events、seconds和avg_ms
+        """
+        stats = dict(self.stats)
+        stats["avg_ms"] = stats["seconds"] * 1000 / max(stats["snapshots"], 1)
+        return stats
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,26 +1,60 @@
 from ui_tars_parser import UITarsParser
-from agno.agent import Agent, RunResponse
-from agno.models.deepseek import DeepSeek
-from agno.media import Image
 from ui_tars_executor import UITarsExecutor
+from ui_tars_budget import TokenBudget
+from ui_tars_resilience import CallPolicy
+from ui_tars_grounding import ElementDetector, to_gray
+from ui_tars_targets import TargetCache
+from ui_tars_router import response_tokens
+from ui_tars_feedback import REPEATED, repeated_feedback
 import os
 import time
-import pyautogui
 import json
 import re
+import base64
+import mimetypes
+from copy import deepcopy
+from datetime import datetime
+
+# 稳定前缀模式下本轮消息末尾的时间（易变字段）
+TIME_NOTE = "\n\nThe current time is "
 
 class UITarsAgent:
     """
     UI-TARS代理类，用于集成Agno框架和UI-TARS模型解析器
     """
     
-    def __init__(self, model_id=None, base_url=None):
+    def __init__(self, model_id=None, base_url=None, window=None,
+                 num_history_responses=20, history_slide_step=5, prefix_cache=True, token_budget=None,
+                 call_policy=None, max_corrections=1, grounding=None, target_cache=None, executor_options=None,
+                 router=None, batcher=None):
         """
         初始化UI-TARS代理
         
         Args:
             model_id (str, optional): 模型ID
             base_url (str, optional): API基础URL
+            window (WindowTarget, optional): 目标窗口，设置后只截取并操作该窗口
+            num_history_responses (int): 发送给模型的最多历史轮数
+            history_slide_step (int): 历史超出上限时一次丢弃的轮数，
+                按块滑动使历史前缀在多轮之间保持不变
+            prefix_cache (bool): 是否构造稳定的请求前缀以命中服务端前缀缓存，
+                False时使用Agno自带的历史和系统提示中的时间
+            token_budget (int|TokenBudget, optional): 单次请求的token预算，
+                接近预算时压缩历史（需要prefix_cache=True）
+            call_policy (CallPolicy, optional): 模型调用的超时、重试和对冲策略，
+                默认单次调用60秒超时、可重试错误最多重试2次、不对冲；close()时一并关闭其线程池
+            max_corrections (int): 输出无法解析且本地修复失败时，针对同一张截图
+                发送纯文本纠正请求的最多次数
+            grounding (bool|ElementDetector, optional): 点击前用本地元素检测器检查位置，
+                True表示使用默认参数的检测器
+            target_cache (str|TargetCache, optional): 点击目标缓存或其目录，
+                调用process_task时传入cache_key的步骤会先尝试用缓存的目标直接点击
+            executor_options (dict, optional): 传给UITarsExecutor的其他参数，
+                如scroll_clicks、drag_duration、type_delay、wait_seconds
+            router (ModelRouter, optional): 模型路由，按每轮需要的能力（截图定位、看历史截图、纯文本）
+                选择最便宜的模型，共用同一份历史（需要prefix_cache=True）；第一个路由对应代理自身的模型
+            batcher (MicroBatcher, optional): 跨会话的请求合并器，同一进程中共用它的代理的请求
+                在几毫秒内到达时合并为一个批量请求发给支持批处理的模型服务
         """
         # 默认使用README中提到的模型ID和URL
         self.model_id = model_id or "ep-20250417103958-d888s"  # TARS模型ID
@@ -33,30 +67,194 @@ class UITarsAgent:
             
         # 初始化解析器
         self.parser = UITarsParser()
+        self.max_corrections = max_corrections
         
         # 初始化执行器
-        self.executor = UITarsExecutor()
+        if grounding is True:
+            grounding = ElementDetector()
+        self.executor = UITarsExecutor(window=window, grounding=grounding or None, **(executor_options or {}))
+        
+        # 点击目标缓存
+        if isinstance(target_cache, str):
+            target_cache = TargetCache(path=target_cache)
+        self.target_cache = target_cache
+        
+        # 由代理自己维护的对话历史: [(用户消息, 助手消息), ...]
+        # 两次按块丢弃之间历史消息不再修改，保证每轮请求的前缀逐字节一致
+        self.num_history_responses = num_history_responses
+        self.history_slide_step = max(1, min(history_slide_step, num_history_responses))
+        self.prefix_cache = prefix_cache
+        self.history = []
+        self.turns = 0
+        
+        # 请求token预算
+        if isinstance(token_budget, int):
+            token_budget = TokenBudget(max_tokens=token_budget)
+        self.token_budget = token_budget
+        
+        # 模型调用策略；重试由策略负责，OpenAI客户端自身不再重试
+        self.call_policy = call_policy or CallPolicy()
+        self.last_call = None
+        
+        # 模型路由：其他路由的代理在第一次用到时创建
+        self.router = router if prefix_cache else None
+        self._route_agents = {}
+        self.last_action_type = None
+        self.batcher = batcher
         
         # 初始化Agno模型和代理
-        self.model = DeepSeek(
-            id=self.model_id,
-            base_url=self.base_url,
+        self.model = self._create_model()
+        
+        # 创建代理实例
+        self.agent = self._create_agent(self.model)
+    
+    def _create_model(self, model_id=None, base_url=None):
+        """
+        创建模型对象，超时与调用策略一致
+        
+        Args:
+            model_id (str, optional): 模型ID，默认为代理的模型
+            base_url (str, optional): 模型服务地址，默认为代理的地址
+        """
+        # Agno及其模型依赖较重，在创建代理时才导入，只用解析器等离线工具时不需要加载
+        from agno.models.deepseek import DeepSeek
+        
+        return DeepSeek(
+            id=model_id or self.model_id,
+            base_url=base_url or self.base_url,
             temperature=0,
-            top_p=0.7
+            top_p=0.7,
+            timeout=self.call_policy.timeout,
+            max_retries=0,
+            http_client=self.batcher.client() if self.batcher else None,
         )
+    
+    def _create_agent(self, model):
+        """
+        创建Agno代理实例
+        """
+        from agno.agent import Agent
         
-        # 创建代理实例
-        self.agent = Agent(
-            model=self.model,
+        return Agent(
+            model=model,
             name="我的UI助手",
             description="基于UI-TARS的自动化UI操作助手",
             instructions=self._get_instructions(),
             debug_mode=True,
-            add_datetime_to_instructions=True,
-            add_history_to_messages=True,
-            num_history_responses=20,
+            # 时间写进系统提示会让前缀每轮都变化，前缀缓存模式下改为追加到本轮消息末尾
+            add_datetime_to_instructions=not self.prefix_cache,
+            add_history_to_messages=not self.prefix_cache,
+            num_history_responses=self.num_history_responses,
         )
     
+    def _clone_agent(self, agent, memory=None):
+        """
+        复制一个可以与原代理同时运行的代理，用于对冲请求和超时后的重试
+        
+        新代理使用独立的模型对象，但共享同一个OpenAI客户端（连接池）
+        
+        Args:
+            agent (Agent): 原代理
+            memory (AgentMemory, optional): 调用开始前的记忆快照；原代理可能正在（或被放弃后仍在）
+                运行并写入自己的memory，不能在这时复制它
+        """
+        model = self._create_model(agent.model.id, agent.model.base_url)
+        model.client = agent.model.get_client()
+        clone = self._create_agent(model)
+        clone.debug_mode = agent.debug_mode
+        clone.add_messages = agent.add_messages
+        if not self.prefix_cache:
+            # Agno历史模式下会话历史保存在代理的memory中
+            clone.memory = deepcopy(memory if memory is not None else agent.memory)
+            clone.session_id = agent.session_id
+        return clone
+    
+    def _run_agent(self, message, images=None, route=None):
+        """
+        按调用策略运行代理，对冲请求胜出时改用胜出的代理
+        
+        Args:
+            message (str|Message): 本轮消息
+            images (list, optional): 本轮截图（message为字符串时使用）
+            route (ModelRoute, optional): 模型路由，默认使用代理自身的模型
+        
+        Returns:
+            RunResponse: Agno运行结果
+        """
+        from agno.models.message import Message
+        
+        def run(agent):
+            # 对冲时两个请求同时进行，各自使用一份消息
+            if isinstance(message, Message):
+                return agent.run(message.model_copy())
+            return agent.run(message, images=images)
+        
+        agent = self._route_agent(route)
+        # 在调用开始前给记忆拍快照，副本都从快照复制；运行中的代理只往列表里追加，复制列表本身即可
+        memory = None
+        if not self.prefix_cache and agent.memory is not None:
+            memory = agent.memory.model_copy(update={"runs": list(agent.memory.runs),
+                                                     "messages": list(agent.memory.messages)})
+        response, winner, self.last_call = self.call_policy.call(
+            run, agent, lambda target: self._clone_agent(target, memory))
+        if agent is self.agent:
+            self.agent = winner
+        else:
+            self._route_agents[route.name] = winner
+        return response
+    
+    def _route_agent(self, route):
+        """
+        返回路由对应的代理，主路由使用代理自身的模型
+        """
+        if route is None or route is self.router.primary:
+            return self.agent
+        agent = self._route_agents.get(route.name)
+        if agent is None:
+            agent = self._create_agent(self._create_model(route.model_id, route.base_url))
+            agent.debug_mode = self.agent.debug_mode
+            self._route_agents[route.name] = agent
+        return agent
+    
+    def _select_route(self, images):
+        """
+        按本轮需要的能力选择路由
+        
+        Returns:
+            tuple: (ModelRoute, 轮次类别)，没有设置路由时为 (None, None)
+        """
+        if not self.router:
+            return None, None
+        history_has_images = any(user.images for user, _ in self.history)
+        turn_class = self.router.classify(images, self.last_action_type, history_has_images)
+        return self.router.select(turn_class), turn_class
+    
+    def _call_model(self, task, images):
+        """
+        选择路由并调用模型，记录路由的耗时和token用量
+        
+        Returns:
+            tuple: (RunResponse, 路由信息dict或None)
+        """
+        if not self.prefix_cache:
+            # 调用Agno代理运行任务
+            self.turns += 1
+            response = self._run_agent(task, images)
+            self._trim_agent_memory(self.agent)
+            return response, None
+        
+        route, turn_class = self._select_route(images)
+        start = time.perf_counter()
+        response = self._run_with_stable_prefix(task, images, route)
+        if route is None:
+            return response, None
+        
+        seconds = time.perf_counter() - start
+        input_tokens, output_tokens = response_tokens(response)
+        self.router.record(route, turn_class, seconds, input_tokens, output_tokens)
+        return response, {"name": route.name, "model_id": route.model_id, "class": turn_class,
+                          "seconds": seconds, "input_tokens": input_tokens, "output_tokens": output_tokens}
+    
     def _get_instructions(self):
         """
         获取代理指令
@@ -84,39 +282,388 @@ finished(content='xxx') # Use escape characters \\', \\", and \\n in content par
 ## User Instruction
         """
     
-    def process_task(self, task, screenshot_path=None):
+    def process_task(self, task, screenshot_path=None, cache_key=None, image_url=None):
         """
         处理UI任务
         
         Args:
             task (str): 用户任务描述
             screenshot_path (str, optional): 屏幕截图路径
+            cache_key (str, optional): 步骤描述，启用目标缓存时用于查找和保存本步的点击目标
+            image_url (str, optional): 本轮截图已编码好的data URL（如FrameEncoder的结果），
+                提供时不再读取和编码截图文件
             
         Returns:
             dict: 处理结果
         """
         # 准备图片参数（如果有）
         images = None
-        if screenshot_path:
-            # 创建本地图片对象
-            images = [Image(filepath=screenshot_path)]
+        if image_url and screenshot_path:
+            from agno.media import Image
+            images = [Image(url=image_url)]
+        elif screenshot_path:
+            # 读取图片内容，避免历史中的图片在之后被同名的新截图替换
+            images = [self._load_image(screenshot_path)]
+        
+        gray = None
+        if self.target_cache and cache_key and screenshot_path:
+            gray = to_gray(screenshot_path)
+        # 点击前的本地定位检查使用本轮截图
+        self.executor.set_frame(gray if gray is not None else screenshot_path)
+        
+        if gray is not None:
+            cached = self._run_cached_target(task, cache_key, gray, images)
+            if cached:
+                return cached
         
-        # 调用Agno代理运行任务
-        response = self.agent.run(task, images=images)
+        response, route = self._call_model(task, images)
         
-        # 解析模型输出
+        # 解析模型输出，无法解析时先本地修复，再针对同一张截图发送纠正请求
         parsed_result = self.parser.parse_output(response.content)
+        recovery = {"repairs": parsed_result["repairs"], "corrections": 0, "correction_seconds": 0.0}
+        if parsed_result["error"] and self.max_corrections > 0:
+            parsed_result, response = self._correct_output(parsed_result, images, recovery)
+        recovery["recovered"] = bool(recovery["repairs"] or recovery["corrections"]) and not parsed_result["error"]
         
-        # 执行动作
-        execution_result = self._execute_ui_action(parsed_result["action"])
+        if parsed_result["error"]:
+            # 仍然无法解析时不执行任何动作，返回invalid动作供调用方生成反馈
+            action = {"type": "invalid", "params": {}, "error": parsed_result["error"]}
+            execution_result = {"status": "error", "message": f"无法解析模型输出: {parsed_result['error']}"}
+        else:
+            action = parsed_result["action"]
+            # 执行动作
+            execution_result = self._execute_ui_action(action)
+            if gray is not None:
+                self._store_target(cache_key, gray, action, execution_result, parsed_result["thought"])
+        self.last_action_type = action["type"]
         
         return {
             "thought": parsed_result["thought"],
-            "action": parsed_result["action"],
+            "action": action,
+            "execution": execution_result,
+            "raw_response": response.content,
+            "recovery": recovery,
+            "budget": self.token_budget.last_report if self.token_budget and self.prefix_cache else None,
+            "call": self.last_call,
+            "target": None,
+            "route": route
+        }
+    
+    def _run_cached_target(self, task, cache_key, gray, images):
+        """
+        在截图中查找缓存的点击目标，置信度足够高时直接点击，不调用模型
+        
+        这一步以缓存的思考和动作写入历史（见_record_turn）
+        
+        Args:
+            task (str): 本轮任务或反馈
+            cache_key (str): 步骤描述
+            gray (numpy.ndarray): 本轮灰度截图
+            images (list|None): 本轮截图
+            
+        Returns:
+            dict|None: 与process_task相同格式的结果，未命中时返回None
+        """
+        start = time.perf_counter()
+        found = self.target_cache.lookup(cache_key, gray)
+        if not found:
+            return None
+        
+        height, width = gray.shape
+        point = f"({round(found['x'] * 1000 / width)},{round(found['y'] * 1000 / height)})"
+        action = {"type": found["action_type"], "params": {"start_box": point}}
+        content = f"Thought: {found['thought']}\nAction: {found['action_type']}(start_box='{point}')"
+        target = {"score": found["score"], "stage": found["stage"], "seconds": time.perf_counter() - start}
+        
+        self._record_turn(task, images, content)
+        execution_result = self._execute_ui_action(action)
+        self.last_action_type = action["type"]
+        if execution_result.get("status") != "success":
+            # 缓存的目标执行失败（例如被本地定位检查拦截），下次改由模型决定
+            self.target_cache.forget(cache_key)
+        
+        return {
+            "thought": found["thought"],
+            "action": action,
+            "execution": execution_result,
+            "raw_response": content,
+            "recovery": {"repairs": [], "corrections": 0, "correction_seconds": 0.0, "recovered": False},
+            "budget": None,
+            "call": None,
+            "target": target,
+            "route": None
+        }
+    
+    def replay_action(self, task, screenshot_path, action, raw_response, thought=""):
+        """
+        不调用模型，直接执行给定的动作（例如录制轨迹中的一步），并把这一轮写入历史
+        
+        Args:
+            task (str): 本轮任务或反馈
+            screenshot_path (str|None): 本轮截图路径
+            action (dict): 要执行的动作
+            raw_response (str): 这一步模型的原始输出，写入历史
+            thought (str): 这一步模型的思考
+            
+        Returns:
+            dict: 与process_task相同格式的结果，另有replayed=True
+        """
+        images = [self._load_image(screenshot_path)] if screenshot_path else None
+        self.executor.set_frame(screenshot_path)
+        self._record_turn(task, images, raw_response)
+        execution_result = self._execute_ui_action(action)
+        self.last_action_type = action["type"]
+        return {
+            "thought": thought,
+            "action": action,
             "execution": execution_result,
-            "raw_response": response.content
+            "raw_response": raw_response,
+            "recovery": {"repairs": [], "corrections": 0, "correction_seconds": 0.0, "recovered": False},
+            "budget": None,
+            "call": None,
+            "target": None,
+            "route": None,
+            "replayed": True
         }
     
+    def _record_turn(self, task, images, content):
+        """
+        把一轮没有经过模型的对话写入历史，之后的模型调用仍能看到完整的操作过程
+        
+        只有稳定前缀模式的历史由代理自己维护；Agno历史模式下这一轮不写入模型历史
+        """
+        if not self.prefix_cache:
+            return
+        from agno.models.message import Message
+        
+        user_message = Message(role="user", content=f"{task}{TIME_NOTE}{datetime.now()}.", images=images)
+        self.history.append((user_message, Message(role="assistant", content=content)))
+        self._trim_history()
+        self.turns += 1
+    
+    def _store_target(self, cache_key, gray, action, execution_result, thought):
+        """
+        模型给出的点击成功执行后，把点击位置周围的图块存入目标缓存
+        """
+        if action["type"] not in ("click", "left_double", "right_single"):
+            return
+        if execution_result.get("status") != "success" or "coords" not in execution_result:
+            return
+        coords = execution_result["coords"]
+        x, y = self.executor.to_frame_point(coords["x"], coords["y"], (gray.shape[1], gray.shape[0]))
+        self.target_cache.store(cache_key, gray, x, y, action["type"], thought)
+    
+    def _correct_output(self, parsed_result, images, recovery):
+        """
+        发送纯文本的纠正请求，让模型针对同一张截图重新输出
+        
+        稳定前缀模式下截图已经在历史里，纠正请求只追加一条文本消息，不重新截图也不重复上传图片；
+        Agno历史模式下随请求重发同一张截图
+        
+        Args:
+            parsed_result (dict): 无法解析的结果
+            images (list|None): 本轮截图
+            recovery (dict): 恢复统计，会被更新
+            
+        Returns:
+            tuple: (最后一次的解析结果, 最后一次的模型响应)
+        """
+        response = None
+        for _ in range(self.max_corrections):
+            correction = (
+                f"你的上一条输出无法执行：{parsed_result['error']}。"
+                "界面没有变化，请根据同一张截图重新给出下一步，严格按照以下格式输出，"
+                "Action必须是Action Space中的一个动作：\nThought: ...\nAction: ..."
+            )
+            start = time.perf_counter()
+            response, _ = self._call_model(correction, None if self.prefix_cache else images)
+            recovery["correction_seconds"] += time.perf_counter() - start
+            recovery["corrections"] += 1
+            
+            parsed_result = self.parser.parse_output(response.content)
+            recovery["repairs"] = parsed_result["repairs"]
+            if not parsed_result["error"]:
+                break
+        return parsed_result, response
+    
+    def _load_image(self, screenshot_path):
+        """
+        读取截图并转换为data URL形式的图片对象
+        
+        图片内容在读取时就固定下来，之后每轮重新发送的历史图片逐字节一致，
+        也不会因为截图文件被覆盖而变成最新的截图
+        
+        Args:
+            screenshot_path (str): 截图路径
+            
+        Returns:
+            Image: Agno图片对象
+        """
+        from agno.media import Image
+        
+        mime_type = mimetypes.guess_type(screenshot_path)[0] or "image/png"
+        with open(screenshot_path, "rb") as f:
+            encoded = base64.b64encode(f.read()).decode("ascii")
+        return Image(url=f"data:{mime_type};base64,{encoded}")
+    
+    def _history_messages(self):
+        """
+        返回要发送的历史消息
+        
+        历史超出上限时按块丢弃初始任务之后最早的若干轮，而不是每轮都滑动一格，
+        这样在两次丢弃之间历史前缀保持不变，服务端的前缀缓存可以持续命中
+        
+        Returns:
+            list: 历史消息列表
+        """
+        self._trim_history()
+        messages = []
+        for user_message, assistant_message in self.history:
+            messages.append(user_message)
+            # 预算压缩生成的摘要轮次没有助手回复
+            if assistant_message is not None:
+                messages.append(assistant_message)
+        return messages
+    
+    def _trim_history(self):
+        """
+        历史超出上限时丢弃最早的若干轮（按history_slide_step成块丢弃）
+        
+        第一轮（初始任务及截图）固定保留，只丢弃它之后的轮次，模型始终能看到原始指令；
+        预算压缩合并中间轮次时同样保留第一轮。每次写入历史后都会调用，
+        不经过模型的轮次（目标缓存命中、回放）也不会让历史无限增长
+        """
+        if len(self.history) > self.num_history_responses:
+            overflow = len(self.history) - max(self.num_history_responses, 1)
+            drop = -(-overflow // self.history_slide_step) * self.history_slide_step
+            del self.history[1:1 + min(drop, len(self.history) - 1)]
+            # 前缀已经改变，顺便折叠重复的反馈
+            self._collapse_repeated_feedback()
+    
+    def _collapse_repeated_feedback(self):
+        """
+        把历史中与之后某一轮完全相同的反馈换成简短的占位文字（截图和时间保留），
+        同样的反馈（例如连续几步相同的模板反馈）只保留最近的一次
+        
+        改写历史会让服务端的前缀缓存从改写处失效，稳定前缀模式下只在前缀本来就要改变时
+        （按块丢弃、预算压缩之后）调用；第一轮（初始任务）不参与比较
+        """
+        texts = [None] + [user.content.partition(TIME_NOTE)[0] if isinstance(user.content, str) else None
+                          for user, _ in self.history[1:]]
+        for index in repeated_feedback(texts):
+            user_message, assistant_message = self.history[index]
+            _, note, time_text = user_message.content.partition(TIME_NOTE)
+            self.history[index] = (user_message.model_copy(update={"content": f"{REPEATED}{note}{time_text}"}),
+                                   assistant_message)
+    
+    def retained_turns(self):
+        """
+        下一轮请求中一定还保留的最近轮数（不含固定保留的第一轮）
+        
+        稳定前缀模式按块丢弃，两次丢弃之间保留的轮数不少于num_history_responses - history_slide_step，
+        预算压缩只保证最近keep_recent轮保持原样；Agno历史模式保留最近num_history_responses轮
+        
+        Returns:
+            int: 轮数
+        """
+        if not self.prefix_cache:
+            return max(1, self.num_history_responses)
+        keep = max(1, self.num_history_responses - self.history_slide_step)
+        if self.token_budget:
+            keep = min(keep, max(1, self.token_budget.keep_recent))
+        return keep
+    
+    def _trim_agent_memory(self, agent):
+        """
+        Agno历史模式下只保留最近num_history_responses轮的运行记录
+        
+        Agno的memory记录每一轮的运行和消息（包括截图），发送历史时只用到最近的若干轮，
+        更早的记录只会让长时间运行的会话占用越来越多的内存
+        """
+        memory = agent.memory
+        keep = self.num_history_responses
+        if len(memory.runs) > keep:
+            del memory.runs[:len(memory.runs) - keep]
+        # 第一条是系统提示，其余每轮至少一条用户消息和一条助手消息
+        start = 1 if memory.messages and memory.messages[0].role == "system" else 0
+        if len(memory.messages) - start > keep * 2:
+            del memory.messages[start:len(memory.messages) - keep * 2]
+        
+        # Agno历史模式的系统提示每轮都带时间，没有可保持的前缀，每轮都折叠重复的反馈
+        users = [message for run in memory.runs if run.response and run.response.messages
+                 for message in run.response.messages
+                 if message.role == "user" and not getattr(message, "from_history", False)]
+        for index in repeated_feedback([message.content if isinstance(message.content, str) else None
+                                        for message in users]):
+            users[index].content = REPEATED
+    
+    def _run_with_stable_prefix(self, task, images, route=None):
+        """
+        以稳定前缀的消息顺序调用模型：系统提示 → 历史轮次 → 本轮消息（易变字段在末尾）
+        
+        Args:
+            task (str): 本轮任务或反馈
+            images (list|None): 本轮截图
+            route (ModelRoute, optional): 模型路由；不能看图的模型收到的历史和本轮消息都去掉截图
+            
+        Returns:
+            RunResponse: Agno运行结果
+        """
+        from agno.models.message import Message
+        
+        text_only = route is not None and not {"grounding", "vision"} & set(route.capabilities)
+        if text_only:
+            images = None
+        content = f"{task}{TIME_NOTE}{datetime.now()}."
+        user_message = Message(role="user", content=content, images=images)
+        
+        agent = self._route_agent(route)
+        agent.add_messages = self._history_messages()
+        if text_only:
+            agent.add_messages = [self._without_images(message) for message in agent.add_messages]
+        elif self.token_budget:
+            # 估算本次请求，接近预算时压缩历史
+            system_message = Message(role="system", content=self._get_instructions())
+            report = self.token_budget.check(self.history, [system_message, user_message], self.turns)
+            if "compaction" in report:
+                self._collapse_repeated_feedback()
+                agent.add_messages = self._history_messages()
+        
+        self.turns += 1
+        response = self._run_agent(user_message, route=route)
+        
+        # 历史由代理自己维护，清空Agno内部记录避免其随会话无限增长
+        self._route_agent(route).memory.clear()
+        
+        self.history.append((user_message, Message(role="assistant", content=response.content)))
+        # 写入后立即裁剪，调用方在下一轮之前看到的history就是下一轮实际发送的历史
+        self._trim_history()
+        return response
+    
+    def _without_images(self, message):
+        """
+        去掉消息中的截图（发给纯文本模型），用占位文字说明这里原本有一张截图
+        """
+        if not message.images:
+            return message
+        return message.model_copy(update={"images": None, "content": f"{message.content}\n[截图已省略]"})
+    
+    def close(self):
+        """
+        停止执行器的输入线程，关闭调用策略的线程池
+        """
+        self.executor.close()
+        self.call_policy.close()
+    
+    def reset_history(self):
+        """
+        清空对话历史，开始新的任务
+        """
+        self.history = []
+        self.agent.memory.clear()
+        # 上一个任务的finished不能让新任务的第一轮被当作完成确认
+        self.last_action_type = None
+    
     def _execute_ui_action(self, action_data):
         """
         执行UI动作
@@ -131,11 +678,22 @@ finished(content='xxx') # Use escape characters \\', \\", and \\n in content par
             return {"status": "error", "message": "没有可执行的动作"}
         
         # 调用执行器执行实际UI操作
-        return self.executor.execute(action_data)
+        try:
+            return self.executor.execute(action_data)
+        finally:
+            # 动作执行后不再需要本轮截图，释放执行器持有的截图和检测结果
+            self.executor.set_frame(None)
 
 
 # 测试代码
 if __name__ == "__main__":
+    import logging
+    from ui_tars_capture import create_capture_backend
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     print("初始化UI-TARS代理...")
     agent = UITarsAgent()
     
@@ -152,7 +710,7 @@ if __name__ == "__main__":
         try:
             screenshot_path = "current_screen.png"
             print(f"正在截取当前屏幕...")
-            pyautogui.screenshot(screenshot_path)
+            create_capture_backend().save(screenshot_path)
             print(f"屏幕截图已保存至: {screenshot_path}")
         except Exception as e:
             print(f"截图失败: {e}")
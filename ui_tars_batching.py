@@ -0,0 +1,219 @@
+import json
+import time
+import logging
+import threading
+
+
+class MicroBatcher:
+    """
+    跨会话的请求合并：同一进程中多个代理共用一个HTTP客户端，几毫秒内到达的chat completions请求
+    合并为一个批量请求发给支持批处理的自部署模型服务，再把各自的结果交还给对应的会话
+
+    批量接口：POST {base_url}batch/chat/completions，请求体 {"requests": [请求, ...]}，
+    响应体 {"responses": [{"status": 状态码, "body": 响应}, ...]}，顺序与请求一致。
+    只有发往同一服务地址、使用同一Authorization的请求才会合并在一起。
+    服务不支持该接口（404/405）时该服务改为逐个发送，只有一个请求时也直接发送。
+
+    MicroBatcher实现了httpx传输层的接口，通过client()取得共用的httpx.Client：
+
+        batcher = MicroBatcher(window_ms=5)
+        agent = UITarsAgent(base_url=..., batcher=batcher)
+    """
+
+    BATCH_PATH = "batch/chat/completions"
+
+    def __init__(self, window_ms=5, max_batch=8, transport=None):
+        """
+        初始化请求合并器
+
+        Args:
+            window_ms (float): 第一个请求到达后等待其他请求的时间（毫秒）
+            max_batch (int): 一个批量请求最多包含的请求数，达到后立即发送
+            transport (httpx.BaseTransport, optional): 实际发送请求的传输层，默认httpx.HTTPTransport
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch至少为1")
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.logger = logging.getLogger("MicroBatcher")
+        self._transport = transport
+        self._client = None
+        self._condition = threading.Condition()
+        self._pending = []
+        self._collecting = False
+        # None表示还不知道服务是否支持批量接口（最近一次批量请求的结果）
+        self.supported = None
+        # 不支持批量接口的服务（endpoint()的返回值）
+        self._unsupported = set()
+        self.stats = {"requests": 0, "batches": 0, "batched_requests": 0, "max_batch": 0, "direct": 0}
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            import httpx
+            self._transport = httpx.HTTPTransport()
+        return self._transport
+
+    def client(self):
+        """
+        返回经过合并器发送请求的httpx.Client（同一个合并器只创建一个）
+        """
+        with self._condition:
+            if self._client is None:
+                import httpx
+                self._client = httpx.Client(transport=self, timeout=None)
+            return self._client
+
+    def handle_request(self, request):
+        """
+        httpx传输层接口：chat completions请求进入合并窗口，其他请求直接发送
+        """
+        if request.method != "POST" or not request.url.path.endswith("/chat/completions") \
+                or self.max_batch == 1 or self.endpoint(request) in self._unsupported:
+            return self._send_direct(request)
+
+        request.read()
+        item = {"request": request, "payload": json.loads(request.content), "done": threading.Event(),
+                "response": None, "error": None, "direct": False}
+        with self._condition:
+            self.stats["requests"] += 1
+            self._pending.append(item)
+            leader = not self._collecting
+            if leader:
+                self._collecting = True
+            elif len(self._pending) >= self.max_batch:
+                self._condition.notify_all()
+
+        if leader:
+            self._lead()
+        item["done"].wait()
+        if item["error"] is not None:
+            raise item["error"]
+        if item["direct"]:
+            return self._send_direct(request)
+        return item["response"]
+
+    def _lead(self):
+        # 第一个到达的请求负责收集窗口内的请求并发送
+        deadline = time.perf_counter() + self.window_ms / 1000
+        with self._condition:
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            # 超出上限的请求留给下一批：立即开始下一轮收集，不等这一批返回
+            self._collecting = bool(self._pending)
+            if self._collecting:
+                threading.Thread(target=self._lead, name="MicroBatcher", daemon=True).start()
+
+        # 批量请求的地址和鉴权取自组内的请求，不同服务或不同API key的请求分开发送
+        groups = {}
+        for item in batch:
+            groups.setdefault(self.endpoint(item["request"]), []).append(item)
+        groups = list(groups.values())
+        for group in groups[1:]:
+            threading.Thread(target=self._send_group, args=(group,), name="MicroBatcher", daemon=True).start()
+        self._send_group(groups[0])
+
+    @staticmethod
+    def endpoint(request):
+        """
+        请求所属的服务：(scheme, host, port, 接口路径前缀, Authorization)
+        """
+        url = request.url
+        return (url.scheme, url.host, url.port, url.path[:-len("chat/completions")],
+                request.headers.get("authorization"))
+
+    def _send_group(self, group):
+        if len(group) == 1:
+            group[0]["direct"] = True
+            self._count_direct(1)
+            group[0]["done"].set()
+        else:
+            self._submit(group)
+
+    def _count_direct(self, count):
+        with self._condition:
+            self.stats["direct"] += count
+
+    def _submit(self, batch):
+        import httpx
+
+        first = batch[0]["request"]
+        url = first.url.copy_with(path=first.url.path[:-len("chat/completions")] + self.BATCH_PATH)
+        body = json.dumps({"requests": [item["payload"] for item in batch]}, ensure_ascii=False).encode("utf-8")
+        headers = {key: value for key, value in first.headers.items()
+                   if key.lower() in ("authorization", "user-agent", "accept")}
+        headers["content-type"] = "application/json"
+        extensions = dict(first.extensions)
+        # 批量请求的超时取各请求中最长的
+        timeouts = [item["request"].extensions.get("timeout") for item in batch]
+        if all(timeouts):
+            extensions["timeout"] = max(timeouts, key=lambda t: t.get("read") or 0)
+
+        try:
+            response = self.transport.handle_request(
+                httpx.Request("POST", url, headers=headers, content=body, extensions=extensions))
+            response.read()
+            if response.status_code in (404, 405):
+                self.supported = False
+                self._unsupported.add(self.endpoint(first))
+                self.logger.info(f"模型服务不支持批量接口({response.status_code})，改为逐个发送请求")
+                for item in batch:
+                    item["direct"] = True
+                self._count_direct(len(batch))
+                return
+            if response.status_code != 200:
+                # 整批失败时每个请求都收到同样的错误响应，由各自的调用策略决定是否重试
+                for item in batch:
+                    item["response"] = httpx.Response(response.status_code, headers=response.headers,
+                                                      content=response.content, request=item["request"])
+                return
+            self.supported = True
+            results = response.json()["responses"]
+            for item, result in zip(batch, results):
+                item["response"] = httpx.Response(result.get("status", 200), json=result.get("body"),
+                                                  request=item["request"])
+            for item in batch[len(results):]:
+                # 服务返回的结果少于请求数时，没有对应结果的请求按连接错误处理，由调用策略重试
+                item["error"] = httpx.RemoteProtocolError(
+                    f"批量响应只有{len(results)}个结果，少于请求数{len(batch)}", request=item["request"])
+            with self._condition:
+                self.stats["batches"] += 1
+                self.stats["batched_requests"] += len(batch)
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+        except Exception as e:
+            for item in batch:
+                item["error"] = e
+        finally:
+            for item in batch:
+                item["done"].set()
+
+    def _send_direct(self, request):
+        return self.transport.handle_request(request)
+
+    def report(self):
+        """
+        返回合并统计
+
+        Returns:
+            dict: requests（进入合并窗口的请求数）、batches（批量请求数）、batched_requests、
+                avg_batch（平均每批请求数）、max_batch、direct（逐个发送的请求数）、supported
+        """
+        with self._condition:
+            stats = dict(self.stats)
+        stats["avg_batch"] = stats["batched_requests"] / max(stats["batches"], 1)
+        stats["supported"] = self.supported
+        return stats
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,295 @@
+import re
+import base64
+import struct
+import logging
+from collections import deque
+
+
+_CJK_PATTERN = re.compile(r"[一-鿿　-〿＀-￯]")
+
+
+def image_size(data):
+    """
+    从PNG/JPEG字节中读取图片尺寸（只解析文件头）
+
+    Args:
+        data (bytes): 图片字节
+
+    Returns:
+        tuple|None: (width, height)
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return struct.unpack(">II", data[16:24])
+    if data[:2] == b"\xff\xd8":
+        index = 2
+        while index + 9 < len(data):
+            if data[index] != 0xFF:
+                index += 1
+                continue
+            marker = data[index + 1]
+            length = struct.unpack(">H", data[index + 2:index + 4])[0]
+            if marker in (0xC0, 0xC1, 0xC2):
+                height, width = struct.unpack(">HH", data[index + 5:index + 9])
+                return (width, height)
+            index += 2 + length
+    return None
+
+
+def image_tokens(width, height, patch=28, max_tokens=16384):
+    """
+    估算qwen-vl类模型一张图片占用的token数（每28x28像素一个token）
+    """
+    return min(max_tokens, max(1, round(width / patch) * round(height / patch)))
+
+
+def estimate_text_tokens(text):
+    """
+    估算文本的token数：中文字符约1个token，其余字符约4个一个token
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def data_url_image_size(url):
+    """
+    读取data URL图片的尺寸，只解码文件头部分
+
+    Returns:
+        tuple|None: (width, height)
+    """
+    if not url or not url.startswith("data:"):
+        return None
+    encoded = url.split(",", 1)[1]
+    # PNG尺寸在前24字节；JPEG的SOF段一般在前64KB内
+    head = encoded[:32] if url.startswith("data:image/png") else encoded[:87384]
+    try:
+        return image_size(base64.b64decode(head[:len(head) // 4 * 4]))
+    except Exception:
+        return None
+
+
+class TokenBudget:
+    """
+    请求token预算管理器，在每次调用模型前估算请求大小，接近预算时压缩历史
+
+    压缩按代价从低到高依次进行，直到回落到目标水位：
+    1. 丢弃较早轮次的截图，只保留最近keep_frames张
+    2. 把keep_recent轮之前的Thought压缩为一句话，Action保持原样
+    3. 把更早的轮次合并为一条动作摘要（首轮任务始终保留）
+
+    每次压缩都会改变历史前缀，因此触发后压到较低的目标水位，避免每轮都压缩。
+    """
+
+    def __init__(self, max_tokens=32000, trigger_ratio=0.9, target_ratio=0.6,
+                 keep_recent=4, keep_frames=2, thought_chars=40, max_events=100):
+        """
+        初始化token预算
+
+        Args:
+            max_tokens (int): 单次请求的token预算
+            trigger_ratio (float): 估算值超过预算的该比例时触发压缩
+            target_ratio (float): 压缩后的目标水位（预算比例）
+            keep_recent (int): 最近若干轮保持原样
+            keep_frames (int): 历史中最多保留的截图数
+            thought_chars (int): 压缩后Thought保留的字符数
+            max_events (int): 保留的最近压缩事件数（累计统计不受影响）
+        """
+        self.max_tokens = max_tokens
+        self.trigger_ratio = trigger_ratio
+        self.target_ratio = target_ratio
+        self.keep_recent = keep_recent
+        self.keep_frames = keep_frames
+        self.thought_chars = thought_chars
+
+        self.events = deque(maxlen=max_events)  # 最近的压缩事件记录
+        self.totals = {"compactions": 0, "frames_dropped": 0, "thoughts_summarized": 0, "turns_merged": 0}
+        self.last_report = None
+        self.logger = logging.getLogger("TokenBudget")
+
+    def estimate_message(self, message):
+        """
+        估算单条消息的token数和载荷字节数
+
+        Args:
+            message (Message|None): Agno消息
+
+        Returns:
+            tuple: (文本token, 图片token, 载荷字节)
+        """
+        if message is None:
+            return (0, 0, 0)
+
+        content = message.content if isinstance(message.content, str) else str(message.content or "")
+        text_tokens = estimate_text_tokens(content) + 4
+        image_token_count = 0
+        payload = len(content.encode("utf-8"))
+        for image in message.images or []:
+            url = image.url or ""
+            size = data_url_image_size(url)
+            image_token_count += image_tokens(*size) if size else 1024
+            payload += len(url)
+        return (text_tokens, image_token_count, payload)
+
+    def estimate(self, messages):
+        """
+        估算一组消息的总token数和载荷字节数
+
+        Returns:
+            dict: text_tokens, image_tokens, total_tokens, payload_bytes
+        """
+        text_total = image_total = payload_total = 0
+        for message in messages:
+            text_count, image_count, payload = self.estimate_message(message)
+            text_total += text_count
+            image_total += image_count
+            payload_total += payload
+        return {
+            "text_tokens": text_total,
+            "image_tokens": image_total,
+            "total_tokens": text_total + image_total,
+            "payload_bytes": payload_total,
+        }
+
+    def _turn_messages(self, history):
+        messages = []
+        for user_message, assistant_message in history:
+            messages.append(user_message)
+            messages.append(assistant_message)
+        return messages
+
+    def check(self, history, fixed_messages, turn_index=None):
+        """
+        估算本次请求，必要时就地压缩历史
+
+        Args:
+            history (list): 历史轮次 [(用户消息, 助手消息|None), ...]，会被就地修改
+            fixed_messages (list): 不参与压缩的消息（系统提示、本轮消息）
+            turn_index (int, optional): 当前轮次，用于记录事件
+
+        Returns:
+            dict: 本次请求的估算结果，发生压缩时包含compaction字段
+        """
+        before = self.estimate(fixed_messages + self._turn_messages(history))
+        report = dict(before)
+        report["budget"] = self.max_tokens
+
+        if before["total_tokens"] > self.max_tokens * self.trigger_ratio:
+            target = self.max_tokens * self.target_ratio
+            stats = self.compact(history, fixed_messages, target)
+            after = self.estimate(fixed_messages + self._turn_messages(history))
+            event = {
+                "turn": turn_index,
+                "before_tokens": before["total_tokens"],
+                "after_tokens": after["total_tokens"],
+                "before_payload_bytes": before["payload_bytes"],
+                "after_payload_bytes": after["payload_bytes"],
+                **stats,
+            }
+            self.events.append(event)
+            self.totals["compactions"] += 1
+            for key in ("frames_dropped", "thoughts_summarized", "turns_merged"):
+                self.totals[key] += stats[key]
+            self.logger.info(
+                f"历史压缩: {event['before_tokens']} -> {event['after_tokens']} tokens, "
+                f"载荷 {event['before_payload_bytes'] / 1024:.0f}KB -> {event['after_payload_bytes'] / 1024:.0f}KB, "
+                f"丢弃截图 {stats['frames_dropped']} 张, 压缩Thought {stats['thoughts_summarized']} 条, "
+                f"合并轮次 {stats['turns_merged']} 轮"
+            )
+            report.update(after)
+            report["compaction"] = event
+
+        self.last_report = report
+        return report
+
+    def compact(self, history, fixed_messages, target):
+        """
+        压缩历史直到估算值不超过target
+
+        Returns:
+            dict: 各阶段的压缩数量
+        """
+        from agno.models.message import Message
+
+        stats = {"frames_dropped": 0, "thoughts_summarized": 0, "turns_merged": 0}
+
+        def total():
+            return self.estimate(fixed_messages + self._turn_messages(history))["total_tokens"]
+
+        # 1. 丢弃较早的截图
+        kept = 0
+        for index in range(len(history) - 1, -1, -1):
+            user_message, assistant_message = history[index]
+            if not user_message.images:
+                continue
+            if kept < self.keep_frames:
+                kept += 1
+                continue
+            history[index] = (
+                Message(role=user_message.role, content=f"{user_message.content}\n[截图已省略]"),
+                assistant_message,
+            )
+            stats["frames_dropped"] += 1
+        if total() <= target:
+            return stats
+
+        # 2. 压缩较早轮次的Thought，Action保持原样
+        for index in range(max(0, len(history) - self.keep_recent)):
+            user_message, assistant_message = history[index]
+            if assistant_message is None:
+                continue
+            summarized = self.summarize_response(assistant_message.content)
+            if summarized != assistant_message.content:
+                history[index] = (user_message, Message(role="assistant", content=summarized))
+                stats["thoughts_summarized"] += 1
+        if total() <= target:
+            return stats
+
+        # 3. 把首轮之后、最近keep_recent轮之前的轮次合并为一条动作摘要
+        start, end = 1, max(1, len(history) - self.keep_recent)
+        if end - start > 0:
+            lines = []
+            for user_message, assistant_message in history[start:end]:
+                if assistant_message is None:
+                    # 之前合并出的摘要，展开其中的动作
+                    lines.extend(line for line in user_message.content.splitlines()[1:] if line.strip())
+                    continue
+                action = self._action_line(assistant_message.content)
+                if action:
+                    lines.append(action)
+            summary = "此前已执行的动作（按顺序）:\n" + "\n".join(f"- {line.lstrip('- ')}" for line in lines)
+            stats["turns_merged"] = end - start
+            history[start:end] = [(Message(role="user", content=summary), None)]
+        return stats
+
+    def summarize_response(self, content):
+        """
+        把模型输出中的Thought压缩为第一句话，Action保持原样
+        """
+        if not content or "Thought:" not in content:
+            return content
+        thought = content.split("Thought:", 1)[1].split("\nAction:", 1)[0].strip()
+        first = re.split(r"(?<=[。！？.!?])", thought, maxsplit=1)[0]
+        if len(first) > self.thought_chars:
+            first = first[:self.thought_chars] + "…"
+        action = self._action_line(content)
+        return f"Thought: {first}" + (f"\nAction: {action}" if action else "")
+
+    def _action_line(self, content):
+        if not content or "Action:" not in content:
+            return ""
+        return content.split("Action:", 1)[1].strip()
+
+    def report(self):
+        """
+        汇总所有压缩事件
+
+        Returns:
+            dict: 压缩次数、累计丢弃的截图数、最近一次请求的估算值以及最近的压缩事件
+        """
+        return {
+            **self.totals,
+            "last_request": self.last_report,
+            "events": list(self.events),
+        }
@@ -0,0 +1,418 @@
+import os
+import sys
+import ctypes
+import ctypes.util
+import logging
+import threading
+
+
+class Frame:
+    """
+    一帧屏幕截图，持有像素缓冲区的零拷贝视图
+
+    注意：XShm后端的缓冲区会在下一次截图时被覆盖，需要长期保存时请调用copy()
+    """
+
+    def __init__(self, buffer, width, height, stride, mode, owner=None):
+        """
+        初始化截图帧
+
+        Args:
+            buffer (memoryview): 像素缓冲区
+            width (int): 宽度（像素）
+            height (int): 高度（像素）
+            stride (int): 每行字节数
+            mode (str): 像素格式，"BGRX"（每像素4字节）或 "RGB"（每像素3字节）
+            owner (object, optional): 缓冲区的持有者，保证缓冲区在帧存活期间有效
+        """
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+        self.stride = stride
+        self.mode = mode
+        self.owner = owner
+
+    @property
+    def channels(self):
+        return 4 if self.mode == "BGRX" else 3
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+    @property
+    def array(self):
+        """
+        以NumPy数组形式访问像素（不复制），形状为 (height, width, channels)
+        """
+        import numpy as np
+
+        data = np.frombuffer(self.buffer, dtype=np.uint8, count=self.stride * self.height)
+        data = data.reshape(self.height, self.stride // self.channels, self.channels)
+        return data[:, :self.width]
+
+    def copy(self):
+        """
+        复制一份独立于采集缓冲区的帧
+        """
+        return Frame(memoryview(bytes(self.buffer[:self.stride * self.height])),
+                     self.width, self.height, self.stride, self.mode)
+
+    def to_image(self):
+        """
+        转换为PIL图片对象（RGB）
+        """
+        from PIL import Image
+
+        return Image.frombuffer("RGB", self.size, self.buffer, "raw", self.mode, self.stride, 1)
+
+    def save(self, path):
+        """
+        将帧保存为图片文件，PNG使用最快的压缩级别
+
+        Args:
+            path (str): 保存路径
+        """
+        image = self.to_image()
+        if path.lower().endswith(".png"):
+            image.save(path, compress_level=1)
+        else:
+            image.save(path)
+        return path
+
+
+class CaptureBackend:
+    """
+    截图后端基类
+    """
+
+    name = "base"
+
+    def grab(self, region=None):
+        """
+        截取屏幕或指定区域
+
+        Args:
+            region (tuple, optional): (left, top, width, height)，None表示整个屏幕
+
+        Returns:
+            Frame: 截图帧
+        """
+        raise NotImplementedError
+
+    def save(self, path, region=None):
+        """
+        截图并保存到文件
+
+        Args:
+            path (str): 保存路径
+            region (tuple, optional): 截图区域
+
+        Returns:
+            str: 保存路径
+        """
+        return self.grab(region).save(path)
+
+    def close(self):
+        """
+        释放后端占用的资源
+        """
+        pass
+
+
+class PyAutoGUICapture(CaptureBackend):
+    """
+    基于pyautogui.screenshot的截图后端，跨平台，作为默认的兜底实现
+    """
+
+    name = "pyautogui"
+
+    def grab(self, region=None):
+        import pyautogui
+
+        image = pyautogui.screenshot(region=region)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        width, height = image.size
+        return Frame(memoryview(image.tobytes()), width, height, width * 3, "RGB")
+
+
+# X11常量
+_ZPIXMAP = 2
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+_ALL_PLANES = ctypes.c_ulong(-1).value
+
+
+class _XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong),
+        ("green_mask", ctypes.c_ulong),
+        ("blue_mask", ctypes.c_ulong),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+_X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+# XSetErrorHandler对整个进程生效：只安装一次，回调对象保存在模块里不会被回收，
+# 发生错误的连接记在_x_error_displays中，由各实例按自己的display检查
+_x_error_lock = threading.Lock()
+_x_error_handler = None
+_x_error_displays = set()
+
+
+def _on_x_error(display, event):
+    _x_error_displays.add(display)
+    return 0
+
+
+def _install_x_error_handler(x11):
+    global _x_error_handler
+    with _x_error_lock:
+        if _x_error_handler is None:
+            _x_error_handler = _X_ERROR_HANDLER(_on_x_error)
+            x11.XSetErrorHandler(_x_error_handler)
+
+
+class XShmCapture(CaptureBackend):
+    """
+    基于X11共享内存扩展（MIT-SHM）的截图后端
+
+    X服务器直接把像素写入与本进程共享的内存段，不经过子进程和临时文件；
+    共享内存段按整屏大小一次性分配并在每次截图时复用，返回的帧是该内存段的零拷贝视图。
+    """
+
+    name = "xshm"
+
+    def __init__(self, display=None):
+        """
+        初始化XShm截图后端
+
+        Args:
+            display (str, optional): X显示名，默认使用DISPLAY环境变量
+        """
+        if not sys.platform.startswith("linux"):
+            raise RuntimeError("XShm截图后端仅支持Linux/X11")
+
+        self.logger = logging.getLogger("XShmCapture")
+        # 先把句柄置空：初始化中途失败时close和__del__只释放已经创建的资源
+        self._display = None
+        self._shminfo = None
+        self._attached = False
+        self._images = {}
+        self._x11 = self._load_library("X11")
+        self._xext = self._load_library("Xext")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._declare_functions()
+
+        # X错误默认会直接终止进程，这里改为记录错误
+        _install_x_error_handler(self._x11)
+
+        name = (display or os.environ.get("DISPLAY", "")).encode() or None
+        self._display = self._x11.XOpenDisplay(name)
+        if not self._display:
+            raise RuntimeError(f"无法连接X显示: {display or os.environ.get('DISPLAY')}")
+
+        try:
+            self._attach()
+        except Exception:
+            self.close()
+            raise
+
+    def _attach(self):
+        # 查询屏幕参数，分配共享内存段并附加到X服务器
+        if not self._xext.XShmQueryExtension(self._display):
+            raise RuntimeError("X服务器不支持MIT-SHM扩展")
+
+        screen = self._x11.XDefaultScreen(self._display)
+        self._root = self._x11.XRootWindow(self._display, screen)
+        self._visual = self._x11.XDefaultVisual(self._display, screen)
+        self._depth = self._x11.XDefaultDepth(self._display, screen)
+        self.screen_width = self._x11.XDisplayWidth(self._display, screen)
+        self.screen_height = self._x11.XDisplayHeight(self._display, screen)
+
+        # 按整屏大小分配共享内存段，所有尺寸的截图都复用这一块内存
+        self._shminfo = _XShmSegmentInfo()
+        full = self._create_image(self.screen_width, self.screen_height)
+        if full.contents.bits_per_pixel != 32:
+            raise RuntimeError(f"不支持的像素格式: {full.contents.bits_per_pixel}bpp")
+
+        self._buffer_size = full.contents.bytes_per_line * self.screen_height
+        shmid = self._libc.shmget(_IPC_PRIVATE, self._buffer_size, _IPC_CREAT | 0o600)
+        if shmid < 0:
+            raise OSError(ctypes.get_errno(), "shmget失败")
+        shmaddr = self._libc.shmat(shmid, None, 0)
+        if shmaddr in (None, ctypes.c_void_p(-1).value):
+            self._libc.shmctl(shmid, _IPC_RMID, None)
+            raise OSError(ctypes.get_errno(), "shmat失败")
+
+        self._shminfo.shmid = shmid
+        self._shminfo.shmaddr = shmaddr
+        self._shminfo.readOnly = 0
+        full.contents.data = shmaddr
+
+        attached = self._xext.XShmAttach(self._display, ctypes.byref(self._shminfo))
+        self._x11.XSync(self._display, 0)
+        # 标记删除：所有进程分离后由内核回收，进程异常退出也不会泄漏
+        self._libc.shmctl(shmid, _IPC_RMID, None)
+        if not attached or self._display in _x_error_displays:
+            raise RuntimeError("XShmAttach失败，可能是远程X连接")
+        self._attached = True
+
+        self._memory = (ctypes.c_ubyte * self._buffer_size).from_address(shmaddr)
+
+    def _load_library(self, name):
+        path = ctypes.util.find_library(name)
+        if not path:
+            raise RuntimeError(f"找不到lib{name}")
+        return ctypes.CDLL(path)
+
+    def _declare_functions(self):
+        x11, xext, libc = self._x11, self._xext, self._libc
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XSetErrorHandler.argtypes = [_X_ERROR_HANDLER]
+        x11.XSetErrorHandler.restype = ctypes.c_void_p
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+            ctypes.c_char_p, ctypes.POINTER(_XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint,
+        ]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage), ctypes.c_int, ctypes.c_int, ctypes.c_ulong,
+        ]
+
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def _create_image(self, width, height):
+        """
+        创建（或复用）指定尺寸的XImage，像素数据指向同一块共享内存
+        """
+        image = self._images.get((width, height))
+        if image is None:
+            image = self._xext.XShmCreateImage(
+                self._display, self._visual, self._depth, _ZPIXMAP, None,
+                ctypes.byref(self._shminfo), width, height
+            )
+            if not image:
+                raise RuntimeError(f"XShmCreateImage失败: {width}x{height}")
+            if self._shminfo.shmaddr:
+                image.contents.data = self._shminfo.shmaddr
+            self._images[(width, height)] = image
+        return image
+
+    def grab(self, region=None):
+        if region is None:
+            left, top, width, height = 0, 0, self.screen_width, self.screen_height
+        else:
+            left, top, width, height = (int(v) for v in region)
+            # 超出屏幕的区域会触发X错误，先裁剪到屏幕范围内
+            left = min(max(left, 0), self.screen_width - 1)
+            top = min(max(top, 0), self.screen_height - 1)
+            width = max(1, min(width, self.screen_width - left))
+            height = max(1, min(height, self.screen_height - top))
+
+        image = self._create_image(width, height)
+        _x_error_displays.discard(self._display)
+        ok = self._xext.XShmGetImage(self._display, self._root, image, left, top, _ALL_PLANES)
+        if not ok or self._display in _x_error_displays:
+            raise RuntimeError(f"XShmGetImage失败，区域: {(left, top, width, height)}")
+
+        stride = image.contents.bytes_per_line
+        buffer = memoryview(self._memory).cast("B")[:stride * height]
+        return Frame(buffer, width, height, stride, "BGRX", owner=self)
+
+    def close(self):
+        # 初始化失败时也会调用，只释放已经创建的资源
+        if not getattr(self, "_display", None):
+            return
+        if self._attached:
+            self._xext.XShmDetach(self._display, ctypes.byref(self._shminfo))
+            self._attached = False
+        for image in self._images.values():
+            image.contents.data = None
+            self._x11.XFree(image)
+        self._images = {}
+        if self._shminfo is not None and self._shminfo.shmaddr:
+            self._libc.shmdt(ctypes.c_void_p(self._shminfo.shmaddr))
+            self._shminfo = None
+        self._x11.XCloseDisplay(self._display)
+        # 关闭后同一地址可能被新的连接复用
+        _x_error_displays.discard(self._display)
+        self._display = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+CAPTURE_BACKENDS = {
+    "pyautogui": PyAutoGUICapture,
+    "xshm": XShmCapture,
+}
+
+
+def create_capture_backend(name="auto"):
+    """
+    创建截图后端
+
+    Args:
+        name (str): 后端名称，"auto" 表示在Linux/X11下优先使用XShm，不可用时回退到pyautogui
+
+    Returns:
+        CaptureBackend: 截图后端实例
+    """
+    if name != "auto":
+        if name not in CAPTURE_BACKENDS:
+            raise ValueError(f"未知的截图后端: {name}，可选: {', '.join(CAPTURE_BACKENDS)}")
+        return CAPTURE_BACKENDS[name]()
+
+    if sys.platform.startswith("linux") and os.environ.get("DISPLAY"):
+        try:
+            return XShmCapture()
+        except Exception as e:
+            logging.getLogger("UITarsCapture").info(f"XShm截图后端不可用，回退到pyautogui: {e}")
+    return PyAutoGUICapture()
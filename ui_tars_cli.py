@@ -0,0 +1,327 @@
+"""
+UI-TARS命令行入口
+
+    ui-tars run      运行多轮会话（自动或交互式）
+    ui-tars replay   回放录制的轨迹，界面不一致的步骤才调用模型
+    ui-tars serve    启动任务队列服务（jobs）、多机调度服务（fleet）或Playground服务（playground）
+    ui-tars worker   启动多机任务分发的worker，向调度服务注册显示器槽位并执行分配的任务
+    ui-tars bench    运行bench包中的基准测试，其余参数原样传给基准测试
+    ui-tars parse    解析模型输出（文件或标准输入），打印解析出的动作
+
+速度和稳定性相关的参数（历史轮数、截图、等待时间、滚动格数、最大步骤数、模型调用策略）
+可以写在配置文件中（--config 或环境变量UI_TARS_CONFIG），命令行参数优先。
+每个子命令只在运行时导入自己需要的模块，启动时不加载模型框架和图形界面依赖。
+"""
+
+import os
+import sys
+import argparse
+
+from ui_tars_config import DEFAULTS, load_config, executor_options, loop_options
+
+
+def _add_config_arguments(parser):
+    # 这些参数默认为None，未指定时使用配置文件或默认值
+    group = parser.add_argument_group('速度和稳定性（默认值见ui_tars_config.DEFAULTS）')
+    group.add_argument('--history', dest='num_history_responses', type=int, default=None,
+                       help='发送给模型的最多历史轮数')
+    group.add_argument('--capture', choices=['auto', 'xshm', 'pyautogui'], default=None,
+                       help='截图后端')
+    group.add_argument('--background-fps', type=float, default=None,
+                       help='后台截图帧率，大于0时启用后台截图线程')
+    group.add_argument('--ring-slots', type=int, default=None, help='后台截图环形缓冲区槽位数')
+    group.add_argument('--encode-processes', type=int, default=None,
+                       help='截图编码进程池的工作进程数，0表示在会话线程中编码')
+    group.add_argument('--observation', choices=['screenshot', 'tree', 'tree+image'], default=None,
+                       help='每步的观察方式：screenshot为截图，tree为无障碍控件树（AT-SPI，不可用时退回截图），'
+                            'tree+image为控件树加缩小的截图')
+    group.add_argument('--max-steps', type=int, default=None, help='初始任务之后最多执行的步骤数')
+    group.add_argument('--max-seconds', type=float, default=None, help='单个任务的最长耗时（秒）')
+    group.add_argument('--repeat-limit', type=int, default=None, help='连续相同动作达到该次数视为循环，0表示不检查')
+    group.add_argument('--stall-steps', type=int, default=None, help='连续该步数界面没有变化视为停滞，0表示不检查')
+    group.add_argument('--oscillation-cycles', type=int, default=None,
+                       help='在两个界面之间来回切换达到该次数视为振荡，0表示不检查')
+    group.add_argument('--loop-corrections', type=int, default=None,
+                       help='发现循环时发送纠正提示的最多次数，用完后提前结束')
+    group.add_argument('--settle-seconds', type=float, default=None,
+                       help='每步之间等待界面稳定的最长时间（秒）')
+    group.add_argument('--feedback', dest='feedback_style', choices=['template', 'compact'], default=None,
+                       help='自动反馈格式：template为中文模板，compact为一行结构化结果（状态、位置、界面变化、稳定用时）')
+    group.add_argument('--scroll-clicks', type=int, default=None, help='scroll动作每次滚动的格数')
+    group.add_argument('--drag-duration', type=float, default=None, help='drag动作的移动时间（秒）')
+    group.add_argument('--type-delay', type=float, default=None, help='type动作开始输入前的等待（秒）')
+    group.add_argument('--wait-seconds', type=float, default=None, help='wait动作的等待时间（秒）')
+    group.add_argument('--verify-effects', action='store_true', default=None,
+                       help='动作执行后检查目标附近是否有可见变化，没有变化时先在本地重试，仍没有变化时告诉模型')
+    group.add_argument('--model-timeout', type=float, default=None, help='单次模型调用的超时时间（秒）')
+    group.add_argument('--max-retries', type=int, default=None, help='模型调用的最多重试次数')
+    group.add_argument('--hedge', action='store_true', default=None, help='启用对冲请求')
+    group.add_argument('--token-budget', type=int, default=None, help='单次请求的token预算')
+    group.add_argument('--route', action='store_true', default=None,
+                       help='启用模型路由：不需要看截图的轮次发给更便宜、更快的纯文本模型')
+    group.add_argument('--text-model', default=None, help='模型路由中纯文本轮次使用的模型接入点')
+
+
+def _add_session_arguments(parser):
+    parser.add_argument('--verbose', type=int, choices=[0, 1, 2], default=1,
+                        help='日志详细程度：0=静默，1=普通，2=详细')
+    parser.add_argument('--no-screenshot', dest='use_screenshot', action='store_false',
+                        help='缸中脑模式：不截图')
+    parser.add_argument('--window-title', default=None, help='目标窗口标题：只截取并操作该窗口')
+    parser.add_argument('--window-pid', type=int, default=None, help='目标窗口所属进程PID')
+    parser.add_argument('--grounding', action='store_true', help='点击前用本地元素检测器检查位置')
+    parser.add_argument('--target-cache', default=None, help='点击目标缓存目录')
+    parser.add_argument('--record', default=None, help='录制操作轨迹并在会话结束后保存到该JSON文件')
+    _add_config_arguments(parser)
+
+
+def _config_overrides(args):
+    return {key: getattr(args, key) for key in DEFAULTS if hasattr(args, key)}
+
+
+def _session_kwargs(args, config):
+    """
+    把命令行参数和配置转换为run_session的参数
+    """
+    return {
+        "use_screenshot": args.use_screenshot,
+        "verbose": args.verbose,
+        "window_title": args.window_title,
+        "window_pid": args.window_pid,
+        "capture": config["capture"],
+        "background_fps": config["background_fps"],
+        "ring_slots": config["ring_slots"],
+        "encode_processes": config["encode_processes"],
+        "observation": config["observation"],
+        "verify_effects": config["verify_effects"],
+        "token_budget": config["token_budget"],
+        "model_timeout": config["model_timeout"],
+        "max_retries": config["max_retries"],
+        "hedge": config["hedge"],
+        "grounding": args.grounding,
+        "target_cache": args.target_cache,
+        "record": args.record,
+        "max_steps": config["max_steps"],
+        "max_seconds": config["max_seconds"],
+        "loop_options": loop_options(config),
+        "settle_seconds": config["settle_seconds"],
+        "feedback_style": config["feedback_style"],
+        "num_history_responses": config["num_history_responses"],
+        "executor_options": executor_options(config),
+        "route": config["route"],
+        "text_model": config["text_model"],
+    }
+
+
+def cmd_run(args, config):
+    from ui_tars_session import run_session
+
+    run_session(mode=args.mode, task=args.task, **_session_kwargs(args, config))
+    return 0
+
+
+def cmd_replay(args, config):
+    from ui_tars_session import run_session
+
+    run_session(replay=args.trajectory, replay_tolerance=args.tolerance, **_session_kwargs(args, config))
+    return 0
+
+
+def cmd_serve(args, config):
+    import uvicorn
+
+    if args.app == "jobs":
+        from functools import partial
+        from ui_tars_jobs import JobManager, create_app, run_ui_task
+
+        batcher = None
+        if args.batch_window_ms is not None:
+            from ui_tars_batching import MicroBatcher
+            batcher = MicroBatcher(window_ms=args.batch_window_ms, max_batch=args.max_batch)
+        # 所有任务共用一个截图编码进程池
+        encoder = None
+        if config["encode_processes"]:
+            from ui_tars_encoding import FrameEncoder
+            encoder = FrameEncoder(processes=config["encode_processes"])
+        manager = JobManager(runner=partial(run_ui_task, defaults=config, batcher=batcher, encoder=encoder),
+                             concurrency=args.concurrency, max_queue=args.max_queue)
+        uvicorn.run(create_app(manager), host=args.host, port=args.port or 8000)
+        return 0
+
+    if args.app == "fleet":
+        from ui_tars_fleet import Dispatcher, create_fleet_app
+
+        dispatcher = Dispatcher(lease_seconds=args.lease_seconds, max_attempts=args.max_attempts,
+                                affinity_wait=args.affinity_wait)
+        uvicorn.run(create_fleet_app(dispatcher), host=args.host, port=args.port or 8100)
+        return 0
+
+    # Playground服务的worker进程重新导入ui_tars_playground模块，通过环境变量传递配置
+    if args.pool_size is not None:
+        os.environ["UI_TARS_POOL_SIZE"] = str(args.pool_size)
+    if args.db_url:
+        os.environ["UI_TARS_DB_URL"] = args.db_url
+    if args.base_url:
+        os.environ["UI_TARS_BASE_URL"] = args.base_url
+    if args.reload:
+        uvicorn.run("ui_tars_playground:app", host=args.host, port=args.port or 7777, reload=True)
+    else:
+        uvicorn.run("ui_tars_playground:app", host=args.host, port=args.port or 7777, workers=args.workers,
+                    log_level="warning")
+    return 0
+
+
+def cmd_worker(args, config):
+    from ui_tars_fleet import build_worker, serve_worker
+
+    # 配置作为分配到本机的任务的默认选项
+    serve_worker(build_worker(args, config))
+    return 0
+
+
+def _bench_names():
+    import pkgutil
+    import bench
+
+    return sorted(name for _, name, _ in pkgutil.iter_modules(bench.__path__) if name != "stub_server")
+
+
+def cmd_bench(args, config):
+    import runpy
+
+    # 基准测试不随包安装，只能在源码目录中运行
+    try:
+        names = _bench_names()
+    except ImportError:
+        print("找不到基准测试（bench目录），请在源码目录中运行 ui-tars bench")
+        return 2
+    if not args.name or args.name not in names:
+        if args.name:
+            print(f"未知的基准测试: {args.name}")
+        print(f"可用的基准测试: {', '.join(names)}")
+        return 0 if not args.name else 2
+
+    # 基准测试自己解析参数
+    sys.argv = [f"bench.{args.name}"] + args.bench_args
+    try:
+        runpy.run_module(f"bench.{args.name}", run_name="__main__", alter_sys=True)
+    except SystemExit as e:
+        return e.code or 0
+    return 0
+
+
+def cmd_parse(args, config):
+    import json
+    from ui_tars_parser import UITarsParser
+
+    if args.file in (None, "-"):
+        text = sys.stdin.read()
+    else:
+        with open(args.file, "r", encoding="utf-8") as f:
+            text = f.read()
+
+    result = UITarsParser().parse_output(text)
+    if args.screen and result["action"] and not result["error"]:
+        # 按给定的屏幕尺寸换算坐标，不需要图形界面
+        from ui_tars_executor import UITarsExecutor
+
+        width, height = (int(v) for v in args.screen.lower().split("x"))
+        executor = UITarsExecutor(screen_width=width, screen_height=height)
+        for name in ("start_box", "end_box"):
+            value = result["action"]["params"].get(name)
+            if value:
+                point = executor._convert_to_absolute_coordinates(executor._parse_coordinates(value))
+                result.setdefault("absolute", {})[name] = list(point) if point else None
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if result["error"] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ui-tars', description='UI-TARS自动化操作命令行工具')
+    parser.add_argument('--config', default=None, help='配置文件（TOML或JSON），默认读取环境变量UI_TARS_CONFIG')
+    parser.add_argument('--log-level', default='INFO', help='日志级别')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='运行多轮会话')
+    run.add_argument('--mode', choices=['auto', 'interactive'], default='auto',
+                     help='运行模式：auto自动反馈，interactive交互式')
+    run.add_argument('--task', default=None, help='自动模式的整体任务')
+    _add_session_arguments(run)
+    run.set_defaults(func=cmd_run)
+
+    replay = sub.add_parser('replay', help='回放录制的轨迹')
+    replay.add_argument('trajectory', help='录制的轨迹JSON文件')
+    replay.add_argument('--tolerance', type=float, default=0.01, help='允许的截图变化比例')
+    _add_session_arguments(replay)
+    replay.set_defaults(func=cmd_replay)
+
+    serve = sub.add_parser('serve', help='启动服务')
+    serve.add_argument('app', choices=['jobs', 'fleet', 'playground'], nargs='?', default='jobs',
+                       help='jobs为任务队列服务，fleet为多机任务分发的调度服务，playground为Agno Playground服务')
+    serve.add_argument('--host', default='127.0.0.1', help='监听地址')
+    serve.add_argument('--port', type=int, default=None,
+                       help='监听端口，默认jobs为8000，fleet为8100，playground为7777')
+    serve.add_argument('--concurrency', type=int, default=1, help='jobs：同时运行的任务数')
+    serve.add_argument('--max-queue', type=int, default=100, help='jobs：排队任务数上限')
+    serve.add_argument('--batch-window-ms', type=float, default=None,
+                       help='jobs：合并同时运行的任务的模型请求，等待其他请求的时间（毫秒），需要模型服务支持批量接口')
+    serve.add_argument('--max-batch', type=int, default=8, help='jobs：一个批量请求最多包含的请求数')
+    serve.add_argument('--lease-seconds', type=float, default=15.0, help='fleet：worker超过该时间没有消息视为失联（秒）')
+    serve.add_argument('--max-attempts', type=int, default=3, help='fleet：一个任务最多分配的次数')
+    serve.add_argument('--affinity-wait', type=float, default=5.0,
+                       help='fleet：有其他空闲的热槽位时任务为等待它最多保留的时间（秒）')
+    serve.add_argument('--workers', type=int, default=int(os.getenv("UI_TARS_WORKERS", "1")),
+                       help='playground：uvicorn worker进程数')
+    serve.add_argument('--pool-size', type=int, default=None, help='playground：每个worker的Agent池大小')
+    serve.add_argument('--db-url', default=None, help='playground：会话存储数据库URL')
+    serve.add_argument('--base-url', default=None, help='playground：模型服务地址')
+    serve.add_argument('--reload', action='store_true', help='playground：代码修改后自动重启（只能单worker）')
+    _add_config_arguments(serve)
+    serve.set_defaults(func=cmd_serve)
+
+    worker = sub.add_parser('worker', help='启动多机任务分发的worker')
+    worker.add_argument('--dispatcher', default='http://127.0.0.1:8100', help='调度服务地址')
+    worker.add_argument('--slots', nargs='+', default=[os.environ.get("DISPLAY", ":0")],
+                        help='槽位（X显示器），每个槽位同时运行一个任务')
+    worker.add_argument('--runner', default=None, help='执行任务的函数（模块:函数），默认在子进程中运行run_ui_task')
+    worker.add_argument('--heartbeat', type=float, default=3.0, help='心跳间隔（秒）')
+    worker.add_argument('--warm', nargs='*', default=None, help='注册时报告的热键（如已缓存点击目标的应用）')
+    worker.add_argument('--name', default=None, help='worker名称')
+    _add_config_arguments(worker)
+    worker.set_defaults(func=cmd_worker)
+
+    bench = sub.add_parser('bench', help='运行基准测试', add_help=False)
+    bench.add_argument('name', nargs='?', default=None, help='基准测试名，省略时列出全部')
+    bench.add_argument('bench_args', nargs=argparse.REMAINDER, help='传给基准测试的参数')
+    bench.set_defaults(func=cmd_bench)
+
+    parse = sub.add_parser('parse', help='解析模型输出')
+    parse.add_argument('file', nargs='?', default=None, help='模型输出文件，省略或为-时读取标准输入')
+    parse.add_argument('--screen', default=None, help='屏幕尺寸，如1920x1080，设置后同时输出换算后的屏幕坐标')
+    parse.set_defaults(func=cmd_parse)
+    return parser
+
+
+def main(argv=None):
+    """
+    命令行入口（ui-tars）
+
+    Returns:
+        int: 退出码
+    """
+    import logging
+
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        config = load_config(args.config, _config_overrides(args))
+    except (OSError, ValueError) as e:
+        print(f"配置加载失败: {e}")
+        return 2
+    return args.func(args, config)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import os
+import json
+
+# 影响速度和稳定性的参数及默认值；命令行参数 > 配置文件 > 默认值
+DEFAULTS = {
+    # 对话历史
+    "num_history_responses": 20,
+    # 截图
+    "capture": "auto",
+    "background_fps": 0,
+    "ring_slots": 8,
+    "encode_processes": 0,
+    # 观察方式："screenshot"、"tree"（无障碍控件树）或 "tree+image"（控件树加缩小的截图）
+    "observation": "screenshot",
+    # 会话节奏和预算
+    "max_steps": 10,
+    "max_seconds": None,
+    "settle_seconds": 10,
+    # 自动反馈格式："template"（中文模板）或 "compact"（一行结构化结果）
+    "feedback_style": "template",
+    # 循环检测（0表示不检查该项）
+    "repeat_limit": 3,
+    "stall_steps": 3,
+    "oscillation_cycles": 2,
+    "loop_corrections": 1,
+    # 执行器
+    "scroll_clicks": 10,
+    "drag_duration": 0.5,
+    "type_delay": 0.5,
+    "wait_seconds": 5,
+    # 动作执行后检查界面是否有可见变化，没有变化时先在本地重试
+    "verify_effects": False,
+    # 模型调用
+    "model_timeout": 60,
+    "max_retries": 2,
+    "hedge": False,
+    "token_budget": None,
+    # 模型路由：不需要看截图的轮次发给纯文本模型
+    "route": False,
+    "text_model": None,
+}
+
+EXECUTOR_KEYS = ("scroll_clicks", "drag_duration", "type_delay", "wait_seconds")
+
+# 配置键 -> ProgressMonitor的参数名
+LOOP_KEYS = {
+    "repeat_limit": "repeat_limit",
+    "stall_steps": "stall_steps",
+    "oscillation_cycles": "oscillation_cycles",
+    "loop_corrections": "max_corrections",
+}
+
+
+def load_config(path=None, overrides=None):
+    """
+    加载配置：默认值，依次被配置文件和overrides覆盖
+
+    配置文件为TOML或JSON（按扩展名区分），键与DEFAULTS相同；TOML中也可以写在[ui_tars]表下。
+    没有指定path时使用环境变量UI_TARS_CONFIG
+
+    Args:
+        path (str, optional): 配置文件路径
+        overrides (dict, optional): 优先级最高的值（如命令行参数），值为None的键忽略
+
+    Returns:
+        dict: 完整的配置
+    """
+    config = dict(DEFAULTS)
+    path = path or os.environ.get("UI_TARS_CONFIG")
+    if path:
+        config.update(_read_file(path))
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def _read_file(path):
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        import tomllib
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+        data = data.get("ui_tars", data)
+
+    unknown = sorted(set(data) - set(DEFAULTS))
+    if unknown:
+        raise ValueError(f"配置文件 {path} 中有未知的键: {', '.join(unknown)}")
+    return data
+
+
+def executor_options(config):
+    """
+    从配置中取出UITarsExecutor的节奏参数（没有设置的键不返回，使用执行器的默认值）
+
+    Returns:
+        dict: scroll_clicks、drag_duration、type_delay、wait_seconds中已设置的项
+    """
+    return {key: config[key] for key in EXECUTOR_KEYS if config.get(key) is not None}
+
+
+def loop_options(config):
+    """
+    从配置中取出ProgressMonitor的循环检测参数（没有设置的键不返回，使用默认值）
+
+    Returns:
+        dict: repeat_limit、stall_steps、oscillation_cycles、max_corrections中已设置的项
+    """
+    return {name: config[key] for key, name in LOOP_KEYS.items() if config.get(key) is not None}
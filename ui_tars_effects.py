@@ -0,0 +1,252 @@
+import time
+import logging
+
+from ui_tars_frames import frame_difference
+from ui_tars_input import click_events, chord_events
+
+# 需要检查效果的动作及其检查范围：点击类只看目标周围，其他动作看整个映射区域；
+# wait和finished不产生需要检查的输入，不检查也不等待
+CLICK_ACTIONS = {"click": ("left", 1), "left_double": ("left", 2), "right_single": ("right", 1)}
+CHECKED_ACTIONS = set(CLICK_ACTIONS) | {"hotkey", "type", "scroll", "drag"}
+
+# 允许偏移重点的点击；双击再来一次可能把同一个文件打开两遍，只等待
+RECLICK_ACTIONS = {"click", "right_single"}
+
+# 按两次与按一次效果相同的热键，只有这些热键会再按一次（例如ctrl+b按两次会把加粗又取消）
+SAFE_HOTKEYS = {"ctrl s", "ctrl a", "home", "end", "ctrl home", "ctrl end"}
+
+
+class EffectVerifier:
+    """
+    动作效果检查：比较动作前后目标附近的截图，没有可见变化时先在本地重试
+
+    执行器在产生输入之前截取目标附近（点击类动作为目标周围margin像素，其他动作为整个映射区域），
+    动作完成后每隔poll秒重新截取并与之前比较（降采样逐像素比较，向量化实现），
+    settle秒内出现变化即视为生效。没有变化时依次重试：
+
+    - 等待更长时间（界面响应慢）
+    - 单击和右键：在目标附近偏移jitter像素再点一次，优先朝与目标点颜色差别最大的方向
+      （点击落在控件边缘之外的空隙时，控件通常在颜色不同的那一侧）
+    - safe_hotkeys中的热键：再按一次
+    - 双击、其他热键、输入、滚动和拖拽只等待，不重复（重复会把开关切换回去、输入两遍文字或滚动两次）
+
+    重新产生输入之前，界面已经在settle的5倍时间内都没有变化，每次重新输入之后同样等待更长时间，
+    响应慢的复选框、开关不会因为第一次点击还没显示出来就被再点一次而切换回去。
+
+    点击类动作生效之后紧接着的输入是在刚点中的输入框里打字，不检查也不等待。
+    重试后仍没有变化时，执行结果标记no_effect，由反馈告诉模型界面没有可见变化。
+    """
+
+    def __init__(self, capture="auto", threshold=0.0005, margin=60, settle=0.3, poll=0.05, max_retries=3, jitter=5,
+                 safe_hotkeys=SAFE_HOTKEYS):
+        """
+        初始化效果检查
+
+        Args:
+            capture (str|CaptureBackend): 截图后端或其名称；默认创建独立的后端，不与后台截图线程共用
+            threshold (float): 变化像素比例阈值，超过视为有变化；整个映射区域中一个小图标的变化也要能检测到
+            margin (int): 点击类动作检查目标周围的范围（像素）
+            settle (float): 每次检查等待变化的最长时间（秒），等待更长时间的重试为它的4倍
+            poll (float): 检查的间隔（秒）
+            max_retries (int): 没有变化时的最多重试次数
+            jitter (int): 点击偏移重试的距离（像素）
+            safe_hotkeys (set): 没有变化时可以再按一次的热键（按两次与按一次效果相同）
+        """
+        self._capture = capture
+        self.own_capture = isinstance(capture, str)
+        self.threshold = threshold
+        self.margin = margin
+        self.settle = settle
+        self.poll = poll
+        self.max_retries = max_retries
+        self.jitter = jitter
+        self.safe_hotkeys = {" ".join(key.lower().split()) for key in safe_hotkeys}
+        self.focused = False  # 上一个检查的动作是生效的点击，输入框已获得焦点
+        self.logger = logging.getLogger("EffectVerifier")
+        self.stats = {"checked": 0, "changed": 0, "resolved": 0, "no_effect": 0, "retries": 0, "seconds": 0.0}
+
+    @property
+    def capture(self):
+        if isinstance(self._capture, str):
+            from ui_tars_capture import create_capture_backend
+            self._capture = create_capture_backend(self._capture)
+        return self._capture
+
+    def region(self, executor, action_type, result):
+        """
+        检查范围 (left, top, width, height)
+
+        Args:
+            executor (UITarsExecutor): 执行器（提供当前的映射区域）
+            action_type (str): 动作类型
+            result (dict): 动作成功时的执行结果（点击类动作含coords）
+
+        Returns:
+            tuple: 检查范围
+        """
+        left, top, width, height = executor.region
+        if action_type not in CLICK_ACTIONS or "coords" not in result:
+            return (left, top, width, height)
+        x, y = result["coords"]["x"], result["coords"]["y"]
+        x1, y1 = max(left, x - self.margin), max(top, y - self.margin)
+        x2, y2 = min(left + width, x + self.margin + 1), min(top + height, y + self.margin + 1)
+        return (x1, y1, x2 - x1, y2 - y1)
+
+    def before(self, executor, action_type, result):
+        """
+        在产生输入之前截取检查范围
+
+        Returns:
+            dict|None: 检查需要的状态，该动作不需要检查或截图失败时返回None
+        """
+        if action_type not in CHECKED_ACTIONS:
+            return None
+        if action_type == "type" and self.focused:
+            # 在刚点中的输入框里打字，输入不会重复，不需要等待检查
+            return None
+        region = self.region(executor, action_type, result)
+        try:
+            frame = self.capture.grab(region).copy()
+        except Exception as e:
+            self.logger.warning(f"效果检查截图失败: {e}")
+            return None
+        return {"type": action_type, "region": region, "frame": frame}
+
+    def _difference(self, a, b):
+        # 点击目标周围的范围较小，降采样步长随之减小
+        step = max(1, min(8, min(a.size) // 32))
+        return frame_difference(a, b, step)
+
+    def _wait_change(self, frame, region, timeout):
+        """
+        在timeout秒内等待检查范围出现变化
+
+        Returns:
+            float|None: 变化像素比例，没有变化时返回None
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            ratio = self._difference(frame, self.capture.grab(region))
+            if ratio > self.threshold:
+                return ratio
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.poll, remaining))
+
+    def _jitter_offsets(self, frame, region, coords):
+        """
+        点击偏移重试的方向，按该方向上的像素与目标点的颜色差别从大到小排列
+        """
+        import numpy as np
+
+        j = self.jitter
+        offsets = [(j, 0), (-j, 0), (0, j), (0, -j)]
+        left, top, width, height = region
+        pixels = frame.array
+        scale_x, scale_y = frame.width / width, frame.height / height
+
+        def pixel(x, y):
+            fx = min(frame.width - 1, max(0, int((x - left) * scale_x)))
+            fy = min(frame.height - 1, max(0, int((y - top) * scale_y)))
+            return pixels[fy, fx, :3].astype(np.int16)
+
+        x, y = coords
+        center = pixel(x, y)
+        return sorted(offsets, key=lambda o: -int(np.abs(pixel(x + o[0], y + o[1]) - center).sum()))
+
+    def _retries(self, executor, state, result, params):
+        """
+        依次产生重试：(说明, 事件序列或None, 等待时间, 重试的位置或None)
+
+        重新产生的输入之后都等待settle的4倍，再次重试之前确认它确实没有生效
+        """
+        wait = self.settle * 4
+        yield "等待更长时间", None, wait, None
+        action_type = state["type"]
+        if action_type in RECLICK_ACTIONS and "coords" in result:
+            button, clicks = CLICK_ACTIONS[action_type]
+            x, y = result["coords"]["x"], result["coords"]["y"]
+            for dx, dy in self._jitter_offsets(state["frame"], state["region"], (x, y)):
+                point = executor._clamp_to_region(x + dx, y + dy)
+                yield f"偏移到 {point} 重试", click_events(*point, button=button, clicks=clicks), wait, point
+        elif action_type == "hotkey" and " ".join(params.get("key", "").lower().split()) in self.safe_hotkeys:
+            while True:
+                yield "再按一次", chord_events(params["key"].split()), wait, None
+
+    def verify(self, executor, state, result, params=None):
+        """
+        检查动作是否产生了可见变化，没有变化时在本地重试
+
+        Args:
+            executor (UITarsExecutor): 执行器（重试的输入交给它的输入线程）
+            state (dict): before的返回值
+            result (dict): 动作的执行结果
+            params (dict, optional): 动作参数
+
+        Returns:
+            dict: 执行结果，另有effect（changed、ratio、retries、seconds）；
+                重试后生效时coords为最终生效的位置，仍没有变化时no_effect为True
+        """
+        if not state or result.get("status") != "success":
+            return result
+        self.focused = False
+        start = time.perf_counter()
+        frame, region = state["frame"], state["region"]
+        self.stats["checked"] += 1
+        retries = 0
+        try:
+            ratio = self._wait_change(frame, region, self.settle)
+            if ratio is None:
+                for note, events, wait, point in self._retries(executor, state, result, params or {}):
+                    if retries >= self.max_retries:
+                        break
+                    retries += 1
+                    self.logger.info(f"{state['type']}后界面没有变化，{note}")
+                    if events:
+                        outcome = executor.input_engine.submit(events).result()
+                        self.logger.debug(f"重试输入完成: {outcome}")
+                    ratio = self._wait_change(frame, region, wait)
+                    if ratio is not None:
+                        if point:
+                            result = dict(result, coords={"x": point[0], "y": point[1]},
+                                          message=f"{result['message']}（原位置没有变化，偏移到 {point} 后生效）")
+                        break
+        except Exception as e:
+            # 检查本身失败时不影响动作的结果
+            self.logger.warning(f"效果检查失败: {e}")
+            return result
+        seconds = time.perf_counter() - start
+        self.stats["retries"] += retries
+        self.stats["seconds"] += seconds
+        effect = {"changed": ratio is not None, "ratio": ratio or 0.0, "retries": retries, "seconds": seconds}
+        if ratio is None:
+            self.stats["no_effect"] += 1
+            self.logger.warning(f"{state['type']}后界面没有可见变化（重试{retries}次）")
+            return dict(result, effect=effect, no_effect=True,
+                        message=f"{result['message']}，但界面没有可见变化")
+        self.stats["changed"] += 1
+        self.focused = state["type"] in CLICK_ACTIONS
+        if retries:
+            self.stats["resolved"] += 1
+        return dict(result, effect=effect)
+
+    def report(self):
+        """
+        返回效果检查的统计
+
+        Returns:
+            dict: checked、changed、resolved（本地重试后生效，即省下的模型调用数）、no_effect、retries、
+                avg_ms（每次检查的平均耗时）
+        """
+        stats = dict(self.stats)
+        stats["avg_ms"] = stats.pop("seconds") * 1000 / max(stats["checked"], 1)
+        return stats
+
+    def close(self):
+        """
+        释放由效果检查自己创建的截图后端
+        """
+        if self.own_capture and not isinstance(self._capture, str):
+            self._capture.close()
+            self._capture = "auto"
@@ -0,0 +1,227 @@
+import os
+import time
+import base64
+import logging
+import threading
+
+
+MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg"}
+
+
+def encode_image(image, format="png", quality=85, compress_level=1):
+    """
+    把PIL图片编码为PNG或JPEG
+
+    Args:
+        image (PIL.Image.Image): 图片
+        format (str): "png" 或 "jpeg"
+        quality (int): JPEG质量
+        compress_level (int): PNG压缩级别（1最快）
+
+    Returns:
+        bytes: 编码后的图片
+    """
+    import io
+
+    buffer = io.BytesIO()
+    if format == "jpeg":
+        image.save(buffer, format="JPEG", quality=quality)
+    else:
+        image.save(buffer, format="PNG", compress_level=compress_level)
+    return buffer.getvalue()
+
+
+def encode_frame(frame, format="png", quality=85, compress_level=1, path=None):
+    """
+    在当前线程中编码一帧截图（不使用进程池时的做法）
+
+    Args:
+        frame (Frame): 截图帧
+        format (str): "png" 或 "jpeg"
+        quality (int): JPEG质量
+        compress_level (int): PNG压缩级别
+        path (str, optional): 同时把编码结果写入该文件
+
+    Returns:
+        dict: data_url（可直接放入请求的data URL）、bytes（编码后大小）、seconds（编码耗时）和path
+    """
+    start = time.perf_counter()
+    data = encode_image(frame.to_image(), format, quality, compress_level)
+    return _finish(data, format, path, start)
+
+
+def _finish(data, format, path, start):
+    if path:
+        with open(path, "wb") as f:
+            f.write(data)
+    url = f"data:{MIME_TYPES[format]};base64,{base64.b64encode(data).decode('ascii')}"
+    return {"data_url": url, "bytes": len(data), "seconds": time.perf_counter() - start, "path": path}
+
+
+# 工作进程中已附加的共享内存，按名称缓存（主进程会重复使用同一块共享内存）
+_attached = {}
+
+
+def _attach(name):
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+
+    shm = _attached.get(name)
+    if shm is None:
+        # Python 3.12附加已有的共享内存时也会登记到resource_tracker，导致其被提前释放；
+        # 共享内存由主进程创建和释放，工作进程附加时不登记
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            shm = SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+        _attached[name] = shm
+    return shm
+
+
+def _encode_shared(name, width, height, stride, mode, format, quality, compress_level, path):
+    # 在工作进程中运行：直接从共享内存读取像素并编码，像素不经过pickle
+    from PIL import Image
+
+    start = time.perf_counter()
+    shm = _attach(name)
+    image = Image.frombuffer("RGB", (width, height), shm.buf, "raw", mode, stride, 1)
+    data = encode_image(image, format, quality, compress_level)
+    del image
+    return _finish(data, format, path, start)
+
+
+class FrameEncoder:
+    """
+    截图编码进程池：PNG/JPEG编码和base64转换在工作进程中进行，不占用会话线程的GIL
+
+    截图像素写入主进程创建的共享内存（multiprocessing.shared_memory），工作进程按名称附加后直接读取，
+    像素不经过pickle在进程间复制；返回的是可以直接放入请求的data URL。
+    共享内存块在编码完成后放回空闲列表，相同尺寸的截图重复使用。
+
+        encoder = FrameEncoder(processes=4)
+        result = encoder.encode(frame, path="current_screen.png")
+        agent.process_task(task, result["path"], image_url=result["data_url"])
+    """
+
+    def __init__(self, processes=None, format="png", quality=85, compress_level=1):
+        """
+        初始化编码进程池
+
+        Args:
+            processes (int, optional): 工作进程数，默认为CPU核数（最多8个）
+            format (str): "png" 或 "jpeg"
+            quality (int): JPEG质量
+            compress_level (int): PNG压缩级别（1最快）
+        """
+        if format not in MIME_TYPES:
+            raise ValueError(f"不支持的编码格式: {format}")
+        self.processes = processes or min(os.cpu_count() or 1, 8)
+        self.format = format
+        self.quality = quality
+        self.compress_level = compress_level
+        self.logger = logging.getLogger("FrameEncoder")
+        self._pool = None
+        self._lock = threading.Lock()
+        self._free = {}   # 大小 -> 空闲的共享内存列表
+        self._blocks = []
+        self.stats = {"frames": 0, "bytes": 0, "encode_seconds": 0.0, "wait_seconds": 0.0, "shared_blocks": 0}
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # 会话和后台截图都在线程中运行，fork多线程进程可能死锁，工作进程用spawn启动
+                self._pool = ProcessPoolExecutor(max_workers=self.processes,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _acquire_block(self, size):
+        from multiprocessing.shared_memory import SharedMemory
+
+        with self._lock:
+            free = self._free.setdefault(size, [])
+            if free:
+                return free.pop()
+        shm = SharedMemory(create=True, size=size)
+        with self._lock:
+            self._blocks.append(shm)
+            self.stats["shared_blocks"] += 1
+        return shm
+
+    def _release_block(self, shm, size):
+        with self._lock:
+            self._free.setdefault(size, []).append(shm)
+
+    def submit(self, frame, path=None):
+        """
+        提交一帧截图编码
+
+        帧的像素在提交时复制到共享内存，返回后截图缓冲区可以立即被覆盖
+
+        Args:
+            frame (Frame): 截图帧
+            path (str, optional): 同时把编码结果写入该文件（在工作进程中写入）
+
+        Returns:
+            Future: 结果同encode_frame
+        """
+        size = frame.stride * frame.height
+        shm = self._acquire_block(size)
+        shm.buf[:size] = memoryview(frame.buffer).cast("B")[:size]
+        future = self._executor().submit(_encode_shared, shm.name, frame.width, frame.height, frame.stride,
+                                         frame.mode, self.format, self.quality, self.compress_level, path)
+        future.add_done_callback(lambda done: self._release_block(shm, size))
+        return future
+
+    def encode(self, frame, path=None):
+        """
+        编码一帧截图并等待结果（等待期间不持有GIL，其他会话的线程可以继续运行）
+
+        Returns:
+            dict: data_url、bytes、seconds（工作进程中的编码耗时）和path
+        """
+        start = time.perf_counter()
+        result = self.submit(frame, path).result()
+        with self._lock:
+            self.stats["frames"] += 1
+            self.stats["bytes"] += result["bytes"]
+            self.stats["encode_seconds"] += result["seconds"]
+            self.stats["wait_seconds"] += time.perf_counter() - start
+        return result
+
+    def report(self):
+        """
+        返回编码统计
+
+        Returns:
+            dict: frames、bytes、encode_seconds、wait_seconds、shared_blocks、avg_encode_ms、avg_wait_ms
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        frames = max(stats["frames"], 1)
+        stats["avg_encode_ms"] = stats["encode_seconds"] * 1000 / frames
+        stats["avg_wait_ms"] = stats["wait_seconds"] * 1000 / frames
+        return stats
+
+    def close(self):
+        """
+        关闭工作进程并释放共享内存
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+            blocks, self._blocks = self._blocks, []
+            self._free = {}
+        if pool:
+            pool.shutdown(wait=True)
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
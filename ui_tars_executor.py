@@ -1,42 +1,146 @@
-import pyautogui
 import time
 import re
 import logging
-import pyperclip  # 添加剪贴板支持
+from concurrent.futures import Future
+
+from ui_tars_input import InputEngine, InputEvent, click_events, drag_events, chord_events
+
+
+def _pyautogui():
+    """
+    按需导入pyautogui：它在导入时就要连接图形界面，只解析或回放轨迹时不应加载
+    """
+    import pyautogui
+    pyautogui.FAILSAFE = True  # 移动鼠标到屏幕角落将中止程序
+    return pyautogui
+
 
 class UITarsExecutor:
     """
     UI-TARS执行器类，实际执行UI-TARS模型输出的操作
     """
     
-    def __init__(self, screen_width=None, screen_height=None):
+    def __init__(self, screen_width=None, screen_height=None, window=None, grounding=None,
+                 scroll_clicks=10, drag_duration=0.5, type_delay=0.5, wait_seconds=5, input_engine=None,
+                 verifier=None):
         """
         初始化UI操作执行器
         
         Args:
             screen_width (int, optional): 屏幕宽度，默认自动获取
             screen_height (int, optional): 屏幕高度，默认自动获取
+            window (WindowTarget, optional): 目标窗口，设置后坐标映射到该窗口的矩形内
+            grounding (ElementDetector, optional): 本地元素检测器，设置后点击前检查位置，
+                吸附到附近的控件并拦截落在空白背景上的点击
+            scroll_clicks (int): scroll动作每次滚动的格数
+            drag_duration (float): drag动作从起点移动到终点的时间（秒）
+            type_delay (float): type动作开始输入前的等待（秒），确保输入框已准备好
+            wait_seconds (float): wait动作的等待时间（秒）
+            input_engine (InputEngine, optional): 输入事件引擎，默认在第一次执行动作时创建
+            verifier (EffectVerifier, optional): 动作效果检查，设置后execute比较动作前后目标附近的截图，
+                没有可见变化时在本地重试，仍没有变化时结果标记no_effect
         """
-        # 设置pyautogui的安全设置
-        pyautogui.FAILSAFE = True  # 移动鼠标到屏幕角落将中止程序
+        # 屏幕尺寸和默认的映射区域在第一次用到时才通过pyautogui获取
+        self._screen_size = (screen_width, screen_height) if screen_width and screen_height else None
         
-        # 获取屏幕尺寸
-        if screen_width and screen_height:
-            self.screen_width = screen_width
-            self.screen_height = screen_height
-        else:
-            self.screen_width, self.screen_height = pyautogui.size()
+        # 坐标映射区域 (left, top, width, height)，None表示整个屏幕
+        self._region = None
+        self.window = window
+        
+        # 本地定位检查：动作前的截图及其检测结果（按需计算，每帧一次）
+        self.grounding = grounding
+        self.frame = None
+        self._detection = None
+        
+        # 动作的节奏参数
+        self.scroll_clicks = scroll_clicks
+        self.drag_duration = drag_duration
+        self.type_delay = type_delay
+        self.wait_seconds = wait_seconds
+        
+        # 动作编译为底层事件序列，由输入线程按计划时间执行
+        self._input_engine = input_engine
+        self.verifier = verifier
         
-        # 初始化日志
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        # 日志格式由入口脚本配置
         self.logger = logging.getLogger("UITarsExecutor")
     
+    @property
+    def screen_size(self):
+        """
+        屏幕尺寸 (宽, 高)，未指定时第一次访问才通过pyautogui获取
+        """
+        if self._screen_size is None:
+            self._screen_size = tuple(_pyautogui().size())
+        return self._screen_size
+    
+    @property
+    def screen_width(self):
+        return self.screen_size[0]
+    
+    @property
+    def screen_height(self):
+        return self.screen_size[1]
+    
+    @property
+    def input_engine(self):
+        """
+        输入事件引擎，未指定时第一次访问才创建（输入线程在第一次提交时启动）
+        """
+        if self._input_engine is None:
+            self._input_engine = InputEngine()
+        return self._input_engine
+    
+    @property
+    def region(self):
+        """
+        坐标映射区域 (left, top, width, height)，默认为整个屏幕
+        """
+        if self._region is None:
+            return (0, 0, self.screen_width, self.screen_height)
+        return self._region
+    
+    def set_region(self, region):
+        """
+        设置坐标映射区域，模型输出的0-1000坐标将映射到该区域内
+        
+        Args:
+            region (tuple|None): (left, top, width, height)，None表示整个屏幕
+        """
+        self._region = tuple(region) if region is not None else None
+    
+    def set_frame(self, frame):
+        """
+        设置本次动作前的截图，截图应覆盖当前的坐标映射区域
+        
+        Args:
+            frame: 截图路径、Frame、PIL图片或NumPy数组，None表示没有截图（不做定位检查）
+        """
+        self.frame = frame
+        self._detection = None
+    
+    def sync_window(self):
+        """
+        重新定位目标窗口并更新坐标映射区域，使映射跟随窗口移动
+        
+        Returns:
+            tuple|None: 当前的窗口区域，未设置窗口或找不到窗口时返回None
+        """
+        if not self.window:
+            return None
+        
+        rect = self.window.locate()
+        if rect is None:
+            self.logger.warning(f"找不到目标窗口 {self.window.describe()}")
+            return None
+        
+        if rect != self.region:
+            self.set_region(rect)
+        return rect
+    
     def execute(self, action_data):
         """
-        执行UI操作
+        执行UI操作，等待输入完成后返回；设置了效果检查时检查动作是否产生了可见变化
         
         Args:
             action_data (dict): 操作数据，包含type和params
@@ -44,39 +148,125 @@ class UITarsExecutor:
         Returns:
             dict: 执行结果
         """
+        result, state = self._submit(action_data)
+        result = result.result()
+        if state:
+            result = self.verifier.verify(self, state, result, action_data.get("params"))
+        return result
+    
+    def submit(self, action_data):
+        """
+        提交UI操作：在调用线程中解析坐标、做定位检查并编译为事件序列，交给输入线程执行
+        
+        输入进行期间调用方可以继续截图、编码或请求模型，需要结果时再等待返回的Future（不做效果检查）
+        
+        Args:
+            action_data (dict): 操作数据，包含type和params
+            
+        Returns:
+            Future: 结果为执行结果dict；动作被取消或FAILSAFE触发时结果为错误dict，不抛出异常
+        """
+        return self._submit(action_data)[0]
+    
+    def _submit(self, action_data):
+        """
+        提交UI操作，产生输入之前按需截取效果检查的参考画面
+        
+        Returns:
+            tuple: (结果的Future, 效果检查的状态或None)
+        """
+        result = Future()
         if not action_data:
-            return {"status": "error", "message": "没有可执行的动作"}
+            result.set_result({"status": "error", "message": "没有可执行的动作"})
+            return result, None
         
         action_type = action_data["type"]
-        params = action_data["params"]
+        params = action_data.get("params") or {}
         
         self.logger.info(f"执行动作: {action_type}, 参数: {params}")
         
+        # 窗口模式下，执行前确认窗口仍然存在并跟随其当前位置
+        if self.window and self.sync_window() is None:
+            result.set_result({"status": "error", "message": f"找不到目标窗口 {self.window.describe()}"})
+            return result, None
+        
         try:
-            # 根据动作类型分发到相应的处理方法
+            # 根据动作类型分发到相应的编译方法
             if action_type == "click":
-                return self._execute_click(params)
+                compiled = self._compile_click(params)
             elif action_type == "left_double":
-                return self._execute_double_click(params)
+                compiled = self._compile_double_click(params)
             elif action_type == "right_single":
-                return self._execute_right_click(params)
+                compiled = self._compile_right_click(params)
             elif action_type == "drag":
-                return self._execute_drag(params)
+                compiled = self._compile_drag(params)
             elif action_type == "hotkey":
-                return self._execute_hotkey(params)
+                compiled = self._compile_hotkey(params)
             elif action_type == "type":
-                return self._execute_type(params)
+                compiled = self._compile_type(params)
             elif action_type == "scroll":
-                return self._execute_scroll(params)
+                compiled = self._compile_scroll(params)
             elif action_type == "wait":
-                return self._execute_wait(params)
+                compiled = self._compile_wait(params)
             elif action_type == "finished":
-                return self._execute_finished(params)
+                compiled = self._compile_finished(params)
             else:
-                return {"status": "error", "message": f"未知的动作类型: {action_type}"}
+                compiled = {"status": "error", "message": f"未知的动作类型: {action_type}"}
+            
+            # 参数错误或被定位检查拦截时直接返回结果，不产生输入
+            if isinstance(compiled, dict):
+                result.set_result(compiled)
+                return result, None
+            
+            events, success, on_abort = compiled
+            if not events:
+                result.set_result(success)
+                return result, None
+            
+            state = self.verifier.before(self, action_type, success) if self.verifier else None
+            future = self.input_engine.submit(events, on_abort)
         except Exception as e:
             self.logger.error(f"执行动作异常: {str(e)}")
-            return {"status": "error", "message": f"执行异常: {str(e)}"}
+            result.set_result({"status": "error", "message": f"执行异常: {str(e)}"})
+            return result, None
+        
+        def finish(future):
+            if future.cancelled():
+                self.logger.warning(f"动作{action_type}已取消")
+                result.set_result({"status": "error", "message": f"动作{action_type}已取消", "cancelled": True})
+                return
+            error = future.exception()
+            if error is None:
+                result.set_result(success)
+            elif type(error).__name__ == "InputCancelled":
+                self.logger.warning(f"动作{action_type}在执行中被取消")
+                result.set_result({"status": "error", "message": f"动作{action_type}在执行中被取消",
+                                   "cancelled": True})
+            else:
+                self.logger.error(f"执行动作异常: {str(error)}")
+                result.set_result({"status": "error", "message": f"执行异常: {str(error)}"})
+        
+        future.add_done_callback(finish)
+        return result, state
+    
+    def cancel(self):
+        """
+        取消排队和正在执行的输入，已按下的鼠标按键和键盘按键会被松开
+        
+        Returns:
+            int: 取消的动作数
+        """
+        if self._input_engine is None:
+            return 0
+        return self._input_engine.cancel()
+    
+    def close(self):
+        """
+        停止输入线程
+        """
+        if self._input_engine is not None:
+            self._input_engine.close()
+            self._input_engine = None
     
     def _parse_coordinates(self, coords_str):
         """
@@ -111,36 +301,132 @@ class UITarsExecutor:
         if not coords or len(coords) < 2:
             return None
         
+        left, top, width, height = self.region
+        
         # 如果只有两个坐标（单点），转换为绝对坐标
         if len(coords) == 2:
-            x = round(int(coords[0]) * self.screen_width / 1000)
-            y = round(int(coords[1]) * self.screen_height / 1000)
-            return (x, y)
+            x = left + round(int(coords[0]) * width / 1000)
+            y = top + round(int(coords[1]) * height / 1000)
+            return self._clamp_to_region(x, y)
         
         # 如果有四个坐标（矩形区域），转换为绝对坐标
         elif len(coords) == 4:
-            x1 = round(int(coords[0]) * self.screen_width / 1000)
-            y1 = round(int(coords[1]) * self.screen_height / 1000)
-            x2 = round(int(coords[2]) * self.screen_width / 1000)
-            y2 = round(int(coords[3]) * self.screen_height / 1000)
+            x1 = left + round(int(coords[0]) * width / 1000)
+            y1 = top + round(int(coords[1]) * height / 1000)
+            x2 = left + round(int(coords[2]) * width / 1000)
+            y2 = top + round(int(coords[3]) * height / 1000)
             
             # 计算中心点
             center_x = (x1 + x2) // 2
             center_y = (y1 + y2) // 2
             
-            return (center_x, center_y)
+            return self._clamp_to_region(center_x, center_y)
         
         return None
     
-    def _execute_click(self, params):
+    def to_relative(self, x, y):
         """
-        执行点击操作
+        将绝对坐标换算回模型使用的0-1000相对坐标（用于向模型反馈实际执行的位置）
+        
+        Returns:
+            tuple: (x, y) 相对坐标
+        """
+        left, top, width, height = self.region
+        return (round((x - left) * 1000 / max(width, 1)), round((y - top) * 1000 / max(height, 1)))
+    
+    def _clamp_to_region(self, x, y):
+        """
+        将坐标限制在映射区域内，防止点击落到目标窗口之外
+        
+        Args:
+            x (int): 绝对横坐标
+            y (int): 绝对纵坐标
+            
+        Returns:
+            tuple: 限制后的坐标
+        """
+        left, top, width, height = self.region
+        x = min(max(x, left), left + width - 1)
+        y = min(max(y, top), top + height - 1)
+        return (x, y)
+    
+    def to_frame_point(self, x, y, frame_size):
+        """
+        把绝对坐标换算为截图中的坐标
+        
+        截图覆盖当前的映射区域，但尺寸可能与区域不同（例如高分屏缩放），按比例换算
+        
+        Args:
+            x (int): 绝对横坐标
+            y (int): 绝对纵坐标
+            frame_size (tuple): 截图的 (宽, 高)
+            
+        Returns:
+            tuple: 截图中的 (x, y)
+        """
+        left, top, width, height = self.region
+        frame_width, frame_height = frame_size
+        frame_x = min(frame_width - 1, max(0, int((x - left) * frame_width / width)))
+        frame_y = min(frame_height - 1, max(0, int((y - top) * frame_height / height)))
+        return frame_x, frame_y
+    
+    def _ground(self, x, y):
+        """
+        用本地元素检测器检查点击位置
+        
+        Args:
+            x (int): 绝对横坐标
+            y (int): 绝对纵坐标
+            
+        Returns:
+            tuple: (调整后的x, 调整后的y, 检查结果)，未启用检测或没有截图时检查结果为None
+        """
+        if not self.grounding or self.frame is None:
+            return x, y, None
+        
+        if self._detection is None:
+            self._detection = self.grounding.detect(self.frame)
+        
+        frame_x, frame_y = self.to_frame_point(x, y, self._detection["size"])
+        located = self.grounding.locate(self._detection, frame_x, frame_y)
+        if located["status"] == "snapped":
+            left, top, width, height = self.region
+            frame_width, frame_height = self._detection["size"]
+            x, y = self._clamp_to_region(left + round(located["x"] * width / frame_width),
+                                         top + round(located["y"] * height / frame_height))
+            self.logger.info(f"点击位置吸附到附近的控件 {located['element']}: ({x}, {y})")
+        elif located["status"] == "empty":
+            self.logger.warning(f"点击位置 ({x}, {y}) 附近没有可点击的控件")
+        
+        return x, y, {"status": located["status"], "element": located["element"], "distance": located["distance"]}
+    
+    def _grounded_target(self, name, abs_coords):
+        """
+        点击类动作的公共检查：返回最终位置，或者在目标落在空白背景上时返回错误结果
+        
+        Returns:
+            tuple: (x, y, 检查结果, 错误结果或None)
+        """
+        x, y, grounding = self._ground(*abs_coords)
+        if grounding and grounding["status"] == "empty" and self.grounding.block_empty:
+            return x, y, grounding, {
+                "status": "error",
+                "message": f"{name}位置 ({x}, {y}) 落在空白背景上，附近没有可点击的控件，未执行{name}",
+                "coords": {"x": x, "y": y},
+                "grounding": grounding,
+                "blocked": True
+            }
+        return x, y, grounding, None
+    
+    def _compile_click(self, params):
+        """
+        编译点击操作为事件序列
         
         Args:
             params (dict): 操作参数
             
         Returns:
-            dict: 执行结果
+            tuple|dict: (事件序列, 成功时的执行结果, 中止时的清理函数)，参数错误时返回错误结果
         """
         start_box = params.get("start_box")
         if not start_box:
@@ -152,25 +438,28 @@ class UITarsExecutor:
         if not abs_coords:
             return {"status": "error", "message": "无法解析坐标"}
         
-        x, y = abs_coords
+        x, y, grounding, blocked = self._grounded_target("点击", abs_coords)
+        if blocked:
+            return blocked
+        
         self.logger.info(f"点击位置: ({x}, {y})")
-        pyautogui.click(x, y)
         
-        return {
+        return click_events(x, y), {
             "status": "success", 
             "message": f"点击操作成功执行，位置: ({x}, {y})",
-            "coords": {"x": x, "y": y}
-        }
+            "coords": {"x": x, "y": y},
+            "grounding": grounding
+        }, None
     
-    def _execute_double_click(self, params):
+    def _compile_double_click(self, params):
         """
-        执行双击操作
+        编译双击操作为事件序列
         
         Args:
             params (dict): 操作参数
             
         Returns:
-            dict: 执行结果
+            tuple|dict: (事件序列, 成功时的执行结果, 中止时的清理函数)，参数错误时返回错误结果
         """
         start_box = params.get("start_box")
         if not start_box:
@@ -182,25 +471,28 @@ class UITarsExecutor:
         if not abs_coords:
             return {"status": "error", "message": "无法解析坐标"}
         
-        x, y = abs_coords
+        x, y, grounding, blocked = self._grounded_target("双击", abs_coords)
+        if blocked:
+            return blocked
+        
         self.logger.info(f"双击位置: ({x}, {y})")
-        pyautogui.doubleClick(x, y)
         
-        return {
+        return click_events(x, y, clicks=2), {
             "status": "success", 
             "message": f"双击操作成功执行，位置: ({x}, {y})",
-            "coords": {"x": x, "y": y}
-        }
+            "coords": {"x": x, "y": y},
+            "grounding": grounding
+        }, None
     
-    def _execute_right_click(self, params):
+    def _compile_right_click(self, params):
         """
-        执行右键点击操作
+        编译右键点击操作为事件序列
         
         Args:
             params (dict): 操作参数
             
         Returns:
-            dict: 执行结果
+            tuple|dict: (事件序列, 成功时的执行结果, 中止时的清理函数)，参数错误时返回错误结果
         """
         start_box = params.get("start_box")
         if not start_box:
@@ -212,25 +504,28 @@ class UITarsExecutor:
         if not abs_coords:
             return {"status": "error", "message": "无法解析坐标"}
         
-        x, y = abs_coords
+        x, y, grounding, blocked = self._grounded_target("右键点击", abs_coords)
+        if blocked:
+            return blocked
+        
         self.logger.info(f"右键点击位置: ({x}, {y})")
-        pyautogui.rightClick(x, y)
         
-        return {
+        return click_events(x, y, button="right"), {
             "status": "success", 
             "message": f"右键点击操作成功执行，位置: ({x}, {y})",
-            "coords": {"x": x, "y": y}
-        }
+            "coords": {"x": x, "y": y},
+            "grounding": grounding
+        }, None
     
-    def _execute_drag(self, params):
+    def _compile_drag(self, params):
         """
-        执行拖拽操作
+        编译拖拽操作为事件序列
         
         Args:
             params (dict): 操作参数
             
         Returns:
-            dict: 执行结果
+            tuple|dict: (事件序列, 成功时的执行结果, 中止时的清理函数)，参数错误时返回错误结果
         """
         start_box = params.get("start_box")
         end_box = params.get("end_box")
@@ -252,28 +547,23 @@ class UITarsExecutor:
         
         self.logger.info(f"拖拽: 从 ({start_x}, {start_y}) 到 ({end_x}, {end_y})")
         
-        # 移动到起始位置，按下鼠标，移动到结束位置，释放鼠标
-        pyautogui.moveTo(start_x, start_y)
-        pyautogui.mouseDown()
-        pyautogui.moveTo(end_x, end_y, duration=0.5)  # 使用duration参数使拖动平滑
-        pyautogui.mouseUp()
-        
-        return {
+        # 移动到起始位置，按下鼠标，在drag_duration秒内平滑移动到结束位置，释放鼠标
+        return drag_events(start_abs, end_abs, duration=self.drag_duration), {
             "status": "success", 
             "message": f"拖拽操作成功执行，从 ({start_x}, {start_y}) 到 ({end_x}, {end_y})",
             "start": {"x": start_x, "y": start_y},
             "end": {"x": end_x, "y": end_y}
-        }
+        }, None
     
-    def _execute_hotkey(self, params):
+    def _compile_hotkey(self, params):
         """
-        执行热键操作
+        编译热键操作为事件序列
         
         Args:
             params (dict): 操作参数
             
         Returns:
-            dict: 执行结果
+            tuple|dict: (事件序列, 成功时的执行结果, 中止时的清理函数)，参数错误时返回错误结果
         """
         key = params.get("key")
         if not key:
@@ -281,26 +571,25 @@ class UITarsExecutor:
         
         self.logger.info(f"执行热键: {key}")
         
-        # 处理组合键
+        # 处理组合键：依次按下，再按相反顺序松开
         keys = key.split()
         
-        # 使用pyautogui的hotkey函数
-        pyautogui.hotkey(*keys)
-        
-        return {
+        return chord_events(keys), {
             "status": "success", 
             "message": f"热键操作成功执行: {key}"
-        }
+        }, None
     
-    def _execute_type(self, params):
+    def _compile_type(self, params):
         """
-        执行键盘输入操作，使用剪贴板方式支持中文输入
+        编译键盘输入操作为事件序列，使用剪贴板方式支持中文输入
+        
+        剪贴板的读写也作为事件在输入线程中执行；中途取消或出错时恢复原来的剪贴板内容
         
         Args:
             params (dict): 操作参数
             
         Returns:
-            dict: 执行结果
+            tuple|dict: (事件序列, 成功时的执行结果, 中止时的清理函数)，参数错误时返回错误结果
         """
         content = params.get("content")
         if content is None:
@@ -308,61 +597,60 @@ class UITarsExecutor:
         
         self.logger.info(f"键盘输入: {content}")
         
-        # 添加短暂延迟，确保输入框已准备好接收输入
-        time.sleep(0.5)
-        
         # 检查是否需要在输入后按回车（如果内容以\n结尾）
         press_enter = False
         if content.endswith('\n'):
             content = content[:-1]  # 移除\n
             press_enter = True
         
-        # 保存当前剪贴板内容
-        try:
-            original_clipboard = pyperclip.paste()
-        except:
-            original_clipboard = ""
-        
-        # 使用剪贴板方式输入文本（尤其适用于中文等非ASCII字符）
-        try:
-            # 复制内容到剪贴板
-            pyperclip.copy(content)
-            time.sleep(0.2)  # 短暂等待确保复制成功
-            
-            # 使用热键粘贴
-            pyautogui.hotkey('ctrl', 'v')
-            time.sleep(0.3)  # 等待粘贴完成
-            
-            # 如果需要回车，按回车键
-            if press_enter:
-                time.sleep(0.2)  # 在按回车前稍作等待
-                self.logger.info("按下回车键")
-                pyautogui.press('enter')
-            
-            # 恢复原来的剪贴板内容
-            pyperclip.copy(original_clipboard)
-            
-            # 完成后再等待一下，让系统有时间处理输入
-            time.sleep(0.3)
-            
-            return {
-                "status": "success", 
-                "message": f"键盘输入操作成功执行，内容: {content}" + (" (已按回车)" if press_enter else "")
-            }
-        except Exception as e:
-            # 恢复原来的剪贴板内容
-            pyperclip.copy(original_clipboard)
-            return {"status": "error", "message": f"键盘输入失败: {str(e)}"}
+        import pyperclip  # 剪贴板支持
+        clipboard = {}
+        
+        def save_clipboard():
+            # 保存当前剪贴板内容
+            try:
+                clipboard["original"] = pyperclip.paste()
+            except Exception:
+                clipboard["original"] = ""
+        
+        def restore_clipboard():
+            if "original" in clipboard:
+                pyperclip.copy(clipboard.pop("original"))
+        
+        # 先短暂等待，确保输入框已准备好接收输入
+        at = self.type_delay
+        events = [
+            InputEvent("call", save_clipboard, at=at),
+            # 复制内容到剪贴板（尤其适用于中文等非ASCII字符）
+            InputEvent("call", lambda: pyperclip.copy(content), at=at),
+        ]
+        # 短暂等待确保复制成功后粘贴
+        at += 0.2
+        events += chord_events(["ctrl", "v"], at=at)
+        # 等待粘贴完成
+        at += 0.3
+        if press_enter:
+            # 在按回车前稍作等待
+            at += 0.2
+            events += chord_events(["enter"], at=at)
+        # 恢复原来的剪贴板内容，完成后再等待一下，让系统有时间处理输入
+        events.append(InputEvent("call", restore_clipboard, at=at))
+        events.append(InputEvent("idle", at=at + 0.3))
+        
+        return events, {
+            "status": "success", 
+            "message": f"键盘输入操作成功执行，内容: {content}" + (" (已按回车)" if press_enter else "")
+        }, restore_clipboard
     
-    def _execute_scroll(self, params):
+    def _compile_scroll(self, params):
         """
-        执行滚动操作
+        编译滚动操作为事件序列
         
         Args:
             params (dict): 操作参数
             
         Returns:
-            dict: 执行结果
+            tuple|dict: (事件序列, 成功时的执行结果, 中止时的清理函数)，参数错误时返回错误结果
         """
         start_box = params.get("start_box")
         direction = params.get("direction")
@@ -378,74 +666,67 @@ class UITarsExecutor:
         
         x, y = abs_coords
         
-        # 移动到位置
-        pyautogui.moveTo(x, y)
-        
         # 根据方向滚动
-        clicks = 10  # 滚动距离
+        clicks = self.scroll_clicks  # 滚动距离
         
         if direction == "up":
             self.logger.info(f"向上滚动，位置: ({x}, {y})")
-            pyautogui.scroll(clicks)
+            scroll = InputEvent("scroll", clicks)
         elif direction == "down":
             self.logger.info(f"向下滚动，位置: ({x}, {y})")
-            pyautogui.scroll(-clicks)
+            scroll = InputEvent("scroll", -clicks)
         elif direction == "left":
             self.logger.info(f"向左滚动，位置: ({x}, {y})")
-            pyautogui.hscroll(-clicks)
+            scroll = InputEvent("hscroll", -clicks)
         elif direction == "right":
             self.logger.info(f"向右滚动，位置: ({x}, {y})")
-            pyautogui.hscroll(clicks)
+            scroll = InputEvent("hscroll", clicks)
         else:
             return {"status": "error", "message": f"未知的滚动方向: {direction}"}
         
-        return {
+        # 移动到位置后滚动
+        return [InputEvent("move", x, y), scroll], {
             "status": "success", 
             "message": f"滚动操作成功执行，方向: {direction}, 位置: ({x}, {y})",
             "coords": {"x": x, "y": y},
             "direction": direction
-        }
+        }, None
     
-    def _execute_wait(self, params):
+    def _compile_wait(self, params):
         """
-        执行等待操作
+        编译等待操作为事件序列：等待也在输入线程中计时，可以被取消
         
         Args:
             params (dict): 操作参数
             
         Returns:
-            dict: 执行结果
+            tuple|dict: (事件序列, 成功时的执行结果, 中止时的清理函数)，参数错误时返回错误结果
         """
-        self.logger.info("等待5秒")
-        time.sleep(5)
+        self.logger.info(f"等待{self.wait_seconds}秒")
         
-        # 可以选择在这里截屏
-        # screenshot = pyautogui.screenshot()
-        # screenshot.save("wait_screenshot.png")
-        
-        return {
+        return [InputEvent("idle", at=self.wait_seconds)], {
             "status": "success", 
-            "message": "等待操作成功执行，等待5秒"
-        }
+            "message": f"等待操作成功执行，等待{self.wait_seconds}秒"
+        }, None
     
-    def _execute_finished(self, params):
+    def _compile_finished(self, params):
         """
-        执行完成操作
+        编译完成操作：不产生输入
         
         Args:
             params (dict): 操作参数
             
         Returns:
-            dict: 执行结果
+            tuple|dict: (事件序列, 成功时的执行结果, 中止时的清理函数)，参数错误时返回错误结果
         """
         content = params.get("content", "")
         self.logger.info(f"任务完成: {content}")
         
-        return {
+        return [], {
             "status": "success", 
             "message": f"任务标记为完成，内容: {content}",
             "content": content
-        }
+        }, None
 
 
 # 测试代码
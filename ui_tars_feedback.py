@@ -0,0 +1,225 @@
+import json
+
+# 原有的中文模板反馈（feedback_style="template"）
+TEMPLATES = {
+    "click": "点击操作已完成，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
+    "left_double": "双击操作已完成，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
+    "right_single": "右键点击已完成，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
+    "drag": "拖拽操作已完成，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
+    "hotkey": "热键{key}已按下，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
+    "type": "文本已输入：{content}，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
+    "scroll": "已在{start_box}位置向{direction}方向滚动，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
+    "wait": "等待操作完成，已暂停5秒，检查一下目标是否已完成，如果已完成，请继续下一步，如果未完成请检查一下为什么未完成",
+    "finished": "任务已完成：{content}",
+    "invalid": "上一步的输出无法解析为有效动作，没有执行任何操作，请根据当前截图重新给出下一步动作"
+}
+
+BLOCKED = "上一步的点击位置落在空白背景上，附近没有可点击的控件，操作未执行，请根据当前截图重新确定目标位置"
+
+NO_EFFECT = "上一步的{action}操作已执行，但界面没有可见变化（已在本地重试），请根据当前截图检查目标位置是否正确或换一种操作方式"
+
+# 紧凑反馈的格式说明：每一轮的反馈只有一行结果，说明只在上次发送的那一轮超出保留的历史窗口后才重新附上
+GUIDANCE = "反馈格式：动作 结果 实际坐标 Δ界面变化比例 [变化区域] 稳定用时"
+
+# 历史中与之后某一轮相同的反馈被替换成的占位文字
+REPEATED = "（与之后某一轮的反馈相同，已省略）"
+
+
+class StepRecord:
+    """
+    一步动作的记录（MultiTurnAgent.action_history中的一项）
+
+    长时间运行的会话会保留大量步骤记录，用__slots__代替dict减少每条记录的内存；
+    支持按键读取（record["type"]、record.get("params")、"params" in record），
+    可以直接传给template_feedback和compact_feedback
+    """
+
+    __slots__ = ("type", "params", "thought", "blocked", "status", "at", "error")
+
+    def __init__(self, type, params=None, thought=None, blocked=False, status="ok", at=None, error=None):
+        self.type = type
+        self.params = params or {}
+        self.thought = thought
+        self.blocked = blocked
+        self.status = status
+        self.at = at
+        self.error = error
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"StepRecord({self.to_dict()!r})"
+
+
+def template_feedback(action):
+    """
+    按动作类型生成中文模板反馈
+
+    Args:
+        action (dict): 动作（type、params，被本地定位检查拦截时blocked为True，
+            执行后界面没有可见变化时status为no_effect）
+
+    Returns:
+        str: 反馈
+    """
+    action_type = action["type"]
+    params = action["params"] if "params" in action else {}
+
+    if action.get("blocked"):
+        # 点击位置落在空白背景上被本地定位检查拦截
+        return BLOCKED
+
+    if action.get("status") == "no_effect":
+        # 动作执行后界面没有变化，本地重试也没有生效
+        return NO_EFFECT.format(action=action_type)
+
+    if action_type in TEMPLATES:
+        try:
+            return TEMPLATES[action_type].format(**params)
+        except KeyError:
+            # 参数缺失时返回通用反馈
+            return f"{action_type}操作已完成"
+    return f"{action_type}操作已完成"
+
+
+def execution_status(execution):
+    """
+    把执行器的结果归为 ok、blocked、no_effect（执行后界面没有可见变化，见EffectVerifier）或 error
+
+    Returns:
+        str: 执行状态
+    """
+    if not execution:
+        return "ok"
+    if execution.get("blocked"):
+        return "blocked"
+    if execution.get("no_effect"):
+        return "no_effect"
+    return "ok" if execution.get("status") == "success" else "error"
+
+
+def _point(point):
+    return f"({point[0]},{point[1]})"
+
+
+def _short(text, limit=40):
+    text = str(text)
+    return json.dumps(text if len(text) <= limit else text[:limit - 1] + "…", ensure_ascii=False)
+
+
+def compact_feedback(action, status="ok", at=None, change=None, settle=None, error=None):
+    """
+    生成一行紧凑的结构化反馈，例如：
+
+        click ok (512,300) Δ12% [480,260,700,420] 0.4s
+        type ok "你好啊\\n" Δ0%
+        click blocked (512,300) 空白处未执行
+        click no_effect (512,300) 界面无变化
+
+    Args:
+        action (dict): 动作（type、params）
+        status (str): ok、blocked、no_effect或error（见execution_status）
+        at (tuple|list, optional): 实际执行的位置（0-1000相对坐标），拖拽为 (起点, 终点)
+        change (dict, optional): 动作前后截图的变化（frame_change的结果）
+        settle (float, optional): 动作后界面稳定用时（秒）
+        error (str, optional): 执行失败的原因
+
+    Returns:
+        str: 反馈
+    """
+    action_type = action["type"]
+    params = action.get("params") or {}
+    if action_type == "invalid":
+        return "invalid 输出无法解析，未执行任何操作，请重新给出下一步动作"
+
+    parts = [action_type, status]
+    if at:
+        parts.append(" -> ".join(_point(p) for p in at) if isinstance(at[0], (tuple, list)) else _point(at))
+    if action_type == "type" and "content" in params:
+        parts.append(_short(params["content"]))
+    elif action_type == "hotkey" and "key" in params:
+        parts.append(params["key"])
+    elif action_type == "scroll" and "direction" in params:
+        parts.append(params["direction"])
+    elif action_type == "finished" and "content" in params:
+        parts.append(_short(params["content"]))
+    if status == "blocked":
+        parts.append("空白处未执行")
+    elif status == "no_effect":
+        parts.append("界面无变化")
+    elif status == "error" and error:
+        parts.append(_short(error, 60))
+
+    return " ".join(parts) + observation(change, settle)
+
+
+def observation(change=None, settle=None):
+    """
+    紧凑反馈中动作之后的观察部分：界面变化比例、变化区域和稳定用时
+
+    Returns:
+        str: 例如 " Δ12% [480,260,700,420] 0.4s"，都没有时为空字符串
+    """
+    text = ""
+    if change is not None:
+        text += f" Δ{change['ratio']:.0%}"
+        if change.get("box"):
+            text += " [" + ",".join(str(v) for v in change["box"]) + "]"
+    if settle is not None:
+        text += f" {settle:.1f}s"
+    return text
+
+
+def needs_guidance(last_sent, turn, window):
+    """
+    本轮反馈是否要附上紧凑反馈的格式说明
+
+    按上次发送说明的轮次判断，与对话历史由谁保存（稳定前缀或Agno历史）无关：
+    从未发送过，或者发送说明的那一轮已经不在本轮请求一定保留的历史窗口中时重新附上
+
+    Args:
+        last_sent (int|None): 上次附上说明的轮次（UITarsAgent.turns），从未发送时为None
+        turn (int): 本轮的轮次
+        window (int): 请求中一定保留的最近轮数（UITarsAgent.retained_turns）
+
+    Returns:
+        bool: 是否需要附上说明
+    """
+    return last_sent is None or turn - last_sent > window
+
+
+def repeated_feedback(texts):
+    """
+    找出与之后某一轮完全相同的反馈，相同的反馈只保留最近的一次
+
+    Args:
+        texts (list): 各轮用户消息中的反馈文本（按时间顺序），None表示不参与比较
+
+    Returns:
+        list: 要替换为REPEATED的轮次下标
+    """
+    seen = set()
+    indices = []
+    for index in range(len(texts) - 1, -1, -1):
+        text = texts[index]
+        # 比占位文字还短的反馈替换后也省不了token
+        if text is None or len(text) <= len(REPEATED):
+            continue
+        if text in seen:
+            indices.append(index)
+        else:
+            seen.add(text)
+    return indices
@@ -0,0 +1,1028 @@
+"""
+UI-TARS多机任务分发：一个调度服务（dispatcher）加多台机器上的工作进程（worker），不需要外部消息队列
+
+worker启动时向调度服务注册自己的显示器槽位（每个槽位是一个X显示器，同一时间只运行一个任务），
+每个槽位通过HTTP长轮询领取任务，执行中按步骤上报事件和检查点（到目前为止的操作轨迹）。
+worker定期发送心跳，超过lease_seconds没有消息的worker视为失联，它正在运行的任务带着最后的检查点
+重新排队，由其他worker回放轨迹后继续执行。
+
+调度时优先把任务交给“热”的槽位：最近运行过相同亲和键（默认为目标窗口标题）任务的槽位上应用已经打开
+（热会话），其次是同一worker的其他槽位（共用本机的点击目标缓存），冷启动和模型调用都更少。
+
+    调度服务（任务和worker使用的接口）：
+    POST   /fleet/jobs                      提交任务（task、options、affinity），返回job_id
+    GET    /fleet/jobs                      任务列表
+    GET    /fleet/jobs/{job_id}             任务状态、所在worker和事件
+    POST   /fleet/jobs/{job_id}/cancel      取消任务
+    GET    /fleet/jobs/{job_id}/events      以SSE推送任务事件
+    GET    /fleet/workers                   worker列表
+    GET    /fleet/stats                     队列深度、槽位占用、亲和命中和重新分配次数
+    POST   /fleet/workers                   worker注册（slots、warm），返回worker_id
+    POST   /fleet/workers/{id}/heartbeat    心跳，返回要取消和已被收回的任务
+    POST   /fleet/workers/{id}/lease        长轮询领取一个任务（没有任务时返回204）
+    POST   /fleet/workers/{id}/leave        worker退出，正在运行的任务立即重新排队
+    POST   /fleet/jobs/{job_id}/events      worker上报事件（step、checkpoint）
+    POST   /fleet/jobs/{job_id}/complete    worker上报任务结束
+
+    python ui_tars_fleet.py dispatcher --port 8100
+    python ui_tars_fleet.py worker --dispatcher http://10.0.0.1:8100 --slots :1 :2
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import logging
+import threading
+import subprocess
+from uuid import uuid4
+from collections import deque, OrderedDict
+
+from ui_tars_jobs import (Job, JobCancelled, QueueFullError, QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED,
+                          FINAL_STATUSES)
+
+
+class UnknownWorkerError(Exception):
+    """worker不存在（没有注册或已被判定为失联）"""
+
+
+class StaleLeaseError(Exception):
+    """任务已不再分配给该worker（已被收回并重新分配）"""
+
+
+class FleetJob(Job):
+    """
+    分发到worker上执行的任务：在Job的基础上记录亲和键、所在worker和槽位、尝试次数和最后的检查点
+    """
+
+    def __init__(self, task, options=None, affinity=None):
+        super().__init__(task, options)
+        self.affinity = affinity
+        self.worker = None
+        self.slot = None
+        self.attempts = 0
+        self.checkpoint = None
+        self.checkpointed_at = None
+        self.queued_at = self.created_at
+        self.leased_at = None  # 最近一次分配的时间
+
+    def lease(self):
+        """
+        交给worker的任务内容
+
+        Returns:
+            dict: job_id、task、options、affinity、attempt和checkpoint
+        """
+        return {"job_id": self.id, "task": self.task, "options": self.options, "affinity": self.affinity,
+                "attempt": self.attempts, "checkpoint": self.checkpoint}
+
+    def to_dict(self, events=False):
+        data = super().to_dict(events)
+        data.update(affinity=self.affinity, worker=self.worker, slot=self.slot, attempts=self.attempts,
+                    checkpointed_at=self.checkpointed_at)
+        return data
+
+
+class _Worker:
+    __slots__ = ("id", "name", "slots", "warm", "running", "last_seen", "registered_at")
+
+    def __init__(self, name, slots, warm):
+        self.id = uuid4().hex
+        self.name = name or self.id[:8]
+        self.slots = slots
+        self.warm = OrderedDict((key, set()) for key in warm)  # 亲和键 -> 运行过该键任务的槽位
+        self.running = set()
+        self.last_seen = time.time()
+        self.registered_at = self.last_seen
+
+    def touch_warm(self, key, slot, limit):
+        self.warm.setdefault(key, set()).add(slot)
+        self.warm.move_to_end(key)
+        while len(self.warm) > limit:
+            self.warm.popitem(last=False)
+
+    def to_dict(self):
+        return {"worker_id": self.id, "name": self.name, "slots": self.slots, "running": sorted(self.running),
+                "warm": list(self.warm), "last_seen": self.last_seen, "registered_at": self.registered_at}
+
+
+class Dispatcher:
+    """
+    任务调度：任务队列、worker登记和租约（线程安全，HTTP接口见create_fleet_app）
+
+    worker的一个槽位领取任务时按以下顺序选择（同一级中最早的一个）：
+    1. 该槽位运行过相同亲和键的任务（热会话）
+    2. 该worker运行过相同亲和键的任务（本机的点击目标缓存是热的）
+    3. 可分配的任务：没有亲和键，或没有其他空闲的热槽位，或已等待超过affinity_wait秒
+       （热槽位一直忙时不让任务无限等待）
+    重新排队的任务排在队首。
+    """
+
+    def __init__(self, lease_seconds=15.0, max_attempts=3, affinity_wait=5.0, max_queue=1000, keep_finished=1000,
+                 warm_limit=32):
+        """
+        初始化调度
+
+        Args:
+            lease_seconds (float): worker超过该时间没有任何消息（心跳、领取、上报）视为失联
+            max_attempts (int): 一个任务最多分配的次数，因worker失联被收回超过该次数时任务失败
+            affinity_wait (float): 有其他热worker空闲时，任务为等待它最多保留的时间（秒）
+            max_queue (int): 排队任务数上限，超出时拒绝提交
+            keep_finished (int): 保留的已结束任务数，超出后丢弃最早的
+            warm_limit (int): 每个worker记住的热键数
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.affinity_wait = affinity_wait
+        self.max_queue = max_queue
+        self.keep_finished = keep_finished
+        self.warm_limit = warm_limit
+        self.logger = logging.getLogger("Dispatcher")
+
+        self.jobs = OrderedDict()
+        self.workers = {}
+        self._queue = deque()
+        self._finished = deque()
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._stop = threading.Event()
+        self._counts = {SUCCEEDED: 0, FAILED: 0, CANCELLED: 0, "reassigned": 0, "lost_workers": 0,
+                        "session_hits": 0, "affinity_hits": 0, "affinity_misses": 0}
+
+    def start(self):
+        """
+        启动失联检查线程
+        """
+        self._stop.clear()
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, name="FleetReaper", daemon=True)
+            self._reaper.start()
+        return self
+
+    def stop(self):
+        """
+        停止失联检查线程
+        """
+        self._stop.set()
+        if self._reaper:
+            self._reaper.join(timeout=2)
+            self._reaper = None
+
+    def _reap_loop(self):
+        while not self._stop.wait(max(self.lease_seconds / 4, 0.1)):
+            self.reap()
+
+    # 任务提交方使用的接口
+
+    def submit(self, task, options=None, affinity=None):
+        """
+        提交任务
+
+        Args:
+            task (str): 任务
+            options (dict, optional): 任务选项（同ui_tars_jobs.run_ui_task）
+            affinity (str, optional): 亲和键，默认为选项中的window_title
+
+        Returns:
+            FleetJob: 新任务
+
+        Raises:
+            QueueFullError: 排队任务数已达上限
+        """
+        options = options or {}
+        job = FleetJob(task, options, affinity or options.get("window_title"))
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                raise QueueFullError(f"任务队列已满（{self.max_queue}）")
+            self.jobs[job.id] = job
+            self._queue.append(job)
+            position = len(self._queue)
+        job.publish("queued", position=position)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        取消任务：排队中直接结束，运行中在worker下次心跳或上报时通知它停止
+
+        Returns:
+            FleetJob|None: 任务，不存在时返回None
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINAL_STATUSES:
+                return job
+            job.cancel_event.set()
+            if job.status != QUEUED:
+                return job
+            self._queue.remove(job)
+            self._finish(job, CANCELLED)
+        job.publish("end", status=CANCELLED)
+        return job
+
+    # worker使用的接口
+
+    def register(self, slots, warm=None, name=None):
+        """
+        登记worker
+
+        Args:
+            slots (int): 槽位数（同时运行的任务数）
+            warm (list, optional): 该worker已经热的亲和键（如本地点击目标缓存中已有的应用）
+            name (str, optional): 显示用的名称
+
+        Returns:
+            str: worker_id
+        """
+        if slots < 1:
+            raise ValueError("槽位数至少为1")
+        worker = _Worker(name, slots, list(warm or [])[-self.warm_limit:])
+        with self._lock:
+            self.workers[worker.id] = worker
+        self.logger.info(f"worker {worker.name} 已注册: {slots} 个槽位")
+        return worker.id
+
+    def _worker(self, worker_id):
+        # 调用方持有self._lock
+        worker = self.workers.get(worker_id)
+        if worker is None:
+            raise UnknownWorkerError(worker_id)
+        worker.last_seen = time.time()
+        return worker
+
+    def heartbeat(self, worker_id, running=()):
+        """
+        worker心跳
+
+        分配给该worker、但分配后超过lease_seconds/3仍没有出现在心跳中的任务带着检查点重新排队：
+        领取响应在路上丢失时worker并不知道这个任务，否则它会一直占着槽位。
+        心跳间隔不超过lease_seconds/3，刚分配的任务可能还没来得及出现在心跳中
+
+        Args:
+            running (list): worker上正在运行的任务
+
+        Returns:
+            dict: cancel（要取消的任务）、lost（已不再分配给该worker的任务，应立即停止）
+
+        Raises:
+            UnknownWorkerError: worker不存在（已被判定失联），需要重新注册
+        """
+        now = time.time()
+        with self._lock:
+            worker = self._worker(worker_id)
+            cancel = [job_id for job_id in running
+                      if job_id in worker.running and self.jobs[job_id].cancelled]
+            lost = [job_id for job_id in running if job_id not in worker.running]
+            reported = set(running)
+            unreported = [self.jobs[job_id] for job_id in worker.running if job_id not in reported
+                          and now - self.jobs[job_id].leased_at > self.lease_seconds / 3]
+            if unreported:
+                self.logger.warning(f"worker {worker.name} 没有报告 {len(unreported)} 个已分配的任务，重新分配")
+            for job in unreported:
+                worker.running.discard(job.id)
+                self._requeue(job, worker, "worker未报告该任务")
+        return {"cancel": cancel, "lost": lost}
+
+    def _pick(self, worker, slot, now):
+        # 调用方持有self._lock
+        same_worker = fallback = None
+        for job in self._queue:
+            if job.affinity and job.affinity in worker.warm:
+                if slot in worker.warm[job.affinity]:
+                    return job
+                same_worker = same_worker or job
+            elif fallback is None and (not job.affinity or now - job.queued_at >= self.affinity_wait
+                                       or not self._warm_elsewhere(job, worker, slot)):
+                fallback = job
+        return same_worker or fallback
+
+    def _warm_elsewhere(self, job, worker, slot):
+        # 是否有其他空闲的热槽位（注册时报告的热键没有槽位，整个worker有空闲槽位即可）
+        for other in self.workers.values():
+            slots = other.warm.get(job.affinity)
+            if slots is None or len(other.running) >= other.slots:
+                continue
+            if other is not worker:
+                return True
+            busy = {self.jobs[job_id].slot for job_id in other.running}
+            if slots - busy - {slot}:
+                return True
+        return False
+
+    def lease(self, worker_id, slot=None):
+        """
+        为worker的一个空闲槽位分配任务（不等待）
+
+        Args:
+            slot (str, optional): 槽位名称（如显示器":1"）
+
+        Returns:
+            dict|None: 任务内容（FleetJob.lease），没有可分配的任务时返回None
+
+        Raises:
+            UnknownWorkerError: worker不存在
+        """
+        now = time.time()
+        with self._lock:
+            worker = self._worker(worker_id)
+            if len(worker.running) >= worker.slots or not self._queue:
+                return None
+            job = self._pick(worker, slot, now)
+            if job is None:
+                return None
+            self._queue.remove(job)
+            if job.affinity:
+                slots = worker.warm.get(job.affinity)
+                self._counts["affinity_misses" if slots is None else "affinity_hits"] += 1
+                self._counts["session_hits"] += bool(slots and slot in slots)
+                worker.touch_warm(job.affinity, slot, self.warm_limit)
+            worker.running.add(job.id)
+            job.worker, job.slot = worker.id, slot
+            job.attempts += 1
+            job.status = RUNNING
+            job.started_at = job.started_at or now
+            job.leased_at = now
+            payload = job.lease()
+        job.publish("started", worker=worker.name, slot=slot, attempt=job.attempts,
+                    resumed=job.checkpoint is not None, queued_seconds=now - job.queued_at)
+        return payload
+
+    def _owned(self, worker_id, job_id):
+        # 调用方持有self._lock
+        worker = self._worker(worker_id)
+        job = self.jobs.get(job_id)
+        if job is None or job.worker != worker_id or job.id not in worker.running:
+            raise StaleLeaseError(job_id)
+        return job
+
+    def report(self, worker_id, job_id, event_type, **data):
+        """
+        worker上报任务事件；checkpoint事件保存data["checkpoint"]，下次分配时交给新的worker
+
+        Returns:
+            dict: cancel（任务是否已被取消）
+
+        Raises:
+            StaleLeaseError: 任务已不再分配给该worker
+        """
+        with self._lock:
+            job = self._owned(worker_id, job_id)
+            if event_type == "checkpoint":
+                job.checkpoint = data.get("checkpoint")
+                job.checkpointed_at = time.time()
+        if event_type != "checkpoint":
+            job.publish(event_type, **data)
+        return {"cancel": job.cancelled}
+
+    def complete(self, worker_id, job_id, status, error=None, result=None):
+        """
+        worker上报任务结束
+
+        Raises:
+            StaleLeaseError: 任务已不再分配给该worker（结果作废）
+        """
+        if status not in FINAL_STATUSES:
+            raise ValueError(f"未知的任务状态: {status}")
+        with self._lock:
+            job = self._owned(worker_id, job_id)
+            self.workers[worker_id].running.discard(job_id)
+            self._finish(job, status, error, result)
+        job.publish("end", status=status, error=error, result=result)
+
+    def leave(self, worker_id):
+        """
+        worker退出，正在运行的任务立即重新排队
+        """
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if worker is not None:
+                self._remove(worker, "worker退出")
+
+    def reap(self):
+        """
+        把超过lease_seconds没有消息的worker判定为失联，收回它的任务
+
+        Returns:
+            int: 失联的worker数
+        """
+        deadline = time.time() - self.lease_seconds
+        with self._lock:
+            lost = [worker for worker in self.workers.values() if worker.last_seen < deadline]
+            for worker in lost:
+                self._counts["lost_workers"] += 1
+                self._remove(worker, "worker失联")
+        return len(lost)
+
+    def _remove(self, worker, reason):
+        # 调用方持有self._lock
+        del self.workers[worker.id]
+        self.logger.warning(f"{reason}: {worker.name}，收回 {len(worker.running)} 个任务")
+        for job_id in worker.running:
+            self._requeue(self.jobs[job_id], worker, reason)
+        worker.running.clear()
+
+    def _requeue(self, job, worker, reason):
+        # 调用方持有self._lock，并负责把任务从worker.running中移除
+        job.worker = job.slot = None
+        if job.cancelled:
+            self._finish(job, CANCELLED)
+            job.publish("end", status=CANCELLED)
+        elif job.attempts >= self.max_attempts:
+            error = f"{reason}，已分配 {job.attempts} 次"
+            self._finish(job, FAILED, error)
+            job.publish("end", status=FAILED, error=error)
+        else:
+            job.status = QUEUED
+            job.queued_at = time.time()
+            self._queue.appendleft(job)
+            self._counts["reassigned"] += 1
+            job.publish("reassigned", reason=reason, worker=worker.name, checkpoint=job.checkpoint is not None)
+
+    def _finish(self, job, status, error=None, result=None):
+        # 调用方持有self._lock
+        job.status = status
+        job.error = error
+        job.result = result
+        job.finished_at = time.time()
+        self._counts[status] += 1
+        self._finished.append(job.id)
+        while len(self._finished) > self.keep_finished:
+            self.jobs.pop(self._finished.popleft(), None)
+
+    def stats(self):
+        """
+        返回调度统计
+
+        Returns:
+            dict: queue_depth、running、workers、slots、各状态的累计数量、reassigned、lost_workers、
+                session_hits（分配到热槽位）、affinity_hits（分配到热worker，含热槽位）、affinity_misses
+        """
+        with self._lock:
+            return {
+                "queue_depth": len(self._queue),
+                "running": sum(len(worker.running) for worker in self.workers.values()),
+                "workers": len(self.workers),
+                "slots": sum(worker.slots for worker in self.workers.values()),
+                **self._counts,
+            }
+
+
+def create_fleet_app(dispatcher, poll_interval=0.05):
+    """
+    创建调度服务的FastAPI应用
+
+    Args:
+        dispatcher (Dispatcher): 调度，失联检查线程随应用启动和关闭
+        poll_interval (float): 长轮询领取任务时的检查间隔（秒）
+
+    Returns:
+        FastAPI: 应用对象
+    """
+    from typing import Optional
+    from contextlib import asynccontextmanager
+
+    from pydantic import BaseModel
+    from fastapi import FastAPI, HTTPException, Header, Response
+    from fastapi.responses import StreamingResponse
+
+    class SubmitRequest(BaseModel):
+        task: str
+        options: dict = {}
+        affinity: Optional[str] = None
+
+    class RegisterRequest(BaseModel):
+        slots: int
+        warm: list = []
+        name: Optional[str] = None
+
+    class HeartbeatRequest(BaseModel):
+        running: list = []
+
+    class LeaseRequest(BaseModel):
+        slot: Optional[str] = None
+        wait: float = 10.0
+
+    class EventRequest(BaseModel):
+        worker_id: str
+        type: str
+        data: dict = {}
+
+    class CompleteRequest(BaseModel):
+        worker_id: str
+        status: str
+        error: Optional[str] = None
+        result: Optional[dict] = None
+
+    @asynccontextmanager
+    async def lifespan(app):
+        dispatcher.start()
+        yield
+        dispatcher.stop()
+
+    app = FastAPI(title="UI-TARS Fleet", lifespan=lifespan)
+    app.state.dispatcher = dispatcher
+
+    def get_job(job_id):
+        job = dispatcher.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return job
+
+    def worker_call(func, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except UnknownWorkerError:
+            raise HTTPException(status_code=404, detail="worker不存在，需要重新注册")
+        except StaleLeaseError:
+            raise HTTPException(status_code=409, detail="任务已不再分配给该worker")
+
+    @app.post("/fleet/jobs", status_code=202)
+    async def submit_job(request: SubmitRequest):
+        try:
+            job = dispatcher.submit(request.task, request.options, request.affinity)
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        return {"job_id": job.id, "status": job.status, "affinity": job.affinity}
+
+    @app.get("/fleet/jobs")
+    async def list_jobs(status: Optional[str] = None):
+        return [job.to_dict() for job in list(dispatcher.jobs.values()) if status is None or job.status == status]
+
+    @app.get("/fleet/jobs/{job_id}")
+    async def get_job_detail(job_id: str):
+        return get_job(job_id).to_dict(events=True)
+
+    @app.post("/fleet/jobs/{job_id}/cancel")
+    async def cancel_job(job_id: str):
+        get_job(job_id)
+        return dispatcher.cancel(job_id).to_dict()
+
+    @app.get("/fleet/jobs/{job_id}/events")
+    async def job_events(job_id: str, since: int = 0, last_event_id: Optional[str] = Header(None)):
+        job = get_job(job_id)
+        if last_event_id is not None and last_event_id.isdigit():
+            since = int(last_event_id) + 1
+
+        async def sse():
+            async for event in job.stream(since):
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.post("/fleet/jobs/{job_id}/events")
+    async def job_report(job_id: str, request: EventRequest):
+        return worker_call(dispatcher.report, request.worker_id, job_id, request.type, **request.data)
+
+    @app.post("/fleet/jobs/{job_id}/complete")
+    async def job_complete(job_id: str, request: CompleteRequest):
+        try:
+            worker_call(dispatcher.complete, request.worker_id, job_id, request.status, request.error,
+                        request.result)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"status": request.status}
+
+    @app.get("/fleet/workers")
+    async def list_workers():
+        return [worker.to_dict() for worker in list(dispatcher.workers.values())]
+
+    @app.post("/fleet/workers", status_code=201)
+    async def register_worker(request: RegisterRequest):
+        try:
+            worker_id = dispatcher.register(request.slots, request.warm, request.name)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"worker_id": worker_id, "lease_seconds": dispatcher.lease_seconds}
+
+    @app.post("/fleet/workers/{worker_id}/heartbeat")
+    async def worker_heartbeat(worker_id: str, request: HeartbeatRequest):
+        return worker_call(dispatcher.heartbeat, worker_id, request.running)
+
+    @app.post("/fleet/workers/{worker_id}/lease")
+    async def worker_lease(worker_id: str, request: LeaseRequest):
+        # 长轮询：在事件循环中等待，不占用线程池
+        deadline = time.monotonic() + min(max(request.wait, 0), 60)
+        while True:
+            payload = worker_call(dispatcher.lease, worker_id, request.slot)
+            if payload is not None:
+                return payload
+            if time.monotonic() >= deadline:
+                return Response(status_code=204)
+            await asyncio.sleep(poll_interval)
+
+    @app.post("/fleet/workers/{worker_id}/leave")
+    async def worker_leave(worker_id: str):
+        dispatcher.leave(worker_id)
+        return {"worker_id": worker_id}
+
+    @app.get("/fleet/stats")
+    async def fleet_stats():
+        return dispatcher.stats()
+
+    return app
+
+
+class TaskLost(Exception):
+    """任务已被调度服务收回（worker被判定失联后任务已重新分配）"""
+
+
+def process_runner(job, slot, report, cancel_event, defaults=None, python=None, grace_seconds=10.0):
+    """
+    默认的任务执行函数：在子进程中运行run_ui_task，子进程的DISPLAY为槽位名称
+
+    每个任务一个子进程：图形界面库在导入时绑定显示器，同一worker的不同槽位操作不同的显示器；
+    子进程在标准输出上逐行输出JSON事件（step、resumed、checkpoint，最后是end），转发给调度服务。
+    取消或任务被收回时先发送SIGTERM（子进程在当前步骤结束后停止），grace_seconds秒后强制结束。
+
+    Args:
+        job (dict): 调度服务交给worker的任务内容（FleetJob.lease）
+        slot (str): 槽位名称，作为子进程的DISPLAY
+        report (callable): report(event_type, **data)，任务被收回时抛出TaskLost
+        cancel_event (threading.Event): 取消标记
+        defaults (dict, optional): 任务没有指定的选项使用的默认值
+        python (str, optional): 子进程使用的Python解释器
+        grace_seconds (float): SIGTERM之后等待子进程退出的时间（秒）
+
+    Returns:
+        dict: 任务结果
+    """
+    env = dict(os.environ, DISPLAY=slot) if slot else dict(os.environ)
+    process = subprocess.Popen([python or sys.executable, "-m", "ui_tars_fleet", "run"], stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, env=env, text=True, encoding="utf-8")
+    process.stdin.write(json.dumps(dict(job, defaults=defaults), ensure_ascii=False))
+    process.stdin.close()
+
+    def watch():
+        while not cancel_event.wait(0.5):
+            if process.poll() is not None:
+                return
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(grace_seconds)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    threading.Thread(target=watch, name="FleetTaskWatch", daemon=True).start()
+    end = None
+    try:
+        for line in process.stdout:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            event_type = event.pop("type", None)
+            if event_type == "end":
+                end = event
+            elif event_type:
+                report(event_type, **event)
+    except TaskLost:
+        cancel_event.set()
+        raise
+    finally:
+        process.stdout.close()
+        process.wait()
+    if end is None:
+        if cancel_event.is_set():
+            raise JobCancelled()
+        raise RuntimeError(f"任务进程异常退出（退出码 {process.returncode}）")
+    if end["status"] == CANCELLED:
+        raise JobCancelled()
+    if end["status"] == FAILED:
+        raise RuntimeError(end.get("error"))
+    return end.get("result")
+
+
+class _ReportingJob(Job):
+    # 子进程中的任务：事件输出到标准输出交给worker，而不是推送给订阅者
+
+    def __init__(self, task, options, emit):
+        super().__init__(task, options)
+        self.emit = emit
+
+    def publish(self, event_type, **data):
+        self.emit(event_type, **data)
+
+
+def run_child():
+    """
+    子进程入口（python -m ui_tars_fleet run）：从标准输入读取任务，运行run_ui_task，事件逐行输出到标准输出
+    """
+    from ui_tars_jobs import run_ui_task
+
+    request = json.loads(sys.stdin.read())
+    # 事件独占原来的标准输出，其他输出（日志、print）改到标准错误
+    out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    lock = threading.Lock()
+
+    def emit(event_type, **data):
+        with lock:
+            out.write(json.dumps({"type": event_type, **data}, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+
+    job = _ReportingJob(request["task"], request.get("options"), emit)
+    job.id = request["job_id"]
+    signal.signal(signal.SIGTERM, lambda *args: job.cancel_event.set())
+    try:
+        result = run_ui_task(job, defaults=request.get("defaults"), checkpoint=request.get("checkpoint"),
+                             on_checkpoint=lambda checkpoint: emit("checkpoint", checkpoint=checkpoint))
+        emit("end", status=CANCELLED if job.cancelled else SUCCEEDED, result=result)
+    except JobCancelled:
+        emit("end", status=CANCELLED)
+    except Exception as e:
+        logging.getLogger("FleetTask").exception(f"任务 {job.id} 执行失败")
+        emit("end", status=FAILED, error=str(e))
+    out.close()
+
+
+class FleetWorker:
+    """
+    worker：向调度服务注册槽位，每个槽位一个线程长轮询领取任务并执行，另有一个线程发送心跳
+
+    与调度服务失去联系时（心跳返回404，即已被判定失联）停止正在运行的任务（它们已被重新分配）并重新注册。
+    """
+
+    def __init__(self, dispatcher_url, slots=(":0",), runner=None, heartbeat_seconds=3.0, warm=None, name=None,
+                 lease_wait=10.0):
+        """
+        初始化worker
+
+        Args:
+            dispatcher_url (str): 调度服务地址，如 http://10.0.0.1:8100
+            slots (list): 槽位名称（默认执行函数中为X显示器，如[":1", ":2"]）
+            runner (callable, optional): 执行任务的函数 runner(job, slot, report, cancel_event) -> result，
+                默认process_runner
+            heartbeat_seconds (float): 心跳间隔（秒），不超过调度服务lease_seconds的三分之一
+            warm (list, optional): 注册时报告的热键
+            name (str, optional): 显示用的名称，默认为主机名和PID
+            lease_wait (float): 每次长轮询的最长等待时间（秒）
+        """
+        import httpx
+
+        if not slots:
+            raise ValueError("至少需要一个槽位")
+        self.slots = list(slots)
+        self.runner = runner or process_runner
+        self.heartbeat_seconds = heartbeat_seconds
+        self.warm = list(warm or [])
+        self.name = name or f"{os.uname().nodename}-{os.getpid()}"
+        self.lease_wait = lease_wait
+        self.logger = logging.getLogger("FleetWorker")
+        self.client = httpx.Client(base_url=dispatcher_url, timeout=lease_wait + 10)
+        self.worker_id = None
+        self._lock = threading.Lock()
+        self._running = {}  # job_id -> (取消标记, 收回标记)
+        self._threads = []
+        self._stop = threading.Event()
+        self.stats = {"jobs": 0, SUCCEEDED: 0, FAILED: 0, CANCELLED: 0, "lost": 0}
+
+    def register(self, stale_id=None):
+        """
+        向调度服务注册（stale_id为已失效的worker_id时才重新注册，多个线程同时发现时只注册一次）
+
+        Returns:
+            str: worker_id
+        """
+        with self._lock:
+            if self.worker_id is None or self.worker_id == stale_id:
+                response = self.client.post("/fleet/workers", json={"slots": len(self.slots), "warm": self.warm,
+                                                                    "name": self.name})
+                response.raise_for_status()
+                data = response.json()
+                self.worker_id = data["worker_id"]
+                self.heartbeat_seconds = min(self.heartbeat_seconds, data["lease_seconds"] / 3)
+                self.logger.info(f"已注册到调度服务: {self.worker_id}，{len(self.slots)} 个槽位")
+            return self.worker_id
+
+    def start(self):
+        """
+        注册并启动心跳线程和每个槽位的领取线程
+        """
+        self._stop.clear()
+        self.register()
+        targets = [("FleetHeartbeat", self._heartbeat_loop, ())]
+        targets += [(f"FleetSlot-{slot}", self._slot_loop, (slot,)) for slot in self.slots]
+        for name, target, args in targets:
+            thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        return self
+
+    def stop(self, timeout=15.0):
+        """
+        停止领取，取消正在运行的任务，并通知调度服务重新分配未完成的任务
+
+        领取线程可能正阻塞在长轮询中，不等待它们结束（守护线程），只等待正在运行的任务停止
+        """
+        self._stop.set()
+        with self._lock:
+            for cancel_event, _ in self._running.values():
+                cancel_event.set()
+        deadline = time.monotonic() + timeout
+        while self._running and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._threads = []
+        if self.worker_id:
+            try:
+                self.client.post(f"/fleet/workers/{self.worker_id}/leave")
+            except Exception as e:
+                self.logger.warning(f"通知调度服务退出失败: {e}")
+        self.client.close()
+
+    def _lost(self, job_ids):
+        with self._lock:
+            for job_id in job_ids:
+                if job_id in self._running:
+                    cancel_event, lost = self._running[job_id]
+                    lost.set()
+                    cancel_event.set()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            worker_id = self.worker_id
+            with self._lock:
+                running = list(self._running)
+            try:
+                response = self.client.post(f"/fleet/workers/{worker_id}/heartbeat", json={"running": running})
+                if response.status_code == 404:
+                    # 已被判定失联，运行中的任务已重新分配
+                    self.logger.warning("调度服务已不认识该worker，停止运行中的任务并重新注册")
+                    self._lost(running)
+                    self.register(stale_id=worker_id)
+                    continue
+                response.raise_for_status()
+            except Exception as e:
+                self.logger.warning(f"心跳失败: {e}")
+                continue
+            data = response.json()
+            self._lost(data["lost"])
+            with self._lock:
+                for job_id in data["cancel"]:
+                    if job_id in self._running:
+                        self._running[job_id][0].set()
+
+    def _slot_loop(self, slot):
+        while not self._stop.is_set():
+            worker_id = self.worker_id
+            try:
+                response = self.client.post(f"/fleet/workers/{worker_id}/lease",
+                                            json={"slot": slot, "wait": self.lease_wait})
+                if response.status_code == 404:
+                    self.register(stale_id=worker_id)
+                    continue
+                response.raise_for_status()
+            except Exception as e:
+                self.logger.warning(f"领取任务失败: {e}")
+                self._stop.wait(1.0)
+                continue
+            if response.status_code == 204 or self._stop.is_set():
+                # 停止后领到的任务在leave时重新排队
+                continue
+            self._run(response.json(), slot, worker_id)
+
+    def _post(self, path, payload, attempts=3):
+        # 上报失败（网络抖动）时重试几次；409表示任务已被收回
+        for attempt in range(attempts):
+            try:
+                response = self.client.post(path, json=payload)
+            except Exception as e:
+                self.logger.warning(f"上报失败: {e}")
+                self._stop.wait(0.5 * (attempt + 1))
+                continue
+            if response.status_code in (404, 409):
+                raise TaskLost(response.json().get("detail"))
+            response.raise_for_status()
+            return response.json()
+        return {}
+
+    def _run(self, job, slot, worker_id):
+        job_id = job["job_id"]
+        cancel_event, lost = threading.Event(), threading.Event()
+        with self._lock:
+            self._running[job_id] = (cancel_event, lost)
+        self.logger.info(f"槽位 {slot} 开始任务 {job_id}（第 {job['attempt']} 次分配"
+                         f"{'，从检查点继续' if job.get('checkpoint') else ''}）")
+
+        def report(event_type, **data):
+            if lost.is_set():
+                raise TaskLost(job_id)
+            reply = self._post(f"/fleet/jobs/{job_id}/events",
+                               {"worker_id": worker_id, "type": event_type, "data": data})
+            if reply.get("cancel"):
+                cancel_event.set()
+
+        status, error, result = SUCCEEDED, None, None
+        try:
+            try:
+                result = self.runner(job, slot, report, cancel_event)
+                if cancel_event.is_set():
+                    status = CANCELLED
+            except JobCancelled:
+                status = CANCELLED
+            except Exception as e:
+                if isinstance(e, TaskLost) or lost.is_set():
+                    status = None
+                else:
+                    self.logger.exception(f"任务 {job_id} 执行失败")
+                    status, error = FAILED, str(e)
+
+            with self._lock:
+                self.stats["jobs"] += 1
+                self.stats["lost" if status is None or lost.is_set() else status] += 1
+            if status is None or lost.is_set():
+                self.logger.warning(f"任务 {job_id} 已被调度服务收回")
+                return
+            try:
+                self._post(f"/fleet/jobs/{job_id}/complete", {"worker_id": worker_id, "status": status,
+                                                              "error": error, "result": result})
+            except TaskLost:
+                self.logger.warning(f"任务 {job_id} 已被调度服务收回，结果作废")
+            except Exception as e:
+                self.logger.warning(f"上报任务 {job_id} 结果失败: {e}")
+        finally:
+            # 结果上报之前心跳仍报告该任务，否则调度服务会把结果还在路上的任务当作没有报告的任务收回
+            with self._lock:
+                self._running.pop(job_id, None)
+
+
+def _load_runner(spec):
+    # "模块:函数"
+    import importlib
+
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def build_worker(args, config=None):
+    """
+    根据命令行参数创建worker（ui_tars_fleet worker 与 ui-tars worker共用）
+    """
+    from functools import partial
+
+    runner = _load_runner(args.runner) if args.runner else partial(process_runner, defaults=config)
+    return FleetWorker(args.dispatcher, slots=args.slots, runner=runner, heartbeat_seconds=args.heartbeat,
+                       warm=args.warm, name=args.name)
+
+
+def serve_worker(worker):
+    """
+    运行worker直到收到SIGINT或SIGTERM
+    """
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    worker.start()
+    try:
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    worker.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='UI-TARS多机任务分发')
+    sub = parser.add_subparsers(dest='command', required=True)
+    dispatcher_parser = sub.add_parser('dispatcher', help='启动调度服务')
+    dispatcher_parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    dispatcher_parser.add_argument('--port', type=int, default=8100, help='监听端口')
+    dispatcher_parser.add_argument('--lease-seconds', type=float, default=15.0,
+                                   help='worker超过该时间没有消息视为失联（秒）')
+    dispatcher_parser.add_argument('--max-attempts', type=int, default=3, help='一个任务最多分配的次数')
+    dispatcher_parser.add_argument('--affinity-wait', type=float, default=5.0,
+                                   help='有其他空闲的热槽位时任务为等待它最多保留的时间（秒）')
+    worker_parser = sub.add_parser('worker', help='启动worker')
+    worker_parser.add_argument('--dispatcher', default='http://127.0.0.1:8100', help='调度服务地址')
+    worker_parser.add_argument('--slots', nargs='+', default=[os.environ.get("DISPLAY", ":0")],
+                               help='槽位（X显示器），每个槽位同时运行一个任务')
+    worker_parser.add_argument('--runner', default=None,
+                               help='执行任务的函数（模块:函数），默认在子进程中运行run_ui_task')
+    worker_parser.add_argument('--heartbeat', type=float, default=3.0, help='心跳间隔（秒）')
+    worker_parser.add_argument('--warm', nargs='*', default=None, help='注册时报告的热键（如已缓存点击目标的应用）')
+    worker_parser.add_argument('--name', default=None, help='worker名称')
+    worker_parser.add_argument('--config', default=None, help='任务默认配置文件')
+    sub.add_parser('run', help='（内部）在子进程中执行一个任务')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        stream=sys.stderr)
+    if args.command == "run":
+        run_child()
+    elif args.command == "dispatcher":
+        import uvicorn
+
+        dispatcher = Dispatcher(lease_seconds=args.lease_seconds, max_attempts=args.max_attempts,
+                                affinity_wait=args.affinity_wait)
+        uvicorn.run(create_fleet_app(dispatcher), host=args.host, port=args.port, log_level="warning")
+    else:
+        from ui_tars_config import load_config
+
+        serve_worker(build_worker(args, load_config(args.config)))
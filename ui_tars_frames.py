@@ -0,0 +1,350 @@
+import time
+import threading
+import logging
+
+from ui_tars_capture import Frame
+
+
+def frame_difference(a, b, step=8):
+    """
+    计算两帧之间的差异程度（降采样后逐像素比较，向量化实现）
+
+    Args:
+        a (Frame): 帧A
+        b (Frame): 帧B
+        step (int): 降采样步长，越大越快但越不敏感
+
+    Returns:
+        float: 发生变化的采样像素比例，0表示完全相同，尺寸不同返回1
+    """
+    import numpy as np
+
+    if a.size != b.size:
+        return 1.0
+    pa = a.array[::step, ::step, :3]
+    pb = b.array[::step, ::step, :3]
+    if a.mode != b.mode:
+        # RGB与BGRX的通道顺序相反
+        pb = pb[..., ::-1]
+    changed = np.abs(pa.astype(np.int16) - pb).max(axis=2) > 16
+    return float(changed.mean())
+
+
+class FrameRingBuffer:
+    """
+    固定大小的帧环形缓冲区，所有槽位在创建时一次性分配，写入时只做一次内存拷贝
+
+    读取有两种保证：
+    - get/latest默认在锁内把槽位复制出来，返回的帧之后不会再变化，可以放心编码或长期保存
+    - copy=False返回槽位的零拷贝视图，写入线程随时可能覆盖它；调用方用完后必须调用valid(seq)，
+      返回False时结果可能来自被撕裂的帧，应丢弃或重试（写入在锁内完成，用完后仍有效说明使用期间没有被覆盖）
+    """
+
+    def __init__(self, slots, slot_size):
+        """
+        初始化环形缓冲区
+
+        Args:
+            slots (int): 槽位数量
+            slot_size (int): 每个槽位的字节数，需不小于最大一帧的大小
+        """
+        if slots < 2:
+            raise ValueError("环形缓冲区至少需要2个槽位")
+
+        self.slots = slots
+        self.slot_size = slot_size
+        self.memory = bytearray(slots * slot_size)
+        self._view = memoryview(self.memory)
+        # 每个槽位的元数据: (seq, timestamp, width, height, stride, mode)
+        self._meta = [None] * slots
+        self._seq = 0
+        self._lock = threading.Condition()
+
+    @property
+    def memory_bytes(self):
+        return len(self.memory)
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def write(self, frame, timestamp=None):
+        """
+        写入一帧（拷贝到下一个槽位）
+
+        Args:
+            frame (Frame): 截图帧
+            timestamp (float, optional): 截图时间，默认当前时间
+
+        Returns:
+            int: 该帧的序号
+        """
+        size = frame.stride * frame.height
+        if size > self.slot_size:
+            raise ValueError(f"帧大小 {size} 超过槽位大小 {self.slot_size}")
+
+        with self._lock:
+            seq = self._seq + 1
+            index = seq % self.slots
+            offset = index * self.slot_size
+            self._view[offset:offset + size] = frame.buffer[:size]
+            self._meta[index] = (seq, timestamp or time.time(), frame.width, frame.height, frame.stride, frame.mode)
+            self._seq = seq
+            self._lock.notify_all()
+        return seq
+
+    def get(self, seq, copy=True):
+        """
+        按序号读取一帧
+
+        Args:
+            seq (int): 帧序号
+            copy (bool): 是否在锁内复制槽位；为False时返回零拷贝视图，用完后需用valid(seq)确认没有被覆盖
+
+        Returns:
+            tuple|None: (Frame, timestamp)，该帧已被覆盖时返回None
+        """
+        with self._lock:
+            meta = self._meta[seq % self.slots]
+            if meta is None or meta[0] != seq:
+                return None
+            _, timestamp, width, height, stride, mode = meta
+            offset = (seq % self.slots) * self.slot_size
+            view = self._view[offset:offset + stride * height]
+            if copy:
+                return Frame(memoryview(bytes(view)), width, height, stride, mode), timestamp
+            return Frame(view, width, height, stride, mode, owner=self), timestamp
+
+    def valid(self, seq):
+        """
+        序号为seq的帧是否仍在缓冲区中（没有被覆盖）
+        """
+        with self._lock:
+            meta = self._meta[seq % self.slots]
+            return meta is not None and meta[0] == seq
+
+    def latest(self, copy=True):
+        """
+        读取最新一帧（copy的含义见get）
+
+        Returns:
+            tuple|None: (Frame, timestamp)，缓冲区为空时返回None
+        """
+        return self.get(self._seq, copy) if self._seq else None
+
+    def recent(self, count, copy=True):
+        """
+        按时间顺序返回最近的若干帧（copy的含义见get）
+
+        Returns:
+            list: [(seq, Frame, timestamp), ...]
+        """
+        frames = []
+        for seq in range(max(1, self._seq - min(count, self.slots - 1) + 1), self._seq + 1):
+            item = self.get(seq, copy)
+            if item:
+                frames.append((seq, item[0], item[1]))
+        return frames
+
+    def wait_for(self, predicate, timeout):
+        """
+        等待直到predicate(最新帧序号)为真
+
+        Returns:
+            bool: 是否在超时前满足条件
+        """
+        with self._lock:
+            return self._lock.wait_for(lambda: predicate(self._seq), timeout)
+
+
+class BackgroundCapturer:
+    """
+    后台截图线程，按固定帧率持续把屏幕写入环形缓冲区
+
+    截图请求直接读取最新一帧而无需等待截图；界面稳定检测和变化检测也只读取缓冲区，不额外截图。
+    截图后端由本线程独占使用。
+    """
+
+    def __init__(self, backend, fps=5.0, slots=8, region=None):
+        """
+        初始化后台截图线程
+
+        Args:
+            backend (CaptureBackend): 截图后端
+            fps (float): 目标帧率，决定CPU开销
+            slots (int): 环形缓冲区槽位数，决定内存占用（每个槽位为一帧全屏大小）
+            region (tuple, optional): 截图区域 (left, top, width, height)
+        """
+        if fps <= 0:
+            raise ValueError("帧率必须大于0")
+
+        self.backend = backend
+        self.fps = fps
+        self.region = region
+        self.logger = logging.getLogger("BackgroundCapturer")
+
+        # 用一帧全屏截图确定槽位大小，之后的区域截图都不会超过它
+        probe = backend.grab(None)
+        self.buffer = FrameRingBuffer(slots, probe.stride * probe.height)
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._frames = 0
+        self._grab_seconds = 0.0
+        self._cpu_seconds = 0.0
+        self._started_at = None
+        self._last_error = None
+
+    def start(self):
+        """
+        启动后台截图线程
+        """
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="BackgroundCapturer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        停止后台截图线程并释放截图后端
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.backend.close()
+
+    def set_region(self, region):
+        """
+        修改截图区域（例如目标窗口移动后），从下一帧开始生效
+        """
+        self.region = tuple(region) if region else None
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        next_tick = time.perf_counter()
+        cpu_start = time.thread_time()
+        while not self._stop.is_set():
+            region = self.region
+            start = time.perf_counter()
+            try:
+                frame = self.backend.grab(region)
+                self.buffer.write(frame)
+                self._frames += 1
+                self._last_error = None
+            except Exception as e:
+                if self._last_error != str(e):
+                    self.logger.warning(f"后台截图失败: {e}")
+                self._last_error = str(e)
+            self._grab_seconds += time.perf_counter() - start
+            self._cpu_seconds = time.thread_time() - cpu_start
+
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                # 截图跟不上目标帧率时不累积欠账
+                next_tick = time.perf_counter()
+
+    def latest(self, since=None, timeout=1.0):
+        """
+        返回最新一帧，可要求该帧在某个时间点之后截取（例如动作执行完成之后）
+
+        Args:
+            since (float, optional): 时间戳，只接受在此之后截取的帧
+            timeout (float): 最长等待时间
+
+        Returns:
+            Frame|None: 截图帧（从缓冲区复制出来，之后不会被后台线程覆盖），超时返回None
+        """
+        def ready(seq):
+            # 只用到元数据，不复制像素
+            item = self.buffer.get(seq, copy=False) if seq else None
+            if item is None:
+                return False
+            frame, timestamp = item
+            if since is not None and timestamp < since:
+                return False
+            if self.region and (frame.width, frame.height) != tuple(self.region[2:]):
+                return False
+            return True
+
+        if not self.buffer.wait_for(ready, timeout):
+            return None
+        return self.buffer.latest()[0]
+
+    def changed_since(self, seq, threshold=0.002):
+        """
+        判断从指定帧到最新帧之间画面是否发生变化
+
+        Args:
+            seq (int): 参考帧序号
+            threshold (float): 变化像素比例阈值
+
+        Returns:
+            bool|None: 是否变化，参考帧已被覆盖时返回None
+        """
+        # 直接比较槽位视图，比较完再确认两帧都没有在比较期间被覆盖
+        while True:
+            old = self.buffer.get(seq, copy=False)
+            new_seq = self.buffer.seq
+            new = self.buffer.get(new_seq, copy=False)
+            if not old or not new:
+                return None
+            changed = frame_difference(old[0], new[0]) > threshold
+            if not self.buffer.valid(seq):
+                return None
+            if self.buffer.valid(new_seq):
+                return changed
+
+    def wait_for_settle(self, since=None, stable_frames=3, threshold=0.002, timeout=10.0):
+        """
+        等待画面稳定：连续若干帧之间没有明显变化
+
+        Args:
+            since (float, optional): 只考虑在此时间之后截取的帧
+            stable_frames (int): 需要连续稳定的帧数
+            threshold (float): 变化像素比例阈值
+            timeout (float): 最长等待时间
+
+        Returns:
+            float|None: 从开始等待到画面稳定所用的秒数，超时返回None
+        """
+        start = time.time()
+        since = since or start
+        last_seq = 0
+        while time.time() - start < timeout:
+            seq = self.buffer.seq
+            if seq != last_seq:
+                last_seq = seq
+                recent = [(s, f) for s, f, ts in self.buffer.recent(stable_frames + 1, copy=False) if ts >= since]
+                frames = [f for _, f in recent]
+                # 比较的是槽位视图，比较期间被覆盖的帧结果不可信，等下一帧再判断
+                if len(frames) == stable_frames + 1 and all(
+                    frame_difference(a, b) <= threshold for a, b in zip(frames, frames[1:])
+                ) and all(self.buffer.valid(s) for s, _ in recent):
+                    return time.time() - start
+            self.buffer.wait_for(lambda s: s != last_seq, timeout=max(0.0, timeout - (time.time() - start)))
+        return None
+
+    def stats(self):
+        """
+        返回后台截图的开销统计
+
+        Returns:
+            dict: 目标/实际帧率、平均截图耗时、CPU占用和缓冲区内存
+        """
+        elapsed = max(time.time() - (self._started_at or time.time()), 1e-6)
+        return {
+            "fps_target": self.fps,
+            "fps_actual": self._frames / elapsed,
+            "frames": self._frames,
+            "grab_ms_avg": self._grab_seconds * 1000 / max(self._frames, 1),
+            "cpu_percent": self._cpu_seconds * 100 / elapsed,
+            "slots": self.buffer.slots,
+            "memory_bytes": self.buffer.memory_bytes,
+        }
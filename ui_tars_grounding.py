@@ -0,0 +1,248 @@
+import logging
+
+
+def to_gray(image):
+    """
+    把截图转换为灰度数组
+
+    Args:
+        image: Frame、PIL图片、NumPy数组 (H, W[, C]) 或图片路径
+
+    Returns:
+        numpy.ndarray: (H, W) 的int16灰度数组
+    """
+    import numpy as np
+
+    if isinstance(image, str):
+        from PIL import Image
+        with Image.open(image) as opened:
+            image = np.asarray(opened.convert("RGB"))
+    elif hasattr(image, "array") and hasattr(image, "mode"):
+        # ui_tars_capture.Frame
+        pixels = image.array
+        if image.mode == "BGRX":
+            pixels = pixels[..., 2::-1]
+        image = pixels
+    elif not isinstance(image, np.ndarray):
+        image = np.asarray(image.convert("RGB"))
+
+    if image.ndim == 2:
+        return image.astype(np.int16)
+    # 整数近似的亮度: (R*77 + G*150 + B*29) / 256
+    rgb = image[..., :3].astype(np.int32)
+    return ((rgb[..., 0] * 77 + rgb[..., 1] * 150 + rgb[..., 2] * 29) >> 8).astype(np.int16)
+
+
+class ElementDetector:
+    """
+    基于边缘的轻量界面元素检测器（纯NumPy，仅用CPU）
+
+    检测过程：
+    1. 灰度图的水平/垂直差分取绝对值，超过阈值的像素视为边缘
+    2. 按cell×cell像素分块，含边缘的块标记为前景，再膨胀一个块把文字和按钮边框连成一片
+    3. 对前景块做连通域标记（按行程合并），每个连通域的外接矩形即一个候选元素
+
+    用于在点击前检查模型给出的位置：落在元素内则照常点击，靠近元素则吸附到元素中心，
+    周围没有任何元素和边缘则判定为空白背景。
+    """
+
+    def __init__(self, edge_threshold=8, cell=4, min_size=6, max_area_ratio=0.25,
+                 line_length=400, snap_distance=24, empty_radius=8, block_empty=True):
+        """
+        初始化元素检测器
+
+        Args:
+            edge_threshold (int): 相邻像素灰度差超过该值视为边缘
+            cell (int): 分块大小（像素），越大越快、元素越粗
+            min_size (int): 元素的最小宽高（像素），更小的视为噪点
+            max_area_ratio (float): 元素面积占整帧的上限，更大的视为容器/窗口而不是控件
+            line_length (int): 长度不小于该值的水平/垂直边缘视为分隔线，检测元素前去掉
+            snap_distance (int): 点击位置距元素边缘在该距离内时吸附到元素中心（像素）
+            empty_radius (int): 判定空白背景时检查的邻域半径（像素）
+            block_empty (bool): 点击位置落在空白背景上时是否拦截点击，False时只记录警告
+        """
+        self.edge_threshold = edge_threshold
+        self.cell = cell
+        self.min_size = min_size
+        self.max_area_ratio = max_area_ratio
+        self.line_length = line_length
+        self.snap_distance = snap_distance
+        self.empty_radius = empty_radius
+        self.block_empty = block_empty
+        self.logger = logging.getLogger("ElementDetector")
+
+    def edges(self, gray):
+        """
+        计算边缘掩码
+
+        Args:
+            gray (numpy.ndarray): (H, W) 灰度数组
+
+        Returns:
+            numpy.ndarray: (H, W) 布尔数组
+        """
+        import numpy as np
+
+        mask = np.zeros(gray.shape, dtype=bool)
+        mask[:, 1:] |= np.abs(np.diff(gray, axis=1)) > self.edge_threshold
+        mask[1:, :] |= np.abs(np.diff(gray, axis=0)) > self.edge_threshold
+        return mask
+
+    def _remove_lines(self, mask):
+        """
+        去掉长直线（分隔线、窗格边框），避免它们把整列控件连成一个连通域
+
+        某一行（列）上连续line_length个像素都是边缘时，这一段视为直线
+        """
+        return mask & ~self._row_lines(mask) & ~self._row_lines(mask.T).T
+
+    def _row_lines(self, mask):
+        # 按行查找长度不小于line_length的连续边缘段，返回这些段覆盖的像素
+        import numpy as np
+
+        length = self.line_length
+        lines = np.zeros_like(mask)
+        # 只有边缘像素总数够多的行才可能含有直线，大部分行可以直接跳过
+        candidates = np.nonzero(np.count_nonzero(mask, axis=1) >= length)[0]
+        if not len(candidates):
+            return lines
+        rows = mask[candidates]
+        width = rows.shape[1]
+        counts = np.zeros((len(candidates), width + 1), dtype=np.int32)
+        np.cumsum(rows, axis=1, out=counts[:, 1:])
+        # ends[:, j]: 以第j列结尾的窗口全部是边缘
+        ends = np.zeros((len(candidates), width + length), dtype=np.int32)
+        ends[:, length - 1:width] = (counts[:, length:] - counts[:, :-length]) == length
+        # 第k列被覆盖：结尾在[k, k+length-1]内的窗口中至少有一个全部是边缘
+        covered = np.zeros((len(candidates), width + length + 1), dtype=np.int32)
+        np.cumsum(ends, axis=1, out=covered[:, 1:])
+        lines[candidates] = (covered[:, length:length + width] - covered[:, :width]) > 0
+        return lines
+
+    def _cells(self, mask):
+        # 分块：块内有任意边缘像素即为前景，再向四邻域膨胀一个块
+        cell = self.cell
+        rows, cols = mask.shape[0] // cell, mask.shape[1] // cell
+        blocks = mask[:rows * cell, :cols * cell].reshape(rows, cell, cols, cell).any(axis=(1, 3))
+        grown = blocks.copy()
+        grown[1:, :] |= blocks[:-1, :]
+        grown[:-1, :] |= blocks[1:, :]
+        grown[:, 1:] |= blocks[:, :-1]
+        grown[:, :-1] |= blocks[:, 1:]
+        return grown
+
+    def _label_runs(self, grid):
+        """
+        按行程做连通域标记：每行的连续前景段为一个行程，与上一行重叠的行程合并
+
+        Returns:
+            list: 每个连通域的外接矩形 (col1, row1, col2, row2)，单位为块，右下角不含
+        """
+        import numpy as np
+
+        padded = np.zeros((grid.shape[0], grid.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = grid
+        changes = np.diff(padded, axis=1)
+        starts_r, starts_c = np.nonzero(changes == 1)
+        _, ends_c = np.nonzero(changes == -1)
+
+        parent = list(range(len(starts_r)))
+
+        def find(index):
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        # 行程按行有序；与上一行的行程逐个比较列区间是否重叠
+        previous, current, row = [], [], -1
+        for index, (r, c1, c2) in enumerate(zip(starts_r.tolist(), starts_c.tolist(), ends_c.tolist())):
+            if r != row:
+                previous = current if r == row + 1 else []
+                current, row = [], r
+            for other, o1, o2 in previous:
+                if o1 < c2 and c1 < o2:
+                    a, b = find(index), find(other)
+                    if a != b:
+                        parent[b] = a
+            current.append((index, c1, c2))
+
+        boxes = {}
+        for index, (r, c1, c2) in enumerate(zip(starts_r.tolist(), starts_c.tolist(), ends_c.tolist())):
+            root = find(index)
+            box = boxes.get(root)
+            if box is None:
+                boxes[root] = [c1, r, c2, r + 1]
+            else:
+                box[0] = min(box[0], c1)
+                box[2] = max(box[2], c2)
+                box[3] = r + 1
+        return list(boxes.values())
+
+    def detect(self, image):
+        """
+        检测界面元素
+
+        Args:
+            image: Frame、PIL图片、NumPy数组或图片路径
+
+        Returns:
+            dict: gray、edges（供后续检查复用）和elements（[(x1, y1, x2, y2), ...]，像素坐标，右下角不含）
+        """
+        gray = to_gray(image)
+        edges = self._remove_lines(self.edges(gray))
+        height, width = gray.shape
+        max_area = width * height * self.max_area_ratio
+
+        elements = []
+        for c1, r1, c2, r2 in self._label_runs(self._cells(edges)):
+            x1, y1 = c1 * self.cell, r1 * self.cell
+            x2, y2 = min(width, c2 * self.cell), min(height, r2 * self.cell)
+            w, h = x2 - x1, y2 - y1
+            if w < self.min_size or h < self.min_size or w * h > max_area:
+                continue
+            elements.append((x1, y1, x2, y2))
+        return {"gray": gray, "edges": edges, "elements": elements, "size": (width, height)}
+
+    def locate(self, detection, x, y):
+        """
+        检查点击位置是否落在界面元素上，必要时吸附到最近的元素
+
+        Args:
+            detection (dict): detect()的结果
+            x (int): 帧内横坐标
+            y (int): 帧内纵坐标
+
+        Returns:
+            dict: status（hit=落在元素上，snapped=已吸附，empty=空白背景）、
+                调整后的x/y、命中的element以及吸附距离distance
+        """
+        import numpy as np
+
+        elements = detection["elements"]
+        if elements:
+            boxes = np.asarray(elements)
+            # 点到每个矩形的距离，点在矩形内时为0
+            dx = np.maximum(np.maximum(boxes[:, 0] - x, 0), x - (boxes[:, 2] - 1))
+            dy = np.maximum(np.maximum(boxes[:, 1] - y, 0), y - (boxes[:, 3] - 1))
+            distance = np.hypot(dx, dy)
+
+            inside = np.nonzero(distance == 0)[0]
+            if len(inside):
+                areas = (boxes[inside, 2] - boxes[inside, 0]) * (boxes[inside, 3] - boxes[inside, 1])
+                best = inside[int(np.argmin(areas))]
+                return {"status": "hit", "x": x, "y": y, "element": tuple(elements[best]), "distance": 0.0}
+
+            best = int(np.argmin(distance))
+            if distance[best] <= self.snap_distance:
+                x1, y1, x2, y2 = elements[best]
+                return {"status": "snapped", "x": (x1 + x2 - 1) // 2, "y": (y1 + y2 - 1) // 2,
+                        "element": tuple(elements[best]), "distance": float(distance[best])}
+
+        # 不属于任何候选元素：邻域内仍有边缘（例如大面积容器中的内容）时照常点击
+        edges = detection["edges"]
+        r = self.empty_radius
+        patch = edges[max(0, y - r):y + r + 1, max(0, x - r):x + r + 1]
+        if patch.any():
+            return {"status": "hit", "x": x, "y": y, "element": None, "distance": 0.0}
+        return {"status": "empty", "x": x, "y": y, "element": None, "distance": None}
@@ -0,0 +1,357 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+
+class InputEvent:
+    """
+    一个底层输入事件，at为相对于事件序列开始的时间（秒）
+
+    - move:    移动鼠标到 (x, y)
+    - down/up: 按下/松开鼠标按键（button）
+    - key_down/key_up: 按下/松开键盘按键（key）
+    - scroll/hscroll:  垂直/水平滚动clicks格
+    - text:    逐字符键入文本（只适用于键盘上能直接输入的字符，中文等用剪贴板粘贴）
+    - call:    在输入线程中调用一个函数（如写入剪贴板）
+    - idle:    不产生输入，只占用时间（序列在该时刻之后才算完成）
+    """
+
+    __slots__ = ("kind", "args", "at")
+
+    def __init__(self, kind, *args, at=0.0):
+        self.kind = kind
+        self.args = args
+        self.at = at
+
+    def __repr__(self):
+        return f"InputEvent({self.kind!r}, {', '.join(repr(a) for a in self.args)}, at={self.at:.3f})"
+
+
+def click_events(x, y, button="left", clicks=1, interval=0.0, at=0.0):
+    """
+    点击的事件序列：移动到 (x, y)，按下并松开clicks次
+
+    Returns:
+        list: InputEvent列表
+    """
+    events = [InputEvent("move", x, y, at=at)]
+    for i in range(clicks):
+        start = at + i * interval
+        events.append(InputEvent("down", button, at=start))
+        events.append(InputEvent("up", button, at=start))
+    return events
+
+
+def drag_events(start, end, duration=0.5, button="left", hold=0.1, step=0.01, at=0.0):
+    """
+    拖拽的事件序列：移动到起点，hold秒后按下，在duration秒内每隔step秒匀速移动一次，到终点后松开
+
+    Returns:
+        list: InputEvent列表
+    """
+    (x1, y1), (x2, y2) = start, end
+    pressed = at + hold
+    events = [InputEvent("move", x1, y1, at=at), InputEvent("down", button, at=pressed)]
+    steps = max(1, int(duration / step))
+    for i in range(1, steps + 1):
+        ratio = i / steps
+        events.append(InputEvent("move", round(x1 + (x2 - x1) * ratio), round(y1 + (y2 - y1) * ratio),
+                                 at=pressed + duration * ratio))
+    events.append(InputEvent("up", button, at=pressed + duration))
+    return events
+
+
+def chord_events(keys, at=0.0):
+    """
+    组合键的事件序列：依次按下，再按相反顺序松开
+
+    Returns:
+        list: InputEvent列表
+    """
+    return ([InputEvent("key_down", key, at=at) for key in keys]
+            + [InputEvent("key_up", key, at=at) for key in reversed(keys)])
+
+
+class PyAutoGUIBackend:
+    """
+    通过pyautogui产生输入事件；每个调用都关闭pyautogui自带的PAUSE停顿，节奏由事件时间决定
+    """
+
+    def __init__(self):
+        from ui_tars_executor import _pyautogui
+        self.gui = _pyautogui()
+
+    def check(self):
+        # 鼠标在屏幕角落时抛出FailSafeException（pyautogui.FAILSAFE为True时）
+        if hasattr(self.gui, "failSafeCheck"):
+            self.gui.failSafeCheck()
+
+    def move(self, x, y):
+        self.gui.moveTo(x, y, _pause=False)
+
+    def down(self, button):
+        self.gui.mouseDown(button=button, _pause=False)
+
+    def up(self, button):
+        self.gui.mouseUp(button=button, _pause=False)
+
+    def key_down(self, key):
+        self.gui.keyDown(key, _pause=False)
+
+    def key_up(self, key):
+        self.gui.keyUp(key, _pause=False)
+
+    def scroll(self, clicks):
+        self.gui.scroll(clicks, _pause=False)
+
+    def hscroll(self, clicks):
+        self.gui.hscroll(clicks, _pause=False)
+
+    def text(self, content):
+        self.gui.write(content, _pause=False)
+
+
+class InputCancelled(Exception):
+    """事件序列在执行过程中被取消"""
+
+
+class _Sequence:
+    __slots__ = ("events", "future", "on_abort", "cancelled")
+
+    def __init__(self, events, on_abort):
+        self.events = sorted(events, key=lambda event: event.at)
+        self.future = Future()
+        self.on_abort = on_abort
+        self.cancelled = False
+
+
+class InputEngine:
+    """
+    输入事件引擎：专用线程按计划时间逐个产生底层输入事件
+
+    高层动作编译为事件序列后提交，返回Future，调用方在输入进行期间可以继续截图、编码或等待模型；
+    序列按提交顺序执行。每个事件先用可中断的等待睡到计划时间前spin_ms毫秒，再忙等到计划时间，
+    事件之间的间隔稳定在亚毫秒级，不受调用方线程和GIL调度的影响。
+
+    每个事件之前检查pyautogui的FAILSAFE（鼠标移到屏幕角落），触发时当前序列和排队的序列都以
+    FailSafeException结束；序列被取消或出错时松开仍按住的鼠标按键和键盘按键，再调用on_abort。
+
+        engine = InputEngine()
+        future = engine.submit(click_events(500, 300))
+        ...  # 输入进行期间做其他事情
+        future.result()
+    """
+
+    def __init__(self, backend=None, spin_ms=1.0):
+        """
+        初始化输入引擎
+
+        Args:
+            backend (optional): 输入后端（move、down、up、key_down、key_up、scroll、hscroll、text、check），
+                默认为PyAutoGUIBackend（第一次执行时创建）
+            spin_ms (float): 计划时间前最后这段时间忙等（毫秒），越大越准时但越占CPU
+        """
+        self.backend = backend
+        self.spin = spin_ms / 1000
+        self.logger = logging.getLogger("InputEngine")
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._current = None
+        self._pending = []
+        self._thread = None
+        self._closed = False
+        self._held_buttons = set()
+        self._held_keys = []
+        self.stats = {"sequences": 0, "events": 0, "cancelled": 0, "failed": 0, "lag_total": 0.0, "lag_max": 0.0}
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("输入引擎已关闭")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="InputEngine", daemon=True)
+                self._thread.start()
+
+    def submit(self, events, on_abort=None):
+        """
+        提交一个事件序列
+
+        Args:
+            events (list): InputEvent列表，at为相对于序列开始执行时的时间
+            on_abort (callable, optional): 序列被取消或出错时在输入线程中调用（如恢复剪贴板）
+
+        Returns:
+            Future: 完成时的结果为 {"events", "started"（开始执行时的perf_counter）, "seconds", "avg_lag_ms",
+                "max_lag_ms"}，
+                取消时为InputCancelled异常（尚未开始的序列直接取消），FAILSAFE触发时为FailSafeException
+        """
+        self._ensure_thread()
+        sequence = _Sequence(events, on_abort)
+        with self._lock:
+            self._pending.append(sequence)
+        self._queue.put(sequence)
+        return sequence.future
+
+    def cancel(self):
+        """
+        取消排队和正在执行的所有事件序列
+
+        Returns:
+            int: 取消的序列数
+        """
+        with self._lock:
+            sequences = list(self._pending)
+            if self._current is not None:
+                sequences.append(self._current)
+        for sequence in sequences:
+            sequence.cancelled = True
+            sequence.future.cancel()
+        self._wake.set()
+        return len(sequences)
+
+    def _run(self):
+        while True:
+            sequence = self._queue.get()
+            if sequence is None:
+                return
+            with self._lock:
+                self._pending.remove(sequence)
+                if not sequence.future.set_running_or_notify_cancel():
+                    self.stats["cancelled"] += 1
+                    continue
+                self._current = sequence
+            try:
+                result = self._play(sequence)
+            except BaseException as e:
+                self._abort(sequence)
+                with self._lock:
+                    self.stats["cancelled" if isinstance(e, InputCancelled) else "failed"] += 1
+                    self._current = None
+                if not isinstance(e, InputCancelled):
+                    self.logger.warning(f"输入事件执行失败: {e}")
+                    if type(e).__name__ == "FailSafeException":
+                        # 用户把鼠标移到了屏幕角落，排队的序列一起结束
+                        for pending in list(self._pending):
+                            pending.cancelled = True
+                            pending.future.cancel()
+                sequence.future.set_exception(e)
+                continue
+            with self._lock:
+                self._current = None
+                self.stats["sequences"] += 1
+            sequence.future.set_result(result)
+
+    def _wait_until(self, deadline, sequence):
+        # 可中断地睡到计划时间前spin秒，再忙等到计划时间
+        while True:
+            if sequence.cancelled:
+                raise InputCancelled("输入已取消")
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            if remaining > self.spin:
+                if self._wake.wait(remaining - self.spin):
+                    self._wake.clear()
+
+    def _play(self, sequence):
+        if self.backend is None:
+            self.backend = PyAutoGUIBackend()
+        backend = self.backend
+        start = time.perf_counter()
+        lags = []
+        for event in sequence.events:
+            deadline = start + event.at
+            self._wait_until(deadline, sequence)
+            if event.kind != "idle":
+                backend.check()
+            lags.append(time.perf_counter() - deadline)
+            self._dispatch(backend, event)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.stats["events"] += len(lags)
+            self.stats["lag_total"] += sum(lags)
+            self.stats["lag_max"] = max([self.stats["lag_max"]] + lags)
+        return {
+            "events": len(lags),
+            "started": start,
+            "seconds": seconds,
+            "avg_lag_ms": sum(lags) * 1000 / max(len(lags), 1),
+            "max_lag_ms": max(lags, default=0.0) * 1000,
+        }
+
+    def _dispatch(self, backend, event):
+        kind, args = event.kind, event.args
+        if kind == "move":
+            backend.move(*args)
+        elif kind == "down":
+            backend.down(*args)
+            self._held_buttons.add(args[0])
+        elif kind == "up":
+            backend.up(*args)
+            self._held_buttons.discard(args[0])
+        elif kind == "key_down":
+            backend.key_down(*args)
+            self._held_keys.append(args[0])
+        elif kind == "key_up":
+            backend.key_up(*args)
+            if args[0] in self._held_keys:
+                self._held_keys.remove(args[0])
+        elif kind == "scroll":
+            backend.scroll(*args)
+        elif kind == "hscroll":
+            backend.hscroll(*args)
+        elif kind == "text":
+            backend.text(*args)
+        elif kind == "call":
+            args[0]()
+        elif kind != "idle":
+            raise ValueError(f"未知的输入事件: {kind}")
+
+    def _abort(self, sequence):
+        # 松开仍按住的按键，避免取消或出错后鼠标键盘停留在按下状态
+        backend = self.backend
+        for key in reversed(self._held_keys):
+            try:
+                backend.key_up(key)
+            except Exception as e:
+                self.logger.warning(f"松开按键{key}失败: {e}")
+        for button in self._held_buttons:
+            try:
+                backend.up(button)
+            except Exception as e:
+                self.logger.warning(f"松开鼠标{button}键失败: {e}")
+        self._held_keys = []
+        self._held_buttons = set()
+        if sequence.on_abort:
+            try:
+                sequence.on_abort()
+            except Exception as e:
+                self.logger.warning(f"输入中止后的清理失败: {e}")
+
+    def report(self):
+        """
+        返回输入统计
+
+        Returns:
+            dict: sequences、events、cancelled、failed、avg_lag_ms、max_lag_ms
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats["avg_lag_ms"] = stats.pop("lag_total") * 1000 / max(stats["events"], 1)
+        stats["max_lag_ms"] = stats.pop("lag_max") * 1000
+        return stats
+
+    def close(self):
+        """
+        取消所有序列并停止输入线程
+        """
+        self.cancel()
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        if thread:
+            self._queue.put(None)
+            thread.join(timeout=2)
@@ -0,0 +1,590 @@
+"""
+UI-TARS任务队列服务：通过HTTP提交UI任务，按步骤实时推送执行结果
+
+    POST   /jobs                 提交任务，返回job_id（队列已满时返回429）
+    GET    /jobs                 任务列表
+    GET    /jobs/{job_id}        任务状态和已执行的步骤
+    POST   /jobs/{job_id}/cancel 取消任务（排队中直接移出队列，运行中在当前步骤结束后停止）
+    GET    /jobs/{job_id}/events 以SSE推送任务事件
+    WS     /jobs/{job_id}/ws     以WebSocket推送任务事件，客户端发送"cancel"可取消任务
+    GET    /stats                队列深度、运行中任务数和并发上限
+
+    python ui_tars_jobs.py --port 8000 --concurrency 1 --max-queue 100
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from uuid import uuid4
+from collections import deque, OrderedDict
+
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """任务队列已满"""
+
+
+class JobCancelled(Exception):
+    """任务在执行过程中被取消"""
+
+
+class Job:
+    """
+    一个UI任务及其事件流
+
+    事件按顺序编号保存，订阅者先补发已有事件再接收新事件，断线重连时可从指定序号继续。
+    """
+
+    def __init__(self, task, options=None):
+        self.id = uuid4().hex
+        self.task = task
+        self.options = options or {}
+        self.status = QUEUED
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """
+        运行中检查取消标记，已取消时抛出JobCancelled
+        """
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def publish(self, event_type, **data):
+        """
+        记录一个事件并推送给所有订阅者（可在任意线程调用）
+
+        Returns:
+            dict: 事件
+        """
+        with self._lock:
+            event = {"id": len(self.events), "type": event_type, "job_id": self.id, "time": time.time(), **data}
+            self.events.append(event)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # 订阅者的事件循环已关闭
+                pass
+        return event
+
+    async def stream(self, since=0):
+        """
+        异步迭代任务事件：先补发序号不小于since的已有事件，再等待新事件，任务结束后停止
+
+        Args:
+            since (int): 起始事件序号
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        subscriber = (loop, queue)
+        with self._lock:
+            backlog = self.events[since:]
+            self._subscribers.append(subscriber)
+        try:
+            last_id = since - 1
+            for event in backlog:
+                last_id = event["id"]
+                yield event
+                if event["type"] == "end":
+                    return
+            while True:
+                event = await queue.get()
+                if event["id"] <= last_id:
+                    continue
+                last_id = event["id"]
+                yield event
+                if event["type"] == "end":
+                    return
+        finally:
+            with self._lock:
+                self._subscribers.remove(subscriber)
+
+    def to_dict(self, events=False):
+        """
+        转换为可序列化的字典
+
+        Args:
+            events (bool): 是否包含全部事件
+        """
+        data = {
+            "job_id": self.id,
+            "task": self.task,
+            "options": self.options,
+            "status": self.status,
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": sum(1 for e in self.events if e["type"] == "step"),
+        }
+        if events:
+            data["events"] = list(self.events)
+        return data
+
+
+def run_ui_task(job, defaults=None, batcher=None, encoder=None, checkpoint=None, on_checkpoint=None):
+    """
+    默认的任务执行函数：复用多轮会话的循环（截图 → 模型 → 执行 → 自动反馈），每步推送一个step事件
+
+    传入on_checkpoint时录制操作轨迹，每步之后把到目前为止的轨迹交给它保存；传入checkpoint（之前保存的轨迹）时
+    先回放轨迹把界面带到中断时的状态（界面不一致的步骤调用模型），再继续执行，推送一个resumed事件
+
+    支持的选项：max_steps、max_seconds、use_screenshot、window_title、window_pid、capture、
+    background_fps、token_budget、grounding、target_cache、settle_seconds、
+    num_history_responses，执行器的scroll_clicks、drag_duration、type_delay、wait_seconds，
+    循环检测的repeat_limit、stall_steps、oscillation_cycles、loop_corrections，
+    模型路由的route、text_model，反馈格式feedback_style，观察方式observation，以及动作效果检查verify_effects
+
+    Args:
+        job (Job): 任务
+        defaults (dict, optional): 任务没有指定的选项使用的默认值（如ui_tars_config加载的配置）
+        batcher (MicroBatcher, optional): 所有任务共用的请求合并器
+        encoder (FrameEncoder, optional): 所有任务共用的截图编码进程池
+        checkpoint (dict, optional): 之前保存的轨迹（task、steps、created），从中断处继续
+        on_checkpoint (callable, optional): 每步之后调用 on_checkpoint(trajectory_dict)
+
+    Returns:
+        dict: 任务结果（最后一个动作和步骤数）
+    """
+    from ui_tars_session import MultiTurnAgent
+    from ui_tars_config import executor_options, loop_options
+    from ui_tars_progress import ProgressMonitor
+    from ui_tars_replay import Trajectory
+    from ui_tars_router import create_router
+
+    options = dict(defaults or {}, **job.options)
+    max_steps = options.get("max_steps", 10)
+    settle_seconds = options.get("settle_seconds", 10)
+
+    agent = MultiTurnAgent(
+        use_screenshot=options.get("use_screenshot", True),
+        verbose=0,
+        window_title=options.get("window_title"),
+        window_pid=options.get("window_pid"),
+        capture=options.get("capture", "auto"),
+        background_fps=options.get("background_fps", 0),
+        token_budget=options.get("token_budget"),
+        grounding=options.get("grounding", False),
+        target_cache=options.get("target_cache"),
+        num_history_responses=options.get("num_history_responses", 20),
+        executor_options=executor_options(options),
+        monitor=ProgressMonitor(max_steps=max_steps, max_seconds=options.get("max_seconds"),
+                                **loop_options(options)),
+        router=create_router(options.get("route", False), options.get("text_model")),
+        batcher=batcher,
+        encoder=encoder,
+        feedback_style=options.get("feedback_style", "template"),
+        observation=options.get("observation", "screenshot"),
+        verify_effects=options.get("verify_effects", False),
+        record=checkpoint is not None or on_checkpoint is not None,
+    )
+    # 多个任务并发时各用各的截图文件
+    agent.screenshot_path = os.path.join(tempfile.gettempdir(), f"ui_tars_job_{job.id}.png")
+
+    def publish_step(step, result):
+        job.publish(
+            "step",
+            step=step,
+            thought=result["thought"],
+            action=result["action"],
+            execution=result["execution"],
+        )
+        save_checkpoint()
+
+    def save_checkpoint():
+        if on_checkpoint:
+            trajectory = agent.trajectory
+            on_checkpoint({"task": trajectory.task, "created": trajectory.created, "steps": list(trajectory.steps)})
+
+    try:
+        result, steps = None, 0
+        resume = Trajectory(**checkpoint) if checkpoint else None
+        if resume and any(step.get("status") == "success" for step in resume.steps):
+            # 新的桌面从头开始，回放已完成的步骤回到中断时的状态，回放的步骤不占用步骤预算
+            agent.monitor.max_steps += len(resume)
+            stats = agent.replay(resume, max_extra_steps=0, settle_seconds=settle_seconds)
+            job.publish("resumed", **stats)
+            save_checkpoint()
+            steps = stats["steps"]
+            # 轨迹中的步骤与process_task的结果一样含action
+            result = agent.trajectory.steps[-1] if agent.trajectory.steps else None
+        if result is None:
+            result = agent.process_initial_task(job.task)
+            publish_step(steps, result)
+        while result["action"]["type"] != "finished" and not agent.should_stop():
+            job.check_cancelled()
+            steps += 1
+            feedback = agent.next_feedback()
+            if agent.capturer:
+                agent.wait_for_settle(settle_seconds)
+            elif job.cancel_event.wait(settle_seconds):
+                raise JobCancelled()
+            job.check_cancelled()
+            result = agent.process_feedback(feedback)
+            publish_step(steps, result)
+
+        return {
+            "finished": result["action"]["type"] == "finished",
+            "steps": agent.steps_taken,
+            "last_action": result["action"],
+            "progress": agent.monitor.report(),
+            "routes": agent.agent.router.report() if agent.agent.router else None,
+        }
+    finally:
+        agent.close()
+        if os.path.exists(agent.screenshot_path):
+            os.remove(agent.screenshot_path)
+
+
+class JobManager:
+    """
+    任务队列：有界队列 + 固定数量的工作线程
+
+    同一台桌面同一时间只能有一个任务在操作鼠标键盘，因此默认并发为1；
+    窗口模式下操作互不重叠的窗口时可以调大并发。
+    """
+
+    def __init__(self, runner=None, concurrency=1, max_queue=100, keep_finished=200):
+        """
+        初始化任务队列
+
+        Args:
+            runner (callable, optional): 执行任务的函数 runner(job) -> result，默认run_ui_task
+            concurrency (int): 同时运行的任务数
+            max_queue (int): 排队任务数上限，超出时拒绝提交
+            keep_finished (int): 保留的已结束任务数，超出后丢弃最早的
+        """
+        if concurrency < 1:
+            raise ValueError("并发数至少为1")
+
+        self.runner = runner or run_ui_task
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.keep_finished = keep_finished
+        self.logger = logging.getLogger("JobManager")
+
+        self.jobs = OrderedDict()
+        self._queue = deque()
+        self._running = 0
+        self._finished = deque()
+        self._counts = {SUCCEEDED: 0, FAILED: 0, CANCELLED: 0}
+        self._condition = threading.Condition()
+        self._workers = []
+        self._stopping = False
+
+    def start(self):
+        """
+        启动工作线程
+        """
+        with self._condition:
+            self._stopping = False
+            while len(self._workers) < self.concurrency:
+                worker = threading.Thread(target=self._work, name=f"JobWorker-{len(self._workers)}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """
+        停止工作线程，正在运行的任务会收到取消请求
+        """
+        with self._condition:
+            self._stopping = True
+            for job in self.jobs.values():
+                if job.status == RUNNING:
+                    job.cancel_event.set()
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def submit(self, task, options=None):
+        """
+        提交任务
+
+        Returns:
+            Job: 新任务
+
+        Raises:
+            QueueFullError: 排队任务数已达上限
+        """
+        job = Job(task, options)
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                raise QueueFullError(f"任务队列已满（{self.max_queue}）")
+            self.jobs[job.id] = job
+            self._queue.append(job)
+            position = len(self._queue)
+            self._condition.notify()
+        job.publish("queued", position=position)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def position(self, job):
+        """
+        返回任务在队列中的位置（从1开始），不在队列中返回None
+        """
+        with self._condition:
+            for index, queued in enumerate(self._queue):
+                if queued is job:
+                    return index + 1
+        return None
+
+    def cancel(self, job_id):
+        """
+        取消任务
+
+        Returns:
+            Job|None: 任务，不存在时返回None
+        """
+        with self._condition:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINAL_STATUSES:
+                return job
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                self._queue.remove(job)
+                self._finish(job, CANCELLED)
+                finished = True
+            else:
+                finished = False
+        if finished:
+            job.publish("end", status=CANCELLED)
+        return job
+
+    def _finish(self, job, status, error=None, result=None):
+        # 调用方持有self._condition
+        job.status = status
+        job.error = error
+        job.result = result
+        job.finished_at = time.time()
+        self._counts[status] += 1
+        self._finished.append(job.id)
+        while len(self._finished) > self.keep_finished:
+            self.jobs.pop(self._finished.popleft(), None)
+
+    def _work(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._stopping)
+                if self._stopping:
+                    return
+                job = self._queue.popleft()
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._running += 1
+            job.publish("started", queued_seconds=job.started_at - job.created_at)
+
+            status, error, result = SUCCEEDED, None, None
+            try:
+                result = self.runner(job)
+                if job.cancelled:
+                    status = CANCELLED
+            except JobCancelled:
+                status = CANCELLED
+            except Exception as e:
+                self.logger.exception(f"任务 {job.id} 执行失败")
+                status, error = FAILED, str(e)
+
+            with self._condition:
+                self._running -= 1
+                self._finish(job, status, error, result)
+            job.publish("end", status=status, error=error, result=result)
+
+    def stats(self):
+        """
+        返回队列统计
+
+        Returns:
+            dict: 队列深度、运行中任务数、并发上限和各状态的累计数量
+        """
+        with self._condition:
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "concurrency": self.concurrency,
+                **self._counts,
+            }
+
+
+def create_app(manager):
+    """
+    创建任务队列的FastAPI应用
+
+    Args:
+        manager (JobManager): 任务队列，随应用启动和关闭
+
+    Returns:
+        FastAPI: 应用对象
+    """
+    from typing import Optional
+    from contextlib import asynccontextmanager
+
+    from pydantic import BaseModel
+    from fastapi import FastAPI, HTTPException, Header, WebSocket
+    from fastapi.responses import StreamingResponse
+
+    class JobRequest(BaseModel):
+        # 未知的选项返回422，不静默忽略
+        model_config = {"extra": "forbid"}
+
+        task: str
+        # 未指定的选项使用服务的默认配置
+        max_steps: Optional[int] = None
+        max_seconds: Optional[float] = None
+        use_screenshot: bool = True
+        window_title: Optional[str] = None
+        window_pid: Optional[int] = None
+        capture: Optional[str] = None
+        background_fps: Optional[float] = None
+        token_budget: Optional[int] = None
+        grounding: Optional[bool] = None
+        target_cache: Optional[str] = None
+        settle_seconds: Optional[float] = None
+        num_history_responses: Optional[int] = None
+        # 执行器节奏
+        scroll_clicks: Optional[int] = None
+        drag_duration: Optional[float] = None
+        type_delay: Optional[float] = None
+        wait_seconds: Optional[float] = None
+        # 循环检测
+        repeat_limit: Optional[int] = None
+        stall_steps: Optional[int] = None
+        oscillation_cycles: Optional[int] = None
+        loop_corrections: Optional[int] = None
+        route: Optional[bool] = None
+        text_model: Optional[str] = None
+        feedback_style: Optional[str] = None
+        observation: Optional[str] = None
+        verify_effects: Optional[bool] = None
+
+    @asynccontextmanager
+    async def lifespan(app):
+        manager.start()
+        yield
+        manager.stop()
+
+    app = FastAPI(title="UI-TARS Jobs", lifespan=lifespan)
+    app.state.manager = manager
+
+    def get_job(job_id):
+        job = manager.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return job
+
+    @app.post("/jobs", status_code=202)
+    async def submit_job(request: JobRequest):
+        options = request.model_dump(exclude={"task"}, exclude_none=True)
+        try:
+            job = manager.submit(request.task, options)
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        return {"job_id": job.id, "status": job.status, "position": manager.position(job)}
+
+    @app.get("/jobs")
+    async def list_jobs(status: Optional[str] = None):
+        return [job.to_dict() for job in list(manager.jobs.values()) if status is None or job.status == status]
+
+    @app.get("/jobs/{job_id}")
+    async def get_job_detail(job_id: str):
+        job = get_job(job_id)
+        data = job.to_dict(events=True)
+        data["position"] = manager.position(job)
+        return data
+
+    @app.post("/jobs/{job_id}/cancel")
+    async def cancel_job(job_id: str):
+        get_job(job_id)
+        return manager.cancel(job_id).to_dict()
+
+    @app.get("/jobs/{job_id}/events")
+    async def job_events(job_id: str, since: int = 0, last_event_id: Optional[str] = Header(None)):
+        job = get_job(job_id)
+        if last_event_id is not None and last_event_id.isdigit():
+            # 断线重连时从上次收到的事件之后继续
+            since = int(last_event_id) + 1
+
+        async def sse():
+            async for event in job.stream(since):
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.websocket("/jobs/{job_id}/ws")
+    async def job_websocket(websocket: WebSocket, job_id: str, since: int = 0):
+        job = manager.get(job_id)
+        if job is None:
+            await websocket.close(code=4404)
+            return
+        await websocket.accept()
+
+        async def send_events():
+            async for event in job.stream(since):
+                await websocket.send_json(event)
+
+        async def receive_commands():
+            while True:
+                if (await websocket.receive_text()).strip() == "cancel":
+                    manager.cancel(job_id)
+
+        # 任一方向结束（事件推送完毕或客户端断开）就停止另一方向
+        sender = asyncio.create_task(send_events())
+        receiver = asyncio.create_task(receive_commands())
+        done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if sender in done and sender.exception() is None:
+            await websocket.close()
+
+    @app.get("/stats")
+    async def queue_stats():
+        return manager.stats()
+
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='UI-TARS任务队列服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8000, help='监听端口')
+    parser.add_argument('--concurrency', type=int, default=1, help='同时运行的任务数（同一桌面建议为1）')
+    parser.add_argument('--max-queue', type=int, default=100, help='排队任务数上限')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    manager = JobManager(concurrency=args.concurrency, max_queue=args.max_queue)
+    uvicorn.run(create_app(manager), host=args.host, port=args.port)
@@ -19,6 +19,47 @@ class UITarsParser:
             "wait": [],
             "finished": ["content"]
         }
+        
+        # 执行前必须具备的参数（finished的content可以省略）
+        self.required_params = {
+            "click": ["start_box"],
+            "left_double": ["start_box"],
+            "right_single": ["start_box"],
+            "drag": ["start_box", "end_box"],
+            "hotkey": ["key"],
+            "type": ["content"],
+            "scroll": ["start_box", "direction"],
+            "wait": [],
+            "finished": []
+        }
+        
+        # 模型偶尔输出的其他动作名
+        self.action_aliases = {
+            "left_single": "click",
+            "single_click": "click",
+            "left_click": "click",
+            "double_click": "left_double",
+            "left_double_click": "left_double",
+            "right_click": "right_single",
+            "press": "hotkey",
+            "key": "hotkey",
+            "typing": "type",
+            "input": "type",
+            "finish": "finished",
+            "done": "finished",
+            "sleep": "wait"
+        }
+        
+        # 其他参数名
+        self.param_aliases = {
+            "point": "start_box",
+            "start_point": "start_box",
+            "box": "start_box",
+            "end_point": "end_box",
+            "text": "content",
+            "keys": "key",
+            "hotkey": "key"
+        }
     
     def parse_output(self, model_output):
         """
@@ -43,11 +84,225 @@ class UITarsParser:
         # 解析动作
         action_data = self.parse_action(action_str) if action_str else None
         
+        # 严格解析失败时先在本地修复常见的格式问题
+        repairs = []
+        error = self.validate_action(action_data)
+        if error:
+            repaired = self.repair_output(model_output or "")
+            if not self.validate_action(repaired["action"]):
+                action_data = repaired["action"]
+                repairs = list(dict.fromkeys(repaired["repairs"]))
+                thought = repaired["thought"] or thought
+                error = None
+        
         return {
             "thought": thought,
-            "action": action_data
+            "action": action_data,
+            "repairs": repairs,
+            "error": error
         }
     
+    def validate_action(self, action_data):
+        """
+        检查解析出的动作能否执行
+        
+        Args:
+            action_data (dict|None): 解析后的动作数据
+            
+        Returns:
+            str|None: 不能执行的原因，可以执行时返回None
+        """
+        if not action_data:
+            return "没有找到Action"
+        
+        action_type = action_data.get("type")
+        if action_type not in self.action_types:
+            return f"未知的动作: {action_data.get('raw') or action_type}"
+        
+        params = action_data.get("params") or {}
+        missing = [name for name in self.required_params[action_type] if name not in params]
+        if missing:
+            return f"{action_type}缺少参数: {', '.join(missing)}"
+        
+        for name in ("start_box", "end_box"):
+            if name in params and len(re.findall(r"\d+", params[name])) < 2:
+                return f"{action_type}的{name}不是有效坐标: {params[name]}"
+        
+        if action_type == "scroll" and params["direction"] not in ("up", "down", "left", "right"):
+            return f"未知的滚动方向: {params['direction']}"
+        return None
+    
+    def repair_output(self, model_output):
+        """
+        修复格式不规范的模型输出
+        
+        依次处理：代码块和全角标点、缺少的"Action:"前缀、动作名和参数名的别名、
+        未闭合的引号和括号、动作后多余的文字、<point>/<bbox>/<|box_start|>等坐标写法、
+        未加引号的坐标和位置参数
+        
+        Args:
+            model_output (str): 模型的原始输出文本
+            
+        Returns:
+            dict: thought、action（修复后仍可能无效）和repairs（应用过的修复）
+        """
+        repairs = []
+        text = model_output.strip()
+        
+        # 代码块标记
+        if "```" in text:
+            text = re.sub(r"```\w*", "", text).strip()
+            repairs.append("code_fence")
+        
+        # 定位动作：优先使用最后一个Action标签（容忍大小写、全角冒号和markdown加粗）
+        labels = list(re.finditer(r"(?i)\**action\**\s*[:：]\**", text))
+        names = "|".join(sorted(list(self.action_types) + list(self.action_aliases), key=len, reverse=True))
+        if labels:
+            if labels[-1].group(0) != "Action:":
+                repairs.append("action_label")
+            thought_text = text[:labels[-1].start()]
+            action_text = text[labels[-1].end():].strip()
+        else:
+            calls = list(re.finditer(rf"(?i)\b(?:{names})\s*[(（]", text))
+            if not calls:
+                return {"thought": "", "action": None, "repairs": repairs}
+            repairs.append("missing_action_prefix")
+            thought_text = text[:calls[-1].start()]
+            action_text = text[calls[-1].start():].strip()
+        thought = re.sub(r"(?i)^\s*\**thought\**\s*[:：]\**", "", thought_text.strip()).strip()
+        
+        # 动作名
+        name_match = re.match(r"`?([A-Za-z_]+)\s*([(（])", action_text)
+        if not name_match:
+            # 没有括号的动作，如 "wait" 或 "finished"
+            bare = re.match(r"`?([A-Za-z_]+)`?\s*$", action_text)
+            if not bare:
+                return {"thought": thought, "action": None, "repairs": repairs}
+            name_match, args_text = bare, ""
+            repairs.append("missing_parentheses")
+        else:
+            if name_match.group(2) == "（":
+                repairs.append("fullwidth_punctuation")
+            args_text = self._balanced_args(action_text[name_match.end():], repairs)
+        
+        action_type = name_match.group(1).lower()
+        if action_type in self.action_aliases:
+            action_type = self.action_aliases[action_type]
+            repairs.append("action_alias")
+        if action_type not in self.action_types:
+            return {"thought": thought, "action": {"type": "unknown", "raw": action_text}, "repairs": repairs}
+        
+        params = self._repair_params(action_type, args_text, repairs)
+        return {"thought": thought, "action": {"type": action_type, "params": params}, "repairs": repairs}
+    
+    def _balanced_args(self, text, repairs):
+        """
+        截取括号内的参数文本：补全未闭合的引号和括号，丢弃右括号之后的多余文字
+        """
+        depth, quote, index = 1, None, 0
+        while index < len(text):
+            char = text[index]
+            if quote:
+                if char == "\\":
+                    index += 1
+                elif char == quote:
+                    quote = None
+            elif char in "'\"":
+                quote = char
+            elif char in "([（":
+                depth += 1
+            elif char in ")]）":
+                depth -= 1
+                if depth == 0:
+                    if char == "）":
+                        repairs.append("fullwidth_punctuation")
+                    if text[index + 1:].strip(" `"):
+                        repairs.append("trailing_text")
+                    return text[:index]
+            index += 1
+        
+        args = text.rstrip()
+        if quote:
+            args += quote
+            repairs.append("unclosed_quote")
+        repairs.append("unbalanced_parentheses")
+        return args
+    
+    def _repair_params(self, action_type, args_text, repairs):
+        """
+        逐个解析参数，支持别名、未加引号的值、位置参数和各种坐标写法
+        """
+        expected = self.action_types[action_type]
+        params = {}
+        positional = []
+        for part in self._split_args(args_text):
+            match = re.match(r"\s*([A-Za-z_]+)\s*[=:]\s*(.*)$", part, re.DOTALL)
+            if match and not part.strip().startswith(("'", '"')):
+                name, value = match.group(1), match.group(2)
+                if name in self.param_aliases:
+                    name = self.param_aliases[name]
+                    repairs.append("param_alias")
+            else:
+                name, value = None, part
+            value = self._repair_value(value.strip(), repairs)
+            if name is None:
+                positional.append(value)
+            elif name in expected:
+                params[name] = value
+        
+        # 位置参数按该动作的参数顺序补齐
+        if positional:
+            repairs.append("positional_args")
+            # 坐标被逗号拆开时重新拼起来，如 click(100, 200)
+            if expected and expected[0].endswith("_box") and all(re.fullmatch(r"\d+", v) for v in positional):
+                positional = [f"({','.join(positional)})"]
+            for name, value in zip([n for n in expected if n not in params], positional):
+                params[name] = value
+        return params
+    
+    def _split_args(self, args_text):
+        """
+        按顶层逗号拆分参数，引号和括号内的逗号不拆
+        """
+        parts, current, depth, quote = [], "", 0, None
+        for char in args_text:
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in "'\"":
+                quote = char
+            elif char in "([<":
+                depth += 1
+            elif char in ")]>":
+                depth -= 1
+            elif char == "," and depth == 0:
+                parts.append(current)
+                current = ""
+                continue
+            current += char
+        if current.strip():
+            parts.append(current)
+        return parts
+    
+    def _repair_value(self, value, repairs):
+        """
+        去掉引号，并把各种坐标写法统一为 "(x1,y1,...)"
+        """
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+            value = value[1:-1]
+        elif value and not re.fullmatch(r"\d+", value):
+            repairs.append("unquoted_value")
+        
+        box = re.fullmatch(
+            r"\s*(?:<\|box_start\|>|<point>|<bbox>)?\s*[(\[]?\s*"
+            r"(\d+(?:\.\d+)?(?:\s*[,\s]\s*\d+(?:\.\d+)?){1,3})"
+            r"\s*[)\]]?\s*(?:<\|box_end\|>|</point>|</bbox>)?\s*", value)
+        if box and ("<" in value or not re.match(r"\s*[(\[]", value)) and len(re.findall(r"\d+(?:\.\d+)?", value)) in (2, 4):
+            numbers = [str(round(float(n))) for n in re.findall(r"\d+(?:\.\d+)?", box.group(1))]
+            value = f"({','.join(numbers)})"
+            repairs.append("box_syntax")
+        return value
+    
     def parse_action(self, action_str):
         """
         解析动作字符串为结构化数据
@@ -0,0 +1,93 @@
+"""
+UI-TARS的Agno Playground服务：每个请求从Agent池中借出独立的Agent，会话状态保存在共享存储中，可以多worker部署
+
+启动方式见 starter.py 和 ui-tars serve playground
+"""
+
+import os
+
+from agno.agent import Agent
+from agno.models.deepseek import DeepSeek
+from agno.storage.agent.sqlite import SqliteAgentStorage
+
+from ui_tars_pool import create_playground_app
+
+V3 = "ep-20250204220334-l2q5g"
+R1 = "ep-20250204215316-p8rqb"
+TARS = "ep-20250417103958-d888s"
+
+#参考官方文档：https://www.volcengine.com/docs/82379/1536429
+#使用无随机性的推理参数，以提高模型输出准确性
+# temperature=0
+# top_p=0.7
+
+# 多worker部署时每个worker进程独立导入本模块，配置通过环境变量传递
+AGENT_ID = "ui-tars"
+MODEL_BASE_URL = os.getenv("UI_TARS_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3/")
+DB_URL = os.getenv("UI_TARS_DB_URL", "sqlite:////tmp/ui_tars_sessions.db")
+POOL_SIZE = int(os.getenv("UI_TARS_POOL_SIZE", "4"))
+
+INSTRUCTIONS = """
+You are a GUI agent. You are given a task and your action history, with screenshots. You need to perform the next action to complete the task.
+## Output Format
+```
+Thought: ...
+Action: ...
+```
+## Action Space
+click(start_box='[x1, y1, x2, y2]')
+left_double(start_box='[x1, y1, x2, y2]')
+right_single(start_box='[x1, y1, x2, y2]')
+drag(start_box='[x1, y1, x2, y2]', end_box='[x3, y3, x4, y4]')
+hotkey(key='')
+type(content='') #If you want to submit your input, use "\n" at the end of `content`.
+scroll(start_box='[x1, y1, x2, y2]', direction='down or up or right or left')
+wait() #Sleep for 5s and take a screenshot to check for any changes.
+finished(content='xxx') # Use escape characters \\', \\", and \\n in content part to ensure we can parse the content in normal python string format.
+## Note
+- Use Chinese in `Thought` part.
+- Write a small plan and finally summarize your next action (with its target element) in one sentence in `Thought` part.
+## User Instruction
+            """
+
+_storage = None
+
+
+def get_storage():
+    """
+    获取会话存储（每个进程一个，进程内所有Agent共用同一个数据库连接池）
+
+    默认使用SQLite文件，UI_TARS_DB_URL设置为postgresql://...时使用PostgreSQL，便于多台机器共享会话
+    """
+    global _storage
+    if _storage is None:
+        if DB_URL.startswith("postgresql"):
+            from agno.storage.postgres import PostgresStorage
+            _storage = PostgresStorage(table_name="ui_tars_sessions", db_url=DB_URL)
+        else:
+            if DB_URL.startswith("sqlite:///"):
+                os.makedirs(os.path.dirname(os.path.abspath(DB_URL[len("sqlite:///"):])), exist_ok=True)
+            _storage = SqliteAgentStorage(table_name="ui_tars_sessions", db_url=DB_URL)
+    return _storage
+
+
+def build_agent():
+    """
+    创建一个UI助手Agent，会话历史保存在共享存储中
+    """
+    ui_tars = DeepSeek(id=TARS, base_url=MODEL_BASE_URL, temperature=0, top_p=0.7)
+    return Agent(model=ui_tars,
+                 agent_id=AGENT_ID,
+                 name="我的UI助手",
+                 description="",
+                 instructions=INSTRUCTIONS,
+                 storage=get_storage(),
+                 debug_mode=os.getenv("UI_TARS_DEBUG", "1") == "1",
+                 add_datetime_to_instructions=True,
+                 add_history_to_messages=True,
+                 num_history_responses=5,
+                 )
+
+
+# 每个请求从Agent池中借出独立的Agent，会话状态保存在存储中，可以多worker部署
+app = create_playground_app(build_agent, pool_size=POOL_SIZE)
@@ -0,0 +1,289 @@
+import time
+import asyncio
+import logging
+import threading
+from uuid import uuid4
+from contextlib import contextmanager, asynccontextmanager
+
+
+class AgentPool:
+    """
+    Agent实例池：每个请求从池中借出一个独立的Agent，用完归还
+
+    Agent对象本身带有会话记忆，不能被多个请求同时使用。池中的Agent共享同一个会话存储，
+    借出时清空上一个请求留下的记忆，运行时由Agno按session_id从存储中加载会话历史，
+    因此任意一个Agent（甚至另一个worker进程中的Agent）都能接着处理同一个会话。
+    """
+
+    def __init__(self, factory, size=4, acquire_timeout=60.0):
+        """
+        初始化Agent池
+
+        Args:
+            factory (callable): 创建Agent的函数，池按需调用，最多创建size个
+            size (int): 池的大小，即单个进程内可同时运行的请求数
+            acquire_timeout (float): 借出Agent的最长等待时间（秒）
+        """
+        if size < 1:
+            raise ValueError("Agent池大小至少为1")
+
+        self.factory = factory
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.logger = logging.getLogger("AgentPool")
+
+        self._idle = []
+        self._created = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+        # 同一会话的请求串行执行，避免并发写存储时互相覆盖历史
+        self._session_locks = {}
+        self._async_slots = None
+
+        self._leases = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._max_wait = 0.0
+
+    def acquire(self, timeout=None):
+        """
+        借出一个Agent，池中没有空闲Agent且已达上限时等待
+
+        Args:
+            timeout (float, optional): 最长等待时间，默认使用acquire_timeout
+
+        Returns:
+            Agent: 已清空会话记忆的Agent
+
+        Raises:
+            TimeoutError: 超时仍没有可用的Agent
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        create = False
+        with self._condition:
+            if not self._idle and self._created >= self.size:
+                self._waits += 1
+                if not self._condition.wait_for(lambda: self._idle, timeout):
+                    raise TimeoutError(f"等待可用Agent超时（{timeout}秒，池大小 {self.size}）")
+            if self._idle:
+                agent = self._idle.pop()
+            else:
+                self._created += 1
+                create = True
+            self._in_use += 1
+            self._leases += 1
+            waited = time.perf_counter() - start
+            self._wait_seconds += waited
+            self._max_wait = max(self._max_wait, waited)
+
+        if create:
+            try:
+                agent = self.factory()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+            self.logger.info(f"创建Agent实例 {self._created}/{self.size}")
+
+        self._reset(agent)
+        return agent
+
+    def release(self, agent):
+        """
+        归还Agent
+        """
+        with self._condition:
+            self._idle.append(agent)
+            self._in_use -= 1
+            self._condition.notify()
+
+    def _reset(self, agent):
+        # 清空上一个请求留下的会话状态，本次运行时再从存储中按session_id加载
+        agent.agent_session = None
+        agent.session_name = None
+        agent.session_id = None
+        if agent.memory is not None:
+            agent.memory.clear()
+        if agent.model is not None:
+            agent.model.clear()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        以上下文管理器的方式借出Agent
+
+            with pool.lease() as agent:
+                agent.run(message, session_id=session_id)
+        """
+        agent = self.acquire(timeout)
+        try:
+            yield agent
+        finally:
+            self.release(agent)
+
+    @asynccontextmanager
+    async def alease(self, session_id=None, timeout=None):
+        """
+        异步借出Agent，等待期间不阻塞事件循环；指定session_id时同一会话的请求依次执行
+        """
+        entry = None
+        if session_id:
+            # [锁, 持有或等待该锁的请求数]，计数归零时删除，避免锁表无限增长
+            entry = self._session_locks.setdefault(session_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+        try:
+            if entry:
+                await entry[0].acquire()
+            try:
+                # 在事件循环里排队而不是占用线程池阻塞等待：agno运行时也会用到默认线程池，
+                # 排队请求占满线程池会导致已借出的Agent无法完成而死锁
+                if self._async_slots is None:
+                    self._async_slots = asyncio.Semaphore(self.size)
+                try:
+                    await asyncio.wait_for(self._async_slots.acquire(), timeout or self.acquire_timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"等待可用Agent超时（池大小 {self.size}）")
+                try:
+                    agent = self.acquire(timeout)
+                    try:
+                        yield agent
+                    finally:
+                        self.release(agent)
+                finally:
+                    self._async_slots.release()
+            finally:
+                if entry:
+                    entry[0].release()
+        finally:
+            if entry:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._session_locks[session_id]
+
+    def stats(self):
+        """
+        返回池的使用统计
+
+        Returns:
+            dict: 池大小、已创建/使用中的Agent数、借出次数和等待时间
+        """
+        with self._condition:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "leases": self._leases,
+                "waits": self._waits,
+                "wait_ms_avg": self._wait_seconds * 1000 / max(self._leases, 1),
+                "wait_ms_max": self._max_wait * 1000,
+            }
+
+
+def create_playground_app(factory, pool_size=4, acquire_timeout=60.0):
+    """
+    创建使用Agent池的Playground应用
+
+    运行接口（POST /v1/playground/agents/{agent_id}/runs）从池中借出Agent处理请求，
+    会话列表、历史等其余接口沿用Agno Playground的实现，通过共享存储读取会话。
+    factory创建的Agent必须配置同一个存储和固定的agent_id。
+
+    Args:
+        factory (callable): 创建Agent的函数
+        pool_size (int): 每个worker进程的Agent池大小
+        acquire_timeout (float): 借出Agent的最长等待时间（秒）
+
+    Returns:
+        FastAPI: 应用对象，pool挂在app.state.agent_pool上
+    """
+    from typing import List, Optional
+
+    from fastapi import FastAPI, APIRouter, File, Form, HTTPException, UploadFile
+    from fastapi.responses import StreamingResponse
+    from starlette.background import BackgroundTask
+    from agno.playground import Playground
+    from agno.playground.async_router import chat_response_streamer
+    from agno.playground.utils import process_image
+
+    template = factory()
+    if template.storage is None or not template.agent_id:
+        raise ValueError("Agent池中的Agent需要配置存储和固定的agent_id")
+
+    pool = AgentPool(factory, pool_size, acquire_timeout)
+    api_app = FastAPI(title="UI-TARS Playground", docs_url="/docs", openapi_url="/openapi.json")
+    api_app.state.agent_pool = pool
+    router = APIRouter(prefix="/v1")
+
+    # 先于Playground的路由注册，同一路径优先匹配这里
+    @router.post("/playground/agents/{agent_id}/runs")
+    async def create_agent_run(
+        agent_id: str,
+        message: str = Form(...),
+        stream: bool = Form(True),
+        monitor: bool = Form(False),
+        session_id: Optional[str] = Form(None),
+        user_id: Optional[str] = Form(None),
+        files: Optional[List[UploadFile]] = File(None),
+    ):
+        if agent_id != template.agent_id:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        session_id = session_id or str(uuid4())
+
+        images = []
+        for file in files or []:
+            if file.content_type not in ["image/png", "image/jpeg", "image/jpg", "image/webp"]:
+                raise HTTPException(status_code=400, detail="Unsupported file type")
+            images.append(process_image(file))
+
+        lease = pool.alease(session_id)
+        try:
+            agent = await lease.__aenter__()
+        except Exception as e:
+            # 超时、创建Agent失败等借出失败都表示暂时无法服务
+            raise HTTPException(status_code=503, detail=str(e) or "无可用Agent")
+
+        released = False
+
+        async def release():
+            nonlocal released
+            if not released:
+                released = True
+                await lease.__aexit__(None, None, None)
+
+        try:
+            agent.monitoring = monitor
+            if stream:
+                async def streamer():
+                    try:
+                        async for chunk in chat_response_streamer(
+                            agent, message, session_id=session_id, user_id=user_id, images=images or None
+                        ):
+                            yield chunk
+                    finally:
+                        await release()
+
+                # 流出错时Starlette不执行后台任务，由生成器的finally归还；客户端在开始读取前断开时
+                # 生成器不会被迭代，由响应的后台任务归还，避免Agent和会话锁一直不被释放
+                return StreamingResponse(streamer(), media_type="text/event-stream",
+                                         background=BackgroundTask(release))
+        except BaseException:
+            await release()
+            raise
+
+        try:
+            run_response = await agent.arun(
+                message, session_id=session_id, user_id=user_id, images=images or None, stream=False
+            )
+            return run_response.to_dict()
+        finally:
+            await release()
+
+    @router.get("/pool/stats")
+    async def pool_stats():
+        return pool.stats()
+
+    Playground(agents=[template], api_app=api_app, router=router).get_app()
+    return api_app
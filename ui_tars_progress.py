@@ -0,0 +1,172 @@
+import re
+import time
+import logging
+
+from ui_tars_replay import frame_difference
+
+
+class ProgressMonitor:
+    """
+    会话进度监控：检查步骤数和耗时预算，并识别没有进展的循环
+
+    - repeat:      连续多步执行相同的动作（坐标按网格归一，几个像素的抖动视为相同）
+    - stall:       连续多步动作前后的截图都没有变化，之前的操作没有生效
+    - oscillation: 截图在两个界面之间来回切换，操作在相互抵消
+
+    发现循环时先返回纠正提示（追加到下一步的反馈中），纠正次数用完后再次发现循环则提前结束
+    """
+
+    # 连续滚动、等待本身就是正常的操作方式，只有界面也不变时才算循环（由stall检查）
+    REPEATABLE = ("scroll", "wait")
+
+    def __init__(self, max_steps=10, max_seconds=None, repeat_limit=3, stall_steps=3, oscillation_cycles=2,
+                 frame_tolerance=0.01, coordinate_grid=20, max_corrections=1):
+        """
+        初始化进度监控
+
+        Args:
+            max_steps (int): 初始任务之后最多执行的步骤数
+            max_seconds (float, optional): 整个任务的最长耗时（秒），None表示不限制
+            repeat_limit (int): 连续相同动作达到该次数视为循环，0表示不检查
+            stall_steps (int): 连续该步数截图没有变化视为停滞，0表示不检查
+            oscillation_cycles (int): 在两个界面之间来回切换达到该次数视为振荡，0表示不检查
+            frame_tolerance (float): 截图变化比例不超过该值视为相同界面
+            coordinate_grid (int): 比较动作时坐标（0-1000）按该网格归一
+            max_corrections (int): 发现循环时发送纠正提示的最多次数，用完后提前结束
+        """
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.repeat_limit = repeat_limit
+        self.stall_steps = stall_steps
+        self.oscillation_cycles = oscillation_cycles
+        self.frame_tolerance = frame_tolerance
+        self.coordinate_grid = coordinate_grid
+        self.max_corrections = max_corrections
+        # 循环检查最多回看的步数，更早的动作和截图签名不再保留
+        self.window = max(repeat_limit, stall_steps + 1, 2 * oscillation_cycles + 1)
+        self.logger = logging.getLogger("ProgressMonitor")
+        self.start()
+
+    def start(self):
+        """
+        开始一个新任务：清空记录并重新计时
+        """
+        self.started = time.time()
+        self.steps = 0
+        self.actions = []
+        self.frames = []
+        self.corrections = 0
+        self.events = []
+        self.stopped = None
+
+    def action_key(self, action):
+        """
+        动作的比较键：类型和参数，坐标按网格归一
+
+        Returns:
+            tuple: 比较键
+        """
+        params = action.get("params") or {}
+        items = []
+        for name in sorted(params):
+            value = str(params[name])
+            if name in ("start_box", "end_box"):
+                numbers = [int(n) for n in re.findall(r"\d+", value)]
+                value = tuple(round(n / self.coordinate_grid) for n in numbers)
+            items.append((name, value))
+        return (action.get("type"), tuple(items))
+
+    def _same(self, a, b):
+        return a is not None and b is not None and frame_difference(a, b) <= self.frame_tolerance
+
+    def _detect(self):
+        # 返回 (原因, 涉及的步骤数)，没有发现循环时返回None
+        n = self.repeat_limit
+        if n and len(self.actions) >= n and len(set(self.actions[-n:])) == 1 \
+                and self.actions[-1][0] not in self.REPEATABLE:
+            return "repeat", n
+
+        n = self.stall_steps
+        frames = self.frames
+        if n and len(frames) > n and all(self._same(frames[-1 - i], frames[-2 - i]) for i in range(n)):
+            return "stall", n
+
+        n = self.oscillation_cycles
+        window = 2 * n + 1
+        if n and len(frames) >= window and not self._same(frames[-1], frames[-2]) \
+                and all(self._same(frames[-1 - i], frames[-3 - i]) for i in range(window - 2)):
+            return "oscillation", window - 1
+        return None
+
+    def _message(self, reason, count, action):
+        if reason == "repeat":
+            return (f"注意：你已经连续{count}次执行相同的操作（{action.get('type')}），界面没有按预期推进。"
+                    "不要再重复这个操作，请根据当前截图换一种方法（换一个目标位置、使用热键或滚动查找），"
+                    "如果任务已经完成请输出finished")
+        if reason == "stall":
+            return (f"注意：最近{count}步操作后界面都没有变化，之前的操作可能没有生效。"
+                    "请仔细检查当前截图，换一种方法完成任务，如果任务已经完成请输出finished")
+        return (f"注意：界面在两个状态之间来回切换了{count}次，之前的操作在相互抵消。"
+                "请根据当前截图重新规划，不要重复来回切换")
+
+    def observe(self, action, frame=None):
+        """
+        记录一步并判断是否继续
+
+        Args:
+            action (dict): 这一步执行的动作（type和params）
+            frame (dict, optional): 这一步动作前截图的签名（frame_signature的结果），没有截图时为None
+
+        Returns:
+            dict: status（continue、correct或abort）、reason（repeat、stall、oscillation、
+                max_steps、max_seconds或None）和message（纠正提示或结束原因）
+        """
+        self.steps += 1
+        if action.get("type") == "finished":
+            return {"status": "continue", "reason": None, "message": ""}
+        self.actions.append(self.action_key(action))
+        self.frames.append(frame)
+        del self.actions[:-self.window], self.frames[:-self.window]
+
+        # 初始任务那一步不计入步骤预算
+        budget = None
+        if self.steps > self.max_steps:
+            budget = ("max_steps", f"已达到最大步骤数 {self.max_steps}")
+        elif self.max_seconds is not None and time.time() - self.started >= self.max_seconds:
+            budget = ("max_seconds", f"已达到最长耗时 {self.max_seconds} 秒")
+
+        loop = self._detect()
+        if loop:
+            reason, count = loop
+            self.events.append({"step": self.steps, "reason": reason})
+            if self.corrections < self.max_corrections and budget is None:
+                self.corrections += 1
+                # 纠正后重新积累证据，避免同一段记录在下一步再次触发
+                self.actions, self.frames = self.actions[-1:], self.frames[-1:]
+                self.logger.info(f"第{self.steps}步发现循环({reason})，发送纠正提示")
+                return {"status": "correct", "reason": reason, "message": self._message(reason, count, action)}
+            return self._stop(reason, f"发现循环({reason})，纠正{self.corrections}次后仍未摆脱，提前结束")
+
+        if budget:
+            return self._stop(*budget)
+        return {"status": "continue", "reason": None, "message": ""}
+
+    def _stop(self, reason, message):
+        self.stopped = reason
+        self.logger.info(f"第{self.steps}步结束任务: {message}")
+        return {"status": "abort", "reason": reason, "message": message}
+
+    def report(self):
+        """
+        返回本次任务的统计
+
+        Returns:
+            dict: steps、seconds、corrections、events（每次发现循环的步骤和原因）和stopped（结束原因）
+        """
+        return {
+            "steps": self.steps,
+            "seconds": time.time() - self.started,
+            "corrections": self.corrections,
+            "events": list(self.events),
+            "stopped": self.stopped,
+        }
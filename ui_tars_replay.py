@@ -0,0 +1,151 @@
+import json
+import time
+import base64
+import hashlib
+
+
+def frame_signature(image, size=(64, 36)):
+    """
+    计算截图的缩略签名：灰度图按块求均值缩小到 size，用于判断两帧界面是否相同
+
+    Args:
+        image: 截图路径、Frame、PIL图片或NumPy数组
+        size (tuple): 缩略图的 (宽, 高)
+
+    Returns:
+        dict: width、height（原图尺寸）、size、pixels（缩略图灰度，base64）和hash（缩略图的SHA1）
+    """
+    import numpy as np
+    from ui_tars_grounding import to_gray
+
+    gray = to_gray(image)
+    height, width = gray.shape
+    cols, rows = size
+    block_h, block_w = max(1, height // rows), max(1, width // cols)
+    rows, cols = min(rows, height), min(cols, width)
+    blocks = gray[:rows * block_h, :cols * block_w].reshape(rows, block_h, cols, block_w).mean(axis=(1, 3))
+    pixels = np.round(blocks).astype(np.uint8)
+    return {
+        "width": width,
+        "height": height,
+        "size": [cols, rows],
+        "pixels": base64.b64encode(pixels.tobytes()).decode("ascii"),
+        "hash": hashlib.sha1(pixels.tobytes()).hexdigest(),
+    }
+
+
+def frame_difference(a, b, pixel_threshold=8):
+    """
+    比较两个截图签名，返回变化的缩略像素比例
+
+    Args:
+        a (dict): frame_signature的结果
+        b (dict): frame_signature的结果
+        pixel_threshold (int): 缩略像素灰度差超过该值才算变化，过滤抗锯齿和压缩噪声
+
+    Returns:
+        float: 0到1之间的变化比例，尺寸不同时返回1
+    """
+    import numpy as np
+
+    if a["hash"] == b["hash"]:
+        return 0.0
+    if (a["width"], a["height"], a["size"]) != (b["width"], b["height"], b["size"]):
+        return 1.0
+    cols, rows = a["size"]
+    pa = np.frombuffer(base64.b64decode(a["pixels"]), dtype=np.uint8).reshape(rows, cols).astype(np.int16)
+    pb = np.frombuffer(base64.b64decode(b["pixels"]), dtype=np.uint8).reshape(rows, cols).astype(np.int16)
+    return float(np.count_nonzero(np.abs(pa - pb) > pixel_threshold)) / pa.size
+
+
+def frame_change(a, b, pixel_threshold=8):
+    """
+    比较两个截图签名，返回变化比例和变化区域
+
+    Args:
+        a (dict): 动作前截图的签名
+        b (dict): 动作后截图的签名
+        pixel_threshold (int): 缩略像素灰度差超过该值才算变化
+
+    Returns:
+        dict: ratio（变化比例）和box（变化区域的外接矩形，0-1000相对坐标 (x1, y1, x2, y2)，没有变化时为None）
+    """
+    import numpy as np
+
+    ratio = frame_difference(a, b, pixel_threshold)
+    if ratio == 0.0:
+        return {"ratio": ratio, "box": None}
+    if (a["width"], a["height"], a["size"]) != (b["width"], b["height"], b["size"]):
+        # 截图尺寸变了（窗口大小改变），整个界面都算变化
+        return {"ratio": ratio, "box": (0, 0, 1000, 1000)}
+    cols, rows = a["size"]
+    pa = np.frombuffer(base64.b64decode(a["pixels"]), dtype=np.uint8).reshape(rows, cols).astype(np.int16)
+    pb = np.frombuffer(base64.b64decode(b["pixels"]), dtype=np.uint8).reshape(rows, cols).astype(np.int16)
+    ys, xs = np.nonzero(np.abs(pa - pb) > pixel_threshold)
+    if not len(xs):
+        return {"ratio": ratio, "box": None}
+    box = (int(xs.min()) * 1000 // cols, int(ys.min()) * 1000 // rows,
+           (int(xs.max()) + 1) * 1000 // cols, (int(ys.max()) + 1) * 1000 // rows)
+    return {"ratio": ratio, "box": box}
+
+
+class Trajectory:
+    """
+    录制的操作轨迹：每一步保存发给模型的消息、动作前截图的签名以及模型的思考、动作和原始输出
+
+    保存为JSON文件，可以在界面没有变化时不经过模型重新执行
+    """
+
+    def __init__(self, task=None, steps=None, created=None):
+        """
+        初始化轨迹
+
+        Args:
+            task (str, optional): 整体任务
+            steps (list, optional): 步骤列表
+            created (float, optional): 录制时间
+        """
+        self.task = task
+        self.steps = steps or []
+        self.created = created or time.time()
+
+    def append(self, message, frame, result):
+        """
+        记录一步
+
+        Args:
+            message (str): 发给模型的任务或反馈
+            frame (dict|None): 动作前截图的签名，没有截图时为None
+            result (dict): process_task的结果
+        """
+        self.steps.append({
+            "message": message,
+            "frame": frame,
+            "thought": result["thought"],
+            "action": result["action"],
+            "raw_response": result["raw_response"],
+            "status": result["execution"].get("status"),
+        })
+
+    def save(self, path):
+        """
+        保存到JSON文件
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"task": self.task, "created": self.created, "steps": self.steps}, f,
+                      ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        """
+        从JSON文件读取轨迹
+
+        Returns:
+            Trajectory: 轨迹对象
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(task=data.get("task"), steps=data.get("steps", []), created=data.get("created"))
+
+    def __len__(self):
+        return len(self.steps)
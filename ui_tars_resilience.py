@@ -0,0 +1,247 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def is_retryable(error):
+    """
+    判断模型调用错误是否值得重试：超时、连接错误、限流和服务端5xx错误
+
+    Args:
+        error (Exception): 调用抛出的异常
+
+    Returns:
+        bool: 是否可重试
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError,
+                          openai.InternalServerError)):
+        return True
+    # agno把OpenAI的状态码错误包装成ModelProviderError
+    status = getattr(error, "status_code", None)
+    return status == 408 or status == 429 or (isinstance(status, int) and status >= 500)
+
+
+class CallPolicy:
+    """
+    模型调用的超时、重试和对冲策略
+
+    - 超时：每次调用的最长等待时间，超时的调用被放弃（由HTTP客户端的同名超时负责真正断开连接）
+    - 重试：可重试错误按带抖动的指数退避重试（full jitter: 在 [0, min(上限, 基数×2^n)] 内均匀取值）
+    - 对冲：调用超过近期延迟的p95仍未返回时，再发出一个相同请求，取先返回的结果
+
+    被调用的对象（例如Agno Agent）带有运行状态，不能被两个调用同时使用，
+    因此除第一次调用外，可能与旧调用重叠的调用都在clone出的副本上执行，
+    调用方应改用返回的那个对象。
+
+    调用在内部线程池中执行，用完后调用close()（或使用with语句）释放线程；关闭后再次调用会重新创建线程池。
+    """
+
+    def __init__(self, timeout=60.0, max_retries=2, backoff_base=0.5, backoff_max=8.0,
+                 hedge=False, hedge_quantile=0.95, hedge_min_delay=0.5, hedge_initial_delay=None,
+                 latency_window=50, min_samples=5, max_workers=None):
+        """
+        初始化调用策略
+
+        Args:
+            timeout (float): 单次调用的超时时间（秒）
+            max_retries (int): 可重试错误的最多重试次数
+            backoff_base (float): 退避基数（秒）
+            backoff_max (float): 单次退避的上限（秒）
+            hedge (bool): 是否启用对冲请求
+            hedge_quantile (float): 用近期延迟的该分位数作为对冲等待时间
+            hedge_min_delay (float): 对冲等待时间下限（秒），避免对正常请求也发出对冲
+            hedge_initial_delay (float, optional): 样本不足时的对冲等待时间，默认不对冲
+            latency_window (int): 统计延迟分位数时保留的最近样本数
+            min_samples (int): 按分位数计算对冲等待时间所需的最少样本数
+            max_workers (int, optional): 执行调用的线程数，默认按重试和对冲次数计算
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_initial_delay = hedge_initial_delay
+        self.min_samples = min_samples
+        self.logger = logging.getLogger("CallPolicy")
+
+        self.latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        if max_workers is None:
+            # 被放弃的调用（超时或对冲落败）在HTTP客户端超时前仍占用线程：一次调用最多同时占用
+            # (重试次数+1)×(对冲时为2) 个线程，再留出同样多的线程给上一次调用中尚未结束的调用，
+            # 避免线程被占满后新的请求排队等待，连同排队时间一起超时
+            max_workers = 2 * (max_retries + 1) * (2 if hedge else 1)
+        self.max_workers = max_workers
+        self._executor = None
+        self.counters = {"calls": 0, "attempts": 0, "retries": 0, "timeouts": 0, "hedges": 0,
+                         "hedge_wins": 0, "failures": 0}
+
+    @property
+    def executor(self):
+        """
+        执行调用的线程池，第一次使用时创建
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ModelCall")
+            return self._executor
+
+    def close(self):
+        """
+        关闭线程池：不等待被放弃的调用结束（它们在HTTP客户端超时后自行退出），排队中的调用被取消
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def backoff(self, retry):
+        """
+        第retry次重试前的等待时间（从0开始计数）
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** retry)))
+
+    def hedge_delay(self):
+        """
+        对冲请求的等待时间：近期成功调用延迟的分位数，不低于hedge_min_delay
+
+        Returns:
+            float|None: 等待秒数，不对冲时返回None
+        """
+        if not self.hedge:
+            return None
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < self.min_samples:
+            return self.hedge_initial_delay
+        index = min(len(samples) - 1, int(self.hedge_quantile * len(samples)))
+        return max(self.hedge_min_delay, samples[index])
+
+    def record(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def call(self, fn, target, clone):
+        """
+        按策略调用fn(target)
+
+        Args:
+            fn (callable): 调用函数 fn(target) -> result
+            target: 第一次调用使用的对象
+            clone (callable): clone(target) -> 新对象，用于对冲和可能与旧调用重叠的重试
+
+        Returns:
+            tuple: (result, 实际产生结果的对象, 本次调用的统计)
+
+        Raises:
+            Exception: 不可重试的错误，或重试次数用尽后的最后一个错误
+        """
+        info = {"attempts": 0, "retries": 0, "timeouts": 0, "hedged": False, "hedge_won": False}
+        start = time.perf_counter()
+        self.counters["calls"] += 1
+        # 上一次调用被放弃后仍可能在后台运行，之后的调用不能再使用它的对象
+        busy = False
+        last_error = None
+
+        for retry in range(self.max_retries + 1):
+            if retry:
+                delay = self.backoff(retry - 1)
+                self.logger.warning(f"模型调用失败（{last_error}），{delay:.2f}秒后第{retry}次重试")
+                time.sleep(delay)
+                info["retries"] += 1
+                self.counters["retries"] += 1
+
+            primary = clone(target) if busy else target
+            outcome = self._attempt(fn, primary, clone, info)
+            if outcome["result"] is not None:
+                info["latency"] = time.perf_counter() - start
+                return outcome["result"], outcome["target"], info
+
+            last_error = outcome["error"]
+            busy = busy or outcome["abandoned"]
+            if not is_retryable(last_error):
+                break
+
+        self.counters["failures"] += 1
+        raise last_error
+
+    def _attempt(self, fn, primary, clone, info):
+        # 一轮调用：主请求 + 可选的对冲请求，返回先成功的一个
+        def run(target):
+            begin = time.perf_counter()
+            result = fn(target)
+            return result, target, time.perf_counter() - begin
+
+        executor = self.executor
+        deadline = time.perf_counter() + self.timeout
+        futures = {executor.submit(run, primary): "primary"}
+        info["attempts"] += 1
+        self.counters["attempts"] += 1
+
+        hedge_delay = self.hedge_delay()
+        if hedge_delay is not None and hedge_delay < self.timeout:
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                futures[executor.submit(run, clone(primary))] = "hedge"
+                info["hedged"] = True
+                info["attempts"] += 1
+                self.counters["hedges"] += 1
+                self.counters["attempts"] += 1
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                try:
+                    result, target, latency = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                self.record(latency)
+                if futures[future] == "hedge":
+                    info["hedge_won"] = True
+                    self.counters["hedge_wins"] += 1
+                return {"result": result, "target": target, "error": None, "abandoned": bool(pending)}
+
+        if pending:
+            info["timeouts"] += 1
+            self.counters["timeouts"] += 1
+            error = TimeoutError(f"模型调用超过{self.timeout}秒未返回")
+        return {"result": None, "target": None, "error": error, "abandoned": bool(pending)}
+
+    def stats(self):
+        """
+        返回累计统计和近期延迟分位数
+
+        Returns:
+            dict: 调用/尝试/重试/超时/对冲次数，以及p50、p95延迟（毫秒）
+        """
+        with self._lock:
+            samples = sorted(self.latencies)
+        stats = dict(self.counters)
+        if samples:
+            stats["p50_ms"] = samples[len(samples) // 2] * 1000
+            stats["p95_ms"] = samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000
+        stats["hedge_delay_ms"] = (self.hedge_delay() or 0) * 1000
+        return stats
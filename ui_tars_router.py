@@ -0,0 +1,181 @@
+import logging
+import threading
+
+# 火山引擎上的接入点（与ui_tars_playground.py一致）
+TARS = "ep-20250417103958-d888s"
+V3 = "ep-20250204220334-l2q5g"
+R1 = "ep-20250204215316-p8rqb"
+
+# 轮次类别：grounding（本轮有新截图，需要输出坐标）、vision（需要看历史中的截图）、text（纯文本）
+TURN_CLASSES = ("grounding", "vision", "text")
+
+
+class ModelRoute:
+    """
+    一个模型接入点：能处理的轮次类别和价格
+    """
+
+    def __init__(self, name, model_id, capabilities, input_price=0.0, output_price=0.0, base_url=None):
+        """
+        初始化模型路由
+
+        Args:
+            name (str): 路由名称
+            model_id (str): 模型ID（接入点）
+            capabilities (tuple): 能处理的轮次类别（grounding、vision、text）
+            input_price (float): 每百万输入token的价格（元）
+            output_price (float): 每百万输出token的价格（元）
+            base_url (str, optional): 模型服务地址，默认与代理相同
+        """
+        self.name = name
+        self.model_id = model_id
+        self.capabilities = tuple(capabilities)
+        self.input_price = input_price
+        self.output_price = output_price
+        self.base_url = base_url
+
+    def cost(self, input_tokens, output_tokens):
+        return (input_tokens * self.input_price + output_tokens * self.output_price) / 1e6
+
+
+def default_routes(base_url=None):
+    """
+    默认路由：UI-TARS处理需要截图的轮次，DeepSeek V3处理纯文本轮次
+
+    价格为示例值（元/百万token），按实际的计费标准传入自己的ModelRoute
+
+    Returns:
+        list: ModelRoute列表
+    """
+    return [
+        ModelRoute("tars", TARS, ("grounding", "vision", "text"), input_price=3.0, output_price=9.0,
+                   base_url=base_url),
+        ModelRoute("v3", V3, ("text",), input_price=2.0, output_price=8.0, base_url=base_url),
+    ]
+
+
+def create_router(route=False, text_model=None, base_url=None):
+    """
+    按配置创建模型路由
+
+    Args:
+        route (bool): 是否启用模型路由
+        text_model (str, optional): 纯文本轮次使用的模型接入点，默认DeepSeek V3
+        base_url (str, optional): 模型服务地址
+
+    Returns:
+        ModelRouter|None: 没有启用时为None
+    """
+    if not route:
+        return None
+    routes = default_routes(base_url)
+    if text_model:
+        routes[1].model_id = text_model
+    return ModelRouter(routes)
+
+
+class ModelRouter:
+    """
+    模型路由：按每一轮需要的能力选择最便宜的模型，所有模型共用同一份对话历史
+
+    - grounding: 本轮带新截图，模型要在截图上定位并给出坐标
+    - vision:    本轮没有新截图，但要根据历史中的截图回答（例如输出格式的纠正请求）
+    - text:      不需要看截图（缸中脑模式，或上一步已经输出finished后的确认轮次）
+    """
+
+    def __init__(self, routes=None, confirm_finished_as_text=True):
+        """
+        初始化模型路由
+
+        Args:
+            routes (list, optional): ModelRoute列表，第一个路由是主模型（必须能处理grounding），
+                默认使用default_routes()
+            confirm_finished_as_text (bool): 上一步输出finished后的确认轮次是否按纯文本处理
+        """
+        self.routes = list(routes or default_routes())
+        if not self.routes or "grounding" not in self.routes[0].capabilities:
+            raise ValueError("第一个路由必须是能处理截图定位的模型")
+        self.primary = self.routes[0]
+        self.confirm_finished_as_text = confirm_finished_as_text
+        self.logger = logging.getLogger("ModelRouter")
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def classify(self, images, last_action=None, history_has_images=False):
+        """
+        判断本轮需要的能力
+
+        Args:
+            images (list|None): 本轮的截图
+            last_action (str, optional): 上一步的动作类型
+            history_has_images (bool): 历史中是否有截图
+
+        Returns:
+            str: grounding、vision或text
+        """
+        if images:
+            return "grounding"
+        # 不带截图的finished确认轮次只需要文本回答，带截图时仍要看图判断
+        if last_action == "finished" and self.confirm_finished_as_text:
+            return "text"
+        return "vision" if history_has_images else "text"
+
+    def select(self, turn_class):
+        """
+        选择能处理该类别的最便宜的路由（按输入价格，其次输出价格）
+
+        Returns:
+            ModelRoute: 选中的路由
+        """
+        candidates = [route for route in self.routes if turn_class in route.capabilities]
+        if not candidates:
+            return self.primary
+        return min(candidates, key=lambda route: (route.input_price, route.output_price))
+
+    def record(self, route, turn_class, seconds, input_tokens=0, output_tokens=0):
+        """
+        记录一次调用的耗时和token用量
+        """
+        with self._lock:
+            stat = self.stats.setdefault(route.name, {
+                "model_id": route.model_id, "calls": 0, "seconds": 0.0, "max_seconds": 0.0,
+                "input_tokens": 0, "output_tokens": 0, "cost": 0.0, "classes": {},
+            })
+            stat["calls"] += 1
+            stat["seconds"] += seconds
+            stat["max_seconds"] = max(stat["max_seconds"], seconds)
+            stat["input_tokens"] += input_tokens
+            stat["output_tokens"] += output_tokens
+            stat["cost"] += route.cost(input_tokens, output_tokens)
+            stat["classes"][turn_class] = stat["classes"].get(turn_class, 0) + 1
+
+    def report(self):
+        """
+        返回每个路由的调用次数、平均耗时、token用量和费用
+
+        Returns:
+            dict: 路由名 -> calls、avg_seconds、max_seconds、input_tokens、output_tokens、cost、classes
+        """
+        with self._lock:
+            report = {}
+            for name, stat in self.stats.items():
+                report[name] = dict(stat, classes=dict(stat["classes"]),
+                                    avg_seconds=stat["seconds"] / max(stat["calls"], 1))
+            return report
+
+
+def response_tokens(response):
+    """
+    从Agno运行结果中取出本次调用的输入和输出token数
+
+    Returns:
+        tuple: (输入token数, 输出token数)，没有用量信息时为 (0, 0)
+    """
+    metrics = getattr(response, "metrics", None) or {}
+
+    def total(key):
+        value = metrics.get(key, 0)
+        return sum(value) if isinstance(value, list) else (value or 0)
+
+    return total("input_tokens"), total("output_tokens")
+
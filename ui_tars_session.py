@@ -0,0 +1,753 @@
+"""
+UI-TARS多轮对话会话：MultiTurnAgent在一台桌面上连续执行任务，run_session按模式运行一次会话
+
+命令行入口见 example_continuous_actions.py 和 ui-tars run
+"""
+
+from ui_tars_agent import UITarsAgent
+from ui_tars_window import WindowTarget
+from ui_tars_capture import create_capture_backend
+from ui_tars_frames import BackgroundCapturer
+from ui_tars_resilience import CallPolicy
+from ui_tars_replay import Trajectory, frame_signature, frame_difference, frame_change
+from ui_tars_progress import ProgressMonitor
+from ui_tars_router import create_router
+from ui_tars_encoding import FrameEncoder
+from ui_tars_accessibility import AccessibilityTree
+from ui_tars_effects import EffectVerifier
+from ui_tars_feedback import (GUIDANCE, StepRecord, template_feedback, compact_feedback, observation,
+                               execution_status, needs_guidance)
+from collections import deque
+import json
+import re
+import time
+
+class MultiTurnAgent:
+    """多轮对话代理类，处理连续对话操作"""
+    
+    def __init__(self, use_screenshot=True, verbose=1, window_title=None, window_pid=None, capture="auto",
+                 background_fps=0, ring_slots=8, token_budget=None, call_policy=None, grounding=False,
+                 target_cache=None, record=False, num_history_responses=20, executor_options=None, monitor=None,
+                 router=None, batcher=None, encoder=None, feedback_style="template", max_action_history=200,
+                 observation="screenshot", thumbnail_size=640, min_tree_nodes=3, verify_effects=False):
+        """
+        初始化多轮对话代理
+        
+        Args:
+            use_screenshot (bool): 是否使用实际截图，False表示缸中脑模式
+            verbose (int): 日志详细程度，0=静默，1=普通，2=详细
+            window_title (str, optional): 目标窗口标题，设置后只截取并操作该窗口
+            window_pid (int, optional): 目标窗口所属进程PID
+            capture (str): 截图后端，"auto"、"xshm" 或 "pyautogui"
+            background_fps (float): 后台截图帧率，大于0时启用后台截图线程和环形缓冲区
+            ring_slots (int): 环形缓冲区槽位数（每个槽位一帧全屏）
+            token_budget (int, optional): 单次请求的token预算，接近预算时压缩历史
+            call_policy (CallPolicy, optional): 模型调用的超时、重试和对冲策略
+            grounding (bool): 是否在点击前用本地元素检测器检查位置
+            target_cache (str, optional): 点击目标缓存目录，相同任务的相同步骤命中缓存时直接点击，不调用模型
+            record (bool): 是否录制操作轨迹（每步的消息、动作前截图签名和模型输出），供之后回放
+            num_history_responses (int): 发送给模型的最多历史轮数
+            executor_options (dict, optional): 执行器的节奏参数（scroll_clicks、drag_duration、type_delay、wait_seconds）
+            monitor (ProgressMonitor, optional): 进度监控，检查步骤和耗时预算，发现重复动作、
+                界面停滞或来回切换时给出纠正提示或提前结束
+            router (ModelRouter, optional): 模型路由，不需要看截图的轮次发给更便宜、更快的纯文本模型
+            batcher (MicroBatcher, optional): 跨会话的请求合并器（同一进程中运行多个会话时共用）
+            encoder (int|FrameEncoder, optional): 截图编码进程池或其工作进程数，截图的PNG编码和base64转换
+                在工作进程中进行；传入进程数时由本代理创建并在close时关闭
+            feedback_style (str): 自动反馈的格式，"template"为原有的中文模板，"compact"为一行结构化结果
+                （执行状态、实际位置、界面变化区域和稳定用时），格式说明在保留的历史中只出现一次
+            max_action_history (int): 内存中保留的最近动作记录数，长时间运行的会话只保留最近的记录，
+                总步数见steps_taken
+            observation (str): 每步的观察方式，"screenshot"为完整截图，"tree"为目标窗口的无障碍控件树（AT-SPI），
+                "tree+image"为控件树加一张缩小的截图；控件树不可用时退回完整截图
+            thumbnail_size (int): "tree+image"时截图缩小后的最长边（像素）
+            min_tree_nodes (int): 控件树列出的控件少于该数时视为不可用（应用没有提供有效的控件树）
+            verify_effects (bool|EffectVerifier): 动作执行后比较目标附近的截图，没有可见变化时先在本地重试
+                （等待更久、偏移几个像素再点、再按一次可重复的热键），仍没有变化时在反馈中告诉模型；缸中脑模式下不检查
+        """
+        if verbose > 0:
+            print("初始化UI-TARS代理...")
+        self.window = None
+        if window_title or window_pid:
+            self.window = WindowTarget(title=window_title, pid=window_pid)
+        self.agent = UITarsAgent(window=self.window, token_budget=token_budget, call_policy=call_policy,
+                                 grounding=grounding, target_cache=target_cache,
+                                 num_history_responses=num_history_responses, executor_options=executor_options,
+                                 router=router, batcher=batcher)
+        self.screenshot_path = "current_screen.png"
+        self.own_encoder = isinstance(encoder, int)
+        if self.own_encoder:
+            encoder = FrameEncoder(processes=encoder) if encoder > 0 else None
+        self.encoder = encoder
+        self.screenshot_url = None  # 编码进程池返回的最近一张截图的data URL
+        if feedback_style not in ("template", "compact"):
+            raise ValueError(f"未知的反馈格式: {feedback_style}")
+        self.feedback_style = feedback_style
+        if observation not in ("screenshot", "tree", "tree+image"):
+            raise ValueError(f"未知的观察方式: {observation}")
+        self.observation = observation
+        self.thumbnail_size = thumbnail_size
+        self.min_tree_nodes = min_tree_nodes
+        self.accessibility = None
+        if observation != "screenshot":
+            tree = AccessibilityTree(title=window_title, pid=window_pid)
+            if tree.available():
+                self.accessibility = tree.start()
+            elif verbose > 0:
+                print("无障碍树（AT-SPI）不可用，改用截图")
+        self.last_frame = None  # 上一步动作前截图的签名
+        self.last_settle = None  # 上一步动作后界面稳定用时（启用后台截图时）
+        self._auto_feedback = None
+        self._guidance_turn = None  # 上次附上紧凑反馈格式说明的轮次（UITarsAgent.turns）
+        self.action_history = deque(maxlen=max_action_history)  # 仅记录最近的操作历史，不维护对话历史
+        self.steps_taken = 0  # 已执行的总步数（action_history只保留最近的记录）
+        self.task = None
+        self._step_keys = {}  # 本任务中各步骤消息出现的次数
+        self.trajectory = Trajectory() if record else None
+        self.monitor = monitor
+        self.verdict = None  # 进度监控对最近一步的判断
+        self.use_screenshot = use_screenshot
+        self.verbose = verbose
+        self.capture = create_capture_backend(capture) if use_screenshot else None
+        if self.capture and verbose > 1:
+            print(f"截图后端: {self.capture.name}")
+        
+        # 后台截图线程独占截图后端，截图请求直接读取环形缓冲区中的最新帧
+        self.capturer = None
+        if self.capture and background_fps > 0:
+            self.capturer = BackgroundCapturer(self.capture, fps=background_fps, slots=ring_slots).start()
+            if verbose > 1:
+                print(f"后台截图已启动: {background_fps} fps, {ring_slots} 个槽位, "
+                      f"缓冲区 {self.capturer.buffer.memory_bytes / 1024 / 1024:.1f} MB")
+        self.last_action_at = None  # 最近一次动作执行完成的时间
+        
+        # 动作效果检查使用独立的截图后端，不与后台截图线程共用
+        self.verifier = None
+        if verify_effects and use_screenshot:
+            self.verifier = verify_effects if isinstance(verify_effects, EffectVerifier) else EffectVerifier(capture)
+            self.agent.executor.verifier = self.verifier
+    
+    def take_screenshot(self, max_size=None):
+        """
+        获取当前屏幕截图，或在缸中脑模式下返回None
+        
+        Args:
+            max_size (int, optional): 截图缩小到该最长边（像素）后保存
+        
+        Returns:
+            str|None: 截图路径或缸中脑模式下的None
+        """
+        self.screenshot_url = None
+        if not self.use_screenshot:
+            if self.verbose > 1:
+                print("缸中脑模式：不使用屏幕截图")
+            return None
+        
+        try:
+            # 窗口模式下只截取目标窗口所在的矩形，并让执行器的坐标映射跟随窗口
+            region = None
+            if self.window:
+                region = self.agent.executor.sync_window()
+                if region is None:
+                    print(f"找不到目标窗口 {self.window.describe()}，本步不截图")
+                    return None
+            
+            if self.capturer:
+                # 直接取缓冲区中动作完成之后的最新帧，不再同步截图
+                self.capturer.set_region(region)
+                frame = self.capturer.latest(since=self.last_action_at)
+                if frame is None:
+                    print("后台截图超时，未取得新帧")
+                    return None
+            else:
+                if self.verbose > 1:
+                    print(f"正在截取{'窗口区域 ' + str(region) if region else '当前屏幕'}...")
+                frame = self.capture.grab(region)
+            if max_size:
+                # 附带控件树时只需要一张缩小的截图
+                image = frame.to_image()
+                image.thumbnail((max_size, max_size))
+                image.save(self.screenshot_path)
+            elif self.encoder:
+                # 在工作进程中编码并写入截图文件，得到的data URL直接用于本轮请求
+                self.screenshot_url = self.encoder.encode(frame, path=self.screenshot_path)["data_url"]
+            else:
+                frame.save(self.screenshot_path)
+            if self.verbose > 1:
+                print(f"屏幕截图已保存至: {self.screenshot_path}")
+            return self.screenshot_path
+        except Exception as e:
+            print(f"截图失败: {e}")
+            return None
+    
+    def take_observation(self):
+        """
+        获取本步的观察：截图，以及启用无障碍树时目标窗口的控件列表
+        
+        observation为"tree"时控件树可用就不截图，"tree+image"时附上一张缩小的截图；
+        控件树不可用（找不到窗口、应用没有提供控件树）时退回完整截图
+        
+        Returns:
+            tuple: (截图路径或None, 控件树文本或None)
+        """
+        tree = None
+        if self.accessibility:
+            region = self.agent.executor.sync_window() if self.window else self.agent.executor.region
+            snapshot = self.accessibility.snapshot(region)
+            if snapshot["nodes"] >= self.min_tree_nodes:
+                tree = snapshot["text"]
+            if self.verbose > 1:
+                print(f"无障碍树: {snapshot['nodes']} 个控件, 读取 {snapshot['reads']} 个"
+                      f"{'（完整遍历）' if snapshot['full'] else ''}, {snapshot['seconds'] * 1000:.1f}ms"
+                      f"{'' if tree else '，改用截图'}")
+        if tree and self.observation == "tree":
+            self.screenshot_url = None
+            return None, tree
+        return self.take_screenshot(self.thumbnail_size if tree else None), tree
+    
+    def _with_tree(self, message, tree):
+        """把控件树附在本轮消息之后"""
+        return f"{message}\n\n{tree}" if tree else message
+    
+    def process_initial_task(self, task):
+        """处理初始任务"""
+        if self.verbose > 0:
+            print(f"\n处理整体任务: {task}")
+        
+        # 获取初始截图（以及控件树）
+        screenshot_path, tree = self.take_observation()
+        
+        # 初始任务处理
+        self.task = task
+        self._step_keys = {}
+        if self.trajectory is not None:
+            self.trajectory.task = task
+        if self.monitor:
+            self.monitor.start()
+        result = self.agent.process_task(self._with_tree(task, tree), screenshot_path, cache_key=self.step_key(task),
+                                         image_url=self.screenshot_url)
+        self._finish_step(task, screenshot_path, result)
+        
+        return result
+    
+    def process_feedback(self, feedback):
+        """处理反馈并执行下一步操作"""
+        if not self.action_history:
+            print("没有活跃的任务，请先处理初始任务")
+            return None
+        
+        # 更新截图（以及控件树）
+        screenshot_path, tree = self.take_observation()
+        
+        cache_key = self.step_key(feedback)
+        frame = None
+        turn = self.agent.turns
+        if self.feedback_style == "compact" and feedback == self._auto_feedback:
+            # 自动反馈补上动作前后的界面变化和稳定用时
+            frame = frame_signature(screenshot_path) if screenshot_path else None
+            feedback = self._observe(feedback, frame)
+        
+        # 处理任务
+        result = self.agent.process_task(self._with_tree(feedback, tree), screenshot_path,
+                                         cache_key=cache_key, image_url=self.screenshot_url)
+        if self._guidance_turn == turn and self.agent.turns == turn:
+            # 这一轮没有写入模型历史（Agno历史模式下的目标缓存命中），格式说明下一轮重新附上
+            self._guidance_turn = None
+        self._finish_step(feedback, screenshot_path, result, frame)
+        
+        return result
+    
+    def _finish_step(self, message, screenshot_path, result, frame=None):
+        """记录一步的动作（以及录制时的轨迹）并打印结果"""
+        self.last_action_at = time.time()
+        self.last_settle = None
+        # 截图已随本轮请求发出（需要时保存在对话历史中），不再单独持有编码结果
+        self.screenshot_url = None
+        
+        # 记录动作到历史
+        execution = result["execution"]
+        self.action_history.append(StepRecord(
+            result["action"]["type"],
+            result["action"]["params"],
+            result["thought"],
+            bool(execution.get("blocked")),
+            execution_status(execution),
+            self._executed_at(execution),
+            execution.get("message") if execution.get("status") != "success" else None
+        ))
+        self.steps_taken += 1
+        if frame is None and screenshot_path and (self.trajectory is not None or self.monitor
+                                                  or self.feedback_style == "compact"):
+            frame = frame_signature(screenshot_path)
+        self.last_frame = frame
+        if self.trajectory is not None:
+            self.trajectory.append(message, frame, result)
+        if self.monitor:
+            self.verdict = self.monitor.observe(result["action"], frame)
+        
+        # 打印结果
+        self._print_step_result(result)
+    
+    def replay(self, trajectory, tolerance=0.01, verify_timeout=5.0, poll_interval=0.2, max_extra_steps=10,
+               settle_seconds=10):
+        """
+        按录制的轨迹重新执行任务，界面与录制时一致的步骤不调用模型
+        
+        每一步先截图并与录制时的动作前截图比较（缩略签名中变化的比例不超过tolerance），
+        界面还没到位时每隔poll_interval重新截图，最多等待verify_timeout秒；
+        一致则直接执行录制的动作，否则这一步改由模型根据当前截图决定。
+        录制时执行失败或无法解析的步骤在回放时跳过；轨迹结束时任务仍未完成则由模型继续
+        
+        Args:
+            trajectory (Trajectory): 录制的轨迹
+            tolerance (float): 允许的截图变化比例（时钟、光标闪烁等）
+            verify_timeout (float): 每一步等待界面与录制时一致的最长时间（秒）
+            poll_interval (float): 等待期间的截图间隔（秒）
+            max_extra_steps (int): 轨迹结束后由模型继续执行的最多步骤数
+            settle_seconds (float): 模型继续执行时每步之间的等待时间（秒）
+            
+        Returns:
+            dict: steps、replayed（回放的步骤数）、model（调用模型的步骤数）、
+                skipped、finished和seconds
+        """
+        start = time.time()
+        self.task = trajectory.task
+        self._step_keys = {}
+        if self.trajectory is not None:
+            self.trajectory.task = trajectory.task
+        if self.monitor:
+            self.monitor.start()
+        stats = {"steps": 0, "replayed": 0, "model": 0, "skipped": 0, "finished": False}
+        result = None
+        
+        for index, step in enumerate(trajectory.steps):
+            if step["action"]["type"] == "invalid" or step.get("status") != "success":
+                stats["skipped"] += 1
+                continue
+            message = self.task if not self.action_history else self.generate_feedback(self.action_history[-1])
+            screenshot_path, difference = self._wait_for_frame(step["frame"], tolerance, verify_timeout,
+                                                               poll_interval)
+            stats["steps"] += 1
+            
+            if step["frame"] is None or (difference is not None and difference <= tolerance):
+                if self.verbose > 0:
+                    print(f"\n--- 回放步骤 {index + 1}/{len(trajectory)} (截图变化 {difference or 0:.1%}) ---")
+                result = self.agent.replay_action(message, screenshot_path, step["action"], step["raw_response"],
+                                                  step["thought"])
+                stats["replayed"] += 1
+            else:
+                if self.verbose > 0:
+                    changed = "无截图" if difference is None else f"截图变化 {difference:.1%}"
+                    print(f"\n--- 步骤 {index + 1}/{len(trajectory)} 与录制时不一致 ({changed})，调用模型 ---")
+                result = self.agent.process_task(message, screenshot_path, cache_key=self.step_key(message),
+                                                 image_url=self.screenshot_url)
+                stats["model"] += 1
+            self._finish_step(message, screenshot_path, result)
+            
+            if result["action"]["type"] == "finished":
+                break
+        
+        # 轨迹结束但任务未完成时由模型继续
+        extra = 0
+        while result is not None and result["action"]["type"] != "finished" and extra < max_extra_steps \
+                and not self.should_stop():
+            extra += 1
+            self.wait_for_settle(settle_seconds)
+            result = self.process_feedback(self.next_feedback())
+            stats["steps"] += 1
+            stats["model"] += 1
+        
+        stats["finished"] = result is not None and result["action"]["type"] == "finished"
+        stats["seconds"] = time.time() - start
+        return stats
+    
+    def _wait_for_frame(self, expected, tolerance, timeout, poll_interval):
+        """
+        截图直到与录制时的截图签名一致或超时
+        
+        Returns:
+            tuple: (截图路径, 变化比例)，没有截图或无需比较时变化比例为None
+        """
+        deadline = time.time() + timeout
+        while True:
+            screenshot_path = self.take_screenshot()
+            if expected is None or screenshot_path is None:
+                return screenshot_path, None
+            difference = frame_difference(frame_signature(screenshot_path), expected)
+            if difference <= tolerance or time.time() >= deadline:
+                return screenshot_path, difference
+            time.sleep(poll_interval)
+    
+    def step_key(self, message):
+        """
+        当前步骤的描述，作为目标缓存的键：整体任务 + 本步消息（数字替换为#并合并空白），
+        同一任务中相同的消息再次出现时附上出现次数加以区分。
+        不使用步骤序号，多一步或少一步不会让之后所有步骤的键错位
+        
+        Args:
+            message (str): 本轮发给模型的任务或反馈（不含控件树）
+        """
+        text = " ".join(re.sub(r"\d+", "#", message).split())
+        count = self._step_keys.get(text, 0)
+        self._step_keys[text] = count + 1
+        key = f"{self.task}\n{text}"
+        return f"{key}\n#{count}" if count else key
+    
+    def wait_for_settle(self, max_wait=10):
+        """
+        等待上一步动作引起的界面变化稳定下来
+        
+        启用后台截图时根据环形缓冲区判断画面是否稳定，稳定后立即返回；
+        否则固定等待max_wait秒
+        
+        Args:
+            max_wait (float): 最长等待时间（秒）
+            
+        Returns:
+            float: 实际等待的秒数
+        """
+        if not self.capturer:
+            time.sleep(max_wait)
+            return max_wait
+        
+        start = time.time()
+        settle_time = self.capturer.wait_for_settle(since=self.last_action_at, timeout=max_wait)
+        self.last_settle = settle_time
+        if self.verbose > 1:
+            if settle_time is None:
+                print(f"界面在{max_wait}秒内未稳定")
+            else:
+                print(f"界面已稳定，用时 {settle_time:.2f} 秒")
+        return time.time() - start
+    
+    def close(self):
+        """停止后台截图，释放截图后端，停止输入线程和模型调用线程池"""
+        if self.capturer:
+            stats = self.capturer.stats()
+            if self.verbose > 0:
+                print(f"后台截图统计: 目标 {stats['fps_target']} fps, 实际 {stats['fps_actual']:.1f} fps, "
+                      f"平均截图 {stats['grab_ms_avg']:.1f} ms, CPU {stats['cpu_percent']:.1f}%, "
+                      f"缓冲区 {stats['memory_bytes'] / 1024 / 1024:.1f} MB")
+            self.capturer.stop()
+            self.capturer = None
+        elif self.capture:
+            self.capture.close()
+        self.capture = None
+        if self.encoder and self.own_encoder:
+            self.encoder.close()
+            self.encoder = None
+        if self.accessibility:
+            self.accessibility.stop()
+            self.accessibility = None
+        if self.verifier:
+            self.verifier.close()
+        # 停止执行器的输入线程和模型调用线程池
+        self.agent.close()
+    
+    def _print_step_result(self, result):
+        """打印步骤结果"""
+        if self.verbose == 0:
+            return
+            
+        print("\n==================== 步骤结果 ====================")
+        
+        # 详细模式才打印思考过程
+        if self.verbose > 1:
+            print(f"模型思考: {result['thought']}")
+            
+        # 简化动作输出
+        action_type = result['action']['type']
+        action_params = result['action']['params']
+        params_str = ""
+        
+        if action_params:
+            for k, v in action_params.items():
+                if isinstance(v, str) and len(v) > 30:
+                    v = v[:27] + "..."
+                params_str += f"{k}={v}, "
+            params_str = params_str.rstrip(", ")
+        
+        print(f"执行动作: {action_type}({params_str})")
+        target = result.get('target')
+        if target:
+            print(f"命中目标缓存，未调用模型 (相关系数 {target['score']:.3f}, {target['seconds'] * 1000:.0f}ms)")
+        route = result.get('route')
+        if route and self.verbose > 1:
+            print(f"模型路由: {route['name']} ({route['class']}), {route['seconds']:.2f}秒, "
+                  f"{route['input_tokens']}+{route['output_tokens']} tokens")
+        
+        # 简化执行结果输出
+        if self.verbose > 1:
+            print(f"执行结果: {json.dumps(result['execution'], ensure_ascii=False)}")
+            grounding = result['execution'].get('grounding')
+            if grounding and grounding['status'] != 'hit':
+                print(f"本地定位: {grounding['status']}, 控件 {grounding['element']}, 距离 {grounding['distance']}")
+            recovery = result.get('recovery')
+            if recovery and (recovery['repairs'] or recovery['corrections']):
+                print(f"输出修复: 本地修复 {recovery['repairs'] or '无'}, 纠正请求 {recovery['corrections']} 次 "
+                      f"({recovery['correction_seconds']:.2f}秒), {'已恢复' if recovery['recovered'] else '未恢复'}")
+            budget = result.get('budget')
+            if budget:
+                print(f"请求估算: {budget['total_tokens']}/{budget['budget']} tokens "
+                      f"(图片 {budget['image_tokens']}), 载荷 {budget['payload_bytes'] / 1024:.0f}KB")
+        else:
+            # 简洁模式只显示执行是否成功
+            success = result['execution'].get('success', False)
+            print(f"执行状态: {'成功' if success else '失败'}")
+            
+        print("=================================================\n")
+    
+    def print_action_summary(self):
+        """打印操作历史摘要"""
+        if self.verbose == 0:
+            return
+            
+        print("\n============= 操作历史摘要 =============")
+        first = self.steps_taken - len(self.action_history)
+        if first:
+            print(f"（只保留最近 {len(self.action_history)} 步，共 {self.steps_taken} 步）")
+        for i, action in enumerate(self.action_history, first):
+            params_str = ""
+            if "params" in action and action["params"]:
+                for k, v in action["params"].items():
+                    if isinstance(v, str) and len(v) > 20:
+                        v = v[:17] + "..."
+                    params_str += f"{k}={v}, "
+                params_str = params_str.rstrip(", ")
+            
+            print(f"[{i+1}] {action['type']}({params_str})")
+        
+        budget = self.agent.token_budget
+        if budget and budget.events:
+            report = budget.report()
+            print(f"历史压缩 {report['compactions']} 次: 丢弃截图 {report['frames_dropped']} 张, "
+                  f"压缩Thought {report['thoughts_summarized']} 条, 合并轮次 {report['turns_merged']} 轮")
+        if self.monitor and (self.monitor.events or self.monitor.stopped):
+            report = self.monitor.report()
+            loops = ", ".join(f"第{e['step']}步 {e['reason']}" for e in report['events']) or "无"
+            print(f"进度监控: {report['steps']} 步, 用时 {report['seconds']:.1f} 秒, 发现循环: {loops}, "
+                  f"纠正提示 {report['corrections']} 次, 结束原因: {report['stopped'] or '正常'}")
+        if self.verifier:
+            report = self.verifier.report()
+            print(f"效果检查: {report['checked']} 次, 平均 {report['avg_ms']:.0f}ms, 本地重试后生效 {report['resolved']} 次"
+                  f"（省下的模型调用）, 仍无变化 {report['no_effect']} 次, 重试 {report['retries']} 次")
+        if self.accessibility:
+            report = self.accessibility.report()
+            print(f"无障碍树: 读取 {report['snapshots']} 次, 平均 {report['avg_ms']:.1f}ms, "
+                  f"完整遍历 {report['full_walks']} 次, 事件 {report['events']} 个")
+        router = self.agent.router
+        if router and router.stats:
+            for name, stat in router.report().items():
+                print(f"模型路由 {name}: {stat['calls']} 次, 平均 {stat['avg_seconds']:.2f} 秒, "
+                      f"{stat['input_tokens']}+{stat['output_tokens']} tokens, 费用 {stat['cost']:.4f} 元")
+        print("========================================")
+    
+    def next_feedback(self):
+        """
+        根据上一步的动作生成自动反馈；进度监控发现循环时在反馈后追加纠正提示
+        """
+        feedback = self.generate_feedback(self.action_history[-1])
+        if self.verdict and self.verdict["status"] == "correct":
+            feedback = f"{feedback}\n{self.verdict['message']}"
+        self._auto_feedback = feedback
+        return feedback
+    
+    def _executed_at(self, execution):
+        """执行器实际操作的位置（0-1000相对坐标），拖拽为 (起点, 终点)"""
+        executor = self.agent.executor
+        if "coords" in execution:
+            return executor.to_relative(execution["coords"]["x"], execution["coords"]["y"])
+        if "start" in execution and "end" in execution:
+            return (executor.to_relative(execution["start"]["x"], execution["start"]["y"]),
+                    executor.to_relative(execution["end"]["x"], execution["end"]["y"]))
+        return None
+    
+    def _observe(self, feedback, frame):
+        """在紧凑反馈的结果行后补上界面变化和稳定用时，上次附上的格式说明已不在保留的历史中时重新附上"""
+        line, _, rest = feedback.partition("\n")
+        change = None
+        if frame is not None and self.last_frame is not None:
+            change = frame_change(self.last_frame, frame)
+        line += observation(change, self.last_settle)
+        feedback = f"{line}\n{rest}" if rest else line
+        if needs_guidance(self._guidance_turn, self.agent.turns, self.agent.retained_turns()):
+            feedback = f"{GUIDANCE}\n{feedback}"
+            self._guidance_turn = self.agent.turns
+        return feedback
+    
+    def should_stop(self):
+        """进度监控是否要求结束任务（步骤或耗时预算用完，或纠正后仍在循环）"""
+        return bool(self.verdict) and self.verdict["status"] == "abort"
+    
+    def generate_feedback(self, action):
+        """根据action类型生成自动反馈"""
+        if self.feedback_style == "compact":
+            return compact_feedback(action, action.get("status", "ok"), action.get("at"),
+                                    error=action.get("error"))
+        return template_feedback(action)
+
+def run_session(mode="auto", use_screenshot=True, verbose=1, window_title=None, window_pid=None, capture="auto",
+                background_fps=0, ring_slots=8, token_budget=None, model_timeout=60, max_retries=2, hedge=False,
+                grounding=False, target_cache=None, record=None, replay=None, replay_tolerance=0.01,
+                task=None, max_steps=10, settle_seconds=10, num_history_responses=20, executor_options=None,
+                max_seconds=None, loop_options=None, route=False, text_model=None, encode_processes=0,
+                feedback_style="template", observation="screenshot", verify_effects=False):
+    """
+    运行会话，根据指定的模式和截图选项执行任务
+    
+    Args:
+        mode (str): 会话模式，"auto"表示自动反馈，"interactive"表示交互式
+        use_screenshot (bool): 是否使用截图，True使用实际截图，False为缸中脑模式
+        verbose (int): 日志详细程度，0=静默，1=普通，2=详细
+        window_title (str, optional): 目标窗口标题，设置后只截取并操作该窗口
+        window_pid (int, optional): 目标窗口所属进程PID
+        capture (str): 截图后端，"auto"、"xshm" 或 "pyautogui"
+        background_fps (float): 后台截图帧率，大于0时启用后台截图线程
+        ring_slots (int): 后台截图环形缓冲区槽位数
+        token_budget (int, optional): 单次请求的token预算
+        model_timeout (float): 单次模型调用的超时时间（秒）
+        max_retries (int): 模型调用遇到超时、限流或5xx错误时的最多重试次数
+        hedge (bool): 是否启用对冲请求（调用超过近期p95延迟时再发一个相同请求）
+        grounding (bool): 是否在点击前用本地元素检测器检查位置（吸附到附近控件、拦截空白处的点击）
+        target_cache (str, optional): 点击目标缓存目录
+        record (str, optional): 录制操作轨迹，会话结束后保存到该JSON文件
+        replay (str, optional): 回放该JSON文件中录制的轨迹，代替auto/interactive模式
+        replay_tolerance (float): 回放时允许的截图变化比例
+        task (str, optional): 自动模式的整体任务，默认使用预设任务
+        max_steps (int): 最大步骤数，防止无限循环
+        settle_seconds (float): 自动模式下每步之间等待界面稳定的最长时间（秒）
+        num_history_responses (int): 发送给模型的最多历史轮数
+        executor_options (dict, optional): 执行器的节奏参数（scroll_clicks、drag_duration、type_delay、wait_seconds）
+        max_seconds (float, optional): 整个任务的最长耗时（秒）
+        loop_options (dict, optional): 循环检测参数（repeat_limit、stall_steps、oscillation_cycles、max_corrections），
+            None表示使用ProgressMonitor的默认值
+        route (bool): 是否启用模型路由，不需要看截图的轮次（缸中脑模式、finished后的确认）发给纯文本模型
+        text_model (str, optional): 纯文本轮次使用的模型接入点，默认DeepSeek V3
+        encode_processes (int): 截图编码进程池的工作进程数，0表示在会话线程中编码
+        feedback_style (str): 自动反馈格式，"template"或"compact"
+        observation (str): 每步的观察方式，"screenshot"、"tree"（无障碍控件树）或"tree+image"（控件树加缩小的截图）
+        verify_effects (bool): 是否检查动作的可见效果，没有变化时先在本地重试
+    """
+    monitor = ProgressMonitor(max_steps=max_steps, max_seconds=max_seconds, **(loop_options or {}))
+    router = create_router(route, text_model)
+    call_policy = CallPolicy(timeout=model_timeout, max_retries=max_retries, hedge=hedge)
+    agent = MultiTurnAgent(use_screenshot=use_screenshot, verbose=verbose,
+                           window_title=window_title, window_pid=window_pid, capture=capture,
+                           background_fps=background_fps, ring_slots=ring_slots, token_budget=token_budget,
+                           call_policy=call_policy, grounding=grounding,
+                           target_cache=target_cache, record=bool(record),
+                           num_history_responses=num_history_responses, executor_options=executor_options,
+                           monitor=monitor, router=router, encoder=encode_processes,
+                           feedback_style=feedback_style, observation=observation,
+                           verify_effects=verify_effects)
+    
+    if replay:
+        trajectory = Trajectory.load(replay)
+        # 回放的步骤不占用模型步骤的预算
+        monitor.max_steps = len(trajectory) + max_steps
+        if verbose > 0:
+            print(f"回放轨迹: {replay} ({len(trajectory)} 步), 任务: {trajectory.task}")
+        stats = agent.replay(trajectory, tolerance=replay_tolerance, max_extra_steps=max_steps,
+                             settle_seconds=settle_seconds)
+        if verbose > 0:
+            print(f"\n回放完成: {stats['steps']} 步, 回放 {stats['replayed']} 步, 调用模型 {stats['model']} 步, "
+                  f"跳过 {stats['skipped']} 步, 用时 {stats['seconds']:.1f} 秒, "
+                  f"{'任务已完成' if stats['finished'] else '任务未完成'}")
+        _finish_session(agent, record)
+        return
+    
+    if verbose > 0:
+        # 使用模式文字描述
+        mode_text = "交互式" if mode == "interactive" else "自动反馈"
+        screenshot_text = "使用实际截图" if use_screenshot else "缸中脑模式(无截图)"
+        if use_screenshot and agent.window:
+            screenshot_text += f", 目标窗口 {agent.window.describe()}"
+        
+        print("="*50)
+        print(f"UI-TARS {mode_text}会话 ({screenshot_text})")
+        print("="*50)
+    
+    # 获取初始任务
+    if mode == "interactive":
+        # 交互式模式下通过输入获取任务
+        initial_task = input("\n请输入整体任务: ")
+        if initial_task.lower() in ['quit', 'exit']:
+            agent.close()
+            return
+    else:
+        # 自动模式下使用指定的任务或预设任务
+        initial_task = task or "打开微信，给文件传输助手发送一条消息：你好啊"
+        if verbose > 0:
+            print(f"\n使用任务: {initial_task}")
+    
+    # 处理初始任务
+    result = agent.process_initial_task(initial_task)
+    if not result:
+        print("初始任务处理失败")
+        agent.close()
+        return
+    
+    steps = 0
+    
+    if mode == "auto" and verbose > 0:
+        print("\n开始执行自动反馈序列...")
+    
+    # 循环执行直到任务完成，或进度监控要求结束（步骤、耗时预算用完或陷入循环）
+    while True:
+        if agent.should_stop():
+            if verbose > 0:
+                print(f"\n任务提前结束: {agent.verdict['message']}")
+            break
+        steps += 1
+        
+        if mode == "interactive":
+            # 交互式模式下通过用户输入获取反馈
+            feedback = input("\n请输入执行结果或下一步指令 ('quit'退出, 'summary'查看历史, 'auto'使用自动反馈): ")
+            
+            if feedback.lower() in ['quit', 'exit']:
+                break
+            elif feedback.lower() == 'summary':
+                agent.print_action_summary()
+                steps -= 1
+                continue
+            elif feedback.lower() == 'auto':
+                # 使用自动生成的反馈
+                feedback = agent.next_feedback()
+                if verbose > 0:
+                    print(f"使用自动反馈: {feedback}")
+        else:
+            # 自动模式下生成反馈（陷入循环时附带纠正提示）
+            feedback = agent.next_feedback()
+            
+            if verbose > 0:
+                print(f"\n--- 步骤 {steps}/{max_steps} ---")
+                print(f"自动反馈: {feedback}")
+            
+            # 暂停一下，方便查看流程；启用后台截图时界面稳定后即继续
+            agent.wait_for_settle(settle_seconds)
+        
+        # 处理当前反馈
+        result = agent.process_feedback(feedback)
+        
+        # 检查是否完成任务
+        if result and result['action']['type'] == 'finished':
+            if verbose > 0:
+                print(f"\n任务已完成: {result['action']['params'].get('content', '任务完成')}")
+            if mode == "interactive":
+                cont = input("\n任务已标记为完成，是否继续? (y/n): ")
+                if cont.lower() != 'y':
+                    break
+            else:
+                break
+    
+    _finish_session(agent, record)
+
+
+def _finish_session(agent, record=None):
+    """打印操作历史摘要，保存录制的轨迹并释放资源"""
+    agent.print_action_summary()
+    if record and agent.trajectory is not None:
+        agent.trajectory.save(record)
+        if agent.verbose > 0:
+            print(f"操作轨迹已保存至: {record} ({len(agent.trajectory)} 步)")
+    agent.close()
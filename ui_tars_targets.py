@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+
+def _box_sums(values, height, width):
+    # 用积分图计算每个height×width窗口内的和，返回 (H-height+1, W-width+1)
+    import numpy as np
+
+    integral = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(values, axis=0), axis=1, out=integral[1:, 1:])
+    return (integral[height:, width:] - integral[:-height, width:]
+            - integral[height:, :-width] + integral[:-height, :-width])
+
+
+def match_template(image, template):
+    """
+    归一化互相关（NCC）模板匹配，互相关用FFT计算，窗口均值和方差用积分图计算
+
+    Args:
+        image (numpy.ndarray): (H, W) 灰度图
+        template (numpy.ndarray): (h, w) 灰度模板，h <= H 且 w <= W
+
+    Returns:
+        numpy.ndarray|None: (H-h+1, W-w+1) 的相关系数（-1到1），位置为模板左上角；
+            模板没有纹理（方差为0）时返回None
+    """
+    import numpy as np
+
+    image = image.astype(np.float32)
+    template = template.astype(np.float32)
+    h, w = template.shape
+    H, W = image.shape
+
+    t = template - template.mean()
+    t_norm = float(np.sqrt((t * t).sum()))
+    if t_norm < 1e-3:
+        return None
+
+    # 模板去均值后，sum(f·t) 等于 sum((f - 窗口均值)·t)
+    shape = (H + h - 1, W + w - 1)
+    spectrum = np.fft.rfft2(image, shape) * np.fft.rfft2(t[::-1, ::-1], shape)
+    corr = np.fft.irfft2(spectrum, shape)[h - 1:H, w - 1:W]
+
+    sums = _box_sums(image, h, w)
+    squares = _box_sums(image * image, h, w)
+    variance = np.maximum(squares - sums * sums / (h * w), 0)
+    denom = np.sqrt(variance) * t_norm
+    # 平坦区域（纯色背景）不可能匹配有纹理的模板
+    return np.where(denom > 1e-3 * t_norm, corr / np.maximum(denom, 1e-12), 0).astype(np.float32)
+
+
+def _downsample(image, factor):
+    # 按factor×factor块求均值缩小
+    h, w = image.shape[0] // factor, image.shape[1] // factor
+    return image[:h * factor, :w * factor].reshape(h, factor, w, factor).mean(axis=(1, 3))
+
+
+class TargetCache:
+    """
+    点击目标缓存：模型的点击成功后保存目标周围的小图块，以步骤描述为键；
+    之后遇到相同的步骤时先在新截图里做模板匹配，置信度足够高就直接点击，不再调用模型
+
+    匹配分两级：
+    1. 在上次的位置附近用原分辨率匹配（窗口没动时只需几毫秒）
+    2. 附近没找到时在缩小的金字塔层上全图匹配，再回到原分辨率在候选位置附近精修
+
+    目标离开原位后还要求最佳位置明显优于其他位置，避免在重复的图标、列表项之间点错
+    """
+
+    def __init__(self, path=None, patch_size=64, threshold=0.92, margin=0.05, search_radius=64,
+                 max_entries=500):
+        """
+        初始化目标缓存
+
+        Args:
+            path (str, optional): 缓存目录，设置后图块和索引保存到磁盘，下次运行可以复用
+            patch_size (int): 保存的图块边长（像素）
+            threshold (float): 直接点击所需的最低相关系数
+            margin (float): 目标不在原位时，最佳位置至少比次佳位置高出的相关系数
+            search_radius (int): 第一级在上次位置附近搜索的半径（像素）
+            max_entries (int): 最多保存的条目数，超出时淘汰最久未使用的
+        """
+        self.path = path
+        self.patch_size = patch_size
+        self.threshold = threshold
+        self.margin = margin
+        self.search_radius = search_radius
+        self.max_entries = max_entries
+        self.logger = logging.getLogger("TargetCache")
+
+        self.entries = {}
+        self.patches = {}
+        self._lock = threading.Lock()
+        self.counters = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "local_hits": 0}
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    def _load(self):
+        index_path = os.path.join(self.path, "index.json")
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, "r", encoding="utf-8") as f:
+            self.entries = json.load(f)
+
+    def _save(self):
+        index_path = os.path.join(self.path, "index.json")
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, index_path)
+
+    def _patch(self, digest):
+        # 图块按需从磁盘读取
+        import numpy as np
+
+        patch = self.patches.get(digest)
+        if patch is None and self.path:
+            patch_path = os.path.join(self.path, f"{digest}.png")
+            if os.path.exists(patch_path):
+                from PIL import Image
+                with Image.open(patch_path) as image:
+                    patch = np.asarray(image.convert("L"), dtype=np.int16)
+                self.patches[digest] = patch
+        return patch
+
+    def store(self, key, gray, x, y, action_type, thought=""):
+        """
+        保存一次成功点击的目标
+
+        Args:
+            key (str): 步骤描述
+            gray (numpy.ndarray): 点击前的灰度截图
+            x (int): 点击位置在截图中的横坐标
+            y (int): 点击位置在截图中的纵坐标
+            action_type (str): 动作类型（click、left_double、right_single）
+            thought (str): 模型当时的思考，命中缓存时写入历史
+
+        Returns:
+            bool: 是否保存（图块没有纹理时不保存）
+        """
+        import numpy as np
+
+        height, width = gray.shape
+        size = min(self.patch_size, width, height)
+        left = min(max(x - size // 2, 0), width - size)
+        top = min(max(y - size // 2, 0), height - size)
+        patch = np.ascontiguousarray(gray[top:top + size, left:left + size], dtype=np.int16)
+        if patch.std() < 2:
+            # 纯色区域无法可靠匹配
+            return False
+
+        digest = self._digest(key)
+        entry = {
+            "key": key,
+            "action_type": action_type,
+            "thought": thought,
+            "frame_size": [width, height],
+            "patch_box": [left, top, left + size, top + size],
+            "offset": [x - left, y - top],
+            "hits": 0,
+            "updated": time.time(),
+        }
+        with self._lock:
+            self.entries[digest] = entry
+            self.patches[digest] = patch
+            self.counters["stores"] += 1
+            self._evict()
+            if self.path:
+                from PIL import Image
+                Image.fromarray(patch.astype(np.uint8)).save(os.path.join(self.path, f"{digest}.png"))
+                self._save()
+        return True
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            oldest = min(self.entries, key=lambda digest: self.entries[digest]["updated"])
+            del self.entries[oldest]
+            self.patches.pop(oldest, None)
+            if self.path:
+                patch_path = os.path.join(self.path, f"{oldest}.png")
+                if os.path.exists(patch_path):
+                    os.remove(patch_path)
+
+    def forget(self, key):
+        """
+        删除一个步骤的缓存（例如缓存的点击没有产生预期效果时）
+        """
+        digest = self._digest(key)
+        with self._lock:
+            if self.entries.pop(digest, None) is not None:
+                self.patches.pop(digest, None)
+                if self.path:
+                    self._save()
+
+    def lookup(self, key, gray):
+        """
+        在新截图中查找步骤的目标
+
+        Args:
+            key (str): 步骤描述
+            gray (numpy.ndarray): 当前的灰度截图
+
+        Returns:
+            dict|None: 找到时返回 x、y（截图坐标）、score、stage（local或global）、
+                action_type和thought；没有缓存或置信度不够时返回None
+        """
+        digest = self._digest(key)
+        entry = self.entries.get(digest)
+        if entry is None:
+            return None
+        self.counters["lookups"] += 1
+
+        patch = self._patch(digest)
+        height, width = gray.shape
+        if patch is None or [width, height] != entry["frame_size"]:
+            self.counters["misses"] += 1
+            return None
+
+        found = self._match_local(gray, patch, entry) or self._match_global(gray, patch)
+        if found is None:
+            self.counters["misses"] += 1
+            return None
+
+        left, top, score, stage = found
+        with self._lock:
+            entry["hits"] += 1
+            entry["updated"] = time.time()
+        self.counters["hits"] += 1
+        if stage == "local":
+            self.counters["local_hits"] += 1
+        return {
+            "x": left + entry["offset"][0],
+            "y": top + entry["offset"][1],
+            "score": score,
+            "stage": stage,
+            "action_type": entry["action_type"],
+            "thought": entry["thought"],
+        }
+
+    def _best(self, scores, guard):
+        """
+        返回最佳位置及其与次佳位置（排除最佳位置附近guard范围）的差距
+
+        Returns:
+            tuple: (行, 列, 最佳相关系数, 与次佳的差距)
+        """
+        import numpy as np
+
+        row, col = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        best = float(scores[row, col])
+        masked = scores.copy()
+        masked[max(0, row - guard):row + guard + 1, max(0, col - guard):col + guard + 1] = -1
+        second = float(masked.max())
+        return int(row), int(col), best, best - second
+
+    def _match_local(self, gray, patch, entry):
+        # 第一级：在上次位置附近用原分辨率匹配
+        size_h, size_w = patch.shape
+        left, top = entry["patch_box"][:2]
+        r = self.search_radius
+        x1, y1 = max(0, left - r), max(0, top - r)
+        x2, y2 = min(gray.shape[1], left + size_w + r), min(gray.shape[0], top + size_h + r)
+        scores = match_template(gray[y1:y2, x1:x2], patch)
+        if scores is None:
+            return None
+        row, col, score, gap = self._best(scores, min(size_h, size_w) // 2)
+        if score < self.threshold:
+            return None
+        # 目标仍在原位时即使附近有相同的图标也认为是同一个；移动过时要求没有同样好的其他位置
+        unmoved = abs(x1 + col - left) <= 2 and abs(y1 + row - top) <= 2
+        if not unmoved and gap < self.margin:
+            return None
+        return x1 + col, y1 + row, score, "local"
+
+    def _match_global(self, gray, patch, candidates=5):
+        # 第二级：金字塔上层全图匹配找出几个候选位置，再在原分辨率下逐个精修
+        import numpy as np
+
+        size = min(patch.shape)
+        factor = 1
+        while size // (factor * 2) >= 12:
+            factor *= 2
+
+        coarse = match_template(_downsample(gray, factor), _downsample(patch, factor))
+        if coarse is None:
+            return None
+
+        # 缩小后文字等细节变模糊，相似的位置（例如同一列表的各项）得分接近，
+        # 因此取前几个候选，用原分辨率的得分来比较
+        guard = max(1, size // factor // 2)
+        size_h, size_w = patch.shape
+        refined = []
+        for _ in range(candidates):
+            row, col = np.unravel_index(int(np.argmax(coarse)), coarse.shape)
+            if coarse[row, col] <= 0:
+                break
+            coarse[max(0, row - guard):row + guard + 1, max(0, col - guard):col + guard + 1] = -1
+
+            x1 = max(0, col * factor - factor)
+            y1 = max(0, row * factor - factor)
+            x2 = min(gray.shape[1], col * factor + size_w + factor)
+            y2 = min(gray.shape[0], row * factor + size_h + factor)
+            scores = match_template(gray[y1:y2, x1:x2], patch)
+            if scores is None:
+                continue
+            r, c, score, _ = self._best(scores, 1)
+            refined.append((score, x1 + c, y1 + r))
+
+        if not refined:
+            return None
+        refined.sort(reverse=True)
+        score, x, y = refined[0]
+        second = refined[1][0] if len(refined) > 1 else -1.0
+        if score < self.threshold or score - second < self.margin:
+            return None
+        return x, y, score, "global"
+
+    def stats(self):
+        """
+        返回条目数和命中统计
+
+        Returns:
+            dict: entries、lookups、hits、misses、stores、local_hits
+        """
+        return dict(self.counters, entries=len(self.entries))
@@ -0,0 +1,216 @@
+import sys
+import subprocess
+import logging
+
+
+class WindowTarget:
+    """
+    目标窗口类，按窗口标题或进程PID定位应用窗口，并跟踪其在屏幕上的位置
+    """
+
+    def __init__(self, title=None, pid=None):
+        """
+        初始化目标窗口
+
+        Args:
+            title (str, optional): 窗口标题（包含匹配），如 "微信"
+            pid (int, optional): 窗口所属进程的PID（仅Linux和Windows支持；macOS上同时指定标题时只按标题匹配）
+
+        Raises:
+            ValueError: 没有指定标题和PID，或当前平台不支持按PID匹配而又没有指定标题
+        """
+        if not title and not pid:
+            raise ValueError("必须指定窗口标题或进程PID")
+
+        self.title = title
+        self.pid = int(pid) if pid else None
+
+        self.logger = logging.getLogger("WindowTarget")
+        if self.pid and not self.pid_supported():
+            if not title:
+                raise ValueError(f"当前平台（{sys.platform}）不支持按进程PID匹配窗口，请改用窗口标题")
+            self.logger.warning(f"当前平台（{sys.platform}）不支持按进程PID匹配窗口，只按标题 '{title}' 匹配")
+
+        # 最近一次定位到的窗口句柄和矩形 (left, top, width, height)
+        self.handle = None
+        self.rect = None
+
+    @staticmethod
+    def pid_supported():
+        """
+        当前平台能否按进程PID匹配窗口：Linux通过xdotool，Windows通过GetWindowThreadProcessId，
+        macOS上pygetwindow取不到窗口所属的进程
+        """
+        return sys.platform.startswith("linux") or sys.platform == "win32"
+
+    def describe(self):
+        """
+        返回窗口的可读描述
+        """
+        if self.title and self.pid:
+            return f"'{self.title}' (PID {self.pid})"
+        if self.title:
+            return f"'{self.title}'"
+        return f"PID {self.pid}"
+
+    def locate(self):
+        """
+        定位窗口并返回其当前矩形，窗口移动或缩放后返回新的位置
+
+        Returns:
+            tuple|None: (left, top, width, height)，找不到窗口时返回None
+        """
+        try:
+            if sys.platform.startswith("linux"):
+                rect = self._locate_x11()
+            else:
+                rect = self._locate_pygetwindow()
+        except Exception as e:
+            self.logger.warning(f"定位窗口失败: {e}")
+            rect = None
+
+        if rect is None:
+            self.handle = None
+            self.rect = None
+            return None
+
+        rect = self._clip_to_screen(rect)
+        if rect != self.rect and self.rect is not None:
+            self.logger.info(f"窗口 {self.describe()} 位置变化: {self.rect} -> {rect}")
+        self.rect = rect
+        return rect
+
+    def _clip_to_screen(self, rect):
+        """
+        将窗口矩形裁剪到屏幕范围内，避免截图和点击越界
+
+        Args:
+            rect (tuple): (left, top, width, height)
+
+        Returns:
+            tuple|None: 裁剪后的矩形
+        """
+        import pyautogui
+
+        screen_width, screen_height = pyautogui.size()
+        left, top, width, height = rect
+        right = min(left + width, screen_width)
+        bottom = min(top + height, screen_height)
+        left = max(left, 0)
+        top = max(top, 0)
+
+        if right <= left or bottom <= top:
+            return None
+        return (left, top, right - left, bottom - top)
+
+    def _locate_x11(self):
+        """
+        在Linux/X11下通过xdotool定位窗口
+
+        Returns:
+            tuple|None: 窗口矩形
+        """
+        # 优先复用上次找到的窗口，窗口关闭后再重新搜索
+        if self.handle is not None:
+            rect = self._x11_geometry(self.handle)
+            if rect is not None:
+                return rect
+
+        command = ["xdotool", "search", "--onlyvisible"]
+        if self.pid:
+            command += ["--pid", str(self.pid)]
+        if self.title:
+            command += ["--name", self.title]
+
+        output = subprocess.run(command, capture_output=True, text=True, timeout=2).stdout
+        for window_id in output.split():
+            rect = self._x11_geometry(window_id)
+            # 忽略不可见的零尺寸窗口
+            if rect is not None and rect[2] > 1 and rect[3] > 1:
+                self.handle = window_id
+                return rect
+        return None
+
+    def _x11_geometry(self, window_id):
+        """
+        读取X11窗口的位置和尺寸
+
+        Args:
+            window_id (str): X11窗口ID
+
+        Returns:
+            tuple|None: 窗口矩形
+        """
+        result = subprocess.run(
+            ["xdotool", "getwindowgeometry", "--shell", str(window_id)],
+            capture_output=True, text=True, timeout=2
+        )
+        if result.returncode != 0:
+            return None
+
+        values = {}
+        for line in result.stdout.splitlines():
+            key, _, value = line.partition("=")
+            values[key] = value
+
+        try:
+            return (int(values["X"]), int(values["Y"]), int(values["WIDTH"]), int(values["HEIGHT"]))
+        except (KeyError, ValueError):
+            return None
+
+    def _locate_pygetwindow(self):
+        """
+        在Windows/macOS下通过pygetwindow定位窗口
+
+        Returns:
+            tuple|None: 窗口矩形
+        """
+        import pygetwindow
+
+        if self.title:
+            windows = pygetwindow.getWindowsWithTitle(self.title)
+        else:
+            windows = pygetwindow.getAllWindows()
+
+        if self.pid and self.pid_supported():
+            windows = [w for w in windows if self._window_pid(w) == self.pid]
+
+        for window in windows:
+            if window.isMinimized or window.width <= 1 or window.height <= 1:
+                continue
+            self.handle = window
+            return (window.left, window.top, window.width, window.height)
+        return None
+
+    def _window_pid(self, window):
+        """
+        获取窗口所属进程的PID（仅Windows）
+
+        Args:
+            window: pygetwindow窗口对象
+
+        Returns:
+            int|None: 进程PID
+        """
+        if sys.platform != "win32":
+            return None
+
+        import ctypes
+        from ctypes import wintypes
+
+        pid = wintypes.DWORD()
+        ctypes.windll.user32.GetWindowThreadProcessId(window._hWnd, ctypes.byref(pid))
+        return pid.value
+
+
+# 测试代码
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='窗口定位测试')
+    parser.add_argument('--title', help='窗口标题')
+    parser.add_argument('--pid', type=int, help='进程PID')
+    args = parser.parse_args()
+
+    window = WindowTarget(title=args.title, pid=args.pid)
+    print(f"窗口 {window.describe()} 的位置: {window.locate()}")